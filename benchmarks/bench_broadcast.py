@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import random
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from cs2posts.bot.chats import Chat
+from cs2posts.bot.chats import Chats
+from cs2posts.bot.cs2 import CounterStrike2UpdateBot
+from cs2posts.bot.spam import SpamProtector
+from cs2posts.crawler import CounterStrike2Crawler
+from cs2posts.fake.steam import create_history
+from cs2posts.fake.steam import FakeSteamNewsAPI
+from cs2posts.fake.telegram import FakeTelegramBotAPI
+from cs2posts.post import Post
+from cs2posts.store import LocalChatStore
+from cs2posts.store import LocalLatestPostStore
+
+# Broadcasts one post to many synthetic chats through the local fake
+# Telegram Bot API and reports throughput and tail latencies.
+# Usage: python -m benchmarks.bench_broadcast --chats 100000 --global-rate 0
+
+
+def percentiles(values: list[float]) -> str:
+    values = sorted(values)
+    if not values:
+        return "-"
+    result = []
+    for p in (50, 90, 99, 99.9):
+        result.append(f"p{p}={values[min(len(values) - 1, int(len(values) * p / 100))] * 1000:.2f}")
+    result.append(f"max={values[-1] * 1000:.2f}")
+    return " ".join(result) + " ms"
+
+
+def create_post(url: str) -> Post:
+    return Post(gid="5762994032385146001",
+                title="Counter-Strike 2 News",
+                url=url,
+                is_external_url=True,
+                author="Vitaliy",
+                contents="[p]A new operation starts today.[/p][list][*]New maps[*]New skins[/list]",
+                feedlabel="Community Announcements",
+                date=1713310428,
+                feedname="steam_community_announcements",
+                feed_type=1,
+                appid=730)
+
+
+async def broadcast(bot: CounterStrike2UpdateBot, post: Post) -> list[float]:
+    # Time of every single send_message including retries
+    latencies = []
+    send_message = bot.send_message
+
+    async def timed_send_message(*args, **kwargs) -> None:
+        start = time.perf_counter()
+        await send_message(*args, **kwargs)
+        latencies.append(time.perf_counter() - start)
+
+    bot.send_message = timed_send_message
+    await bot.app.initialize()
+    try:
+        await bot.send_post_to_chats(SimpleNamespace(bot=bot.app.bot), post)
+    finally:
+        await bot.app.shutdown()
+    return latencies
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=100_000)
+    parser.add_argument("--per-chat-rate", type=float, default=1.0)
+    parser.add_argument("--per-chat-burst", type=int, default=3)
+    parser.add_argument("--global-rate", type=float, default=0.0,
+                        help="Messages per second of all chats, Telegram allows ~30")
+    parser.add_argument("--forbidden", type=float, default=0.001,
+                        help="Fraction of chats which blocked the bot")
+    parser.add_argument("--migrated", type=float, default=0.0001,
+                        help="Fraction of chats migrated to a supergroup")
+    args = parser.parse_args()
+
+    # The bot logs every blocked or migrated chat
+    logging.disable(logging.CRITICAL)
+
+    rnd = random.Random(42)
+    chat_ids = range(1, args.chats + 1)
+    forbidden = {chat_id for chat_id in chat_ids if rnd.random() < args.forbidden}
+    migrated = {chat_id: -1000000000000 - chat_id for chat_id in chat_ids
+                if chat_id not in forbidden and rnd.random() < args.migrated}
+
+    end = 1713310428
+    history = create_history(end - 365 * 24 * 3600, end)
+    with (FakeSteamNewsAPI(history) as steam,
+          FakeTelegramBotAPI(per_chat_rate=args.per_chat_rate,
+                             per_chat_burst=args.per_chat_burst,
+                             global_rate=args.global_rate,
+                             forbidden_chats=forbidden,
+                             migrated_chats=migrated) as telegram,
+          tempfile.TemporaryDirectory() as tmp):
+        bot = CounterStrike2UpdateBot(
+            token="123:fake",
+            base_url=telegram.base_url,
+            crawler=CounterStrike2Crawler(steam.url),
+            spam_protector=SpamProtector(),
+            local_post_store=LocalLatestPostStore(Path(tmp) / "latest.json"),
+            local_chat_store=LocalChatStore(Path(tmp) / "chats.json"))
+        bot.chats = Chats(chats=[Chat(chat_id=chat_id, is_running=True) for chat_id in chat_ids])
+
+        print(f"chats={args.chats} forbidden={len(forbidden)} migrated={len(migrated)}"
+              f" per_chat_rate={args.per_chat_rate} global_rate={args.global_rate}")
+
+        start = time.monotonic()
+        latencies = asyncio.run(broadcast(bot, create_post(f"{telegram.base_url}/news")))
+        elapsed = time.monotonic() - start
+
+        # A post is delivered to a chat with its last message
+        deliveries = telegram.deliveries
+        delivered = {}
+        for at, _, chat_id in deliveries:
+            delivered[chat_id] = at - start
+        print(f"elapsed={elapsed:.2f} s messages={len(deliveries)} chats={len(delivered)}"
+              f" throughput={len(deliveries) / elapsed:.0f} msg/s")
+        print(f"errors={telegram.errors} chats left={len(bot.chats)}")
+        print(f"send latency      {percentiles(latencies)}")
+        print(f"time to delivery  {percentiles(list(delivered.values()))}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from cs2posts.bot.chats import Chat
+from cs2posts.bot.chats import Chats
+
+# Measures broadcast audience selection on a large number of chats.
+# Usage: python -m benchmarks.bench_chats --chats 1000000
+
+
+def measure(label: str, func, repeat: int = 5) -> None:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    print(f"{label:<36} best={min(timings) * 1000:10.3f} ms")
+
+
+def scan_running_and_interested_in_news(chats: Chats) -> list[Chat]:
+    # Linear scan as done before the audience indexes existed
+    return [chat for chat in chats if chat.is_running and chat.is_news_interested]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=1_000_000)
+    parser.add_argument("--running", type=float, default=0.1,
+                        help="Fraction of running chats")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+
+    start = time.perf_counter()
+    chats = Chats(chats=[
+        Chat(chat_id=i, is_running=rng.random() < args.running,
+             is_news_interested=rng.random() < 0.8)
+        for i in range(args.chats)])
+    print(f"build chats={args.chats}: {time.perf_counter() - start:.2f} s")
+
+    audience = len(chats.get_running_and_interested_in_news())
+    print(f"news audience={audience}")
+
+    measure("scan running & news", lambda: scan_running_and_interested_in_news(chats))
+    measure("index running & news", chats.get_running_and_interested_in_news)
+    measure("index running & updates", chats.get_running_and_interested_in_updates)
+
+    sample = [chats.get(rng.randrange(args.chats)) for _ in range(10_000)]
+
+    def toggle() -> None:
+        for chat in sample:
+            chat.is_news_interested = not chat.is_news_interested
+
+    measure("10k option toggles", toggle)
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
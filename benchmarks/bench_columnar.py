@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from cs2posts.bot.chats import Chats
+from cs2posts.bot.columnar import ColumnarChats
+from cs2posts.bot.snapshot import ChatFlags
+from cs2posts.bot.snapshot import ChatSnapshotCodec
+
+# Compares memory and audience selection of Chats and ColumnarChats.
+# Usage: python -m benchmarks.bench_columnar --chats 1000000 10000000
+
+
+def create_records(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    for chat_id in range(count):
+        flags = ChatFlags.IS_UPDATE_INTERESTED | ChatFlags.IS_EXTERNAL_NEWS_INTERESTED
+        if rng.random() < 0.1:
+            flags |= ChatFlags.IS_RUNNING
+        if rng.random() < 0.8:
+            flags |= ChatFlags.IS_NEWS_INTERESTED
+        yield chat_id, chat_id, flags, 1713270000000 + chat_id
+
+
+def build(label: str, factory):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    chats = factory()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<40} build={elapsed:8.2f} s  memory={current / 1024 / 1024:10.1f} MiB"
+          f"  ({current / len(chats):6.1f} B/chat)")
+    return chats
+
+
+def measure(label: str, func, repeat: int = 5) -> None:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    size = result if isinstance(result, int) else len(result)
+    print(f"{label:<40} best={min(timings) * 1000:10.2f} ms  result={size}")
+
+
+def bench_dict(count: int) -> None:
+    chats = build("dict Chats", lambda: Chats(chats=[
+        ChatSnapshotCodec.decode_record(*record)
+        for record in create_records(count)]))
+    measure("dict running & news", chats.get_running_and_interested_in_news)
+
+
+def bench_columnar(count: int) -> None:
+    chats = build("ColumnarChats",
+                  lambda: ColumnarChats.from_records(create_records(count)))
+    measure("columnar running & news (views)",
+            chats.get_running_and_interested_in_news)
+    measure("columnar running & news (ids)",
+            lambda: chats.get_audience_ids("running_news"))
+    measure("columnar count running",
+            lambda: chats.count_audience("running"))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, nargs="+",
+                        default=[1_000_000, 10_000_000])
+    parser.add_argument("--dict-limit", type=int, default=1_000_000,
+                        help="Skip the dict backend above this many chats")
+    args = parser.parse_args()
+
+    for count in args.chats:
+        print(f"--- {count} chats")
+        if count <= args.dict_limit:
+            bench_dict(count)
+        bench_columnar(count)
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
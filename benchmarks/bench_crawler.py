@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from cs2posts.crawler import CounterStrike2Crawler
+from cs2posts.cs2 import CounterStrike2Posts
+from cs2posts.fake.steam import create_history
+from cs2posts.fake.steam import FakeSteamNewsAPI
+
+# Measures crawling and parsing against the local fake Steam News API.
+# Usage: python -m benchmarks.bench_crawler --latency 0.05 --error-rate 0.1
+
+
+def measure(label: str, func, repeat: int) -> None:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    print(f"{label:<36} best={min(timings) * 1000:10.2f} ms  result={result}")
+
+
+def crawl_all(crawler: CounterStrike2Crawler, count: int, requests_count: int,
+              concurrency: int) -> str:
+    # Failed requests are counted, not raised
+    def crawl(_: int) -> bool:
+        try:
+            crawler.crawl(count=count)
+            return True
+        except Exception:
+            return False
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        ok = sum(executor.map(crawl, range(requests_count)))
+    return f"{ok}/{requests_count} ok"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=4)
+    parser.add_argument("--contents", type=int, default=4096)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    end = 1713310428
+    newsitems = create_history(end - args.years * 365 * 24 * 3600, end,
+                               contents_size=args.contents)
+    print(f"posts={len(newsitems)} contents={args.contents} bytes"
+          f" latency={args.latency}s error_rate={args.error_rate}")
+
+    # Payloads and parsing are measured without latency and errors
+    with FakeSteamNewsAPI(newsitems) as api:
+        crawler = CounterStrike2Crawler(api.url)
+        for count in (10, 100, 500):
+            url = f"{api.url}?appid=730&count={count}&maxlength=0"
+            identity = len(requests.get(url, headers={"Accept-Encoding": "identity"}).content)
+            compressed = len(requests.get(url, stream=True).raw.read())
+            print(f"payload count={count:<4} {identity / 1024:10.1f} KiB"
+                  f"  gzip={compressed / 1024:8.1f} KiB")
+
+        for count in (10, 100):
+            data = crawler.crawl(count=count)
+            measure(f"parse count={count}",
+                    lambda: len(CounterStrike2Posts(data)), args.repeat)
+
+        # A poll with a matching ETag skips the transfer and parsing
+        url = f"{api.url}?appid=730&count=100&maxlength=0"
+        etag = requests.get(url).headers["ETag"]
+        measure("conditional poll (304)",
+                lambda: requests.get(url, headers={"If-None-Match": etag}).status_code,
+                args.repeat)
+
+    with FakeSteamNewsAPI(newsitems, latency=args.latency, jitter=args.jitter,
+                          error_rate=args.error_rate) as api:
+        crawler = CounterStrike2Crawler(api.url)
+        for count in (10, 100):
+            measure(f"crawl count={count}",
+                    lambda: crawl_all(crawler, count, 1, 1), args.repeat)
+
+        measure(f"{args.requests} crawls x{args.concurrency} threads",
+                lambda: crawl_all(crawler, 10, args.requests, args.concurrency), 1)
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import argparse
+import copy
+import random
+import time
+
+from cs2posts.cs2 import CounterStrike2Posts
+
+# Measures construction, filtering and comparison of a large post archive.
+# Usage: python -m benchmarks.bench_posts --posts 10000
+
+
+def create_newsitems(count: int, contents_size: int) -> dict:
+    rnd = random.Random(42)
+    items = []
+    for i in range(count):
+        kind = rnd.random()
+        items.append({
+            "gid": str(5762994032385146001 + i),
+            "title": "Release Notes for 4/16/2024" if kind < 0.3 else f"News {i}",
+            "url": f"https://store.steampowered.com/news/{i}",
+            "is_external_url": True,
+            "author": "Vitaliy",
+            "contents": "[list][*] Fixed a bug [/list]" * (contents_size // 29),
+            "feedlabel": "Community Announcements",
+            "date": 1713310428 - i * 3600,
+            "feedname": "steam_community_announcements",
+            "feed_type": 0 if kind > 0.8 else 1,
+            "appid": 730,
+            "tags": ["patchnotes"] if kind < 0.2 else [],
+        })
+    return {"appnews": {"appid": 730, "newsitems": items}}
+
+
+def measure(label: str, func, repeat: int) -> None:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    print(f"{label:<36} best={min(timings) * 1000:10.2f} ms  result={result}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--contents", type=int, default=4096)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = create_newsitems(args.posts, args.contents)
+    print(f"posts={args.posts} contents={args.contents} bytes")
+
+    measure("construct",
+            lambda: len(CounterStrike2Posts(data)), args.repeat)
+
+    posts = CounterStrike2Posts(data)
+    measure("filter news/update/external",
+            lambda: (len(posts.news_posts), len(posts.update_posts), len(posts.external_posts)),
+            args.repeat)
+    measure("latest news/update/external",
+            lambda: (posts.latest_news_post.gid, posts.latest_update_post.gid, posts.latest_external_post.gid),
+            args.repeat)
+
+    # A regular crawl of the newest posts merged into the archive
+    crawl = CounterStrike2Posts(create_newsitems(10, args.contents))
+    measure("merge crawl of 10 posts",
+            lambda: posts.merge(crawl, window=args.posts) or len(posts), args.repeat)
+
+    # Equal but distinct objects, like a post crawled twice
+    others = CounterStrike2Posts(copy.deepcopy(data)).posts
+    measure("compare equal posts",
+            lambda: sum(a == b for a, b in zip(posts.posts, others)), args.repeat)
+    measure("post['title'] access",
+            lambda: sum(len(post["title"]) for post in posts.posts), args.repeat)
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from cs2posts.archive import PostArchive
+from cs2posts.post import Post
+
+# Measures indexing and /search queries over the post archive per backend.
+# Usage: python -m benchmarks.bench_search --posts 3000
+
+WORDS = ["ancient", "anubis", "mirage", "inferno", "nuke", "vertigo", "smoke",
+         "grenade", "premier", "rating", "animation", "fixed", "bug", "crash",
+         "map", "weapon", "skin", "case", "operation", "matchmaking", "server",
+         "network", "subtick", "movement", "sound", "radar", "spectator", "hud"]
+
+
+def create_posts(count: int, words: int) -> list[Post]:
+    rnd = random.Random(42)
+    return [Post(gid=str(5762994032385146001 + i),
+                 title=" ".join(rnd.choices(WORDS, k=4)),
+                 url=f"https://store.steampowered.com/news/{i}",
+                 is_external_url=True,
+                 author="Vitaliy",
+                 contents="[list][*]" + " ".join(rnd.choices(WORDS, k=words)) + "[/list]",
+                 feedlabel="Community Announcements",
+                 date=1672531200 + i * 3600,
+                 feedname="steam_community_announcements",
+                 feed_type=1,
+                 appid=730)
+            for i in range(count)]
+
+
+def measure(label: str, func, repeat: int) -> None:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    print(f"{label:<36} best={min(timings) * 1000:10.2f} ms  result={result}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=3000)
+    parser.add_argument("--words", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    posts = create_posts(args.posts, args.words)
+    print(f"posts={args.posts} words={args.words}")
+
+    for backend in ("fts5", "inverted"):
+        archive = PostArchive(":memory:", search_backend=backend)
+        measure(f"{backend}: add", lambda: archive.add(posts), 1)
+        measure(f"{backend}: rebuild", lambda: archive.rebuild_search_index(), 1)
+        measure(f"{backend}: search 'anubis'",
+                lambda: len(archive.search("anubis")), args.repeat)
+        measure(f"{backend}: search 'fixed smoke grenade'",
+                lambda: len(archive.search("fixed smoke grenade")), args.repeat)
+        measure(f"{backend}: search unknown term",
+                lambda: len(archive.search("dust2")), args.repeat)
+        archive.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import argparse
+import mmap
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from cs2posts.bot.chats import Chat
+from cs2posts.bot.chats import Chats
+from cs2posts.bot.snapshot import ChatSnapshotCodec
+from cs2posts.store import LocalChatSnapshotStore
+from cs2posts.store import LocalChatStore
+
+# Compares loading chats from chats.json and from the binary snapshot.
+# Usage: python -m benchmarks.bench_snapshot --chats 1000000
+
+
+def create_chats(count: int) -> Chats:
+    last_activity = datetime(2024, 4, 16, 12, 30)
+    return Chats(chats=[
+        Chat(chat_id=i, chat_id_admin=i, is_running=True,
+             last_activity=last_activity)
+        for i in range(count)])
+
+
+def measure(label: str, func) -> None:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:<28} {elapsed * 1000:10.2f} ms  peak={peak / 1024 / 1024:8.1f} MiB")
+
+
+def stream_records(store: LocalChatSnapshotStore) -> None:
+    with open(store.filepath, "rb") as fs:
+        with mmap.mmap(fs.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for _ in ChatSnapshotCodec.iter_records(mm):
+                pass
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=200_000)
+    args = parser.parse_args()
+
+    chats = create_chats(args.chats)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_store = LocalChatStore(Path(tmp) / "chats.json")
+        snapshot_store = LocalChatSnapshotStore(Path(tmp) / "chats.bin")
+        json_store.save(chats)
+        snapshot_store.save(chats)
+        del chats
+
+        for store in (json_store, snapshot_store):
+            size_mb = store.filepath.stat().st_size / 1024 / 1024
+            print(f"{store.filepath.name:<28} {size_mb:10.1f} MiB")
+
+        measure("load json", json_store.load)
+        measure("load snapshot", snapshot_store.load)
+        measure("stream snapshot records",
+                lambda: stream_records(snapshot_store))
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
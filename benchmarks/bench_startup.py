@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from cs2posts.bot import settings
+from cs2posts.bot.chats import Chat
+from cs2posts.bot.chats import Chats
+from cs2posts.bot.cs2 import CounterStrike2UpdateBot
+from cs2posts.bot.spam import SpamProtector
+from cs2posts.crawler import CounterStrike2Crawler
+from cs2posts.fake.steam import create_history
+from cs2posts.fake.steam import FakeSteamNewsAPI
+from cs2posts.fake.telegram import create_command_update
+from cs2posts.fake.telegram import FakeTelegramBotAPI
+from cs2posts.store import LocalChatStore
+from cs2posts.store import LocalLatestPostStore
+
+# Cold start with an empty post store and a slow Steam API: the time from
+# creating the bot until a /latest command sent right away is answered,
+# either with the placeholder or the post. "blocking" waits for the initial
+# crawl before polling, like the bot did before posts were crawled in the
+# background.
+# Usage: python -m benchmarks.bench_startup --steam-latency 3
+
+
+async def run(bot: CounterStrike2UpdateBot, telegram: FakeTelegramBotAPI,
+              start: float, blocking: bool) -> tuple[float | None, float]:
+    # Returns the time to the first answer and until the posts were fetched
+    telegram.push_update(create_command_update(1, "/latest"))
+
+    await bot.app.initialize()
+    await bot.post_init(bot.app)
+    if blocking:
+        await bot.warm_up_task
+    await bot.app.updater.start_polling(poll_interval=0.0, timeout=10)
+    await bot.app.start()
+    try:
+        delivered = await asyncio.to_thread(telegram.wait_for_delivery, 1, start)
+        await bot.warm_up_task
+        warm = time.monotonic()
+    finally:
+        await bot.app.updater.stop()
+        await bot.app.stop()
+        await bot.app.shutdown()
+        await bot.post_shutdown(bot.app)
+
+    first_update = delivered - start if delivered is not None else None
+    return first_update, warm - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steam-latency", type=float, default=3.0,
+                        help="Seconds every Steam API request takes")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    settings.ADMISSION_RATE = 0
+
+    end = 1713310428
+    history = create_history(end - 365 * 24 * 3600, end)
+    for mode in ("blocking", "background"):
+        with (FakeSteamNewsAPI(history, latency=args.steam_latency) as steam,
+              FakeTelegramBotAPI() as telegram,
+              tempfile.TemporaryDirectory() as tmp):
+            start = time.monotonic()
+            bot = CounterStrike2UpdateBot(
+                token="123:fake",
+                base_url=telegram.base_url,
+                crawler=CounterStrike2Crawler(steam.url),
+                spam_protector=SpamProtector(),
+                local_post_store=LocalLatestPostStore(Path(tmp) / "latest.json"),
+                local_chat_store=LocalChatStore(Path(tmp) / "chats.json"))
+            bot.chats = Chats(chats=[Chat(chat_id=1, is_running=True)])
+            first_update, warm = asyncio.run(run(bot, telegram, start, mode == "blocking"))
+            first = f"{first_update * 1000:.0f} ms" if first_update is not None else "-"
+            print(f"{mode:10} time to first update processed={first} "
+                  f"posts fetched={warm * 1000:.0f} ms")
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from cs2posts.bot.chats import Chat
+from cs2posts.store import LocalChatStore
+
+# Measures the startup cost of the chat store with a large chats file.
+# Usage: python -m benchmarks.bench_store --chats 1000000
+
+
+def create_chats_file(filepath: Path, count: int) -> None:
+    chats = [Chat(chat_id=i, is_running=True).to_json() for i in range(count)]
+    with open(filepath, "w") as fs:
+        json.dump({"chats": chats}, fs, indent=4)
+
+
+def measure(label: str, func, repeat: int) -> None:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    print(f"{label:<32} best={min(timings) * 1000:10.2f} ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = Path(tmp) / "chats.json"
+        create_chats_file(filepath, args.chats)
+        size_mb = filepath.stat().st_size / 1024 / 1024
+        print(f"chats={args.chats} file={size_mb:.1f} MiB")
+
+        # Legacy file without manifest
+        store = LocalChatStore(filepath)
+        measure("is_empty (no manifest)", store.is_empty, args.repeat)
+        measure("startup (no manifest)",
+                lambda: store.is_empty() or store.load(), args.repeat)
+
+        store.save(store.load())
+        measure("is_empty (manifest)", store.is_empty, args.repeat)
+        measure("startup (manifest)",
+                lambda: store.is_empty() or store.load(), args.repeat)
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
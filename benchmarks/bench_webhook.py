@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from cs2posts.bot import settings
+from cs2posts.bot.chats import Chat
+from cs2posts.bot.chats import Chats
+from cs2posts.bot.cs2 import CounterStrike2UpdateBot
+from cs2posts.bot.spam import SpamProtector
+from cs2posts.bot.webhook import WebhookServer
+from cs2posts.crawler import CounterStrike2Crawler
+from cs2posts.fake.steam import create_history
+from cs2posts.fake.steam import FakeSteamNewsAPI
+from cs2posts.fake.telegram import create_command_update
+from cs2posts.fake.telegram import FakeTelegramBotAPI
+from cs2posts.store import LocalChatStore
+from cs2posts.store import LocalLatestPostStore
+
+# Command response latency with polling and with a webhook: the time from
+# a /latest command arriving at the fake Telegram Bot API until the answer
+# is delivered to the chat.
+# Usage: python -m benchmarks.bench_webhook --commands 500
+
+
+def percentiles(values: list[float]) -> str:
+    values = sorted(values)
+    if not values:
+        return "-"
+    result = []
+    for p in (50, 90, 99):
+        result.append(f"p{p}={values[min(len(values) - 1, int(len(values) * p / 100))] * 1000:.2f}")
+    result.append(f"max={values[-1] * 1000:.2f}")
+    return " ".join(result) + " ms"
+
+
+def create_bot(telegram: FakeTelegramBotAPI, steam: FakeSteamNewsAPI, tmp: Path,
+               chats: int) -> CounterStrike2UpdateBot:
+    bot = CounterStrike2UpdateBot(
+        token="123:fake",
+        base_url=telegram.base_url,
+        crawler=CounterStrike2Crawler(steam.url),
+        spam_protector=SpamProtector(),
+        local_post_store=LocalLatestPostStore(tmp / "latest.json"),
+        local_chat_store=LocalChatStore(tmp / "chats.json"))
+    bot.chats = Chats(chats=[Chat(chat_id=chat_id, is_running=True)
+                             for chat_id in range(1, chats + 1)])
+    return bot
+
+
+async def measure(telegram: FakeTelegramBotAPI, commands: int, interval: float) -> list[float]:
+    # Every command comes from another chat, so answers can not be mixed up
+    latencies = []
+    for chat_id in range(1, commands + 1):
+        start = time.monotonic()
+        telegram.push_update(create_command_update(chat_id, "/latest"))
+        delivered = await asyncio.to_thread(telegram.wait_for_delivery, chat_id, start)
+        if delivered is not None:
+            latencies.append(delivered - start)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def run_polling(bot: CounterStrike2UpdateBot, telegram: FakeTelegramBotAPI,
+                      commands: int, interval: float) -> list[float]:
+    # Like Application.run_polling, with the long poll timeout it uses
+    await bot.app.initialize()
+    await bot.post_init(bot.app)
+    await bot.app.updater.start_polling(poll_interval=0.0, timeout=10)
+    await bot.app.start()
+    try:
+        return await measure(telegram, commands, interval)
+    finally:
+        await bot.app.updater.stop()
+        await bot.app.stop()
+        await bot.app.shutdown()
+        await bot.post_shutdown(bot.app)
+
+
+async def run_webhook(bot: CounterStrike2UpdateBot, telegram: FakeTelegramBotAPI,
+                      commands: int, interval: float) -> list[float]:
+    stop = asyncio.Event()
+    serving = asyncio.create_task(bot.serve_webhook(WebhookServer(bot.app), stop=stop))
+    while telegram.webhook is None:
+        await asyncio.sleep(0.01)
+    try:
+        return await measure(telegram, commands, interval)
+    finally:
+        stop.set()
+        await serving
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commands", type=int, default=500)
+    parser.add_argument("--interval", type=float, default=0.0,
+                        help="Seconds between two commands")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    # Measures transport latency, not load shedding
+    settings.ADMISSION_RATE = 0
+
+    end = 1713310428
+    history = create_history(end - 365 * 24 * 3600, end)
+    for mode, run in (("polling", run_polling), ("webhook", run_webhook)):
+        with (FakeSteamNewsAPI(history) as steam,
+              FakeTelegramBotAPI() as telegram,
+              tempfile.TemporaryDirectory() as tmp):
+            bot = create_bot(telegram, steam, Path(tmp), args.commands)
+            start = time.monotonic()
+            latencies = asyncio.run(run(bot, telegram, args.commands, args.interval))
+            elapsed = time.monotonic() - start
+            print(f"{mode:8} commands={len(latencies)}/{args.commands} "
+                  f"elapsed={elapsed:.2f} s latency {percentiles(latencies)}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+from typing import NamedTuple
+
+from cs2posts.crawler import CounterStrike2Crawler
+from cs2posts.cs2 import CounterStrike2Posts
+from cs2posts.parser.plain_text import PlainTextParser
+from cs2posts.post import Post
+from cs2posts.post import PostKind
+from cs2posts.search import Fts5SearchIndex
+from cs2posts.search import InvertedSearchIndex
+from cs2posts.search import SearchEntry
+from cs2posts.search import SearchIndex
+
+
+logger = logging.getLogger(__name__)
+
+
+# (date, gid) of a post, posts are ordered by it newest first
+PostCursor = tuple[int, str]
+
+KIND_COLUMNS = {
+    PostKind.NEWS: "is_news",
+    PostKind.UPDATE: "is_update",
+    PostKind.EXTERNAL: "is_external",
+}
+
+# Length of the pre-rendered plain text summary of a post
+SUMMARY_LENGTH = 160
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    gid TEXT PRIMARY KEY,
+    date INTEGER NOT NULL,
+    is_news INTEGER NOT NULL,
+    is_update INTEGER NOT NULL,
+    is_external INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    summary TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS posts_date ON posts (date, gid);
+CREATE INDEX IF NOT EXISTS posts_news_date ON posts (date, gid) WHERE is_news = 1;
+CREATE INDEX IF NOT EXISTS posts_update_date ON posts (date, gid) WHERE is_update = 1;
+CREATE INDEX IF NOT EXISTS posts_external_date ON posts (date, gid) WHERE is_external = 1;
+"""
+
+
+class PostSummary(NamedTuple):
+    gid: str
+    date: int
+    kind: PostKind
+    title: str
+    url: str
+    summary: str
+
+    @property
+    def cursor(self) -> PostCursor:
+        return self.date, self.gid
+
+
+class ArchivedPost(NamedTuple):
+    row: tuple
+    search_entry: SearchEntry
+
+    @classmethod
+    def create(cls, post: Post) -> ArchivedPost:
+        # The plain text is used for both, the summary and the search index
+        text = PlainTextParser(post.contents).parse()
+        row = (
+            post.gid,
+            post.date,
+            int(post.is_news()),
+            int(post.is_update()),
+            int(post.is_external()),
+            json.dumps(post.to_dict()),
+            post.kind.value,
+            post.title,
+            post.url,
+            PlainTextParser.truncate(text, SUMMARY_LENGTH))
+        return cls(row, (post.gid, post.title, text))
+
+
+class PostArchive:
+    # All posts ever seen, indexed by gid and date. Queries walk the date
+    # index, so they are O(log n + k) for k returned posts. The connection is
+    # shared by the event loop and the threads of asyncio.to_thread, every
+    # use of it is serialized by a lock.
+
+    def __init__(self, filepath: Path | str | None = None,
+                 search_backend: str | None = None) -> None:
+        if filepath is None:
+            filepath = Path(__file__).parent / "data" / "posts.db"
+
+        self.__filepath = filepath
+        self.__connection = sqlite3.connect(filepath, check_same_thread=False)
+        self.__lock = threading.Lock()
+        if filepath != ":memory:":
+            # Commits do not fsync, a crash can only lose the latest posts
+            # which are crawled again anyway.
+            self.__connection.execute("PRAGMA journal_mode=WAL")
+            self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__connection.executescript(SCHEMA)
+
+        if search_backend is None:
+            fts5 = Fts5SearchIndex.is_supported(self.__connection)
+            search_backend = "fts5" if fts5 else "inverted"
+        if search_backend == "fts5":
+            self.__search_index: SearchIndex = Fts5SearchIndex(self.__connection)
+        elif search_backend == "inverted":
+            self.__search_index = InvertedSearchIndex()
+        else:
+            raise ValueError(f'Unknown search backend {search_backend=}')
+
+        if self.__search_index.is_empty() and not self.is_empty():
+            self.rebuild_search_index()
+
+    @property
+    def filepath(self) -> Path | str:
+        return self.__filepath
+
+    @property
+    def search_index(self) -> SearchIndex:
+        return self.__search_index
+
+    @staticmethod
+    def _to_post(row: tuple[str]) -> Post:
+        return Post(**json.loads(row[0]))
+
+    @staticmethod
+    def _to_summary(row: tuple[str, int, str, str, str, str]) -> PostSummary:
+        gid, date, kind, title, url, summary = row
+        return PostSummary(gid, date, PostKind(kind), title, url, summary)
+
+    def __known_data(self, gids: list[str]) -> dict[str, str]:
+        known = {}
+        # Stay below the SQLite host parameter limit
+        for i in range(0, len(gids), 500):
+            chunk = gids[i:i + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            known.update(self.__connection.execute(
+                f"SELECT gid, data FROM posts WHERE gid IN ({placeholders})", chunk))
+        return known
+
+    def add(self, posts: Iterable[Post]) -> int:
+        # Returns the number of new posts, known posts are updated in place.
+        # Only new and edited posts are parsed, written and (re)indexed, the
+        # lock is not held while parsing.
+        posts = {post.gid: post for post in posts}
+        if not posts:
+            return 0
+
+        with self.__lock:
+            known = self.__known_data(list(posts))
+        archived = {gid: ArchivedPost.create(post) for gid, post in posts.items()
+                    if gid not in known or known[gid] != json.dumps(post.to_dict())}
+        if not archived:
+            return 0
+
+        with self.__lock:
+            return self.__add(archived)
+
+    def __add(self, archived: dict[str, ArchivedPost]) -> int:
+        known = self.__known_data(list(archived))
+        new = [post for gid, post in archived.items() if gid not in known]
+        edited = [post for gid, post in archived.items()
+                  if gid in known and known[gid] != post.row[5]]
+
+        with self.__connection:
+            self.__connection.executemany(
+                "INSERT INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [post.row for post in new])
+            self.__connection.executemany(
+                "UPDATE posts SET date = ?, is_news = ?, is_update = ?,"
+                " is_external = ?, data = ?, kind = ?, title = ?, url = ?,"
+                " summary = ? WHERE gid = ?",
+                [(*post.row[1:], post.row[0]) for post in edited])
+            self.__search_index.remove(post.row[0] for post in edited)
+            self.__search_index.index(
+                post.search_entry for post in new + edited)
+
+        return len(new)
+
+    def rebuild_search_index(self) -> None:
+        logger.info('Building search index of the post archive ...')
+        with self.__lock, self.__connection:
+            self.__search_index.rebuild(
+                ArchivedPost.create(self._to_post(row)).search_entry
+                for row in self.__connection.execute("SELECT data FROM posts"))
+
+    def search(self, query: str, limit: int = 10) -> list[PostSummary]:
+        # Archived posts containing all query terms, best match first
+        with self.__lock:
+            gids = self.__search_index.search(query, limit)
+            if not gids:
+                return []
+
+            placeholders = ", ".join("?" * len(gids))
+            summaries = {
+                row[0]: self._to_summary(row)
+                for row in self.__connection.execute(
+                    "SELECT gid, date, kind, title, url, summary FROM posts"
+                    f" WHERE gid IN ({placeholders})", gids)}
+        return [summaries[gid] for gid in gids if gid in summaries]
+
+    def get(self, gid: str) -> Post | None:
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT data FROM posts WHERE gid = ?", (gid,)).fetchone()
+        return self._to_post(row) if row is not None else None
+
+    def contains(self, gid: str) -> bool:
+        with self.__lock:
+            return self.__connection.execute(
+                "SELECT 1 FROM posts WHERE gid = ?", (gid,)).fetchone() is not None
+
+    def __query(self, where: list[str], params: list, kind: PostKind | None,
+                limit: int | None, ascending: bool = False,
+                summaries: bool = False) -> list[Any]:
+        if kind is not None:
+            where.append(f"{KIND_COLUMNS[kind]} = 1")
+
+        if summaries:
+            # Does not load and parse the (large) post data
+            sql = "SELECT gid, date, kind, title, url, summary FROM posts"
+            convert = self._to_summary
+        else:
+            sql = "SELECT data FROM posts"
+            convert = self._to_post
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        order = "ASC" if ascending else "DESC"
+        sql += f" ORDER BY date {order}, gid {order}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self.__lock:
+            rows = self.__connection.execute(sql, params).fetchall()
+        return [convert(row) for row in rows]
+
+    def latest(self, count: int, kind: PostKind | None = None) -> list[Post]:
+        return self.__query([], [], kind, count)
+
+    def newer_than(self, date: int, kind: PostKind | None = None,
+                   limit: int | None = None) -> list[Post]:
+        # Oldest first, i.e. in the order the posts were published
+        return self.__query(["date > ?"], [date], kind, limit, ascending=True)
+
+    def before(self, cursor: PostCursor | None, count: int,
+               kind: PostKind | None = None, summaries: bool = False) -> list[Any]:
+        # One page of posts older than the cursor, newest first. The cursor
+        # of the next page is the (date, gid) of the last returned post.
+        if cursor is None:
+            return self.__query([], [], kind, count, summaries=summaries)
+        return self.__query(["(date, gid) < (?, ?)"], list(cursor), kind,
+                            count, summaries=summaries)
+
+    def after(self, cursor: PostCursor, count: int,
+              kind: PostKind | None = None, summaries: bool = False) -> list[Any]:
+        # One page of posts newer than the cursor, newest first
+        posts = self.__query(["(date, gid) > (?, ?)"], list(cursor), kind,
+                             count, ascending=True, summaries=summaries)
+        posts.reverse()
+        return posts
+
+    def backfill(self, crawler: CounterStrike2Crawler, count: int) -> int:
+        logger.info(f'Backfilling post archive with up to {count} posts ...')
+        posts = CounterStrike2Posts.create(crawler.crawl(count=count))
+        added = self.add(posts.posts)
+        logger.info(f'Backfilled {added} new posts into the post archive.')
+        return added
+
+    def is_empty(self) -> bool:
+        with self.__lock:
+            return self.__connection.execute(
+                "SELECT 1 FROM posts LIMIT 1").fetchone() is None
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__connection.close()
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self.__connection.execute(
+                "SELECT COUNT(*) FROM posts").fetchone()[0]
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from typing import NamedTuple
+
+from cs2posts.archive import PostArchive
+from cs2posts.crawler import CounterStrike2Crawler
+from cs2posts.cs2 import CounterStrike2Posts
+from cs2posts.post import Post
+from cs2posts.store import LocalStore
+from cs2posts.store import Store
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BackfillWindow:
+    # Posts with start <= date <= cursor are still missing. The cursor is the
+    # enddate of the next request and only moves back in time.
+    start: int
+    cursor: int
+    done: bool = False
+
+    @staticmethod
+    def from_json(data: dict[str, Any]) -> BackfillWindow:
+        return BackfillWindow(**data)
+
+    def to_json(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class BackfillState:
+
+    def __init__(self, windows: list[BackfillWindow] | None = None) -> None:
+        self.__windows = windows or []
+
+    @property
+    def windows(self) -> list[BackfillWindow]:
+        return self.__windows
+
+    @staticmethod
+    def plan(start: int, end: int, count: int) -> BackfillState:
+        # Splits [start, end] into count non-overlapping windows, newest first
+        if start > end or count < 1:
+            raise ValueError(f'Invalid backfill range {start=} {end=} {count=}')
+
+        size = -(-(end - start + 1) // count)
+        windows = []
+        for cursor in range(end, start - 1, -size):
+            windows.append(BackfillWindow(
+                start=max(start, cursor - size + 1), cursor=cursor))
+        return BackfillState(windows)
+
+    @staticmethod
+    def from_json(data: dict[str, Any]) -> BackfillState:
+        return BackfillState(
+            [BackfillWindow.from_json(window) for window in data.get("windows", [])])
+
+    def to_json(self) -> dict[str, Any]:
+        return {"windows": [window.to_json() for window in self.windows]}
+
+    def is_done(self) -> bool:
+        return all(window.done for window in self.windows)
+
+    def __len__(self) -> int:
+        return len(self.windows)
+
+
+class LocalBackfillStore(LocalStore):
+
+    def __init__(self, filepath: Path | None = None) -> None:
+        if filepath is None:
+            filepath = Path(__file__).parent / "data" / "backfill.json"
+
+        super().__init__(filepath)
+
+    def load(self) -> BackfillState:
+        return BackfillState.from_json(super().load())
+
+    def save(self, state: BackfillState) -> None:
+        self._write(state.to_json(), count=len(state))
+
+
+class RateBudget:
+    # Spaces requests of all threads at least 1 / rate seconds apart
+
+    def __init__(self, rate: float) -> None:
+        if rate <= 0:
+            raise ValueError(f'Rate must be greater than 0 {rate=}')
+        self.__interval = 1 / rate
+        self.__next = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self.__lock:
+            now = time.monotonic()
+            wait = self.__next - now
+            self.__next = max(now, self.__next) + self.__interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class BackfillPage(NamedTuple):
+    window: int
+    posts: list[Post]
+    cursor: int
+    done: bool
+
+
+class HistoryBackfill:
+    # Walks the post history back with the enddate cursor of GetNewsForApp.
+    # Every window is walked by its own thread, the pages are written into
+    # the archive by the calling thread, which is its only writer,
+    # and the state is saved after every page, so a backfill can be resumed.
+    # A failed page is retried retries times with exponential backoff before
+    # its window gives up.
+
+    def __init__(self, crawler: CounterStrike2Crawler, store: Store,
+                 since: int = CounterStrike2Posts.INITIAL_EPOCH_TIME_CS2,
+                 windows: int = 4, page_size: int = 100, rate: float = 1.0,
+                 retries: int = 3, backoff: float = 1.0) -> None:
+        self.__crawler = crawler
+        self.__store = store
+        self.__since = since
+        self.__windows = windows
+        self.__page_size = page_size
+        self.__budget = RateBudget(rate)
+        self.__retries = retries
+        self.__backoff = backoff
+        self.__stop = threading.Event()
+
+    @property
+    def store(self) -> Store:
+        return self.__store
+
+    def load_state(self) -> BackfillState:
+        state = self.store.load()
+        if not len(state):
+            state = BackfillState.plan(self.__since, int(time.time()), self.__windows)
+            self.store.save(state)
+        return state
+
+    def fetch_page(self, window: int, start: int, cursor: int) -> BackfillPage:
+        self.__budget.acquire()
+        data = self.__crawler.crawl(count=self.__page_size, enddate=cursor)
+        items = data.get("appnews", {}).get("newsitems", [])
+        if not items:
+            return BackfillPage(window, [], cursor, done=True)
+
+        # The cursor follows all items, also of ignored feeds. Items with the
+        # oldest date are requested again (enddate is inclusive) unless the
+        # whole page has a single date, the archive drops the duplicates.
+        oldest = min(item["date"] for item in items)
+        next_cursor = oldest if oldest < cursor else cursor - 1
+        done = len(items) < self.__page_size or next_cursor < start
+
+        posts = [post for post in CounterStrike2Posts(data).posts
+                 if start <= post.date <= cursor]
+        return BackfillPage(window, posts, next_cursor, done)
+
+    def __put(self, pages: queue.Queue[BackfillPage], page: BackfillPage) -> None:
+        # Gives up once the backfill is stopped, nobody takes pages anymore
+        while not self.__stop.is_set():
+            try:
+                pages.put(page, timeout=0.05)
+                return
+            except queue.Full:
+                continue
+
+    def __fetch_page(self, window: int, start: int, cursor: int) -> BackfillPage:
+        for attempt in range(self.__retries + 1):
+            try:
+                return self.fetch_page(window, start, cursor)
+            except Exception as e:
+                if attempt == self.__retries:
+                    raise
+                delay = self.__backoff * 2 ** attempt
+                logger.warning(f'Could not crawl backfill page {window=} {cursor=}, '
+                               f'retrying in {delay:.1f}s: {e}')
+                # A stopped backfill does not wait for the retry
+                if self.__stop.wait(delay):
+                    raise
+
+    def __walk(self, window: int, start: int, cursor: int,
+               pages: queue.Queue[BackfillPage]) -> None:
+        done = False
+        while not done and not self.__stop.is_set():
+            page = self.__fetch_page(window, start, cursor)
+            self.__put(pages, page)
+            cursor, done = page.cursor, page.done
+
+    def stop(self) -> None:
+        # Stops a running backfill after the pages currently crawled
+        self.__stop.set()
+
+    def __start(self, state: BackfillState, pending: list[int],
+                executor: ThreadPoolExecutor) -> tuple[list[Future], queue.Queue[BackfillPage]]:
+        logger.info(f'Backfilling post archive in {len(pending)} windows ...')
+        self.__stop.clear()
+        # Bounded, so the crawl can not run far ahead of the archive
+        pages: queue.Queue[BackfillPage] = queue.Queue(maxsize=2 * len(pending))
+        futures = [
+            executor.submit(self.__walk, i, state.windows[i].start,
+                            state.windows[i].cursor, pages)
+            for i in pending]
+        return futures, pages
+
+    def __is_done(self, futures: list[Future]) -> bool:
+        # Called whenever no page is ready
+        if all(future.done() for future in futures):
+            return True
+        # A window failing all retries stops the others, the pages they
+        # already crawled are still archived.
+        if any(future.exception() for future in futures if future.done()):
+            self.__stop.set()
+        return False
+
+    def __archive(self, archive: PostArchive, state: BackfillState,
+                  page: BackfillPage) -> int:
+        added = archive.add(page.posts)
+        window = state.windows[page.window]
+        window.cursor, window.done = page.cursor, page.done
+        self.store.save(state)
+        return added
+
+    @staticmethod
+    def __finish(futures: list[Future], added: int) -> int:
+        for future in futures:
+            if future.exception() is not None:
+                logger.error(f'Could not backfill post archive: {future.exception()}')
+                raise future.exception()
+
+        logger.info(f'Backfilled {added} new posts into the post archive.')
+        return added
+
+    def run(self, archive: PostArchive) -> int:
+        # Returns the number of new posts
+        state = self.load_state()
+        pending = [i for i, window in enumerate(state.windows) if not window.done]
+        if not pending:
+            return 0
+
+        added = 0
+        with ThreadPoolExecutor(max_workers=len(pending),
+                                thread_name_prefix="backfill") as executor:
+            futures, pages = self.__start(state, pending, executor)
+            try:
+                while True:
+                    try:
+                        page = pages.get(timeout=0.05)
+                    except queue.Empty:
+                        if self.__is_done(futures):
+                            break
+                        continue
+                    added += self.__archive(archive, state, page)
+            finally:
+                self.__stop.set()
+
+        return self.__finish(futures, added)
+
+    async def run_async(self, archive: PostArchive) -> int:
+        # Same as run, but waits for pages without blocking the event loop.
+        # Pages are archived one at a time in a worker thread. Cancelling
+        # stops the windows after their current page.
+        state = self.load_state()
+        pending = [i for i, window in enumerate(state.windows) if not window.done]
+        if not pending:
+            return 0
+
+        added = 0
+        executor = ThreadPoolExecutor(max_workers=len(pending),
+                                      thread_name_prefix="backfill")
+        futures, pages = self.__start(state, pending, executor)
+        try:
+            while True:
+                try:
+                    page = pages.get_nowait()
+                except queue.Empty:
+                    if self.__is_done(futures):
+                        break
+                    await asyncio.sleep(0.05)
+                    continue
+                added += await asyncio.to_thread(self.__archive, archive, state, page)
+        finally:
+            self.__stop.set()
+            executor.shutdown(wait=False)
+
+        return self.__finish(futures, added)
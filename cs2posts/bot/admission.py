@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Callable
+from enum import IntEnum
+
+from telegram import Update
+from telegram.ext import Application
+from telegram.ext import ApplicationHandlerStop
+from telegram.ext import ContextTypes
+from telegram.ext import TypeHandler
+
+from cs2posts.bot import settings
+from cs2posts.metrics import REGISTRY
+
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_COMMANDS = REGISTRY.counter(
+    "cs2posts_admission_commands_total", "Commands accepted or shed by the admission",
+    ("result", "priority"))
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge(
+    "cs2posts_admission_queue_depth", "Pending updates the admission sheds on")
+
+
+class Priority(IntEnum):
+    # Commands are shed from the lowest priority up
+    LOW = 0
+    NORMAL = 1
+    HIGH = 2
+
+
+# Commands changing chat state are never shed. Latest posts are answered
+# from cached messages and only shed under heavy overload, archive queries
+# are the most expensive and shed first.
+COMMAND_PRIORITIES = {
+    "start": Priority.HIGH,
+    "stop": Priority.HIGH,
+    "options": Priority.HIGH,
+    "watch": Priority.HIGH,
+    "unwatch": Priority.HIGH,
+    "topics": Priority.HIGH,
+    "help": Priority.NORMAL,
+    "latest": Priority.NORMAL,
+    "news": Priority.NORMAL,
+    "update": Priority.NORMAL,
+    "external": Priority.NORMAL,
+    "stats": Priority.NORMAL,
+    "history": Priority.LOW,
+    "search": Priority.LOW,
+}
+
+
+def get_command(update: Update, username: str | None = None) -> str | None:
+    message = update.message
+    if message is None or not message.text or not message.text.startswith("/"):
+        return None
+    # /latest@cs2_bot args, a bare "/" or "/@cs2_bot" is no command
+    tokens = message.text[1:].split(maxsplit=1)
+    if not tokens:
+        return None
+    command, _, bot = tokens[0].partition("@")
+    # Commands addressed to other bots in a group are not ours
+    if bot and username is not None and bot.lower() != username.lower():
+        return None
+    return command.lower() or None
+
+
+class SlidingWindow:
+    # Approximates the number of events in the last window seconds from the
+    # counts of the current and the previous fixed window, weighting the
+    # previous one by how much it still overlaps. Constant time and memory.
+
+    __slots__ = ("window", "start", "current", "previous")
+
+    def __init__(self, window: float, now: float) -> None:
+        self.window = window
+        self.start = now
+        self.current = 0
+        self.previous = 0
+
+    def __advance(self, now: float) -> None:
+        elapsed = now - self.start
+        if elapsed < self.window:
+            return
+        if elapsed < 2 * self.window:
+            self.previous = self.current
+            self.start += self.window
+        else:
+            self.previous = 0
+            self.start = now
+        self.current = 0
+
+    def add(self, now: float) -> None:
+        self.__advance(now)
+        self.current += 1
+
+    def count(self, now: float) -> float:
+        self.__advance(now)
+        overlap = 1 - (now - self.start) / self.window
+        return self.current + self.previous * overlap
+
+    def rate(self, now: float) -> float:
+        return self.count(now) / self.window
+
+
+class AdmissionController:
+    # Global load shedding in front of all command handlers. Commands of all
+    # chats are counted in a sliding window of window seconds. Above rate
+    # commands per second low priority commands are shed, above
+    # overload_factor times the rate also normal priority ones. A backlog of
+    # more than max_queue_depth pending updates counts as heavy overload.
+    # Shed commands are dropped without an answer, rendering and sending one
+    # is exactly what overloads the bot. A rate of 0 disables shedding.
+
+    def __init__(self, app: Application, rate: float | None = None,
+                 window: float | None = None, overload_factor: float | None = None,
+                 max_queue_depth: int | None = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        if rate is None:
+            rate = settings.ADMISSION_RATE
+        if window is None:
+            window = settings.ADMISSION_WINDOW_SECONDS
+        if overload_factor is None:
+            overload_factor = settings.ADMISSION_OVERLOAD_FACTOR
+        if max_queue_depth is None:
+            max_queue_depth = settings.ADMISSION_MAX_QUEUE_DEPTH
+
+        if rate < 0 or window <= 0 or overload_factor < 1:
+            raise ValueError(f'Invalid admission {rate=} {window=} {overload_factor=}')
+
+        self.__rate = rate
+        self.__overload_factor = overload_factor
+        self.__max_queue_depth = max_queue_depth
+        self.__clock = clock
+        self.__window = SlidingWindow(window, clock())
+        self.__queue_depth: Callable[[], int] = app.update_queue.qsize
+        self.__accepted = [0] * len(Priority)
+        self.__shed = [0] * len(Priority)
+        self.__last_queue_depth = 0
+        self.__max_seen_queue_depth = 0
+        self.__shedding = False
+
+        # Runs before the handlers of group 0
+        app.add_handler(TypeHandler(Update, self.admit_update), group=-1)
+        ADMISSION_QUEUE_DEPTH.set_function(lambda: self.__queue_depth())
+
+    def set_queue_depth(self, queue_depth: Callable[[], int]) -> None:
+        self.__queue_depth = queue_depth
+
+    def load(self, now: float) -> float:
+        # Commands per second relative to the admitted rate
+        if not self.__rate:
+            return 0.0
+        return self.__window.rate(now) / self.__rate
+
+    def admit(self, priority: Priority) -> bool:
+        now = self.__clock()
+        self.__window.add(now)
+
+        queue_depth = self.__queue_depth()
+        self.__last_queue_depth = queue_depth
+        if queue_depth > self.__max_seen_queue_depth:
+            self.__max_seen_queue_depth = queue_depth
+
+        shed = False
+        if priority != Priority.HIGH and self.__rate:
+            load = self.load(now)
+            if queue_depth > self.__max_queue_depth or load > self.__overload_factor:
+                shed = True
+            elif load > 1:
+                shed = priority == Priority.LOW
+
+        if shed != self.__shedding:
+            self.__shedding = shed
+            if shed:
+                logger.warning(
+                    f'Overloaded, shedding commands rate={self.__window.rate(now):.1f}/s '
+                    f'{queue_depth=}')
+            else:
+                logger.info('Load back to normal, accepting all commands.')
+
+        if shed:
+            self.__shed[priority] += 1
+            ADMISSION_COMMANDS.labels("shed", priority.name.lower()).inc()
+            return False
+        self.__accepted[priority] += 1
+        ADMISSION_COMMANDS.labels("accepted", priority.name.lower()).inc()
+        return True
+
+    async def admit_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        command = get_command(update, context.bot.username)
+        # Unknown commands have no handler and cost nothing
+        priority = COMMAND_PRIORITIES.get(command)
+        if priority is None:
+            return
+        if not self.admit(priority):
+            raise ApplicationHandlerStop
+
+    def metrics(self) -> dict[str, float]:
+        metrics: dict[str, float] = {
+            "accepted": sum(self.__accepted),
+            "shed": sum(self.__shed),
+            "rate": self.__window.rate(self.__clock()),
+            "queue_depth": self.__last_queue_depth,
+            "max_queue_depth": self.__max_seen_queue_depth,
+        }
+        for priority in Priority:
+            name = priority.name.lower()
+            metrics[f"accepted_{name}"] = self.__accepted[priority]
+            metrics[f"shed_{name}"] = self.__shed[priority]
+        return metrics
@@ -6,22 +6,53 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Spam state written by earlier versions. It is dropped on load, strikes
+# and bans only live in the memory of the SpamProtector now, and chats
+# removed while banned are not loaded at all (see LocalChatStore.load).
+LEGACY_FIELDS = ("strikes", "is_banned", "is_removed_while_banned")
+
+
+class IndexedField:
+    # Chat attribute which the owning Chats keeps audience indexes for
+
+    def __init__(self, default: bool) -> None:
+        self.default = default
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, chat: Chat | None, objtype: type | None = None) -> bool:
+        if chat is None:
+            return self.default
+        return chat.__dict__[self.name]
+
+    def __set__(self, chat: Chat, value: bool) -> None:
+        attrs = chat.__dict__
+        previous = attrs.get(self.name)
+        attrs[self.name] = value
+
+        if previous == value:
+            return
+
+        chats = attrs.get('_chats')
+        if chats is not None:
+            chats._reindex(chat)
+
 
 @dataclass
 class Chat:
     chat_id: int
     chat_id_admin: int = 0
-    strikes: int = 0
-    is_running: bool = False
-    is_banned: bool = False
-    is_removed_while_banned: bool = False
-    is_news_interested: bool = True
-    is_update_interested: bool = True
-    is_external_news_interested: bool = True
+    is_running: bool = IndexedField(False)
+    is_news_interested: bool = IndexedField(True)
+    is_update_interested: bool = IndexedField(True)
+    is_external_news_interested: bool = IndexedField(True)
     last_activity: datetime = datetime(1970, 1, 1)
 
     @classmethod
     def from_json(cls, data: dict[str, str]) -> Chat:
+        data = {key: value for key, value in data.items()
+                if key not in LEGACY_FIELDS}
         last_activity = datetime.fromisoformat(data.pop('last_activity'))
         return cls(**data, last_activity=last_activity)
 
@@ -29,10 +60,7 @@ class Chat:
         return {
             "chat_id": self.chat_id,
             "chat_id_admin": self.chat_id_admin,
-            "strikes": self.strikes,
             "is_running": self.is_running,
-            "is_banned": self.is_banned,
-            "is_removed_while_banned": self.is_removed_while_banned,
             "is_news_interested": self.is_news_interested,
             "is_update_interested": self.is_update_interested,
             "is_external_news_interested": self.is_external_news_interested,
@@ -40,33 +68,65 @@ class Chat:
         }
 
 
+AUDIENCES = (
+    "running",
+    "news",
+    "updates",
+    "external_news",
+    "running_news",
+    "running_updates",
+    "running_external_news",
+)
+
+
 class Chats:
 
     def __init__(self, chats: list[Chat] = None) -> None:
         if chats is None:
             chats = []
         self.__chats: dict[int, Chat] = {}
+        self.__chats_list: list[Chat] | None = None
+        # Audience name -> chats matching it, dicts are used as ordered sets
+        self.__audiences: dict[str, dict[int, Chat]] = {
+            name: {} for name in AUDIENCES}
+        self.__audiences_ordered = tuple(
+            self.__audiences[name] for name in AUDIENCES)
         for chat in chats:
-            self.__chats[chat.chat_id] = chat
+            self.add(chat)
 
     @property
     def chats(self) -> list[Chat]:
-        return list(self.__chats.values())
+        # Cached until the members change, a new list is created afterwards
+        # so previously returned lists stay valid snapshots.
+        if self.__chats_list is None:
+            self.__chats_list = list(self.__chats.values())
+        return self.__chats_list
 
     def get(self, chat_id: int) -> Chat | None:
         return self.__chats.get(chat_id)
 
     def add(self, chat: Chat) -> None:
+        previous = self.__chats.get(chat.chat_id)
+        if previous is not None and previous is not chat:
+            self.__detach(previous)
+
         self.__chats[chat.chat_id] = chat
+        self.__chats_list = None
+        chat.__dict__['_chats'] = self
+        self._reindex(chat)
 
     def create(self, chat_id: int) -> Chat:
         return Chat(chat_id=chat_id)
 
     def remove(self, chat: Chat) -> None:
-        self.__chats.pop(chat.chat_id, None)
+        chat = self.__chats.pop(chat.chat_id, None)
+        if chat is None:
+            return
+        self.__chats_list = None
+        self.__detach(chat)
 
     def update(self, chat: Chat) -> None:
-        self.__chats[chat.chat_id] = chat
+        self.add(chat)
 
     def contains(self, chat_id: int) -> bool:
         return chat_id in self.__chats
@@ -82,23 +142,64 @@ class Chats:
         self.add(chat)
         return chat
 
+    def __detach(self, chat: Chat) -> None:
+        for audience in self.__audiences.values():
+            audience.pop(chat.chat_id, None)
+        if chat.__dict__.get('_chats') is self:
+            del chat.__dict__['_chats']
+
+    def _reindex(self, chat: Chat) -> None:
+        # Called by IndexedField whenever an indexed attribute changes
+        if self.__chats.get(chat.chat_id) is not chat:
+            return
+
+        attrs = chat.__dict__
+        running = attrs['is_running']
+        news = attrs['is_news_interested']
+        updates = attrs['is_update_interested']
+        external_news = attrs['is_external_news_interested']
+
+        # Same order as AUDIENCES
+        memberships = (
+            running,
+            news,
+            updates,
+            external_news,
+            running and news,
+            running and updates,
+            running and external_news,
+        )
+
+        chat_id = chat.chat_id
+        for audience, is_member in zip(self.__audiences_ordered, memberships):
+            if is_member:
+                audience[chat_id] = chat
+            else:
+                audience.pop(chat_id, None)
+
+    def get_audience(self, name: str) -> list[Chat]:
+        return list(self.__audiences[name].values())
+
+    def count_audience(self, name: str) -> int:
+        return len(self.__audiences[name])
+
     def get_running_chats(self) -> list[Chat]:
-        return [chat for chat in self.__chats.values() if chat.is_running]
+        return self.get_audience("running")
 
     def get_interested_in_news(self) -> list[Chat]:
-        return [chat for chat in self.__chats.values() if chat.is_news_interested]
+        return self.get_audience("news")
 
     def get_interested_in_updates(self) -> list[Chat]:
-        return [chat for chat in self.__chats.values() if chat.is_update_interested]
+        return self.get_audience("updates")
 
     def get_running_and_interested_in_news(self) -> list[Chat]:
-        return [chat for chat in self.__chats.values() if chat.is_running and chat.is_news_interested]
+        return self.get_audience("running_news")
 
     def get_running_and_interested_in_updates(self) -> list[Chat]:
-        return [chat for chat in self.__chats.values() if chat.is_running and chat.is_update_interested]
+        return self.get_audience("running_updates")
 
     def get_running_and_interested_in_external_news(self) -> list[Chat]:
-        return [chat for chat in self.__chats.values() if chat.is_running and chat.is_external_news_interested]
+        return self.get_audience("running_external_news")
 
     def __contains__(self, chat: Chat) -> bool:
         return chat.chat_id in self.__chats
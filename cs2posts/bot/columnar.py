@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import logging
+from array import array
+from collections.abc import Iterable
+from collections.abc import Iterator
+from datetime import datetime
+from itertools import compress
+from itertools import islice
+
+from cs2posts.bot.chats import Chat
+from cs2posts.bot.snapshot import ALL_FLAGS
+from cs2posts.bot.snapshot import ChatFlags
+from cs2posts.bot.snapshot import ChatSnapshotCodec
+from cs2posts.bot.snapshot import EPOCH
+from cs2posts.bot.snapshot import ONE_MS
+
+logger = logging.getLogger(__name__)
+
+
+def create_predicate_table(required: int) -> bytes:
+    # Translation table mapping a flag byte to 1 if all required flags are set
+    return bytes(
+        1 if flags & required == required else 0 for flags in range(256))
+
+
+AUDIENCE_PREDICATES = {
+    "running": create_predicate_table(ChatFlags.IS_RUNNING),
+    "news": create_predicate_table(ChatFlags.IS_NEWS_INTERESTED),
+    "updates": create_predicate_table(ChatFlags.IS_UPDATE_INTERESTED),
+    "external_news": create_predicate_table(ChatFlags.IS_EXTERNAL_NEWS_INTERESTED),
+    "running_news": create_predicate_table(
+        ChatFlags.IS_RUNNING | ChatFlags.IS_NEWS_INTERESTED),
+    "running_updates": create_predicate_table(
+        ChatFlags.IS_RUNNING | ChatFlags.IS_UPDATE_INTERESTED),
+    "running_external_news": create_predicate_table(
+        ChatFlags.IS_RUNNING | ChatFlags.IS_EXTERNAL_NEWS_INTERESTED),
+}
+
+
+class ChatFlag:
+    # Boolean attribute of ChatView backed by a bit of the flags column
+
+    def __init__(self, flag: int) -> None:
+        self.flag = flag
+
+    def __get__(self, view: ChatView | None, objtype: type | None = None):
+        if view is None:
+            return self
+        return view._table._flags[view._row()] & self.flag != 0
+
+    def __set__(self, view: ChatView, value: bool) -> None:
+        table = view._table
+        row = view._row()
+        if value:
+            table._flags[row] |= self.flag
+        else:
+            table._flags[row] &= ~self.flag & ALL_FLAGS
+
+
+class ChatView:
+    # Thin Chat compatible view on a row of a ColumnarChats table.
+    # Rows move on removal, therefore the view resolves its row by chat id.
+
+    __slots__ = ("_table", "_chat_id")
+
+    is_running = ChatFlag(ChatFlags.IS_RUNNING)
+    is_news_interested = ChatFlag(ChatFlags.IS_NEWS_INTERESTED)
+    is_update_interested = ChatFlag(ChatFlags.IS_UPDATE_INTERESTED)
+    is_external_news_interested = ChatFlag(
+        ChatFlags.IS_EXTERNAL_NEWS_INTERESTED)
+
+    def __init__(self, table: ColumnarChats, chat_id: int) -> None:
+        self._table = table
+        self._chat_id = chat_id
+
+    def _row(self) -> int:
+        return self._table._rows[self._chat_id]
+
+    @property
+    def chat_id(self) -> int:
+        return self._chat_id
+
+    @chat_id.setter
+    def chat_id(self, chat_id: int) -> None:
+        self._table._rename(self._chat_id, chat_id)
+        self._chat_id = chat_id
+
+    @property
+    def chat_id_admin(self) -> int:
+        return self._table._chat_id_admins[self._row()]
+
+    @chat_id_admin.setter
+    def chat_id_admin(self, chat_id_admin: int | None) -> None:
+        self._table._chat_id_admins[self._row()] = chat_id_admin or 0
+
+    @property
+    def last_activity(self) -> datetime:
+        return EPOCH + ONE_MS * self._table._last_activities[self._row()]
+
+    @last_activity.setter
+    def last_activity(self, last_activity: datetime) -> None:
+        self._table._last_activities[self._row()] = (
+            last_activity - EPOCH) // ONE_MS
+
+    def to_chat(self) -> Chat:
+        return Chat(
+            chat_id=self.chat_id,
+            chat_id_admin=self.chat_id_admin,
+            is_running=self.is_running,
+            is_news_interested=self.is_news_interested,
+            is_update_interested=self.is_update_interested,
+            is_external_news_interested=self.is_external_news_interested,
+            last_activity=self.last_activity)
+
+    def to_json(self) -> dict[str, str]:
+        return self.to_chat().to_json()
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ChatView):
+            return self.to_chat() == other.to_chat()
+        if isinstance(other, Chat):
+            return self.to_chat() == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        # Equal views are views of the same chat, so they can be set members
+        return hash(self.chat_id)
+
+    def __repr__(self) -> str:
+        return f"ChatView({self.to_chat()!r})"
+
+
+class ColumnarChats:
+    # Chats container storing every attribute in its own compact column with
+    # an id -> row index. Audiences are selected with C level scans of the
+    # flags column (bytes.translate + itertools.compress) instead of
+    # per chat attribute checks.
+
+    def __init__(self, chats: Iterable[Chat] | None = None) -> None:
+        self._rows: dict[int, int] = {}
+        self._chat_ids = array("q")
+        self._chat_id_admins = array("q")
+        self._flags = bytearray()
+        self._last_activities = array("q")
+
+        for chat in chats or []:
+            self.add(chat)
+
+    @classmethod
+    def from_snapshot(cls, buffer: bytes | memoryview) -> ColumnarChats:
+        return cls.from_records(ChatSnapshotCodec.iter_records(buffer))
+
+    @classmethod
+    def from_records(cls, records: Iterable[tuple[int, int, int, int]]) -> ColumnarChats:
+        table = cls()
+        records = iter(records)
+
+        # Transpose chunks of records into the columns at C level
+        while chunk := list(islice(records, ChatSnapshotCodec.CHUNK_RECORDS)):
+            chat_ids, chat_id_admins, flags, last_activities = zip(*chunk)
+            start = len(table._chat_ids)
+            table._rows.update(zip(chat_ids, range(start, start + len(chat_ids))))
+            table._chat_ids.extend(chat_ids)
+            table._chat_id_admins.extend(chat_id_admins)
+            table._flags.extend(flags)
+            table._last_activities.extend(last_activities)
+
+        return table
+
+    def iter_records(self) -> Iterator[tuple[int, int, int, int]]:
+        # Records in the layout of ChatSnapshotCodec.RECORD
+        return zip(self._chat_ids, self._chat_id_admins, self._flags,
+                   self._last_activities)
+
+    def to_chats(self) -> list[Chat]:
+        # list(zip(...)) copies all rows in one C call, which makes it a
+        # consistent snapshot even if the table is modified concurrently.
+        decode = ChatSnapshotCodec.decode_record
+        return [decode(*record) for record in list(self.iter_records())]
+
+    @property
+    def chats(self) -> list[ChatView]:
+        return [ChatView(self, chat_id) for chat_id in self._chat_ids]
+
+    def get(self, chat_id: int) -> ChatView | None:
+        if chat_id not in self._rows:
+            return None
+        return ChatView(self, chat_id)
+
+    def add(self, chat: Chat | ChatView) -> None:
+        chat_id, chat_id_admin, flags, last_activity = \
+            ChatSnapshotCodec.encode_fields(chat)
+
+        row = self._rows.get(chat_id)
+        if row is None:
+            self._rows[chat_id] = len(self._chat_ids)
+            self._chat_ids.append(chat_id)
+            self._chat_id_admins.append(chat_id_admin)
+            self._flags.append(flags)
+            self._last_activities.append(last_activity)
+            return
+
+        self._chat_id_admins[row] = chat_id_admin
+        self._flags[row] = flags
+        self._last_activities[row] = last_activity
+
+    def create(self, chat_id: int) -> Chat:
+        return Chat(chat_id=chat_id)
+
+    def remove(self, chat: Chat | ChatView) -> None:
+        row = self._rows.pop(chat.chat_id, None)
+        if row is None:
+            return
+
+        # Move the last row into the hole to keep the columns dense
+        last = len(self._chat_ids) - 1
+        if row != last:
+            moved_chat_id = self._chat_ids[last]
+            self._chat_ids[row] = moved_chat_id
+            self._chat_id_admins[row] = self._chat_id_admins[last]
+            self._flags[row] = self._flags[last]
+            self._last_activities[row] = self._last_activities[last]
+            self._rows[moved_chat_id] = row
+
+        self._chat_ids.pop()
+        self._chat_id_admins.pop()
+        self._flags.pop()
+        self._last_activities.pop()
+
+    def update(self, chat: Chat | ChatView) -> None:
+        self.add(chat)
+
+    def contains(self, chat_id: int) -> bool:
+        return chat_id in self._rows
+
+    def create_and_add(self, chat_id: int) -> ChatView:
+        self.add(self.create(chat_id))
+        return ChatView(self, chat_id)
+
+    def migrate(self, chat: Chat | ChatView, new_chat_id: int) -> ChatView:
+        if chat.chat_id not in self._rows:
+            self.add(chat)
+        self._rename(chat.chat_id, new_chat_id)
+        if isinstance(chat, ChatView):
+            chat._chat_id = new_chat_id
+        else:
+            chat.chat_id = new_chat_id
+        return ChatView(self, new_chat_id)
+
+    def _rename(self, chat_id: int, new_chat_id: int) -> None:
+        if chat_id == new_chat_id:
+            return
+        if new_chat_id in self._rows:
+            self.remove(ChatView(self, new_chat_id))
+        row = self._rows.pop(chat_id)
+        self._rows[new_chat_id] = row
+        self._chat_ids[row] = new_chat_id
+
+    def _select(self, predicate: bytes) -> list[int]:
+        mask = self._flags.translate(predicate)
+
+        if mask.count(1) * 16 >= len(mask):
+            return list(compress(self._chat_ids, mask))
+
+        # Sparse selections (e.g. few running chats) jump from match to match
+        # instead of visiting every row.
+        chat_ids = self._chat_ids
+        selected = []
+        find = mask.find
+        row = find(1)
+        while row != -1:
+            selected.append(chat_ids[row])
+            row = find(1, row + 1)
+        return selected
+
+    def get_audience_ids(self, name: str) -> list[int]:
+        return self._select(AUDIENCE_PREDICATES[name])
+
+    def get_audience(self, name: str) -> list[ChatView]:
+        return [ChatView(self, chat_id)
+                for chat_id in self._select(AUDIENCE_PREDICATES[name])]
+
+    def count_audience(self, name: str) -> int:
+        return self._flags.translate(AUDIENCE_PREDICATES[name]).count(1)
+
+    def get_running_chats(self) -> list[ChatView]:
+        return self.get_audience("running")
+
+    def get_interested_in_news(self) -> list[ChatView]:
+        return self.get_audience("news")
+
+    def get_interested_in_updates(self) -> list[ChatView]:
+        return self.get_audience("updates")
+
+    def get_running_and_interested_in_news(self) -> list[ChatView]:
+        return self.get_audience("running_news")
+
+    def get_running_and_interested_in_updates(self) -> list[ChatView]:
+        return self.get_audience("running_updates")
+
+    def get_running_and_interested_in_external_news(self) -> list[ChatView]:
+        return self.get_audience("running_external_news")
+
+    def __contains__(self, chat: Chat | ChatView) -> bool:
+        return chat.chat_id in self._rows
+
+    def __iter__(self) -> Iterator[ChatView]:
+        return iter(self.chats)
+
+    def __len__(self) -> int:
+        return len(self._chat_ids)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable
+from typing import Any
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from cs2posts.bot import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_chat_id(update: object) -> int | None:
+    if not isinstance(update, Update) or update.effective_chat is None:
+        return None
+    return update.effective_chat.id
+
+
+class ChatLock:
+    # Lock of a chat and the number of updates holding or waiting for it
+
+    __slots__ = ("lock", "users")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    # Processes updates of different chats concurrently, but the updates of
+    # a chat one after another in the order they were received. At most
+    # concurrency handlers run at once. Up to max_pending updates are taken
+    # from the update queue, including those waiting for their chat, the
+    # application holds back any further ones.
+    #
+    # The chat lock is taken before a handler slot, so a chat flooding the
+    # bot only waits for itself and never holds the slots of other chats.
+    # Updates without a chat (e.g. poll answers) are not serialized.
+
+    def __init__(self, concurrency: int | None = None,
+                 max_pending: int | None = None) -> None:
+        if concurrency is None:
+            concurrency = settings.UPDATE_CONCURRENCY
+        if max_pending is None:
+            max_pending = settings.UPDATE_MAX_PENDING
+
+        if concurrency < 1 or max_pending < concurrency:
+            raise ValueError(f'Invalid update processing {concurrency=} {max_pending=}')
+
+        # The semaphore of the base class limits the pending updates
+        super().__init__(max_pending)
+        self.__concurrency = concurrency
+        self.__slots = asyncio.BoundedSemaphore(concurrency)
+        # chat_id -> lock, removed once no update of the chat is pending
+        self.__locks: dict[int, ChatLock] = {}
+        self.__pending = 0
+        self.__running = 0
+
+    @property
+    def concurrency(self) -> int:
+        return self.__concurrency
+
+    @property
+    def pending(self) -> int:
+        # Updates taken from the update queue but not processed yet
+        return self.__pending
+
+    @property
+    def running(self) -> int:
+        return self.__running
+
+    def __len__(self) -> int:
+        # Chats with pending updates
+        return len(self.__locks)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        self.__pending += 1
+        try:
+            chat_id = get_chat_id(update)
+            if chat_id is None:
+                await self.__run(coroutine)
+                return
+
+            chat_lock = self.__locks.get(chat_id)
+            if chat_lock is None:
+                chat_lock = self.__locks[chat_id] = ChatLock()
+            chat_lock.users += 1
+            try:
+                # asyncio.Lock wakes up its waiters first in, first out
+                async with chat_lock.lock:
+                    await self.__run(coroutine)
+            finally:
+                chat_lock.users -= 1
+                if not chat_lock.users:
+                    del self.__locks[chat_id]
+        finally:
+            self.__pending -= 1
+
+    async def __run(self, coroutine: Awaitable[Any]) -> None:
+        async with self.__slots:
+            self.__running += 1
+            try:
+                await coroutine
+            finally:
+                self.__running -= 1
@@ -8,3 +8,6 @@ WELCOME_MESSAGE_ENGLISH = """\
 This bot will automatically keep you updated about latest posted news and updates from the https://www.counter-strike.net/ website. Check /help for more information about the commands.\n
 Enjoy using the bot!
 """
+
+POSTS_NOT_READY_MESSAGE_ENGLISH = \
+    "The latest posts are still being fetched, please try again in a moment."
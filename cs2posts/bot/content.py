@@ -3,6 +3,8 @@ from __future__ import annotations
 import re
 from dataclasses import dataclass
 
+from cs2posts.tracing import span
+
 
 @dataclass
 class Content:
@@ -115,16 +117,18 @@ class ContentExtractor:
 
     @staticmethod
     def extract_message_blocks(text: str) -> list[Content]:
-        videos = ContentExtractor.extract_videos(text)
-        images = ContentExtractor.extract_images(text)
-        texts = ContentExtractor.extract_text_block(text, images, videos)
+        with span("extract_content", length=len(text)) as current:
+            videos = ContentExtractor.extract_videos(text)
+            images = ContentExtractor.extract_images(text)
+            texts = ContentExtractor.extract_text_block(text, images, videos)
 
-        content: list[Content] = [*videos, *images, *texts]
-        content.sort(key=lambda file: file.text_pos_start)
+            content: list[Content] = [*videos, *images, *texts]
+            content.sort(key=lambda file: file.text_pos_start)
 
-        content[0].is_heading = True
+            content[0].is_heading = True
+            current.set_attribute("blocks", len(content))
 
-        return content
+            return content
 
     @staticmethod
     def extract_url(text: str) -> str | None:
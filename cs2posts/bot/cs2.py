@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import signal
+import time
+from urllib.parse import urlparse
 
 from telegram import Update
 from telegram.constants import ChatType
@@ -8,6 +12,7 @@ from telegram.constants import ParseMode
 from telegram.error import BadRequest
 from telegram.error import ChatMigrated
 from telegram.error import Forbidden
+from telegram.error import RetryAfter
 from telegram.ext import Application
 from telegram.ext import CallbackContext
 from telegram.ext import CommandHandler
@@ -16,22 +21,63 @@ from telegram.ext import filters
 from telegram.ext import MessageHandler
 
 import cs2posts.bot.constants as const
+from cs2posts.archive import PostArchive
+from cs2posts.backfill import HistoryBackfill
 from cs2posts.bot import settings
+from cs2posts.bot.admission import AdmissionController
+from cs2posts.bot.chats import AUDIENCES
 from cs2posts.bot.chats import Chat
 from cs2posts.bot.chats import Chats
+from cs2posts.bot.concurrency import PerChatUpdateProcessor
+from cs2posts.bot.freshness import FreshnessMessageFactory
+from cs2posts.bot.freshness import FreshnessTracker
+from cs2posts.bot.history import History
+from cs2posts.bot.keywords import KeywordSubscriptions
 from cs2posts.bot.message import TelegramMessage
 from cs2posts.bot.message import TelegramMessageFactory
 from cs2posts.bot.options import Options
+from cs2posts.bot.request import TracedRequest
+from cs2posts.bot.scheduler import PostCheckScheduler
+from cs2posts.bot.search import Search
 from cs2posts.bot.spam import SpamProtector
+from cs2posts.bot.subscriptions import TopicSubscriptions
+from cs2posts.bot.topics import Topics
+from cs2posts.bot.watch import Watch
+from cs2posts.bot.webhook import WebhookServer
 from cs2posts.crawler import CounterStrike2Crawler
 from cs2posts.cs2 import CounterStrike2Posts
+from cs2posts.metrics import LoopLagMonitor
+from cs2posts.metrics import REGISTRY
 from cs2posts.post import Post
+from cs2posts.store import AsyncStore
 from cs2posts.store import LocalChatStore
+from cs2posts.store import LocalKeywordStore
 from cs2posts.store import LocalLatestPostStore
+from cs2posts.store import LocalTopicStore
+from cs2posts.store import ThreadedStore
+from cs2posts.topics import TOPIC_EXTERNAL
+from cs2posts.topics import TOPIC_NEWS
+from cs2posts.topics import TOPIC_UPDATE
+from cs2posts.topics import TopicClassifier
+from cs2posts.tracing import span
+from cs2posts.tracing import TRACER
 
 
 logger = logging.getLogger(__name__)
 
+MESSAGES_SENT = REGISTRY.counter(
+    "cs2posts_messages_sent_total", "Posts sent to a chat")
+SEND_SECONDS = REGISTRY.histogram(
+    "cs2posts_send_seconds", "Time to send a post to a chat")
+SEND_ERRORS = REGISTRY.counter(
+    "cs2posts_send_errors_total", "Failed attempts to send a post to a chat",
+    ("error",))
+OUTBOX_DEPTH = REGISTRY.gauge(
+    "cs2posts_outbox_depth", "Chats running broadcasts still have to send a post to")
+CHATS = REGISTRY.gauge("cs2posts_chats", "Chats by state", ("state",))
+UPDATES = REGISTRY.gauge(
+    "cs2posts_updates", "Updates waiting or being handled", ("state",))
+
 
 def admin(func):
     async def wrapper(self, update: Update, context: CallbackContext):
@@ -48,9 +94,7 @@ def admin(func):
 
 def spam_protected(func):
     async def wrapper(self, update: Update, context: CallbackContext):
-        chat = self.chats.get(update.message.chat_id)
-        await self.spam_protector.check(context.bot, chat)
-        if chat is not None and chat.is_banned:
+        if not await self.spam_protector.check(context.bot, update.message.chat_id):
             return
         return await func(self, update, context)
     return wrapper
@@ -59,18 +103,63 @@ def spam_protected(func):
 class CounterStrike2UpdateBot:
 
     def __init__(self, *args, **kwargs) -> None:
-        self.app = (Application.builder()
-                    .post_init(self.post_init)
-                    .post_shutdown(self.post_shutdown)
-                    .token(kwargs['token'])
-                    .build())
+        # Updates of different chats are handled concurrently
+        self.update_processor: PerChatUpdateProcessor = kwargs.get(
+            'update_processor') or PerChatUpdateProcessor()
+        builder = (Application.builder()
+                   .post_init(self.post_init)
+                   .post_shutdown(self.post_shutdown)
+                   .concurrent_updates(self.update_processor)
+                   # Same pool size as the default request of the builder
+                   .request(TracedRequest(connection_pool_size=256))
+                   .token(kwargs['token']))
+        # e.g. a local Bot API server or cs2posts.fake.telegram
+        if kwargs.get('base_url') is not None:
+            builder = builder.base_url(kwargs['base_url'])
+        self.app = builder.build()
 
         self.crawler: CounterStrike2Crawler = kwargs['crawler']
         self.spam_protector: SpamProtector = kwargs['spam_protector']
         self.local_post_store: LocalLatestPostStore = kwargs['local_post_store']
         self.local_chat_store: LocalChatStore = kwargs['local_chat_store']
-
+        self.local_keyword_store: LocalKeywordStore | None = kwargs.get(
+            'local_keyword_store')
+        self.local_topic_store: LocalTopicStore | None = kwargs.get(
+            'local_topic_store')
+        self.topic_classifier: TopicClassifier = kwargs.get(
+            'topic_classifier') or TopicClassifier()
+        self.post_archive: PostArchive | None = kwargs.get('post_archive')
+        self.history_backfill: HistoryBackfill | None = kwargs.get(
+            'history_backfill')
+        # Checks for new posts from the start of the bot on
+        self.scheduler = PostCheckScheduler(
+            self.post_checker, store=kwargs.get('local_scheduler_store'))
+        # Delivery timelines of broadcast posts from Steam to the last chat
+        self.freshness = FreshnessTracker(store=kwargs.get('local_freshness_store'))
+
+        # Persistence from within handlers runs on a dedicated I/O thread
+        self.post_store: AsyncStore = ThreadedStore(self.local_post_store)
+        self.chat_store: AsyncStore = ThreadedStore(self.local_chat_store)
+        self.keyword_store: AsyncStore | None = None
+        if self.local_keyword_store is not None:
+            self.keyword_store = ThreadedStore(self.local_keyword_store)
+        self.topic_store: AsyncStore | None = None
+        if self.local_topic_store is not None:
+            self.topic_store = ThreadedStore(self.local_topic_store)
+
+        self.admission = AdmissionController(app=self.app)
+        # Updates are taken from the queue right away and wait in the processor
+        self.admission.set_queue_depth(
+            lambda: self.app.update_queue.qsize() + self.update_processor.pending)
         self.options = Options(app=self.app)
+        self.watch = Watch(app=self.app)
+        self.topics = Topics(app=self.app, classifier=self.topic_classifier)
+        self.history = History(app=self.app)
+        self.history.set_archive(self.post_archive)
+        self.history.set_spam_protector(self.spam_protector)
+        self.search = Search(app=self.app)
+        self.search.set_archive(self.post_archive)
+        self.search.set_spam_protector(self.spam_protector)
 
         self.app.add_handlers([
             CommandHandler('start', self.start),
@@ -80,6 +169,7 @@ class CounterStrike2UpdateBot:
             CommandHandler('update', self.update),
             CommandHandler('external', self.external),
             CommandHandler('latest', self.latest),
+            CommandHandler('stats', self.stats),
             MessageHandler(
                 filters.StatusUpdate.NEW_CHAT_MEMBERS, self.new_chat_member),
             MessageHandler(
@@ -89,7 +179,15 @@ class CounterStrike2UpdateBot:
         ])
 
         # self.app.add_error_handler(self.error)
-        self.is_running = False
+        self.loop_lag_monitor = LoopLagMonitor()
+        # Serves /health and /metrics privately, the webhook only serves /health
+        self.metrics_server: WebhookServer | None = None
+        if settings.TRACE_FILEPATH:
+            TRACER.enable(max_spans=settings.TRACE_MAX_SPANS)
+        CHATS.set_function(self.chat_metrics)
+        UPDATES.set_function(self.update_metrics)
+        # Rendered answers of the latest post commands by post gid
+        self.messages: dict[str, TelegramMessage] = {}
         self.__init_data()
 
     def __init_data(self) -> None:
@@ -97,39 +195,137 @@ class CounterStrike2UpdateBot:
             logger.info('No chat data found. Creating new chat data...')
             self.local_chat_store.save(Chats())
 
-        if self.local_post_store.is_empty():
-            # TODO: Maybe ensure that there is a latest update and news post
-            # As of now we just fetch 100 items.
-            logger.info('No post data found. Fetching latest posts...')
-            # TODO: What happens here if crawler fails?
-            data = self.crawler.crawl()
-            posts = CounterStrike2Posts(data)
-            self.local_post_store.save(posts.latest_update_post)
-            self.local_post_store.save(posts.latest_news_post)
-            self.local_post_store.save(posts.latest_external_post)
-
-        self.latest_post: Post = self.local_post_store.get_latest_post()
-        self.latest_news_post: Post = self.local_post_store.get_latest_news_post()
-        self.latest_update_post: Post = self.local_post_store.get_latest_update_post()
-        self.latest_external_post: Post = self.local_post_store.get_latest_external_post()
+        # Whatever is persisted is served right away, missing posts are
+        # crawled in the background by warm_up
+        self.latest_post: Post | None = None
+        self.latest_news_post: Post | None = None
+        self.latest_update_post: Post | None = None
+        self.latest_external_post: Post | None = None
+        if not self.local_post_store.is_empty():
+            self.latest_post = self.local_post_store.get_latest_post()
+            self.latest_news_post = self.local_post_store.get_latest_news_post()
+            self.latest_update_post = self.local_post_store.get_latest_update_post()
+            self.latest_external_post = self.local_post_store.get_latest_external_post()
+        self.warm_up_task: asyncio.Task | None = None
+
         self.chats: Chats = self.local_chat_store.load()
         self.options.set_chats(self.chats)
-        self.options.set_chats_store(self.local_chat_store)
+        self.options.set_chats_store(self.chat_store)
+
+        self.keywords = KeywordSubscriptions()
+        if self.local_keyword_store is not None:
+            self.keywords = self.local_keyword_store.load()
+        self.watch.set_chats(self.chats)
+        self.watch.set_subscriptions(self.keywords)
+        self.watch.set_store(self.keyword_store)
+        self.watch.set_spam_protector(self.spam_protector)
+
+        self.topic_subscriptions = TopicSubscriptions()
+        if self.local_topic_store is not None:
+            self.topic_subscriptions = self.local_topic_store.load()
+        self.topics.set_chats(self.chats)
+        self.topics.set_subscriptions(self.topic_subscriptions)
+        self.topics.set_store(self.topic_store)
+        self.topics.set_spam_protector(self.spam_protector)
 
     async def post_init(self, application: Application) -> None:
         logger.info('Post init bot...')
         # Bot username is only available after initialization
         self.username = application.bot.username
+        # Updates are processed while the posts are crawled
+        self.warm_up_task = asyncio.create_task(self.warm_up())
+        self.scheduler.start(application)
+        self.loop_lag_monitor.start()
+        if settings.METRICS_PORT:
+            self.metrics_server = WebhookServer(
+                application, listen=settings.METRICS_LISTEN,
+                port=settings.METRICS_PORT, url_path=None)
+            await self.metrics_server.start()
         logger.info(f'Bot username: {self.username}. Bot is ready.')
 
+    @property
+    def is_warm(self) -> bool:
+        return self.latest_post is not None
+
+    async def warm_up(self) -> None:
+        # Initial crawl and archive backfill, blocking calls run on threads
+        missing = [name for name in ('latest_update_post', 'latest_news_post',
+                                     'latest_external_post')
+                   if getattr(self, name) is None]
+        if missing:
+            logger.info(f'No post data found for {missing}. Fetching latest posts...')
+            try:
+                data = await asyncio.to_thread(self.crawler.crawl)
+            except Exception as e:
+                logger.error(f'Could not fetch latest posts: {e}')
+            else:
+                # Persisted posts are kept, newer ones are left to the checker
+                posts = CounterStrike2Posts(data)
+                for name in missing:
+                    post = getattr(posts, name)
+                    if post is not None:
+                        setattr(self, name, post)
+                        await self.post_store.save(post)
+                self.latest_post = max(
+                    (post for post in (self.latest_news_post, self.latest_update_post,
+                                       self.latest_external_post) if post is not None),
+                    key=lambda x: x.date, default=None)
+                logger.info('Latest posts fetched.')
+
+        if self.post_archive is not None and self.history_backfill is not None:
+            # Resumes an interrupted backfill, a finished one does nothing
+            try:
+                await self.history_backfill.run_async(self.post_archive)
+            except Exception as e:
+                logger.error(f'Could not backfill post archive: {e}')
+        elif self.post_archive is not None and await asyncio.to_thread(
+                self.post_archive.is_empty):
+            logger.info('Post archive is empty. Backfilling posts...')
+            try:
+                await asyncio.to_thread(
+                    self.post_archive.backfill, self.crawler,
+                    settings.POST_ARCHIVE_BACKFILL_COUNT)
+            except Exception as e:
+                logger.error(f'Could not backfill post archive: {e}')
+
     async def post_shutdown(self, context: ContextTypes.DEFAULT_TYPE) -> None:
         logger.info('Shutting down bot...')
+        await self.scheduler.stop()
+        await self.loop_lag_monitor.stop()
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+        if self.warm_up_task is not None and not self.warm_up_task.done():
+            if self.history_backfill is not None:
+                self.history_backfill.stop()
+            self.warm_up_task.cancel()
+            await asyncio.gather(self.warm_up_task, return_exceptions=True)
+
         logger.info('Saving posts ...')
-        self.local_post_store.save(self.latest_news_post)
-        self.local_post_store.save(self.latest_update_post)
+        for post in (self.latest_news_post, self.latest_update_post):
+            if post is not None:
+                await self.post_store.save(post)
 
         logger.info('Saving chats...')
-        self.local_chat_store.save(self.chats)
+        await self.chat_store.save(self.chats)
+
+        self.post_store.close()
+        self.chat_store.close()
+
+        if self.keyword_store is not None:
+            logger.info('Saving keywords...')
+            await self.keyword_store.save(self.keywords)
+            self.keyword_store.close()
+
+        if self.topic_store is not None:
+            logger.info('Saving topics...')
+            await self.topic_store.save(self.topic_subscriptions)
+            self.topic_store.close()
+
+        self.freshness.close()
+        await self.export_trace()
+
+        if self.post_archive is not None:
+            self.post_archive.close()
 
     async def new_chat_member(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         logger.info(f'New chat member {update.message.new_chat_members} ...')
@@ -146,7 +342,7 @@ class CounterStrike2UpdateBot:
                 logger.info('Chat not found. Creating new chat...')
                 chat = self.chats.create_and_add(
                     chat_id=update.message.chat_id)
-                self.local_chat_store.save(self.chats)
+                await self.chat_store.save(self.chats)
 
             chat.chat_id_admin = update.message.from_user.id
 
@@ -163,8 +359,8 @@ class CounterStrike2UpdateBot:
             return
 
         logger.info('Removing chat from chat list...')
-        self.chats.remove(chat)
-        self.local_chat_store.save(self.chats)
+        self.remove_chat(chat)
+        await self.chat_store.save(self.chats)
 
     async def migrate_chat(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         if update.message.migrate_from_chat_id is None:
@@ -183,8 +379,8 @@ class CounterStrike2UpdateBot:
             return
 
         logger.info(f'Chat migrated to {update.message.chat_id} ...')
-        chat = self.chats.migrate(chat, update.message.chat_id)
-        self.local_chat_store.save(self.chats)
+        chat = self.migrate_chat_id(chat, update.message.chat_id)
+        await self.chat_store.save(self.chats)
         logger.info("Chat migrated successfully.")
 
     @spam_protected
@@ -197,32 +393,18 @@ class CounterStrike2UpdateBot:
         if chat is None:
             chat = self.chats.create_and_add(chat_id=chat_id)
             chat.chat_id_admin = update.message.from_user.id
-            self.spam_protector.update_chat_activity(chat)
-            self.local_chat_store.save(self.chats)
+            await self.chat_store.save(self.chats)
 
         if not chat.is_running:
             chat.is_running = True
             await update.message.reply_text(
                 text=const.WELCOME_MESSAGE_ENGLISH,
                 parse_mode=ParseMode.HTML)
-            self.local_chat_store.save(self.chats)
+            await self.chat_store.save(self.chats)
         else:
             await update.message.reply_text(
                 'Bot is already running for your chat!')
 
-        if chat.is_removed_while_banned:
-            chat.is_removed_while_banned = False
-
-        if self.is_running:
-            return
-
-        # Check for posts every X seconds
-        context.job_queue.run_repeating(
-            callback=self.post_checker,
-            interval=settings.CS2_UPDATE_CHECK_INTERVAL)
-
-        self.is_running = True
-
     @spam_protected
     async def stop(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         logger.info(f'Stopping bot for chat_id={update.message.chat_id} ...')
@@ -242,8 +424,8 @@ class CounterStrike2UpdateBot:
             return
 
         if chat_type == ChatType.PRIVATE:
-            self.chats.remove(chat)
-            self.local_chat_store.save(self.chats)
+            self.remove_chat(chat)
+            await self.chat_store.save(self.chats)
             return
 
     @spam_protected
@@ -262,43 +444,70 @@ class CounterStrike2UpdateBot:
                "/news - Sends the latest news post\n"
                "/update - Sends the latest update post\n"
                "/external - Sends the latest external post\n"
+               "/history [news|update|external] - Browse older posts\n"
+               "/search &lt;terms&gt; - Search all archived posts\n"
                "/help - Prints this help message\n"
-               "/options - Configure Options <b>(only admins)</b>")
+               "/options - Configure Options <b>(only admins)</b>\n"
+               "/watch - Only receive posts mentioning keywords <b>(only admins)</b>\n"
+               "/unwatch - Stop watching keywords <b>(only admins)</b>\n"
+               "/topics - Subscribe to additional topics <b>(only admins)</b>")
 
         await update.message.reply_text(text=msg, parse_mode=ParseMode.HTML)
 
     @spam_protected
     async def latest(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         logger.info('Sending latest saved post to chat ...')
-        chat = self.chats.get(update.message.chat_id)
-        msg = TelegramMessageFactory.create(self.latest_post)
-        await self.send_message(context=context, msg=msg, chat=chat)
+        await self.send_latest(update, context, self.latest_post)
 
     @spam_protected
     async def news(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         logger.info('Sending latest news post to chat ...')
-        chat = self.chats.get(update.message.chat_id)
-        msg = TelegramMessageFactory.create(self.latest_news_post)
-        await self.send_message(context=context, msg=msg, chat=chat)
+        await self.send_latest(update, context, self.latest_news_post)
 
     @spam_protected
     async def update(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         logger.info('Sending latest update post to chats ...')
-        chat = self.chats.get(update.message.chat_id)
-        msg = TelegramMessageFactory.create(self.latest_update_post)
-        await self.send_message(context=context, msg=msg, chat=chat)
+        await self.send_latest(update, context, self.latest_update_post)
 
     @spam_protected
     async def external(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         logger.info('Sending latest external post to chat ...')
+        await self.send_latest(update, context, self.latest_external_post)
+
+    async def send_latest(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                          post: Post | None) -> None:
+        if post is None:
+            # The initial crawl has not finished yet
+            await update.message.reply_text(const.POSTS_NOT_READY_MESSAGE_ENGLISH)
+            return
         chat = self.chats.get(update.message.chat_id)
-        msg = TelegramMessageFactory.create(self.latest_external_post)
+        msg = await self.create_message(post)
         await self.send_message(context=context, msg=msg, chat=chat)
 
-    async def _post_checker_news(self, context: CallbackContext, post: Post) -> None:
+    @spam_protected
+    async def stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        # Operators only, chat admins are any user of a private chat. Channel
+        # posts have no user.
+        user = update.effective_user
+        if user is None or user.id not in settings.BOT_ADMIN_USER_IDS:
+            logger.warning(
+                f'Unauthorized access to stats by {user.id if user else None}')
+            return
+
+        logger.info(f'Sending stats to chat_id={update.message.chat_id} ...')
+        await update.message.reply_text(
+            text=FreshnessMessageFactory.create(self.freshness.timelines),
+            parse_mode=ParseMode.HTML)
+
+    async def _post_checker_news(self, context: CallbackContext, post: Post,
+                                 seen: float | None = None) -> None:
         if post is None:
             return
 
+        if self.latest_news_post is None:
+            self.latest_news_post = post
+            return
+
         if not post.is_newer_than(self.latest_news_post):
             logger.info(
                 f'No new news post found latest_news_post=[{post.title}]')
@@ -308,12 +517,17 @@ class CounterStrike2UpdateBot:
             f'New news post found latest_news_post=[{post.title}]')
 
         self.latest_news_post = post
-        await self.send_post_to_chats(context, post=post)
+        await self.send_post_to_chats(context, post=post, seen=seen)
 
-    async def _post_checker_update(self, context: CallbackContext, post: Post) -> None:
+    async def _post_checker_update(self, context: CallbackContext, post: Post,
+                                   seen: float | None = None) -> None:
         if post is None:
             return
 
+        if self.latest_update_post is None:
+            self.latest_update_post = post
+            return
+
         if not post.is_newer_than(self.latest_update_post):
             logger.info(
                 f'No new update post found latest_update_post=[{post.title}]')
@@ -323,12 +537,16 @@ class CounterStrike2UpdateBot:
             f'New update post found latest_update_post=[{post.title}]')
 
         self.latest_update_post = post
-        await self.send_post_to_chats(context, post=post)
+        await self.send_post_to_chats(context, post=post, seen=seen)
 
-    async def _post_checker_external(self, context: CallbackContext, post: Post) -> None:
+    async def _post_checker_external(self, context: CallbackContext, post: Post,
+                                     seen: float | None = None) -> None:
         if post is None:
-            logger.info(
-                f'No external {post=} found latest_external_post=[{self.latest_external_post.title}]')
+            logger.info(f'No external {post=} found')
+            return
+
+        if self.latest_external_post is None:
+            self.latest_external_post = post
             return
 
         if not post.is_newer_than(self.latest_external_post):
@@ -340,15 +558,23 @@ class CounterStrike2UpdateBot:
             f'New external post found latest_external_post=[{post.title}]')
 
         self.latest_external_post = post
-        await self.send_post_to_chats(context, post=post)
+        await self.send_post_to_chats(context, post=post, seen=seen)
 
     async def post_checker(self, context: CallbackContext) -> None:
+        # A post check and its broadcasts are one trace
+        with span("post_check"):
+            await self.check_posts(context)
+        await self.export_trace()
+
+    async def check_posts(self, context: CallbackContext) -> None:
         logger.info('Crawling latest posts ...')
         try:
-            data = self.crawler.crawl(count=10)
+            data = await asyncio.to_thread(self.crawler.crawl, count=10)
         except Exception as e:
             logger.error(f'Could not fetch latest posts: {e}')
             return
+        # New posts were seen now, not when their turn to be broadcast comes
+        seen = time.time()
 
         posts = CounterStrike2Posts.create(data)
 
@@ -356,71 +582,212 @@ class CounterStrike2UpdateBot:
             logger.info(f'No post(s) found in latest crawl: {posts}')
             return
 
+        if self.post_archive is not None:
+            added = await asyncio.to_thread(self.post_archive.add, posts.posts)
+            logger.info(f'Archived {added} new post(s).')
+
         latest_news_post = posts.latest_news_post
         latest_update_post = posts.latest_update_post
         latest_external_post = posts.latest_external_post
 
-        await self._post_checker_news(context, latest_news_post)
-        await self._post_checker_update(context, latest_update_post)
-        await self._post_checker_external(context, latest_external_post)
+        await self._post_checker_news(context, latest_news_post, seen)
+        await self._post_checker_update(context, latest_update_post, seen)
+        await self._post_checker_external(context, latest_external_post, seen)
 
-        self.latest_post = self.latest_post if self.latest_post.is_older_eq_than(
-            posts.latest) else posts.latest
+        if self.latest_post is None or posts.latest.is_newer_than(self.latest_post):
+            self.latest_post = posts.latest
 
-    async def send_post_to_chats(self, context: CallbackContext, post: Post) -> None:
+    async def send_post_to_chats(self, context: CallbackContext, post: Post,
+                                 seen: float | None = None) -> None:
         logger.info('Sending post to chats ...')
 
         # Send to all chats that are interested in the post type
         if post.is_news():
-            chats = self.chats.get_running_and_interested_in_news()
+            topics = frozenset((TOPIC_NEWS,))
         elif post.is_update():
-            chats = self.chats.get_running_and_interested_in_updates()
+            topics = frozenset((TOPIC_UPDATE,))
         elif post.is_external():
-            chats = self.chats.get_running_and_interested_in_external_news()
+            topics = frozenset((TOPIC_EXTERNAL,))
         else:
             logger.error(
                 f'Unknown post type {post.to_dict()}. Not sending any message.')
             return
 
-        msg = TelegramMessageFactory.create(post=post)
-
-        for chat in chats:
-            await self.send_message(context=context, msg=msg, chat=chat)
-
-    async def send_message(self, context: CallbackContext, msg: TelegramMessage, chat: Chat) -> None:
-
+        # The other topics of the post only matter to chats subscribed to topics
+        if len(self.topic_subscriptions):
+            topics = self.topic_classifier.classify(post)
+        chats = self.topic_subscriptions.audience(self.chats, topics)
+
+        # Chats watching keywords only get posts mentioning one of them
+        chats = self.keywords.filter(chats, post)
+
+        with span("broadcast", gid=post.gid, chats=len(chats)):
+            timeline = self.freshness.seen(post, seen)
+            msg = await TelegramMessageFactory.create_async(post=post)
+            self.freshness.rendered(timeline)
+
+            remaining = len(chats)
+            OUTBOX_DEPTH.inc(remaining)
+            try:
+                for chat in chats:
+                    if await self.send_message(context=context, msg=msg, chat=chat):
+                        self.freshness.delivered(timeline)
+                    remaining -= 1
+                    OUTBOX_DEPTH.dec()
+            finally:
+                # A cancelled broadcast does not send to the remaining chats
+                OUTBOX_DEPTH.dec(remaining)
+
+        await self.freshness.finish(timeline)
+
+    async def create_message(self, post: Post) -> TelegramMessage:
+        # A raid of /latest commands renders the latest posts only once
+        msg = self.messages.get(post.gid)
+        if msg is None:
+            msg = await TelegramMessageFactory.create_async(post)
+            if len(self.messages) >= settings.MESSAGE_CACHE_SIZE:
+                self.messages.clear()
+            # Kept if rendered concurrently, its checked urls are remembered
+            msg = self.messages.setdefault(post.gid, msg)
+        return msg
+
+    async def export_trace(self) -> None:
+        if not settings.TRACE_FILEPATH or not TRACER.enabled:
+            return
+        try:
+            count = await asyncio.to_thread(TRACER.export, settings.TRACE_FILEPATH)
+        except Exception as e:
+            logger.error(f'Could not export trace: {e}')
+            return
+        logger.info(f'Exported {count} spans to {settings.TRACE_FILEPATH}.')
+
+    def chat_metrics(self) -> dict[tuple[str, ...], float]:
+        metrics: dict[tuple[str, ...], float] = {("total",): len(self.chats)}
+        for name in AUDIENCES:
+            metrics[(name,)] = self.chats.count_audience(name)
+        return metrics
+
+    def update_metrics(self) -> dict[tuple[str, ...], float]:
+        processor = self.update_processor
+        return {
+            ("queued",): self.app.update_queue.qsize(),
+            ("pending",): processor.pending,
+            ("running",): processor.running,
+        }
+
+    def remove_chat(self, chat: Chat) -> None:
+        self.chats.remove(chat)
+        self.keywords.remove_chat(chat.chat_id)
+        self.topic_subscriptions.remove_chat(chat.chat_id)
+        self.spam_protector.remove(chat.chat_id)
+
+    def migrate_chat_id(self, chat: Chat, new_chat_id: int) -> Chat | None:
+        # Another update or a broadcast may have removed or migrated the chat
+        # while this one was waiting for Telegram
+        if chat.chat_id == new_chat_id or not self.chats.contains(chat.chat_id):
+            return self.chats.get(new_chat_id)
+        self.keywords.migrate(chat.chat_id, new_chat_id)
+        self.topic_subscriptions.migrate(chat.chat_id, new_chat_id)
+        return self.chats.migrate(chat, new_chat_id)
+
+    async def send_message(self, context: CallbackContext, msg: TelegramMessage, chat: Chat,
+                           retries: int = settings.SEND_MESSAGE_MAX_RETRIES) -> bool:
+        # True if the message was delivered to the chat
         if chat is None:
             logger.error('Chat is None. Not sending any message.')
-            return
+            return False
 
+        start = time.perf_counter()
         try:
-            await msg.send(context.bot, chat_id=chat.chat_id)
+            with span("send", chat_id=chat.chat_id):
+                await msg.send(context.bot, chat_id=chat.chat_id)
         except BadRequest as e:
+            SEND_ERRORS.labels("BadRequest").inc()
             logger.error(f'Bad request for {chat.chat_id=}')
             if e.message == 'Chat not found':
                 logger.error(
                     f'Chat not found we delete the chat {chat.chat_id=}')
-                self.chats.remove(chat)
+                self.remove_chat(chat)
             logger.error(f"Reason: {e}")
         except Forbidden as e:
+            SEND_ERRORS.labels("Forbidden").inc()
             logger.error(
                 f'Bot is blocked by user we delete the chat {chat.chat_id=}')
             logger.error(f"Reason: {e}")
-            self.chats.remove(chat)
+            self.remove_chat(chat)
         except ChatMigrated as e:
+            SEND_ERRORS.labels("ChatMigrated").inc()
             logger.error(
                 f'Chat migrated we update the chat {chat.chat_id=}')
             logger.error(f"Reason: {e}")
-            chat = self.chats.migrate(chat, e.new_chat_id)
-            self.local_chat_store.save(self.chats)
-            await self.send_message(context, msg, chat)
+            chat = self.migrate_chat_id(chat, e.new_chat_id)
+            if chat is None:
+                logger.info(f'Chat {e.new_chat_id=} was removed meanwhile')
+                return False
+            await self.chat_store.save(self.chats)
+            return await self.send_message(context, msg, chat)
+        except RetryAfter as e:
+            SEND_ERRORS.labels("RetryAfter").inc()
+            # Flood control, parts of the message may be sent twice on retry
+            if retries <= 0:
+                logger.error(f'Rate limited, giving up on chat {chat.chat_id=}')
+                return False
+            logger.warning(
+                f'Rate limited, retrying chat {chat.chat_id=} after {e.retry_after}s')
+            await asyncio.sleep(e.retry_after)
+            return await self.send_message(context, msg, chat, retries - 1)
         except Exception as e:
+            SEND_ERRORS.labels(type(e).__name__).inc()
             logger.exception(f'Could not send message to chat {chat.chat_id=}')
             logger.exception(f"Reason: {e}")
+        else:
+            MESSAGES_SENT.inc()
+            SEND_SECONDS.observe(time.perf_counter() - start)
+            return True
+        return False
 
     async def error(self, update: Update, context: CallbackContext) -> None:
         logger.error(f'Update {update} caused error {context.error}')
         # TODO: Implement clean error handling
 
     def run(self) -> None:
+        if settings.WEBHOOK_URL:
+            self.run_webhook(settings.WEBHOOK_URL)
+            return
         self.app.run_polling(allowed_updates=Update.ALL_TYPES)
+
+    def run_webhook(self, url: str) -> None:
+        server = WebhookServer(
+            self.app,
+            listen=settings.WEBHOOK_LISTEN,
+            port=settings.WEBHOOK_PORT,
+            url_path=settings.WEBHOOK_PATH or urlparse(url).path,
+            secret_token=settings.WEBHOOK_SECRET_TOKEN)
+        asyncio.run(self.serve_webhook(server, url))
+
+    async def serve_webhook(self, server: WebhookServer, url: str | None = None,
+                            stop: asyncio.Event | None = None) -> None:
+        # Same lifecycle as run_polling, but updates are pushed by Telegram
+        # to the webhook server instead of being fetched with getUpdates.
+        if stop is None:
+            stop = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(signum, stop.set)
+
+        await self.app.initialize()
+        await self.post_init(self.app)
+        await self.app.start()
+        try:
+            await server.start()
+            await self.app.bot.set_webhook(
+                url=url or server.url,
+                secret_token=server.secret_token,
+                allowed_updates=Update.ALL_TYPES)
+            logger.info('Webhook is set. Bot is ready.')
+            await stop.wait()
+        finally:
+            await server.stop()
+            await self.app.stop()
+            await self.app.shutdown()
+            await self.post_shutdown(self.app)
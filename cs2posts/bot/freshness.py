@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+import logging
+import os
+import statistics
+import struct
+import time
+from collections.abc import Callable
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+
+from cs2posts.bot import settings
+from cs2posts.metrics import REGISTRY
+from cs2posts.post import Post
+from cs2posts.post import PostKind
+from cs2posts.store import AsyncStore
+from cs2posts.store import Store
+from cs2posts.store import ThreadedStore
+
+
+logger = logging.getLogger(__name__)
+
+
+# Seconds, from a post crawled right away to one found hours later
+DELAY_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 900.0,
+                 1200.0, 1800.0, 3600.0, 7200.0, 21600.0, 86400.0)
+# Seconds, from a handful of chats to a broadcast to all of them
+FAN_OUT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+                   300.0, 600.0, 1800.0, 3600.0)
+
+SEEN_DELAY_SECONDS = REGISTRY.histogram(
+    "cs2posts_post_seen_delay_seconds",
+    "Time from publishing a post on Steam until the crawler found it",
+    ("kind",), DELAY_BUCKETS)
+RENDER_DELAY_SECONDS = REGISTRY.histogram(
+    "cs2posts_post_render_delay_seconds",
+    "Time from finding a new post until its message was rendered",
+    ("kind",))
+FIRST_DELIVERY_DELAY_SECONDS = REGISTRY.histogram(
+    "cs2posts_post_first_delivery_delay_seconds",
+    "Time from publishing a post on Steam until the first chat got it",
+    ("kind",), DELAY_BUCKETS)
+LAST_DELIVERY_DELAY_SECONDS = REGISTRY.histogram(
+    "cs2posts_post_last_delivery_delay_seconds",
+    "Time from publishing a post on Steam until the last chat got it",
+    ("kind",), DELAY_BUCKETS)
+FAN_OUT_SECONDS = REGISTRY.histogram(
+    "cs2posts_post_fan_out_seconds",
+    "Time from the first until the last chat got a post",
+    ("kind",), FAN_OUT_BUCKETS)
+
+KINDS = tuple(PostKind)
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+
+@dataclass(slots=True)
+class PostTimeline:
+    # Unix times of a post on its way from Steam to the chats, None if the
+    # step did not happen (yet), e.g. no chat was interested in the post
+    gid: str
+    kind: PostKind
+    published: int
+    seen: float
+    rendered: float | None = None
+    first_delivery: float | None = None
+    last_delivery: float | None = None
+    deliveries: int = 0
+
+    @property
+    def seen_delay(self) -> float:
+        return self.seen - self.published
+
+    @property
+    def render_delay(self) -> float | None:
+        if self.rendered is None:
+            return None
+        return self.rendered - self.seen
+
+    @property
+    def first_delivery_delay(self) -> float | None:
+        if self.first_delivery is None:
+            return None
+        return self.first_delivery - self.published
+
+    @property
+    def last_delivery_delay(self) -> float | None:
+        if self.last_delivery is None:
+            return None
+        return self.last_delivery - self.published
+
+    @property
+    def fan_out(self) -> float | None:
+        if self.first_delivery is None or self.last_delivery is None:
+            return None
+        return self.last_delivery - self.first_delivery
+
+
+def to_ms(value: float | None) -> int:
+    return 0 if value is None else round(value * 1000)
+
+
+def from_ms(value: int) -> float | None:
+    return value / 1000 if value else None
+
+
+class FreshnessCodec:
+
+    MAGIC = b"CS2F"
+    VERSION = 1
+
+    # magic, version, record count
+    HEADER = struct.Struct("<4sHQ")
+    # gid, kind, published (epoch s), seen, rendered, first and last
+    # delivery (epoch ms, 0 if unknown), deliveries
+    RECORD = struct.Struct("<QBIqqqqI")
+
+    @staticmethod
+    def encode_record(timeline: PostTimeline) -> bytes:
+        return FreshnessCodec.RECORD.pack(
+            int(timeline.gid),
+            KIND_CODES[timeline.kind],
+            timeline.published,
+            to_ms(timeline.seen),
+            to_ms(timeline.rendered),
+            to_ms(timeline.first_delivery),
+            to_ms(timeline.last_delivery),
+            timeline.deliveries)
+
+    @staticmethod
+    def decode_record(gid: int, kind: int, published: int, seen: int, rendered: int,
+                      first_delivery: int, last_delivery: int,
+                      deliveries: int) -> PostTimeline:
+        return PostTimeline(
+            str(gid),
+            KINDS[kind],
+            published,
+            seen / 1000,
+            from_ms(rendered),
+            from_ms(first_delivery),
+            from_ms(last_delivery),
+            deliveries)
+
+    @staticmethod
+    def encode(timelines: Iterable[PostTimeline]) -> bytes:
+        records = [FreshnessCodec.encode_record(timeline) for timeline in timelines]
+        header = FreshnessCodec.HEADER.pack(
+            FreshnessCodec.MAGIC, FreshnessCodec.VERSION, len(records))
+        return header + b"".join(records)
+
+    @staticmethod
+    def decode(buffer: bytes) -> list[PostTimeline]:
+        if len(buffer) < FreshnessCodec.HEADER.size:
+            raise ValueError('Freshness data is truncated (missing header)')
+
+        magic, version, count = FreshnessCodec.HEADER.unpack_from(buffer)
+        if magic != FreshnessCodec.MAGIC:
+            raise ValueError(f'Not freshness data {magic=}')
+        if version != FreshnessCodec.VERSION:
+            raise ValueError(
+                f'Unsupported freshness data {version=} (supported: {FreshnessCodec.VERSION})')
+
+        start = FreshnessCodec.HEADER.size
+        end = start + count * FreshnessCodec.RECORD.size
+        if len(buffer) < end:
+            raise ValueError(f'Freshness data is truncated expected {count} records')
+
+        return [FreshnessCodec.decode_record(*record)
+                for record in FreshnessCodec.RECORD.iter_unpack(buffer[start:end])]
+
+
+class LocalFreshnessStore(Store):
+    # Timelines of the latest broadcast posts, 49 bytes per post
+
+    def __init__(self, filepath: Path | None = None) -> None:
+        if filepath is None:
+            filepath = Path(__file__).parent.parent / "data" / "freshness.bin"
+
+        self.__filepath = Path(filepath)
+
+        if not self.__filepath.exists():
+            self.create()
+
+    @property
+    def filepath(self) -> Path:
+        return self.__filepath
+
+    def create(self) -> None:
+        self.save([])
+
+    def load(self) -> list[PostTimeline]:
+        try:
+            return FreshnessCodec.decode(self.filepath.read_bytes())
+        except ValueError as e:
+            logger.error(f'Could not load post freshness data: {e}')
+            return []
+
+    def save(self, timelines: Iterable[PostTimeline]) -> None:
+        # Write to a temporary file first so a crash never leaves a torn file
+        tmp_filepath = self.filepath.with_name(f"{self.filepath.name}.tmp")
+        tmp_filepath.write_bytes(FreshnessCodec.encode(timelines))
+        os.replace(tmp_filepath, self.filepath)
+
+    def is_empty(self) -> bool:
+        return len(self.load()) == 0
+
+
+class FreshnessTracker:
+    # Records when a new post was found, rendered and delivered to the first
+    # and the last chat. Finished timelines are observed by the histograms
+    # and persisted, only the latest max_posts are kept.
+
+    def __init__(self, store: Store | None = None,
+                 max_posts: int | None = None,
+                 clock: Callable[[], float] = time.time) -> None:
+        if max_posts is None:
+            max_posts = settings.FRESHNESS_MAX_POSTS
+
+        self.__max_posts = max_posts
+        self.__clock = clock
+        self.__timelines: dict[str, PostTimeline] = {}
+        self.__store: AsyncStore | None = None
+        if store is not None:
+            self.__store = ThreadedStore(store)
+            for timeline in store.load():
+                self.__add(timeline)
+
+    @property
+    def timelines(self) -> list[PostTimeline]:
+        # Oldest first
+        return list(self.__timelines.values())
+
+    def __len__(self) -> int:
+        return len(self.__timelines)
+
+    def get(self, gid: str) -> PostTimeline | None:
+        return self.__timelines.get(gid)
+
+    def __add(self, timeline: PostTimeline) -> None:
+        self.__timelines[timeline.gid] = timeline
+        while len(self.__timelines) > self.__max_posts:
+            del self.__timelines[next(iter(self.__timelines))]
+
+    def seen(self, post: Post, at: float | None = None) -> PostTimeline:
+        # A post broadcast again keeps the time it was found first
+        timeline = self.__timelines.get(post.gid)
+        if timeline is None:
+            timeline = PostTimeline(
+                post.gid, post.kind, post.date, self.__clock() if at is None else at)
+            self.__add(timeline)
+        return timeline
+
+    def rendered(self, timeline: PostTimeline) -> None:
+        if timeline.rendered is None:
+            timeline.rendered = self.__clock()
+
+    def delivered(self, timeline: PostTimeline) -> None:
+        now = self.__clock()
+        if timeline.first_delivery is None:
+            timeline.first_delivery = now
+        timeline.last_delivery = now
+        timeline.deliveries += 1
+
+    async def finish(self, timeline: PostTimeline) -> None:
+        kind = timeline.kind.value
+        SEEN_DELAY_SECONDS.labels(kind).observe(max(0.0, timeline.seen_delay))
+        if timeline.render_delay is not None:
+            RENDER_DELAY_SECONDS.labels(kind).observe(timeline.render_delay)
+        if timeline.first_delivery_delay is not None:
+            FIRST_DELIVERY_DELAY_SECONDS.labels(kind).observe(
+                max(0.0, timeline.first_delivery_delay))
+            LAST_DELIVERY_DELAY_SECONDS.labels(kind).observe(
+                max(0.0, timeline.last_delivery_delay))
+            FAN_OUT_SECONDS.labels(kind).observe(timeline.fan_out)
+
+        if self.__store is not None:
+            try:
+                await self.__store.save(self.timelines)
+            except Exception as e:
+                logger.error(f'Could not save post freshness data: {e}')
+
+    def close(self) -> None:
+        if self.__store is not None:
+            self.__store.close()
+
+
+def format_duration(seconds: float | None) -> str:
+    if seconds is None:
+        return "-"
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f}m"
+    return f"{seconds / 3600:.1f}h"
+
+
+class FreshnessMessageFactory:
+
+    @staticmethod
+    def create_entry(timeline: PostTimeline) -> str:
+        date = datetime.fromtimestamp(timeline.published, tz=timezone.utc)
+        return (f"<b>{timeline.kind.value}</b> {date:%Y-%m-%d %H:%M} UTC\n"
+                f"seen +{format_duration(timeline.seen_delay)}, "
+                f"rendered +{format_duration(timeline.render_delay)}, "
+                f"first +{format_duration(timeline.first_delivery_delay)}, "
+                f"last +{format_duration(timeline.last_delivery_delay)} "
+                f"({timeline.deliveries} chats)")
+
+    @staticmethod
+    def create_summary(timelines: list[PostTimeline]) -> str:
+        seen = [timeline.seen_delay for timeline in timelines]
+        last = [timeline.last_delivery_delay for timeline in timelines
+                if timeline.last_delivery_delay is not None]
+        fan_out = [timeline.fan_out for timeline in timelines
+                   if timeline.fan_out is not None]
+
+        def median(values: list[float]) -> str:
+            return format_duration(statistics.median(values) if values else None)
+
+        def maximum(values: list[float]) -> str:
+            return format_duration(max(values) if values else None)
+
+        return (f"Posts: {len(timelines)}\n"
+                f"Publish → seen: median {median(seen)}, max {maximum(seen)}\n"
+                f"Publish → last chat: median {median(last)}, max {maximum(last)}\n"
+                f"Fan-out: median {median(fan_out)}, max {maximum(fan_out)}")
+
+    @staticmethod
+    def create(timelines: list[PostTimeline], count: int | None = None) -> str:
+        if count is None:
+            count = settings.FRESHNESS_STATS_POSTS
+
+        title = "<b>Post Freshness</b>\n\n"
+        if not timelines:
+            return title + "No posts were broadcast yet."
+
+        # Newest first
+        summary = FreshnessMessageFactory.create_summary(timelines)
+        entries = map(FreshnessMessageFactory.create_entry,
+                      reversed(timelines[-count:]))
+        return title + summary + "\n\n" + "\n\n".join(entries)
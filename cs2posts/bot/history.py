@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import asyncio
+import html
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import timezone
+from enum import Enum
+
+from telegram import InlineKeyboardButton
+from telegram import InlineKeyboardMarkup
+from telegram import Update
+from telegram.constants import ParseMode
+from telegram.ext import Application
+from telegram.ext import CallbackQueryHandler
+from telegram.ext import CommandHandler
+from telegram.ext import ContextTypes
+
+from cs2posts.archive import PostArchive
+from cs2posts.archive import PostCursor
+from cs2posts.archive import PostSummary
+from cs2posts.bot import settings
+from cs2posts.bot.spam import SpamProtector
+from cs2posts.post import PostKind
+
+
+logger = logging.getLogger(__name__)
+
+
+class Direction(Enum):
+    OLDER = "o"
+    NEWER = "n"
+
+
+# /history argument -> kind of the listed posts
+KIND_ARGS = {
+    "news": PostKind.NEWS,
+    "update": PostKind.UPDATE,
+    "updates": PostKind.UPDATE,
+    "external": PostKind.EXTERNAL,
+}
+
+KIND_NAMES = {
+    None: "All Posts",
+    PostKind.NEWS: "News",
+    PostKind.UPDATE: "Updates",
+    PostKind.EXTERNAL: "External News",
+}
+
+# Callback data has to fit into 64 bytes, kinds are encoded as one letter
+KIND_CODES = {
+    None: "a",
+    PostKind.NEWS: "n",
+    PostKind.UPDATE: "u",
+    PostKind.EXTERNAL: "e",
+}
+KINDS_BY_CODE = {code: kind for kind, code in KIND_CODES.items()}
+
+CALLBACK_PREFIX = "history"
+CALLBACK_CLOSE = f"{CALLBACK_PREFIX}:close"
+
+
+@dataclass
+class HistoryPage:
+    kind: PostKind | None
+    summaries: list[PostSummary]
+    has_newer: bool
+    has_older: bool
+
+
+class HistoryCallback:
+
+    @staticmethod
+    def encode(kind: PostKind | None, direction: Direction, cursor: PostCursor) -> str:
+        date, gid = cursor
+        return f"{CALLBACK_PREFIX}:{KIND_CODES[kind]}:{direction.value}:{date}:{gid}"
+
+    @staticmethod
+    def decode(data: str) -> tuple[PostKind | None, Direction, PostCursor]:
+        prefix, kind, direction, date, gid = data.split(":", 4)
+        if prefix != CALLBACK_PREFIX:
+            raise ValueError(f'Not a history callback {data=}')
+        return KINDS_BY_CODE[kind], Direction(direction), (int(date), gid)
+
+
+class HistoryMessageFactory:
+
+    @staticmethod
+    def create(page: HistoryPage) -> tuple[str, InlineKeyboardMarkup]:
+        text = HistoryMessageFactory.create_text(page)
+        reply_markup = HistoryMessageFactory.create_reply_markup(page)
+        return text, reply_markup
+
+    @staticmethod
+    def create_entry(summary: PostSummary) -> str:
+        date = datetime.fromtimestamp(summary.date, tz=timezone.utc)
+        entry = (f"<b>{html.escape(summary.title)}</b>\n"
+                 f"{date:%Y-%m-%d %H:%M} UTC\n")
+        if summary.summary:
+            entry += f"{html.escape(summary.summary)}\n"
+        entry += f"<a href='{html.escape(summary.url, quote=True)}'>Link</a>"
+        return entry
+
+    @staticmethod
+    def create_text(page: HistoryPage) -> str:
+        title = f"<b>History - {KIND_NAMES[page.kind]}</b>\n\n"
+        if not page.summaries:
+            return title + "No archived posts found."
+
+        entries = map(HistoryMessageFactory.create_entry, page.summaries)
+        return title + "\n\n".join(entries)
+
+    @staticmethod
+    def create_reply_markup(page: HistoryPage) -> InlineKeyboardMarkup:
+        navigation = []
+        if page.has_newer:
+            navigation.append(InlineKeyboardButton(
+                "« Newer",
+                callback_data=HistoryCallback.encode(
+                    page.kind, Direction.NEWER, page.summaries[0].cursor)))
+        if page.has_older:
+            navigation.append(InlineKeyboardButton(
+                "Older »",
+                callback_data=HistoryCallback.encode(
+                    page.kind, Direction.OLDER, page.summaries[-1].cursor)))
+
+        keyboard = [navigation] if navigation else []
+        keyboard.append(
+            [InlineKeyboardButton("Close", callback_data=CALLBACK_CLOSE)])
+        return InlineKeyboardMarkup(keyboard)
+
+
+class History:
+
+    def __init__(self, app: Application) -> None:
+        self.__archive = None
+        self.__spam_protector = None
+
+        app.add_handler(CommandHandler("history", self.history))
+        app.add_handler(CallbackQueryHandler(
+            self.button, pattern=f"^{CALLBACK_PREFIX}:"))
+
+    @property
+    def archive(self) -> PostArchive:
+        return self.__archive
+
+    def set_archive(self, archive: PostArchive | None) -> None:
+        self.__archive = archive
+
+    @property
+    def spam_protector(self) -> SpamProtector:
+        return self.__spam_protector
+
+    def set_spam_protector(self, spam_protector: SpamProtector) -> None:
+        self.__spam_protector = spam_protector
+
+    def load_page(self, kind: PostKind | None, cursor: PostCursor | None = None,
+                  direction: Direction = Direction.OLDER) -> HistoryPage:
+        # One extra summary is loaded to know whether there is a next page
+        count = settings.HISTORY_PAGE_SIZE
+        if direction is Direction.OLDER:
+            summaries = self.archive.before(cursor, count + 1, kind, summaries=True)
+            return HistoryPage(kind, summaries[:count],
+                               has_newer=cursor is not None,
+                               has_older=len(summaries) > count)
+
+        summaries = self.archive.after(cursor, count + 1, kind, summaries=True)
+        return HistoryPage(kind, summaries[-count:],
+                           has_newer=len(summaries) > count,
+                           has_older=True)
+
+    async def history(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        if not await self.spam_protector.check(context.bot, update.message.chat_id):
+            return
+
+        if self.archive is None:
+            return
+
+        args = context.args or []
+        kind = None
+        if args:
+            kind = KIND_ARGS.get(args[0].casefold())
+            if kind is None:
+                await update.message.reply_text(
+                    'Usage: /history [news|update|external]')
+                return
+
+        logger.info(
+            f'Sending history {kind=} to chat_id={update.message.chat_id} ...')
+
+        page = await asyncio.to_thread(self.load_page, kind)
+        text, reply_markup = HistoryMessageFactory.create(page)
+        await update.message.reply_text(
+            text=text,
+            reply_markup=reply_markup,
+            parse_mode=ParseMode.HTML,
+            disable_web_page_preview=True)
+
+    async def button(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        query = update.callback_query
+        await query.answer()
+
+        if query.data == CALLBACK_CLOSE:
+            await query.delete_message()
+            return
+
+        # Paging spends a token like a command, closing is free
+        if not await self.spam_protector.check(context.bot, update.effective_chat.id):
+            return
+
+        if self.archive is None:
+            return
+
+        try:
+            kind, direction, cursor = HistoryCallback.decode(query.data)
+        except (KeyError, ValueError) as e:
+            logger.error(f'Invalid history callback {query.data=}: {e}')
+            return
+
+        # Paging edits the message in place
+        page = await asyncio.to_thread(self.load_page, kind, cursor, direction)
+        text, reply_markup = HistoryMessageFactory.create(page)
+        await query.edit_message_text(
+            text=text,
+            reply_markup=reply_markup,
+            parse_mode=ParseMode.HTML,
+            disable_web_page_preview=True)
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import logging
+from collections import deque
+from collections.abc import Iterable
+
+from cs2posts.bot.chats import Chat
+from cs2posts.bot.subscriptions import Subscriptions
+from cs2posts.parser.plain_text import PlainTextParser
+from cs2posts.post import Post
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_keyword(keyword: str) -> str:
+    return " ".join(keyword.casefold().split())
+
+
+class KeywordMatcher:
+    # Aho-Corasick automaton over all watched keywords. Adding a keyword only
+    # extends the trie, the failure and output links are recomputed lazily on
+    # the next match and only if the keyword set changed in between.
+
+    def __init__(self, keywords: Iterable[str] | None = None) -> None:
+        self.__goto: list[dict[str, int]] = [{}]
+        self.__fail: list[int] = [0]
+        self.__keyword: list[str | None] = [None]
+        # Next node on the failure chain which ends a keyword (0 if none)
+        self.__output: list[int] = [0]
+        self.__dirty = False
+
+        for keyword in keywords or []:
+            self.add(keyword)
+
+    def add(self, keyword: str) -> None:
+        node = 0
+        for char in keyword:
+            child = self.__goto[node].get(char)
+            if child is None:
+                child = len(self.__goto)
+                self.__goto.append({})
+                self.__fail.append(0)
+                self.__keyword.append(None)
+                self.__output.append(0)
+                self.__goto[node][char] = child
+            node = child
+
+        if self.__keyword[node] != keyword:
+            self.__keyword[node] = keyword
+            self.__dirty = True
+
+    def remove(self, keyword: str) -> None:
+        node = self.__find(keyword)
+        if node is not None and self.__keyword[node] is not None:
+            # Trie nodes are kept, they are reused if the keyword returns
+            self.__keyword[node] = None
+            self.__dirty = True
+
+    def __find(self, keyword: str) -> int | None:
+        node = 0
+        for char in keyword:
+            node = self.__goto[node].get(char)
+            if node is None:
+                return None
+        return node
+
+    def __build(self) -> None:
+        queue = deque()
+        for child in self.__goto[0].values():
+            self.__fail[child] = 0
+            self.__output[child] = 0
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for char, child in self.__goto[node].items():
+                fail = self.__fail[node]
+                while fail and char not in self.__goto[fail]:
+                    fail = self.__fail[fail]
+                fail = self.__goto[fail].get(char, 0)
+
+                self.__fail[child] = fail
+                self.__output[child] = fail if self.__keyword[fail] is not None else self.__output[fail]
+                queue.append(child)
+
+        self.__dirty = False
+
+    def match(self, text: str) -> set[str]:
+        if self.__dirty:
+            self.__build()
+
+        goto = self.__goto
+        fail = self.__fail
+        keywords = self.__keyword
+        output = self.__output
+
+        text = text.casefold()
+        matches = set()
+        node = 0
+        for end, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            found = node if keywords[node] is not None else output[node]
+            while found:
+                keyword = keywords[found]
+                if keyword not in matches and self.__is_word(text, end - len(keyword) + 1, end):
+                    matches.add(keyword)
+                found = output[found]
+
+        return matches
+
+    @staticmethod
+    def __is_word(text: str, start: int, end: int) -> bool:
+        # Only match whole words, e.g. "premier" should not match "premiere"
+        if start > 0 and text[start - 1].isalnum():
+            return False
+        if end + 1 < len(text) and text[end + 1].isalnum():
+            return False
+        return True
+
+
+class KeywordSubscriptions(Subscriptions):
+
+    def __init__(self) -> None:
+        self.__matcher = KeywordMatcher()
+        super().__init__()
+
+    def normalize(self, keyword: str) -> str:
+        return normalize_keyword(keyword)
+
+    def _key_added(self, keyword: str) -> None:
+        self.__matcher.add(keyword)
+
+    def _key_removed(self, keyword: str) -> None:
+        self.__matcher.remove(keyword)
+
+    def is_watching(self, chat_id: int) -> bool:
+        return self.is_subscribed(chat_id)
+
+    def match(self, text: str) -> set[int]:
+        # Chat ids watching at least one keyword mentioned in the text
+        return self.resolve(self.__matcher.match(text))
+
+    def filter(self, chats: list[Chat], post: Post) -> list[Chat]:
+        # Chats without keywords get every post, the others only matching ones
+        if not len(self):
+            return chats
+
+        # Markup is dropped, "[b]mirage[/b]" mentions mirage but "[img]" not img
+        text = PlainTextParser(post.contents).parse()
+        matched = self.match(f"{post.title}\n{text}")
+        return [chat for chat in chats
+                if chat.chat_id in matched or not self.is_subscribed(chat.chat_id)]
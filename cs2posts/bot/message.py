@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 import abc
+import asyncio
+import functools
 import logging
+import time
 
 from bs4 import BeautifulSoup
 from telegram.constants import ParseMode
@@ -13,14 +16,20 @@ from cs2posts.bot.content import TextBlock
 from cs2posts.bot.content import Video
 from cs2posts.bot.content import Youtube
 from cs2posts.bot.utils import Utils
+from cs2posts.metrics import REGISTRY
 from cs2posts.parser.steam2telegram_html import Steam2TelegramHTML
 from cs2posts.parser.steam_list import SteamListParser
 from cs2posts.parser.steam_update_heading import SteamUpdateHeadingParser
 from cs2posts.post import Post
+from cs2posts.tracing import span
 
 
 logger = logging.getLogger(__name__)
 
+RENDER_SECONDS = REGISTRY.histogram(
+    "cs2posts_render_seconds", "Time to parse and render a post into a message",
+    ("kind",))
+
 
 class TelegramMessage:
 
@@ -37,6 +46,10 @@ class TelegramMessage:
         return self.__messages
 
     def split(self, message: str) -> list[str]:
+        with span("split", length=len(message)):
+            return self.__split(message)
+
+    def __split(self, message: str) -> list[str]:
 
         if len(message) < TELEGRAM_MAX_MESSAGE_LENGTH:
             return [message]
@@ -64,16 +77,18 @@ class TelegramMessage:
 
 class CounterStrikeNewsMessage(TelegramMessage):
 
-    def __init__(self, post: Post) -> None:
+    def __init__(self, post: Post, url: str | None = None) -> None:
         self.post = post
         parser = Steam2TelegramHTML(post.contents)
         parser.add_parser(parser=SteamListParser, priority=1)
 
         self.content = ContentExtractor.extract_message_blocks(parser.parse())
-        self.__add_footer()
+        self.__add_footer(url or Utils.get_redirected_url(post.url))
+        # Media url -> whether it can be fetched, the same message is sent to
+        # many chats but every valid url is only checked once
+        self.__valid_urls: dict[str, asyncio.Future[bool]] = {}
 
-    def __add_footer(self) -> None:
-        url = Utils.get_redirected_url(self.post.url)
+    def __add_footer(self, url: str) -> None:
         footer = (
             f"\n\n(Author: {self.post.author})\n\n"
             f"Source: <a href='{url}'>Link</a>"
@@ -91,11 +106,29 @@ class CounterStrikeNewsMessage(TelegramMessage):
     def get_header(self) -> str:
         return f"<b>{self.post.title}</b>\n({self.post.date_as_datetime})"
 
+    async def is_valid_url(self, url: str) -> bool:
+        # The check is a blocking request, it runs on a thread so other
+        # updates are handled meanwhile
+        valid = self.__valid_urls.get(url)
+        if valid is None:
+            valid = self.__valid_urls[url] = asyncio.ensure_future(
+                asyncio.to_thread(Utils.is_valid_url, url))
+            valid.add_done_callback(functools.partial(self.__forget_invalid, url))
+        return await asyncio.shield(valid)
+
+    def __forget_invalid(self, url: str, valid: asyncio.Future[bool]) -> None:
+        # A failed check can be a hiccup of the media host, the next chat
+        # checks the url again
+        if valid.cancelled() or valid.exception() is not None or not valid.result():
+            self.__valid_urls.pop(url, None)
+
     async def send_message(self, bot, chat_id: int, message: TextBlock) -> None:
+        # The same message is sent to every chat, so the block is not changed
+        text = message.text
         if message.is_heading:
-            message.text = self.get_header() + "\n\n" + message.text
+            text = self.get_header() + "\n\n" + text
 
-        for text in self.split(message.text):
+        for text in self.split(text):
             await bot.send_message(
                 chat_id=chat_id,
                 text=text,
@@ -105,7 +138,7 @@ class CounterStrikeNewsMessage(TelegramMessage):
     async def send_image(self, bot, chat_id: int, image: Image) -> None:
         image_url = ContentExtractor.extract_url(image.url)
 
-        if not Utils.is_valid_url(image_url):
+        if not await self.is_valid_url(image_url):
             logger.error(
                 f"Not sending image due to invalid image URL {image_url=}")
             return
@@ -120,7 +153,7 @@ class CounterStrikeNewsMessage(TelegramMessage):
     async def send_video(self, bot, chat_id: int, video: Video) -> None:
         video_url = ContentExtractor.extract_url(video.mp4)
 
-        if not Utils.is_valid_url(video_url):
+        if not await self.is_valid_url(video_url):
             logger.error(
                 f"Not sending video due to invalid video URL {video_url=}")
             return
@@ -161,8 +194,8 @@ class CounterStrikeNewsMessage(TelegramMessage):
 
 class CounterStrikeUpdateMessage(TelegramMessage):
 
-    def __init__(self, post: Post) -> None:
-        post.url = Utils.get_redirected_url(post.url)
+    def __init__(self, post: Post, url: str | None = None) -> None:
+        url = url or Utils.get_redirected_url(post.url)
 
         parser = Steam2TelegramHTML(post.contents)
         parser.add_parser(parser=SteamListParser, priority=1)
@@ -174,7 +207,7 @@ class CounterStrikeUpdateMessage(TelegramMessage):
         msg += parser.parse()
         msg += f"(Author: {post.author})"
         msg += "\n\n"
-        msg += f"Source: <a href='{post.url}'>Link</a>"
+        msg += f"Source: <a href='{url}'>Link</a>"
 
         super().__init__(msg)
 
@@ -189,8 +222,8 @@ class CounterStrikeUpdateMessage(TelegramMessage):
 
 class CounterStrikeExternalMessage(TelegramMessage):
 
-    def __init__(self, post: Post) -> None:
-        post.url = Utils.get_redirected_url(post.url)
+    def __init__(self, post: Post, url: str | None = None) -> None:
+        url = url or Utils.get_redirected_url(post.url)
         self.post = post
 
         soup = BeautifulSoup(post.contents, "html.parser")
@@ -227,9 +260,9 @@ class CounterStrikeExternalMessage(TelegramMessage):
         msg += "\n\n"
 
         if len(read_more) > 0:
-            post.url = read_more[0].get("href")
+            url = read_more[0].get("href")
 
-        msg += f"Source: <a href='{post.url}'>Link</a>"
+        msg += f"Source: <a href='{url}'>Link</a>"
 
         super().__init__(msg)
 
@@ -245,11 +278,29 @@ class CounterStrikeExternalMessage(TelegramMessage):
 class TelegramMessageFactory:
 
     @staticmethod
-    def create(post: Post) -> TelegramMessage:
+    def create(post: Post, url: str | None = None) -> TelegramMessage:
+        # url is the resolved source url of the post, it is resolved here if
+        # not given, the blocking request is not part of the render time
         if post.is_news():
-            return CounterStrikeNewsMessage(post)
-        if post.is_update():
-            return CounterStrikeUpdateMessage(post)
-        if post.is_external():
-            return CounterStrikeExternalMessage(post)
-        raise ValueError(f"Unknown post type {post.title=} {post.url=}")
+            message_class = CounterStrikeNewsMessage
+        elif post.is_update():
+            message_class = CounterStrikeUpdateMessage
+        elif post.is_external():
+            message_class = CounterStrikeExternalMessage
+        else:
+            raise ValueError(f"Unknown post type {post.title=} {post.url=}")
+
+        if url is None:
+            url = Utils.get_redirected_url(post.url)
+        with span("render", gid=post.gid, kind=post.kind.value):
+            start = time.perf_counter()
+            message = message_class(post, url)
+            RENDER_SECONDS.labels(post.kind.value).observe(time.perf_counter() - start)
+        return message
+
+    @staticmethod
+    async def create_async(post: Post) -> TelegramMessage:
+        # Same as create, the source url is resolved on a thread so the event
+        # loop keeps handling updates meanwhile
+        url = await asyncio.to_thread(Utils.get_redirected_url, post.url)
+        return TelegramMessageFactory.create(post, url)
@@ -15,7 +15,7 @@ from telegram.ext import ContextTypes
 
 from cs2posts.bot.chats import Chat
 from cs2posts.bot.chats import Chats
-from cs2posts.store import Store
+from cs2posts.store import AsyncStore
 
 
 logger = logging.getLogger(__name__)
@@ -105,20 +105,23 @@ class Options:
         self.__store = None
 
         app.add_handler(CommandHandler("options", self.options))
-        app.add_handler(CallbackQueryHandler(self.button))
+        # Only handle the option buttons, other handlers have their own
+        buttons = "|".join(btn.value for btn in ButtonData)
+        app.add_handler(CallbackQueryHandler(
+            self.button, pattern=f"^({buttons})$"))
 
     @property
     def chats(self) -> Chats:
         return self.__chats
 
     @property
-    def store(self) -> Store:
+    def store(self) -> AsyncStore:
         return self.__store
 
     def set_chats(self, chats: Chats) -> None:
         self.__chats = chats
 
-    def set_chats_store(self, store: Store) -> None:
+    def set_chats_store(self, store: AsyncStore) -> None:
         self.__store = store
 
     async def options(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -158,15 +161,15 @@ class Options:
 
         if btn is ButtonData.UPDATE:
             chat.is_update_interested = not chat.is_update_interested
-            self.__store.save(self.chats)
+            await self.__store.save(self.chats)
 
         if btn is ButtonData.NEWS:
             chat.is_news_interested = not chat.is_news_interested
-            self.__store.save(self.chats)
+            await self.__store.save(self.chats)
 
         if btn is ButtonData.EXTERNAL_NEWS:
             chat.is_external_news_interested = not chat.is_external_news_interested
-            self.__store.save(self.chats)
+            await self.__store.save(self.chats)
 
         await self.update(context, query, chat)
 
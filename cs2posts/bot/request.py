@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import logging
+
+from telegram.request import HTTPXRequest
+from telegram.request import RequestData
+
+from cs2posts.tracing import span
+from cs2posts.tracing import TRACER
+
+
+logger = logging.getLogger(__name__)
+
+
+class TracedRequest(HTTPXRequest):
+    # Every Bot API call of the bot goes through here, each is a span named
+    # after the Bot API method when tracing is enabled
+
+    async def do_request(self, url: str, method: str,
+                         request_data: RequestData | None = None,
+                         **kwargs) -> tuple[int, bytes]:
+        with span("bot_api", method=url.rsplit("/", 1)[-1]) as current:
+            # The parameters are built on every access, only when tracing
+            if TRACER.enabled and request_data is not None:
+                current.set_attribute(
+                    "chat_id", request_data.parameters.get("chat_id"))
+            code, payload = await super().do_request(url, method, request_data, **kwargs)
+            current.set_attribute("status_code", code)
+            return code, payload
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Awaitable
+from collections.abc import Callable
+from pathlib import Path
+
+from telegram.ext import Application
+from telegram.ext import CallbackContext
+
+from cs2posts.bot import settings
+from cs2posts.store import AsyncStore
+from cs2posts.store import LocalStore
+from cs2posts.store import Store
+from cs2posts.store import ThreadedStore
+
+
+logger = logging.getLogger(__name__)
+
+
+class LocalSchedulerStore(LocalStore):
+    # Unix time of the last post check
+
+    def __init__(self, filepath: Path | None = None) -> None:
+        if filepath is None:
+            filepath = Path(__file__).parent.parent / "data" / "scheduler.json"
+
+        super().__init__(filepath)
+
+    def load(self) -> float | None:
+        return super().load().get("last_run")
+
+    def save(self, last_run: float) -> None:
+        self._write({"last_run": last_run}, count=1)
+
+
+class PostCheckScheduler:
+    # Runs the post checker every interval seconds, delayed by up to jitter
+    # seconds, from the start of the bot on. The time of the last run is
+    # persisted, so a restart keeps the rhythm and a bot which was down for
+    # longer than the interval catches up with a check right away. Runs never
+    # overlap, a slow broadcast delays the next check.
+
+    def __init__(self, callback: Callable[[CallbackContext], Awaitable[None]],
+                 interval: float | None = None, jitter: float | None = None,
+                 store: Store | None = None,
+                 clock: Callable[[], float] = time.time,
+                 rnd: random.Random | None = None) -> None:
+        if interval is None:
+            interval = settings.CS2_UPDATE_CHECK_INTERVAL
+        if jitter is None:
+            jitter = settings.CS2_UPDATE_CHECK_JITTER
+
+        if interval <= 0 or jitter < 0:
+            raise ValueError(f'Invalid post check schedule {interval=} {jitter=}')
+
+        self.__callback = callback
+        self.__interval = interval
+        self.__jitter = jitter
+        self.__clock = clock
+        self.__random = rnd or random.Random()
+        self.__store: AsyncStore | None = None
+        self.__last_run: float | None = None
+        if store is not None:
+            self.__store = ThreadedStore(store)
+            self.__last_run = store.load()
+        self.__task: asyncio.Task | None = None
+        self.__runs = 0
+
+    @property
+    def interval(self) -> float:
+        return self.__interval
+
+    @property
+    def last_run(self) -> float | None:
+        return self.__last_run
+
+    @property
+    def runs(self) -> int:
+        return self.__runs
+
+    @property
+    def is_running(self) -> bool:
+        return self.__task is not None and not self.__task.done()
+
+    def next_delay(self, now: float | None = None) -> float:
+        # Seconds until the next check is due, 0 if one was missed
+        if self.__last_run is None:
+            return 0.0
+        if now is None:
+            now = self.__clock()
+        return min(max(0.0, self.__last_run + self.__interval - now), self.__interval)
+
+    def start(self, app: Application) -> None:
+        if self.is_running:
+            return
+        delay = self.next_delay()
+        if not delay:
+            logger.info('Post check is due. Checking for posts right away...')
+        self.__task = asyncio.create_task(self.__loop(CallbackContext(app), delay))
+
+    async def stop(self) -> None:
+        if self.__task is not None:
+            self.__task.cancel()
+            await asyncio.gather(self.__task, return_exceptions=True)
+            self.__task = None
+        if self.__store is not None:
+            self.__store.close()
+
+    async def run(self, context: CallbackContext) -> None:
+        started = self.__clock()
+        try:
+            await self.__callback(context)
+        except Exception:
+            logger.exception('Post check failed')
+        self.__runs += 1
+        self.__last_run = started
+        if self.__store is not None:
+            await self.__store.save(started)
+
+    async def __loop(self, context: CallbackContext, delay: float) -> None:
+        while True:
+            if delay:
+                await asyncio.sleep(delay + self.__random.uniform(0, self.__jitter))
+            await self.run(context)
+            delay = self.__interval
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+import html
+import logging
+from datetime import datetime
+from datetime import timezone
+
+from telegram import Update
+from telegram.constants import ParseMode
+from telegram.ext import Application
+from telegram.ext import CommandHandler
+from telegram.ext import ContextTypes
+
+from cs2posts.archive import PostArchive
+from cs2posts.archive import PostSummary
+from cs2posts.bot import settings
+from cs2posts.bot.spam import SpamProtector
+
+
+logger = logging.getLogger(__name__)
+
+
+class SearchMessageFactory:
+
+    @staticmethod
+    def create_entry(position: int, summary: PostSummary) -> str:
+        date = datetime.fromtimestamp(summary.date, tz=timezone.utc)
+        return (f"{position}. <a href='{html.escape(summary.url, quote=True)}'>"
+                f"{html.escape(summary.title)}</a> ({date:%Y-%m-%d})")
+
+    @staticmethod
+    def create_text(query: str, summaries: list[PostSummary]) -> str:
+        title = f"<b>Search results for \"{html.escape(query)}\"</b>\n\n"
+        if not summaries:
+            return title + "No matching posts found."
+
+        entries = (SearchMessageFactory.create_entry(position, summary)
+                   for position, summary in enumerate(summaries, start=1))
+        return title + "\n".join(entries)
+
+
+class Search:
+
+    def __init__(self, app: Application) -> None:
+        self.__archive = None
+        self.__spam_protector = None
+
+        app.add_handler(CommandHandler("search", self.search))
+
+    @property
+    def archive(self) -> PostArchive:
+        return self.__archive
+
+    def set_archive(self, archive: PostArchive | None) -> None:
+        self.__archive = archive
+
+    @property
+    def spam_protector(self) -> SpamProtector:
+        return self.__spam_protector
+
+    def set_spam_protector(self, spam_protector: SpamProtector) -> None:
+        self.__spam_protector = spam_protector
+
+    async def search(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        if not await self.spam_protector.check(context.bot, update.message.chat_id):
+            return
+
+        if self.archive is None:
+            return
+
+        query = " ".join(context.args or []).strip()
+        if not query:
+            await update.message.reply_text('Usage: /search <terms>')
+            return
+
+        query = query[:settings.SEARCH_MAX_QUERY_LENGTH]
+        logger.info(
+            f'Searching posts {query=} for chat_id={update.message.chat_id} ...')
+
+        # Ranking runs on a thread, a large archive does not stall the loop
+        summaries = await asyncio.to_thread(
+            self.archive.search, query, limit=settings.SEARCH_RESULTS)
+        await update.message.reply_text(
+            text=SearchMessageFactory.create_text(query, summaries),
+            parse_mode=ParseMode.HTML,
+            disable_web_page_preview=True)
@@ -10,12 +10,88 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
+# Bot API server, e.g. a local one (default: https://api.telegram.org/bot)
+TELEGRAM_BASE_URL = os.getenv('TELEGRAM_BASE_URL', None)
+# Retries of a message after Telegram answered with 429 retry_after
+SEND_MESSAGE_MAX_RETRIES = int(os.getenv('SEND_MESSAGE_MAX_RETRIES', 3))
+# Updates are pushed to this public url instead of polled (default: polling)
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', None)
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8443))
+# Path the webhook server listens on (default: the path of WEBHOOK_URL)
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', None)
+# Random per run if not set
+WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN', None)
+# Handlers running at once, updates of the same chat always run in order
+UPDATE_CONCURRENCY = int(os.getenv('UPDATE_CONCURRENCY', 16))
+# Updates in progress or waiting for their chat before the queue backs up
+UPDATE_MAX_PENDING = int(os.getenv('UPDATE_MAX_PENDING', 256))
+# Port of the /health and /metrics endpoints (0 disables them), they are
+# never served by the public webhook server
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+METRICS_LISTEN = os.getenv('METRICS_LISTEN', '127.0.0.1')
+# Spans of post checks and broadcasts are written to this JSON file after
+# every broadcast and on shutdown (default: tracing is disabled)
+TRACE_FILEPATH = os.getenv('TRACE_FILEPATH', None)
+TRACE_MAX_SPANS = int(os.getenv('TRACE_MAX_SPANS', 10_000))
 CS2_UPDATE_CHECK_INTERVAL = int(os.getenv('CS2_UPDATE_CHECK_INTERVAL', 900))
+# Every check is delayed by up to this many seconds
+CS2_UPDATE_CHECK_JITTER = int(os.getenv('CS2_UPDATE_CHECK_JITTER', 30))
 
 LOCAL_CHAT_STORE_FILEPATH = os.getenv('LOCAL_CHAT_STORE_FILEPATH', None)
+# Either "json" (chats.json) or "snapshot" (compact binary chats.bin)
+LOCAL_CHAT_STORE_FORMAT = os.getenv('LOCAL_CHAT_STORE_FORMAT', 'json')
+# Either "dict" (one Chat object per chat) or "columnar" (array backed table)
+CHATS_BACKEND = os.getenv('CHATS_BACKEND', 'dict')
 LOCAL_LATEST_POST_STORE_FILEPATH = os.getenv(
     'LOCAL_LATEST_POST_STORE_FILEPATH', None)
+LOCAL_KEYWORD_STORE_FILEPATH = os.getenv('LOCAL_KEYWORD_STORE_FILEPATH', None)
+LOCAL_TOPIC_STORE_FILEPATH = os.getenv('LOCAL_TOPIC_STORE_FILEPATH', None)
+POST_ARCHIVE_FILEPATH = os.getenv('POST_ARCHIVE_FILEPATH', None)
+# Posts crawled into an empty post archive on startup
+POST_ARCHIVE_BACKFILL_COUNT = int(os.getenv('POST_ARCHIVE_BACKFILL_COUNT', 500))
+# Walks the whole post history since this unix time instead (0 disables it)
+POST_ARCHIVE_BACKFILL_SINCE = int(os.getenv('POST_ARCHIVE_BACKFILL_SINCE', 0))
+POST_ARCHIVE_BACKFILL_WINDOWS = int(os.getenv('POST_ARCHIVE_BACKFILL_WINDOWS', 4))
+# Steam API requests per second of all backfill windows together
+POST_ARCHIVE_BACKFILL_RATE = float(os.getenv('POST_ARCHIVE_BACKFILL_RATE', 1.0))
+LOCAL_BACKFILL_STORE_FILEPATH = os.getenv('LOCAL_BACKFILL_STORE_FILEPATH', None)
+LOCAL_SCHEDULER_STORE_FILEPATH = os.getenv('LOCAL_SCHEDULER_STORE_FILEPATH', None)
+LOCAL_FRESHNESS_STORE_FILEPATH = os.getenv('LOCAL_FRESHNESS_STORE_FILEPATH', None)
+# Delivery timelines of the latest broadcast posts kept, /stats lists a few
+FRESHNESS_MAX_POSTS = int(os.getenv('FRESHNESS_MAX_POSTS', 100))
+FRESHNESS_STATS_POSTS = int(os.getenv('FRESHNESS_STATS_POSTS', 5))
+# Comma separated Telegram user ids allowed to use /stats
+BOT_ADMIN_USER_IDS = frozenset(
+    int(user_id) for user_id in os.getenv('BOT_ADMIN_USER_IDS', '').split(',')
+    if user_id.strip())
 
+# Commands refill every CHAT_SPAM_INTERVAL_MS, up to CHAT_SPAM_BURST at once
 CHAT_SPAM_INTERVAL_MS = int(os.getenv('CHAT_SPAM_INTERVAL_MS', 750))
+CHAT_SPAM_BURST = int(os.getenv('CHAT_SPAM_BURST', 1))
 CHAT_BAN_TIMEOUT_SECONDS = int(os.getenv('CHAT_BAN_TIMEOUT_SECONDS', 600))
 CHAT_MAX_STRIKES = int(os.getenv('CHAT_MAX_STRIKES', 3))
+# Strikes are forgiven after this many seconds without spam (0 = never)
+CHAT_STRIKE_TIMEOUT_SECONDS = int(os.getenv('CHAT_STRIKE_TIMEOUT_SECONDS', 0))
+# Spam state of chats is forgotten when idle or when too many chats are tracked
+CHAT_SPAM_MAX_CHATS = int(os.getenv('CHAT_SPAM_MAX_CHATS', 100_000))
+CHAT_SPAM_IDLE_TIMEOUT_SECONDS = int(os.getenv('CHAT_SPAM_IDLE_TIMEOUT_SECONDS', 3600))
+
+# Commands per second of all chats, above it commands are shed by priority
+# (0 disables it). The rate is measured over ADMISSION_WINDOW_SECONDS.
+ADMISSION_RATE = float(os.getenv('ADMISSION_RATE', 30))
+ADMISSION_WINDOW_SECONDS = float(os.getenv('ADMISSION_WINDOW_SECONDS', 10))
+# Above this multiple of the rate, only commands changing chats are accepted
+ADMISSION_OVERLOAD_FACTOR = float(os.getenv('ADMISSION_OVERLOAD_FACTOR', 2))
+ADMISSION_MAX_QUEUE_DEPTH = int(os.getenv('ADMISSION_MAX_QUEUE_DEPTH', 1000))
+# Rendered answers of the latest post commands kept in memory
+MESSAGE_CACHE_SIZE = int(os.getenv('MESSAGE_CACHE_SIZE', 16))
+
+WATCH_MAX_KEYWORDS = int(os.getenv('WATCH_MAX_KEYWORDS', 10))
+WATCH_MAX_KEYWORD_LENGTH = int(os.getenv('WATCH_MAX_KEYWORD_LENGTH', 32))
+TOPICS_MAX_SUBSCRIPTIONS = int(os.getenv('TOPICS_MAX_SUBSCRIPTIONS', 20))
+
+HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', 5))
+
+SEARCH_RESULTS = int(os.getenv('SEARCH_RESULTS', 10))
+SEARCH_MAX_QUERY_LENGTH = int(os.getenv('SEARCH_MAX_QUERY_LENGTH', 100))
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import logging
+import struct
+from collections.abc import Iterable
+from collections.abc import Iterator
+from datetime import datetime
+from datetime import timedelta
+from itertools import islice
+from itertools import starmap
+from typing import BinaryIO
+
+from cs2posts.bot.chats import Chat
+from cs2posts.bot.chats import Chats
+
+logger = logging.getLogger(__name__)
+
+
+EPOCH = datetime(1970, 1, 1)
+ONE_MS = timedelta(milliseconds=1)
+
+
+class ChatFlags:
+    IS_RUNNING = 1 << 0
+    IS_NEWS_INTERESTED = 1 << 1
+    IS_UPDATE_INTERESTED = 1 << 2
+    IS_EXTERNAL_NEWS_INTERESTED = 1 << 3
+
+
+ALL_FLAGS = (1 << 4) - 1
+
+# Lookup table from a flag bitfield to the decoded booleans
+DECODED_FLAGS = tuple(
+    (flags & ChatFlags.IS_RUNNING != 0,
+     flags & ChatFlags.IS_NEWS_INTERESTED != 0,
+     flags & ChatFlags.IS_UPDATE_INTERESTED != 0,
+     flags & ChatFlags.IS_EXTERNAL_NEWS_INTERESTED != 0)
+    for flags in range(ALL_FLAGS + 1))
+
+
+class ChatSnapshotCodec:
+
+    MAGIC = b"CS2C"
+    VERSION = 2
+
+    # magic, version, record count
+    HEADER = struct.Struct("<4sHQ")
+    # chat_id, chat_id_admin, flags, last_activity (epoch ms)
+    RECORD = struct.Struct("<qqBq")
+
+    # Records decoded per chunk while streaming
+    CHUNK_RECORDS = 4096
+
+    @staticmethod
+    def encode_flags(chat: Chat) -> int:
+        flags = 0
+        if chat.is_running:
+            flags |= ChatFlags.IS_RUNNING
+        if chat.is_news_interested:
+            flags |= ChatFlags.IS_NEWS_INTERESTED
+        if chat.is_update_interested:
+            flags |= ChatFlags.IS_UPDATE_INTERESTED
+        if chat.is_external_news_interested:
+            flags |= ChatFlags.IS_EXTERNAL_NEWS_INTERESTED
+        return flags
+
+    @staticmethod
+    def encode_fields(chat: Chat) -> tuple[int, int, int, int]:
+        return (
+            chat.chat_id,
+            chat.chat_id_admin or 0,
+            ChatSnapshotCodec.encode_flags(chat),
+            (chat.last_activity - EPOCH) // ONE_MS)
+
+    @staticmethod
+    def encode_record(chat: Chat) -> bytes:
+        return ChatSnapshotCodec.RECORD.pack(*ChatSnapshotCodec.encode_fields(chat))
+
+    @staticmethod
+    def decode_record(chat_id: int, chat_id_admin: int, flags: int,
+                      last_activity: int) -> Chat:
+        # Flag tuples are in the same order as the boolean fields of Chat
+        return Chat(
+            chat_id,
+            chat_id_admin,
+            *DECODED_FLAGS[flags & ALL_FLAGS],
+            EPOCH + ONE_MS * last_activity if last_activity else EPOCH)
+
+    @staticmethod
+    def write(fs: BinaryIO, chats: Chats | list[Chat]) -> int:
+        # Iterate over a snapshot, chats may change while saving in a thread
+        chats = chats.chats if isinstance(chats, Chats) else list(chats)
+        return ChatSnapshotCodec.write_records(
+            fs, map(ChatSnapshotCodec.encode_fields, chats), len(chats))
+
+    @staticmethod
+    def write_records(fs: BinaryIO, records: Iterable[tuple[int, int, int, int]], count: int) -> int:
+        fs.write(ChatSnapshotCodec.HEADER.pack(
+            ChatSnapshotCodec.MAGIC, ChatSnapshotCodec.VERSION, count))
+
+        records = iter(records)
+        pack = ChatSnapshotCodec.RECORD.pack
+        step = ChatSnapshotCodec.CHUNK_RECORDS
+        for _ in range(0, count, step):
+            fs.write(b"".join(starmap(pack, islice(records, step))))
+
+        return count
+
+    @staticmethod
+    def read_header(buffer: bytes | memoryview) -> int:
+        if len(buffer) < ChatSnapshotCodec.HEADER.size:
+            raise ValueError('Chat snapshot is truncated (missing header)')
+
+        magic, version, count = ChatSnapshotCodec.HEADER.unpack_from(buffer)
+        if magic != ChatSnapshotCodec.MAGIC:
+            raise ValueError(f'Not a chat snapshot {magic=}')
+        if version != ChatSnapshotCodec.VERSION:
+            raise ValueError(
+                f'Unsupported chat snapshot {version=} (supported: {ChatSnapshotCodec.VERSION})')
+
+        return count
+
+    @staticmethod
+    def iter_records(buffer: bytes | memoryview) -> Iterator[tuple[int, int, int, int]]:
+        count = ChatSnapshotCodec.read_header(buffer)
+        start = ChatSnapshotCodec.HEADER.size
+        end = start + count * ChatSnapshotCodec.RECORD.size
+        if len(buffer) < end:
+            raise ValueError(
+                f'Chat snapshot is truncated expected {count} records')
+
+        # Decode chunk wise so that an mmap is only paged in while iterating
+        view = memoryview(buffer)
+        step = ChatSnapshotCodec.CHUNK_RECORDS * ChatSnapshotCodec.RECORD.size
+        for offset in range(start, end, step):
+            yield from ChatSnapshotCodec.RECORD.iter_unpack(
+                view[offset:min(offset + step, end)])
+
+    @staticmethod
+    def iter_chats(buffer: bytes | memoryview) -> Iterator[Chat]:
+        decode = ChatSnapshotCodec.decode_record
+        for record in ChatSnapshotCodec.iter_records(buffer):
+            yield decode(*record)
+
+    @staticmethod
+    def decode(buffer: bytes | memoryview) -> Chats:
+        decode = ChatSnapshotCodec.decode_record
+        return Chats(chats=[
+            decode(*record) for record in ChatSnapshotCodec.iter_records(buffer)])
@@ -1,111 +1,226 @@
 from __future__ import annotations
 
+import heapq
 import logging
-from datetime import datetime
-from datetime import timedelta
-from zoneinfo import ZoneInfo
+import time
+from collections import OrderedDict
+from collections.abc import Callable
 
 from telegram.constants import ParseMode
 
 from cs2posts.bot import settings
-from cs2posts.bot.chats import Chat
+from cs2posts.metrics import REGISTRY
 
 
 logger = logging.getLogger(__name__)
 
+SPAM_STRIKES = REGISTRY.counter(
+    "cs2posts_spam_strikes_total", "Commands sent without a token left")
+SPAM_BANS = REGISTRY.counter(
+    "cs2posts_spam_bans_total", "Chats banned for spamming")
+SPAM_CHATS = REGISTRY.gauge(
+    "cs2posts_spam_chats", "Chats tracked by the spam protection", ("state",))
+
 
 class SpamProtectorMessages:
 
     @staticmethod
-    def warning(chat: Chat, max_strikes: int) -> str:
-        return f"<b>Spamming</b> bot results in Timeout <b>({chat.strikes}/{max_strikes})</b>."
+    def warning(strikes: int, max_strikes: int) -> str:
+        return f"<b>Spamming</b> bot results in Timeout <b>({strikes}/{max_strikes})</b>."
 
     @staticmethod
-    def banned(chat: Chat, timout: int, max_strikes: int) -> str:
-        return f"<b>Strike ({chat.strikes}/{max_strikes})</b> Chat is now <b>banned</b> for spamming (Timeout: {int(timout / 60)} mins)."
-
-
-class SpamProtector:
-
-    MAX_STRIKES = settings.CHAT_MAX_STRIKES
-    BAN_TIMEOUT = settings.CHAT_BAN_TIMEOUT_SECONDS
-
-    async def check(self, bot, chat: Chat) -> None:
-        if chat is None:
-            return
-
-        logger.info(f'Checking chat {chat.chat_id}')
-
-        if self.is_banned(chat) and self.is_timeouted(chat):
-            logger.info(f'Chat {chat.chat_id} is timeouted')
-            return
-
-        if chat.is_banned:
-            self.unban(chat)
-
-        if self.is_spamming(chat):
-            await self.strike(bot, chat)
-
-        logger.info(f'Chat {chat.chat_id} is not spamming')
+    def banned(strikes: int, timout: int, max_strikes: int) -> str:
+        return f"<b>Strike ({strikes}/{max_strikes})</b> Chat is now <b>banned</b> for spamming (Timeout: {int(timout / 60)} mins)."
 
-        self.update_chat_activity(chat)
 
-    def _get_utc_now(self) -> datetime:
-        return datetime.now(tz=ZoneInfo('UTC')).replace(tzinfo=None)
+class SpamState:
+    # Token bucket and strikes of a single chat, times are time.monotonic()
+    # seconds.
 
-    def update_chat_activity(self, chat: Chat) -> None:
-        logger.info(f'Updated chat activity for {chat.chat_id}')
-        chat.last_activity = self._get_utc_now()
+    __slots__ = ("tokens", "updated", "strikes", "struck")
 
-    def reduce_strike_level(self, chat: Chat) -> None:
-        logger.info(f'Reduce strike level for {chat.chat_id}')
-        if chat.strikes > 0:
-            chat.strikes -= 1
+    def __init__(self, tokens: float, now: float) -> None:
+        self.tokens = tokens
+        self.updated = now
+        self.strikes = 0
+        self.struck = 0.0
 
-    def increase_strike_level(self, chat: Chat) -> None:
-        logger.info(f'Increase strike level for {chat.chat_id}')
-        if chat.strikes < self.MAX_STRIKES:
-            chat.strikes += 1
 
-    def is_spamming(self, chat: Chat) -> bool:
-        time_diff = self._get_utc_now() - chat.last_activity
-        limit = timedelta(milliseconds=settings.CHAT_SPAM_INTERVAL_MS)
-        return time_diff <= limit
-
-    def ban(self, chat: Chat) -> None:
-        logger.info(f'Ban chat {chat.chat_id}')
-        chat.is_banned = True
-
-    def unban(self, chat: Chat) -> None:
-        logger.info(f'Unban chat {chat.chat_id}')
-        chat.is_banned = False
-
-    def is_banned(self, chat: Chat) -> bool:
-        return chat.is_banned
-
-    def is_timeouted(self, chat: Chat) -> bool:
-        time_diff = self._get_utc_now() - chat.last_activity
-        return time_diff.seconds < self.BAN_TIMEOUT
-
-    async def strike(self, bot, chat: Chat) -> None:
-        if chat.is_banned:
-            logger.info(f'Chat {chat.chat_id} is already banned')
-            return
-
-        logger.info(f'Strike for {chat.chat_id}')
-
-        self.increase_strike_level(chat)
-
-        if chat.strikes == self.MAX_STRIKES:
-            self.ban(chat)
-            await bot.send_message(
-                chat_id=chat.chat_id,
-                text=SpamProtectorMessages.banned(
-                    chat, self.BAN_TIMEOUT, self.MAX_STRIKES),
-                parse_mode=ParseMode.HTML)
-            return
-
-        await bot.send_message(
-            chat_id=chat.chat_id,
-            text=SpamProtectorMessages.warning(chat, self.MAX_STRIKES),
-            parse_mode=ParseMode.HTML)
+class SpamProtector:
+    # Rate limits commands per chat_id with a token bucket of burst commands
+    # refilled at rate commands per second. Every command without a token is
+    # a strike, max_strikes strikes ban the chat for ban_timeout seconds.
+    # Strikes are forgiven strike_timeout seconds after the last one (0 keeps
+    # them, so the first spam after a ban bans again).
+    #
+    # The state is kept in memory only and never touches the persisted Chat.
+    # Buckets are kept in least recently used order and evicted once idle for
+    # idle_timeout seconds or when more than max_chats chats are tracked, an
+    # evicted chat simply starts over with a full bucket. Bans are kept apart,
+    # so they can not be evicted, and are lifted by expire() from a heap of
+    # deadlines, as are forgiven strikes.
+
+    def __init__(self, rate: float | None = None, burst: float | None = None,
+                 max_strikes: int | None = None, ban_timeout: float | None = None,
+                 strike_timeout: float | None = None,
+                 max_chats: int | None = None, idle_timeout: float | None = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        if rate is None:
+            rate = 1000 / settings.CHAT_SPAM_INTERVAL_MS
+        if burst is None:
+            burst = settings.CHAT_SPAM_BURST
+        if max_strikes is None:
+            max_strikes = settings.CHAT_MAX_STRIKES
+        if ban_timeout is None:
+            ban_timeout = settings.CHAT_BAN_TIMEOUT_SECONDS
+        if strike_timeout is None:
+            strike_timeout = settings.CHAT_STRIKE_TIMEOUT_SECONDS
+        if max_chats is None:
+            max_chats = settings.CHAT_SPAM_MAX_CHATS
+        if idle_timeout is None:
+            idle_timeout = settings.CHAT_SPAM_IDLE_TIMEOUT_SECONDS
+
+        if rate <= 0 or burst < 1 or max_strikes < 1 or max_chats < 1:
+            raise ValueError(f'Invalid spam protection {rate=} {burst=} '
+                             f'{max_strikes=} {max_chats=}')
+
+        self.__rate = rate
+        self.__burst = burst
+        self.__max_strikes = max_strikes
+        self.__ban_timeout = ban_timeout
+        self.__strike_timeout = strike_timeout
+        self.__max_chats = max_chats
+        self.__idle_timeout = idle_timeout
+        self.__clock = clock
+        self.__states: OrderedDict[int, SpamState] = OrderedDict()
+        # chat_id -> end of the ban
+        self.__bans: dict[int, float] = {}
+        # (deadline, chat_id) of bans to lift and strikes to forgive. Entries
+        # are not removed when a deadline moves, expire() skips stale ones.
+        self.__deadlines: list[tuple[float, int]] = []
+        SPAM_CHATS.set_function(self.__metrics)
+
+    @property
+    def max_strikes(self) -> int:
+        return self.__max_strikes
+
+    @property
+    def ban_timeout(self) -> float:
+        return self.__ban_timeout
+
+    def get(self, chat_id: int) -> SpamState | None:
+        return self.__states.get(chat_id)
+
+    def is_banned(self, chat_id: int) -> bool:
+        until = self.__bans.get(chat_id)
+        return until is not None and until > self.__clock()
+
+    def strikes(self, chat_id: int) -> int:
+        state = self.__states.get(chat_id)
+        return state.strikes if state is not None else 0
+
+    def consume(self, chat_id: int, now: float) -> SpamState | None:
+        # Takes a token, returns the state of the chat if it has none left
+        states = self.__states
+        state = states.get(chat_id)
+        if state is None:
+            states[chat_id] = SpamState(self.__burst - 1, now)
+            if len(states) > self.__max_chats:
+                states.popitem(last=False)
+            return None
+
+        states.move_to_end(chat_id)
+        tokens = state.tokens + (now - state.updated) * self.__rate
+        if tokens > self.__burst:
+            tokens = self.__burst
+        state.updated = now
+        if tokens >= 1:
+            state.tokens = tokens - 1
+            return None
+        state.tokens = tokens
+        return state
+
+    def __metrics(self) -> dict[tuple[str, ...], float]:
+        return {("tracked",): len(self.__states), ("banned",): len(self.__bans)}
+
+    def ban(self, chat_id: int, now: float | None = None) -> None:
+        logger.info(f'Ban chat {chat_id}')
+        SPAM_BANS.inc()
+        if now is None:
+            now = self.__clock()
+        until = now + self.__ban_timeout
+        self.__bans[chat_id] = until
+        heapq.heappush(self.__deadlines, (until, chat_id))
+
+    def unban(self, chat_id: int) -> None:
+        logger.info(f'Unban chat {chat_id}')
+        self.__bans.pop(chat_id, None)
+
+    def remove(self, chat_id: int) -> None:
+        self.__states.pop(chat_id, None)
+        self.__bans.pop(chat_id, None)
+
+    def expire(self, now: float | None = None) -> int:
+        # Lifts ended bans, forgives strikes and evicts idle chats. Returns
+        # the number of evicted chats.
+        if now is None:
+            now = self.__clock()
+
+        deadlines = self.__deadlines
+        while deadlines and deadlines[0][0] <= now:
+            _, chat_id = heapq.heappop(deadlines)
+            until = self.__bans.get(chat_id)
+            if until is not None and until <= now:
+                self.unban(chat_id)
+            state = self.__states.get(chat_id)
+            if state is not None and self.__strike_timeout and \
+                    state.struck + self.__strike_timeout <= now:
+                state.strikes = 0
+
+        evicted = 0
+        states = self.__states
+        idle = now - self.__idle_timeout
+        while states:
+            chat_id = next(iter(states))
+            if states[chat_id].updated > idle:
+                break
+            del states[chat_id]
+            evicted += 1
+        return evicted
+
+    async def check(self, bot, chat_id: int) -> bool:
+        # Returns whether the command of the chat may run. The decision is
+        # made before the first await, updates of other chats handled
+        # concurrently can not interleave with it.
+        now = self.__clock()
+        self.expire(now)
+        if chat_id in self.__bans:
+            return False
+
+        state = self.consume(chat_id, now)
+        if state is None:
+            return True
+
+        text = self.record_strike(chat_id, state, now)
+        allowed = chat_id not in self.__bans
+        await bot.send_message(chat_id=chat_id, text=text, parse_mode=ParseMode.HTML)
+        return allowed
+
+    def record_strike(self, chat_id: int, state: SpamState, now: float) -> str:
+        # Counts a strike, bans the chat on the last one and returns the
+        # message telling the chat about it
+        logger.info(f'Strike for {chat_id}')
+        SPAM_STRIKES.inc()
+        state.strikes = min(state.strikes + 1, self.__max_strikes)
+        state.struck = now
+        if self.__strike_timeout:
+            heapq.heappush(self.__deadlines, (now + self.__strike_timeout, chat_id))
+
+        if state.strikes == self.__max_strikes:
+            self.ban(chat_id, now)
+            return SpamProtectorMessages.banned(
+                state.strikes, self.__ban_timeout, self.__max_strikes)
+        return SpamProtectorMessages.warning(state.strikes, self.__max_strikes)
+
+    def __len__(self) -> int:
+        return len(self.__states)
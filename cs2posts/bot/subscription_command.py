@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import logging
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from cs2posts.bot.chats import Chats
+from cs2posts.bot.spam import SpamProtector
+from cs2posts.bot.subscriptions import Subscriptions
+from cs2posts.store import AsyncStore
+
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriptionCommand:
+    # Commands managing the subscriptions of a chat, e.g. /watch or /topics.
+    # Only the admin of a chat can change them and the commands are spam
+    # protected.
+
+    def __init__(self) -> None:
+        self.__chats = None
+        self.__subscriptions = None
+        self.__store = None
+        self.__spam_protector = None
+
+    @property
+    def chats(self) -> Chats:
+        return self.__chats
+
+    @property
+    def subscriptions(self) -> Subscriptions:
+        return self.__subscriptions
+
+    @property
+    def store(self) -> AsyncStore:
+        return self.__store
+
+    @property
+    def spam_protector(self) -> SpamProtector:
+        return self.__spam_protector
+
+    def set_chats(self, chats: Chats) -> None:
+        self.__chats = chats
+
+    def set_subscriptions(self, subscriptions: Subscriptions) -> None:
+        self.__subscriptions = subscriptions
+
+    def set_store(self, store: AsyncStore | None) -> None:
+        self.__store = store
+
+    def set_spam_protector(self, spam_protector: SpamProtector) -> None:
+        self.__spam_protector = spam_protector
+
+    async def save(self) -> None:
+        if self.__store is not None:
+            await self.__store.save(self.subscriptions)
+
+    def is_admin(self, update: Update) -> bool:
+        chat = self.chats.get(update.message.chat_id)
+        if chat is None:
+            return False
+        return chat.chat_id_admin == update.message.from_user.id
+
+    async def is_allowed(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+        if not await self.spam_protector.check(context.bot, update.message.chat_id):
+            return False
+        return self.is_admin(update)
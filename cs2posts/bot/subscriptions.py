@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+
+from cs2posts.bot.chats import Chat
+from cs2posts.bot.chats import Chats
+from cs2posts.topics import normalize_topic
+from cs2posts.topics import TOPIC_EXTERNAL
+from cs2posts.topics import TOPIC_NEWS
+from cs2posts.topics import TOPIC_UPDATE
+
+logger = logging.getLogger(__name__)
+
+# Topics enabled per chat in /options, their audiences are indexed by Chats
+OPTION_AUDIENCES = {
+    TOPIC_NEWS: "running_news",
+    TOPIC_UPDATE: "running_updates",
+    TOPIC_EXTERNAL: "running_external_news",
+}
+
+# update+major only matches posts of both topics
+TOPIC_INTERSECTION = "+"
+
+
+class Subscriptions:
+    # Inverted index between chats and the keys (keywords, topics, ...) they
+    # subscribe to. Subclasses normalize keys and can hook into the first
+    # subscription and the last unsubscription of a key.
+
+    def __init__(self) -> None:
+        self.__keys_by_chat: dict[int, set[str]] = {}
+        self.__chats_by_key: dict[str, set[int]] = {}
+
+    @classmethod
+    def from_json(cls, data: dict[str, list[str]]) -> Subscriptions:
+        subscriptions = cls()
+        for chat_id, keys in data.items():
+            for key in keys:
+                subscriptions.subscribe(int(chat_id), key)
+        return subscriptions
+
+    def to_json(self) -> dict[str, list[str]]:
+        return {str(chat_id): sorted(keys)
+                for chat_id, keys in self.__keys_by_chat.items()}
+
+    def normalize(self, key: str) -> str:
+        return key
+
+    def _key_added(self, key: str) -> None:
+        pass
+
+    def _key_removed(self, key: str) -> None:
+        pass
+
+    @property
+    def keys(self) -> list[str]:
+        return sorted(self.__chats_by_key)
+
+    def get(self, chat_id: int) -> list[str]:
+        return sorted(self.__keys_by_chat.get(chat_id, ()))
+
+    def is_subscribed(self, chat_id: int) -> bool:
+        return chat_id in self.__keys_by_chat
+
+    def subscribers(self, key: str) -> set[int]:
+        return set(self.__chats_by_key.get(self.normalize(key), ()))
+
+    def resolve(self, keys: Iterable[str]) -> set[int]:
+        # Chat ids subscribed to at least one of the (normalized) keys
+        chats_by_key = self.__chats_by_key
+        chat_ids = set()
+        for key in keys:
+            subscribers = chats_by_key.get(key)
+            if subscribers:
+                chat_ids |= subscribers
+        return chat_ids
+
+    def subscribe(self, chat_id: int, key: str) -> str:
+        key = self.normalize(key)
+        if not key:
+            raise ValueError('Subscription key must not be empty!')
+
+        self.__keys_by_chat.setdefault(chat_id, set()).add(key)
+
+        chat_ids = self.__chats_by_key.get(key)
+        if chat_ids is None:
+            chat_ids = self.__chats_by_key[key] = set()
+            self._key_added(key)
+        chat_ids.add(chat_id)
+
+        return key
+
+    def unsubscribe(self, chat_id: int, key: str) -> None:
+        key = self.normalize(key)
+
+        keys = self.__keys_by_chat.get(chat_id)
+        if keys is None or key not in keys:
+            return
+
+        keys.discard(key)
+        if not keys:
+            del self.__keys_by_chat[chat_id]
+
+        chat_ids = self.__chats_by_key[key]
+        chat_ids.discard(chat_id)
+        if not chat_ids:
+            del self.__chats_by_key[key]
+            self._key_removed(key)
+
+    def remove_chat(self, chat_id: int) -> None:
+        for key in self.get(chat_id):
+            self.unsubscribe(chat_id, key)
+
+    def migrate(self, chat_id: int, new_chat_id: int) -> None:
+        for key in self.get(chat_id):
+            self.unsubscribe(chat_id, key)
+            self.subscribe(new_chat_id, key)
+
+    def __len__(self) -> int:
+        return len(self.__keys_by_chat)
+
+
+class TopicSubscriptions(Subscriptions):
+    # A subscription can be an intersection of topics, it is kept in the
+    # index under its normalized key and matched by checking its parts.
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.__intersections: dict[str, frozenset[str]] = {}
+
+    def normalize(self, topic: str) -> str:
+        topics = {normalize_topic(part) for part in topic.split(TOPIC_INTERSECTION)}
+        topics.discard("")
+        return TOPIC_INTERSECTION.join(sorted(topics))
+
+    def _key_added(self, key: str) -> None:
+        if TOPIC_INTERSECTION in key:
+            self.__intersections[key] = frozenset(key.split(TOPIC_INTERSECTION))
+
+    def _key_removed(self, key: str) -> None:
+        self.__intersections.pop(key, None)
+
+    def resolve(self, topics: Iterable[str]) -> set[int]:
+        # Chat ids subscribed to one of the topics or to an intersection of
+        # some of them
+        topics = frozenset(topics)
+        chat_ids = super().resolve(topics)
+        matched = [key for key, parts in self.__intersections.items() if parts <= topics]
+        if matched:
+            chat_ids |= super().resolve(matched)
+        return chat_ids
+
+    def audience(self, chats: Chats, topics: Iterable[str]) -> list[Chat]:
+        # Union of the /options audiences of the post topics and the running
+        # chats subscribed to them
+        topics = frozenset(topics)
+        audience: dict[int, Chat] = {}
+        for topic, name in OPTION_AUDIENCES.items():
+            if topic in topics:
+                for chat in chats.get_audience(name):
+                    audience.setdefault(chat.chat_id, chat)
+
+        subscribed = self.resolve(topics)
+        subscribed.difference_update(audience)
+        for chat_id in sorted(subscribed):
+            chat = chats.get(chat_id)
+            if chat is not None and chat.is_running:
+                audience[chat_id] = chat
+        return list(audience.values())
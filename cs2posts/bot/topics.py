@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import html
+import logging
+
+from telegram import Update
+from telegram.constants import ParseMode
+from telegram.ext import Application
+from telegram.ext import CommandHandler
+from telegram.ext import ContextTypes
+
+from cs2posts.bot import settings
+from cs2posts.bot.subscription_command import SubscriptionCommand
+from cs2posts.bot.subscriptions import TOPIC_INTERSECTION
+from cs2posts.topics import TOPIC_EXTERNAL
+from cs2posts.topics import TOPIC_FEED_PREFIX
+from cs2posts.topics import TOPIC_NEWS
+from cs2posts.topics import TOPIC_TAG_PREFIX
+from cs2posts.topics import TOPIC_UPDATE
+from cs2posts.topics import TopicClassifier
+
+
+logger = logging.getLogger(__name__)
+
+
+class TopicsMessageFactory:
+
+    @staticmethod
+    def create_text(topics: list[str], classifier: TopicClassifier) -> str:
+        available = [TOPIC_UPDATE, TOPIC_NEWS, TOPIC_EXTERNAL, *classifier.title_topics]
+        available_text = ", ".join(available)
+
+        if topics:
+            subscribed = "\n".join(f"- {html.escape(topic)}" for topic in topics)
+        else:
+            subscribed = "No topics subscribed."
+
+        return ("<b>Topics</b>\n\n"
+                f"{subscribed}\n\n"
+                "Posts of subscribed topics are sent in addition to the ones enabled in /options.\n\n"
+                f"Available topics: {available_text}, "
+                f"{TOPIC_TAG_PREFIX}&lt;steam tag&gt;, {TOPIC_FEED_PREFIX}&lt;feed name&gt;\n"
+                f"Join topics with {TOPIC_INTERSECTION} to only get posts of all of them, "
+                f"e.g. {TOPIC_UPDATE}{TOPIC_INTERSECTION}major\n"
+                "Use /topics add topic1, topic2 or /topics remove topic1")
+
+
+class Topics(SubscriptionCommand):
+
+    def __init__(self, app: Application, classifier: TopicClassifier) -> None:
+        super().__init__()
+        self.__classifier = classifier
+
+        app.add_handler(CommandHandler("topics", self.topics))
+
+    def parse_topics(self, args: list[str]) -> list[str]:
+        topics = (self.subscriptions.normalize(topic)
+                  for topic in " ".join(args).split(","))
+        return [topic for topic in topics if topic]
+
+    async def topics(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        if not await self.is_allowed(update, context):
+            return
+
+        chat_id = update.message.chat_id
+        args = context.args or []
+        action = args[0].casefold() if args else None
+        topics = self.parse_topics(args[1:])
+
+        if action == "add" and topics:
+            subscribed = set(self.subscriptions.get(chat_id))
+            if len(subscribed | set(topics)) > settings.TOPICS_MAX_SUBSCRIPTIONS:
+                await update.message.reply_text(
+                    f'You can subscribe to at most {settings.TOPICS_MAX_SUBSCRIPTIONS} topics!')
+                return
+
+            logger.info(f'Chat {chat_id=} subscribes to {topics=} ...')
+            for topic in topics:
+                self.subscriptions.subscribe(chat_id, topic)
+            await self.save()
+
+        elif action == "remove" and topics:
+            logger.info(f'Chat {chat_id=} unsubscribes from {topics=} ...')
+            for topic in topics:
+                self.subscriptions.unsubscribe(chat_id, topic)
+            await self.save()
+
+        text = TopicsMessageFactory.create_text(
+            self.subscriptions.get(chat_id), self.__classifier)
+        await update.message.reply_text(text=text, parse_mode=ParseMode.HTML)
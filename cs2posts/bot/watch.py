@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import html
+import logging
+
+from telegram import Update
+from telegram.constants import ParseMode
+from telegram.ext import Application
+from telegram.ext import CommandHandler
+from telegram.ext import ContextTypes
+
+from cs2posts.bot import settings
+from cs2posts.bot.keywords import normalize_keyword
+from cs2posts.bot.subscription_command import SubscriptionCommand
+
+
+logger = logging.getLogger(__name__)
+
+
+class WatchMessageFactory:
+
+    @staticmethod
+    def create_text(keywords: list[str]) -> str:
+        if not keywords:
+            return ("<b>Watched keywords</b>\n\n"
+                    "No keywords watched, every post is sent to this chat.\n\n"
+                    "Use /watch keyword1, keyword2 to only receive posts "
+                    "mentioning one of the keywords.")
+
+        watched = "\n".join(f"- {html.escape(keyword)}" for keyword in keywords)
+        return ("<b>Watched keywords</b>\n\n"
+                f"{watched}\n\n"
+                "Only posts mentioning one of the keywords are sent to this chat.\n"
+                "Use /unwatch keyword to remove a keyword or /unwatch to remove all.")
+
+
+class Watch(SubscriptionCommand):
+
+    def __init__(self, app: Application) -> None:
+        super().__init__()
+
+        app.add_handler(CommandHandler("watch", self.watch))
+        app.add_handler(CommandHandler("unwatch", self.unwatch))
+
+    @staticmethod
+    def parse_keywords(args: list[str]) -> list[str]:
+        # "/watch major, anti cheat" -> ["major", "anti cheat"]
+        keywords = (normalize_keyword(keyword)
+                    for keyword in " ".join(args).split(","))
+        return [keyword for keyword in keywords if keyword]
+
+    async def watch(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        if not await self.is_allowed(update, context):
+            return
+
+        chat_id = update.message.chat_id
+        keywords = self.parse_keywords(context.args or [])
+
+        too_long = [keyword for keyword in keywords
+                    if len(keyword) > settings.WATCH_MAX_KEYWORD_LENGTH]
+        if too_long:
+            await update.message.reply_text(
+                f'Keywords must not be longer than {settings.WATCH_MAX_KEYWORD_LENGTH} characters!')
+            return
+
+        watched = set(self.subscriptions.get(chat_id))
+        if len(watched | set(keywords)) > settings.WATCH_MAX_KEYWORDS:
+            await update.message.reply_text(
+                f'You can watch at most {settings.WATCH_MAX_KEYWORDS} keywords!')
+            return
+
+        if keywords:
+            logger.info(f'Chat {chat_id=} watches {keywords=} ...')
+            for keyword in keywords:
+                self.subscriptions.subscribe(chat_id, keyword)
+            await self.save()
+
+        text = WatchMessageFactory.create_text(self.subscriptions.get(chat_id))
+        await update.message.reply_text(text=text, parse_mode=ParseMode.HTML)
+
+    async def unwatch(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        if not await self.is_allowed(update, context):
+            return
+
+        chat_id = update.message.chat_id
+        keywords = self.parse_keywords(context.args or [])
+
+        logger.info(f'Chat {chat_id=} unwatches {keywords=} ...')
+        if keywords:
+            for keyword in keywords:
+                self.subscriptions.unsubscribe(chat_id, keyword)
+        else:
+            self.subscriptions.remove_chat(chat_id)
+        await self.save()
+
+        text = WatchMessageFactory.create_text(self.subscriptions.get(chat_id))
+        await update.message.reply_text(text=text, parse_mode=ParseMode.HTML)
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import asyncio
+import hmac
+import json
+import logging
+import secrets
+import time
+from typing import Any
+
+from telegram import Update
+from telegram.ext import Application
+
+from cs2posts.metrics import CONTENT_TYPE
+from cs2posts.metrics import REGISTRY
+from cs2posts.metrics import Registry
+
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_UPDATES = REGISTRY.counter(
+    "cs2posts_webhook_updates_total", "Updates pushed to the webhook",
+    ("result",))
+
+
+SECRET_TOKEN_HEADER = "x-telegram-bot-api-secret-token"
+
+HEALTH_PATH = "/health"
+
+METRICS_PATH = "/metrics"
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+}
+
+
+class WebhookServer:
+    # Minimal asyncio HTTP/1.1 server receiving updates from Telegram. A POST
+    # to /url_path with the secret token header is put on the update queue of
+    # the application. Without a secret token a random one is created, it is
+    # registered with setWebhook. GET /health reports whether the bot is
+    # alive. Without a url_path the server is a private status server
+    # instead, it also renders the metrics registry on GET /metrics. The
+    # public webhook never serves the metrics.
+    #
+    # A request has to arrive within the timeout, an idle kept alive
+    # connection is closed after the idle timeout.
+
+    def __init__(self, app: Application, listen: str = "127.0.0.1", port: int = 0,
+                 url_path: str | None = "telegram", secret_token: str | None = None,
+                 max_body_size: int = 1 << 20, registry: Registry = REGISTRY,
+                 timeout: float = 10.0, idle_timeout: float = 60.0) -> None:
+        self.__app = app
+        self.__listen = listen
+        self.__port = port
+        self.__url_path = "/" + url_path.strip("/") if url_path is not None else None
+        self.__registry = registry
+        self.__secret_token = secret_token or secrets.token_urlsafe(32)
+        self.__max_body_size = max_body_size
+        self.__timeout = timeout
+        self.__idle_timeout = idle_timeout
+        self.__server: asyncio.Server | None = None
+        # Handlers of open connections, closed on stop
+        self.__connections: set[asyncio.Task] = set()
+        self.__started = 0.0
+        self.__received = 0
+        self.__rejected = 0
+
+    @property
+    def port(self) -> int:
+        if self.__server is None:
+            return self.__port
+        return self.__server.sockets[0].getsockname()[1]
+
+    @property
+    def url(self) -> str:
+        # Local url of the webhook, Telegram usually reaches it via a proxy
+        return f"http://{self.__listen}:{self.port}{self.__url_path or ''}"
+
+    @property
+    def secret_token(self) -> str:
+        return self.__secret_token
+
+    @property
+    def received(self) -> int:
+        return self.__received
+
+    @property
+    def rejected(self) -> int:
+        return self.__rejected
+
+    async def start(self) -> None:
+        self.__server = await asyncio.start_server(
+            self.__handle, self.__listen, self.__port)
+        self.__started = time.monotonic()
+        if self.__url_path is None:
+            logger.info(f'Serving {HEALTH_PATH} and {METRICS_PATH} on {self.url}')
+        else:
+            logger.info(f'Listening for webhook updates on {self.url}, '
+                        f'serving {HEALTH_PATH}')
+
+    def __reject(self) -> None:
+        self.__rejected += 1
+        WEBHOOK_UPDATES.labels("rejected").inc()
+
+    async def stop(self) -> None:
+        if self.__server is None:
+            return
+        self.__server.close()
+        for connection in self.__connections:
+            connection.cancel()
+        await asyncio.gather(*self.__connections, return_exceptions=True)
+        await self.__server.wait_closed()
+        self.__server = None
+
+    def health(self) -> dict[str, Any]:
+        return {
+            "status": "ok",
+            "uptime": round(time.monotonic() - self.__started, 3),
+            "pending": self.__app.update_queue.qsize(),
+        }
+
+    async def __handle(self, reader: asyncio.StreamReader,
+                       writer: asyncio.StreamWriter) -> None:
+        # Connections are kept alive, Telegram reuses them for the next update
+        connection = asyncio.current_task()
+        self.__connections.add(connection)
+        try:
+            timeout = self.__timeout
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        asyncio.TimeoutError):
+                    return
+                timeout = self.__idle_timeout
+
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, path, version = request_line.split(" ", 2)
+                except ValueError:
+                    await self.__respond(writer, 400, close=True)
+                    return
+
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.__respond(writer, 400, close=True)
+                    return
+                if length > self.__max_body_size:
+                    await self.__respond(writer, 413, close=True)
+                    return
+                try:
+                    body = await asyncio.wait_for(
+                        reader.readexactly(length), self.__timeout) if length else b""
+                except asyncio.TimeoutError:
+                    return
+
+                close = version == "HTTP/1.0" or headers.get("connection", "").lower() == "close"
+                status, response = await self.__route(method, path, headers, body)
+                await self.__respond(writer, status, response, close)
+                if close:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            return
+        finally:
+            self.__connections.discard(connection)
+            writer.close()
+
+    async def __route(self, method: str, path: str, headers: dict[str, str],
+                      body: bytes) -> tuple[int, dict[str, Any] | str | None]:
+        path = path.split("?", 1)[0]
+        if path == HEALTH_PATH:
+            if method != "GET":
+                return 405, None
+            return 200, self.health()
+
+        if self.__url_path is None:
+            if path == METRICS_PATH:
+                if method != "GET":
+                    return 405, None
+                return 200, self.__registry.render()
+
+            return 404, None
+
+        if path != self.__url_path:
+            return 404, None
+        if method != "POST":
+            return 405, None
+
+        token = headers.get(SECRET_TOKEN_HEADER, "")
+        if not hmac.compare_digest(token.encode(), self.__secret_token.encode()):
+            self.__reject()
+            logger.warning('Rejected webhook update with an invalid secret token')
+            return 403, None
+
+        try:
+            data = json.loads(body)
+            # de_json returns None for null or an empty object
+            if not isinstance(data, dict):
+                raise ValueError(f'Expected an object, got {type(data).__name__}')
+            update = Update.de_json(data, self.__app.bot)
+            if update is None:
+                raise ValueError('Empty update')
+        except (ValueError, TypeError, KeyError) as e:
+            self.__reject()
+            logger.error(f'Could not parse webhook update: {e}')
+            return 400, None
+
+        self.__received += 1
+        WEBHOOK_UPDATES.labels("received").inc()
+        await self.__app.update_queue.put(update)
+        return 200, None
+
+    @staticmethod
+    async def __respond(writer: asyncio.StreamWriter, status: int,
+                        response: dict[str, Any] | str | None = None,
+                        close: bool = False) -> None:
+        # Text is the metrics exposition, anything else is sent as JSON
+        if isinstance(response, str):
+            body = response.encode()
+            content_type = CONTENT_TYPE
+        else:
+            body = json.dumps(response).encode() if response is not None else b""
+            content_type = "application/json"
+        head = [f"HTTP/1.1 {status} {REASONS[status]}",
+                f"Content-Length: {len(body)}"]
+        if response is not None:
+            head.append(f"Content-Type: {content_type}")
+        if close:
+            head.append("Connection: close")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
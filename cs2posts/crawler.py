@@ -2,15 +2,28 @@ from __future__ import annotations
 
 import json
 import logging
+import time
 from typing import Any
 
 import requests
 
+from cs2posts.metrics import REGISTRY
+from cs2posts.tracing import span
+
 logger = logging.getLogger(__name__)
 
+CRAWL_SECONDS = REGISTRY.histogram(
+    "cs2posts_crawl_seconds", "Duration of Steam News API requests")
+CRAWL_BYTES = REGISTRY.counter(
+    "cs2posts_crawl_bytes_total", "Bytes received from the Steam News API")
+CRAWL_ERRORS = REGISTRY.counter(
+    "cs2posts_crawl_errors_total", "Failed Steam News API requests")
+
 
 CRAWLER_REQUEST_TIMEOUT = 3
 
+STEAM_NEWS_API_URL = "https://api.steampowered.com/ISteamNews/GetNewsForApp/v0002/"
+
 
 class WebCrawler:
     pass
@@ -22,11 +35,11 @@ class SteamAPICrawler(WebCrawler):
 
 class CounterStrike2Crawler(SteamAPICrawler):
 
-    def __init__(self) -> None:
+    def __init__(self, api_url: str = STEAM_NEWS_API_URL) -> None:
         super().__init__()
         # https://developer.valvesoftware.com/wiki/Steam_Web_API
         # maxlength=0 to get whole content
-        self.url = "https://api.steampowered.com/ISteamNews/GetNewsForApp/v0002/" \
+        self.url = api_url + \
             "?appid=730" \
             "&count=%s" \
             "&maxlength=0"
@@ -34,22 +47,39 @@ class CounterStrike2Crawler(SteamAPICrawler):
     def _validate_args(self, **kwargs: dict[str, Any]) -> None:
         if "count" in kwargs and kwargs["count"] < 0:
             raise ValueError('Count must be greater than 0!')
+        if kwargs.get("enddate") is not None and kwargs["enddate"] < 0:
+            raise ValueError('Enddate must be greater than 0!')
 
-    def crawl(self, *, count: int | None = None) -> dict[str, Any]:
+    def crawl(self, *, count: int | None = None,
+              enddate: int | None = None) -> dict[str, Any]:
+        # enddate is the unix time of the newest post to return (inclusive),
+        # it is the cursor to walk back through the history.
         if count is None:
             count = 100
 
-        self._validate_args(count=count)
-
-        try:
-            response = requests.get(
-                self.url % count, timeout=CRAWLER_REQUEST_TIMEOUT)
-        except Exception as e:
-            logger.error(f'Could not fetch data due to {e}')
-            raise
-
-        if not response.ok:
-            raise Exception(
-                f'Could not fetch data received response code={response.status_code}')
-
-        return json.loads(response.text)
+        self._validate_args(count=count, enddate=enddate)
+
+        url = self.url % count
+        if enddate is not None:
+            url += f"&enddate={enddate}"
+
+        with span("crawl", count=count, enddate=enddate) as current:
+            start = time.perf_counter()
+            try:
+                response = requests.get(url, timeout=CRAWLER_REQUEST_TIMEOUT)
+            except Exception as e:
+                CRAWL_ERRORS.inc()
+                logger.error(f'Could not fetch data due to {e}')
+                raise
+            finally:
+                CRAWL_SECONDS.observe(time.perf_counter() - start)
+
+            CRAWL_BYTES.inc(len(response.content))
+            current.set_attribute("status_code", response.status_code)
+            current.set_attribute("bytes", len(response.content))
+            if not response.ok:
+                CRAWL_ERRORS.inc()
+                raise Exception(
+                    f'Could not fetch data received response code={response.status_code}')
+
+            return json.loads(response.text)
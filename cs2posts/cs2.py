@@ -1,22 +1,35 @@
 from __future__ import annotations
 
+import heapq
 import logging
+import time
+from collections.abc import Iterable
+from operator import attrgetter
 from typing import Any
 
+from cs2posts.metrics import REGISTRY
 from cs2posts.post import FeedType
 from cs2posts.post import Post
+from cs2posts.tracing import span
 
 
 logger = logging.getLogger(__name__)
 
 
+DATE_KEY = attrgetter("date")
+
+PARSE_SECONDS = REGISTRY.histogram(
+    "cs2posts_parse_seconds", "Time to parse a crawled newsitem into a post",
+    ("kind",))
+
+
 class CounterStrike2Posts:
 
     INITIAL_EPOCH_TIME_CS2 = 1679503828
 
     def __init__(self, posts: dict[str, Any]) -> None:
 
-        self.__posts = []
+        self.__set_posts([])
 
         if posts is None or posts == {}:
             return
@@ -31,40 +44,97 @@ class CounterStrike2Posts:
 
         posts = posts['newsitems']
 
-        for post in posts:
-            feed_type = FeedType(post['feed_type'])
-            if feed_type not in [FeedType.INTERN, FeedType.EXTERN]:
-                logger.info(
-                    f"Ignoring feed: {post['gid']}"
-                    f" with headline: {post['title']}"
-                    f" and url: {post['url']}"
-                    f" {feed_type=}")
-                continue
-
-            self.__posts.append(Post(**post))
+        with span("parse", newsitems=len(posts)) as current:
+            parsed = []
+            for post in posts:
+                start = time.perf_counter()
+                feed_type = FeedType(post['feed_type'])
+                if feed_type not in [FeedType.INTERN, FeedType.EXTERN]:
+                    logger.info(
+                        f"Ignoring feed: {post['gid']}"
+                        f" with headline: {post['title']}"
+                        f" and url: {post['url']}"
+                        f" {feed_type=}")
+                    continue
+
+                parsed_post = Post(**post)
+                PARSE_SECONDS.labels(parsed_post.kind.value).observe(
+                    time.perf_counter() - start)
+                parsed.append(parsed_post)
+
+            self.__set_posts(parsed)
+            current.set_attribute("posts", len(parsed))
 
     @classmethod
     def create(cls, posts: dict[str, Any]) -> CounterStrike2Posts:
         return cls(posts)
 
+    @classmethod
+    def from_posts(cls, posts: Iterable[Post]) -> CounterStrike2Posts:
+        instance = cls(None)
+        instance.__set_posts(list(posts))
+        return instance
+
+    def __set_posts(self, posts: list[Post]) -> None:
+        # Newest first, the crawler already returns the posts in that order
+        # so the (stable) sort is linear in the common case.
+        posts.sort(key=DATE_KEY, reverse=True)
+        self.__posts = posts
+
+        # Partition once, a post can be an update and external at once
+        news, updates, external = [], [], []
+        cutoff = self.INITIAL_EPOCH_TIME_CS2
+        for post in posts:
+            if post.date < cutoff:
+                continue
+            if post.is_news():
+                news.append(post)
+            if post.is_update():
+                updates.append(post)
+            if post.is_external():
+                external.append(post)
+
+        self.__news_posts = news
+        self.__update_posts = updates
+        self.__external_posts = external
+
+    def merge(self, other: CounterStrike2Posts | Iterable[Post], window: int | None = None) -> None:
+        # Merges a new crawl into the (sorted) posts in O(n + m). Posts of
+        # the new crawl replace known posts with the same gid, e.g. edits.
+        new_posts = sorted(other.posts if isinstance(other, CounterStrike2Posts) else other,
+                           key=DATE_KEY, reverse=True)
+        new_gids = {post.gid for post in new_posts}
+
+        known = (post for post in self.__posts if post.gid not in new_gids)
+        merged = heapq.merge(new_posts, known, key=DATE_KEY, reverse=True)
+
+        seen = set()
+        posts = []
+        for post in merged:
+            if post.gid in seen:
+                continue
+            seen.add(post.gid)
+            posts.append(post)
+            if window is not None and len(posts) >= window:
+                break
+
+        self.__set_posts(posts)
+
     @property
     def posts(self) -> list[Post]:
         return self.__posts
 
     @property
     def news_posts(self) -> list[Post]:
-        return list(filter(lambda x: (x.date >= self.INITIAL_EPOCH_TIME_CS2) and x.is_news(),
-                           self.__posts))
+        return list(self.__news_posts)
 
     @property
     def update_posts(self) -> list[Post]:
-        return list(filter(lambda x: (x.date >= self.INITIAL_EPOCH_TIME_CS2) and x.is_update(),
-                           self.__posts))
+        return list(self.__update_posts)
 
     @property
     def external_posts(self) -> list[Post]:
-        return list(filter(lambda x: (x.date >= self.INITIAL_EPOCH_TIME_CS2) and x.is_external(),
-                           self.__posts))
+        return list(self.__external_posts)
 
     @property
     def posts_json(self) -> list[dict]:
@@ -76,15 +146,15 @@ class CounterStrike2Posts:
 
     @property
     def latest_news_post(self) -> Post | None:
-        return self.news_posts[0] if self.news_posts else None
+        return self.__news_posts[0] if self.__news_posts else None
 
     @property
     def latest_update_post(self) -> Post | None:
-        return self.update_posts[0] if self.update_posts else None
+        return self.__update_posts[0] if self.__update_posts else None
 
     @property
     def latest_external_post(self) -> Post | None:
-        return self.external_posts[0] if self.external_posts else None
+        return self.__external_posts[0] if self.__external_posts else None
 
     @property
     def oldest(self) -> Post | None:
@@ -92,15 +162,15 @@ class CounterStrike2Posts:
 
     @property
     def oldest_news_post(self) -> Post | None:
-        return self.news_posts[-1] if self.news_posts else None
+        return self.__news_posts[-1] if self.__news_posts else None
 
     @property
     def oldest_update_post(self) -> Post | None:
-        return self.update_posts[-1] if self.update_posts else None
+        return self.__update_posts[-1] if self.__update_posts else None
 
     @property
     def oldest_external_post(self) -> Post | None:
-        return self.external_posts[-1] if self.external_posts else None
+        return self.__external_posts[-1] if self.__external_posts else None
 
     def is_latest_post_news(self) -> bool:
         if self.latest is None:
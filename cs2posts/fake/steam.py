@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import argparse
+import bisect
+import gzip
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from typing import NamedTuple
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+
+logger = logging.getLogger(__name__)
+
+
+NEWS_PATH = "/ISteamNews/GetNewsForApp/v0002/"
+
+CS2_APPID = 730
+
+
+def create_history(start: int, end: int, posts_per_week: int = 3,
+                   contents_size: int = 0, seed: int = 42) -> list[dict[str, Any]]:
+    # Synthetic newsitems between start and end (unix time), newest first.
+    # contents_size pads the contents to a realistic payload size.
+    rnd = random.Random(seed)
+    week = 7 * 24 * 3600
+    count = max(1, (end - start) * posts_per_week // week)
+    dates = sorted((rnd.randrange(start, end) for _ in range(count)), reverse=True)
+    padding = "[list][*] Fixed a bug [/list]" * (contents_size // 29)
+
+    items = []
+    for i, date in enumerate(dates):
+        kind = rnd.random()
+        items.append({
+            "gid": str(5762994032385146001 + count - i),
+            "title": "Release Notes" if kind < 0.4 else f"News {count - i}",
+            "url": f"https://store.steampowered.com/news/{count - i}",
+            "is_external_url": True,
+            "author": "Vitaliy",
+            "contents": f"[list][*] Fixed bug {count - i} [/list]{padding}",
+            "feedlabel": "Community Announcements",
+            "date": date,
+            "feedname": "steam_community_announcements",
+            "feed_type": 0 if kind > 0.9 else 1,
+            "appid": CS2_APPID,
+        })
+    return items
+
+
+def load_recorded(filepath: Path | str) -> list[dict[str, Any]]:
+    # A recorded GetNewsForApp response, e.g. saved with curl
+    with open(filepath) as fs:
+        data = json.load(fs)
+    items = data["appnews"]["newsitems"]
+    items.sort(key=lambda item: item["date"], reverse=True)
+    return items
+
+
+class FakeServer(ThreadingHTTPServer):
+    # The default backlog of 5 drops connections of concurrent clients
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class FakeResponse(NamedTuple):
+    body: bytes
+    gzipped: bytes
+    etag: str
+
+
+class FakeSteamNewsAPI:
+    # Local HTTP server emulating ISteamNews/GetNewsForApp/v0002 for tests
+    # and benchmarks. Serves the given newsitems, which have to be sorted
+    # newest first. Every request is delayed by latency plus a random jitter
+    # (seconds) and fails with error_status at the given error_rate.
+
+    def __init__(self, newsitems: list[dict[str, Any]],
+                 host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503,
+                 seed: int = 42) -> None:
+        self.__newsitems = newsitems
+        self.__dates = [-item["date"] for item in newsitems]
+        self.__latency = latency
+        self.__jitter = jitter
+        self.__error_rate = error_rate
+        self.__error_status = error_status
+        self.__random = random.Random(seed)
+        self.__requests: list[dict[str, list[str]]] = []
+        self.__responses: dict[tuple[int, int, int | None], FakeResponse] = {}
+        self.__lock = threading.Lock()
+        self.__server = FakeServer((host, port), self.__create_handler())
+        self.__thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}{NEWS_PATH}"
+
+    @property
+    def newsitems(self) -> list[dict[str, Any]]:
+        return self.__newsitems
+
+    @property
+    def requests(self) -> list[dict[str, list[str]]]:
+        # Query parameters of all handled requests
+        with self.__lock:
+            return list(self.__requests)
+
+    @property
+    def error_status(self) -> int:
+        return self.__error_status
+
+    def _record(self, params: dict[str, list[str]]) -> tuple[float, bool]:
+        # Returns the delay and whether the request fails
+        with self.__lock:
+            self.__requests.append(params)
+            delay = self.__latency + self.__random.uniform(0, self.__jitter)
+            failed = self.__random.random() < self.__error_rate
+        return delay, failed
+
+    def query(self, params: dict[str, list[str]]) -> dict[str, Any]:
+        count = int(params.get("count", ["20"])[0])
+        maxlength = int(params.get("maxlength", ["0"])[0])
+        enddate = params.get("enddate")
+
+        # Items are sorted newest first, so the dates are negated for bisect
+        first = 0
+        if enddate is not None:
+            first = bisect.bisect_left(self.__dates, -int(enddate[0]))
+        items = self.__newsitems[first:first + count]
+
+        if maxlength:
+            items = [self.truncate(item, maxlength) for item in items]
+
+        return {"appnews": {
+            "appid": CS2_APPID,
+            "newsitems": items,
+            "count": len(self.__newsitems),
+        }}
+
+    @staticmethod
+    def truncate(item: dict[str, Any], maxlength: int) -> dict[str, Any]:
+        if len(item["contents"]) <= maxlength:
+            return item
+        return {**item, "contents": item["contents"][:maxlength] + "..."}
+
+    def response(self, params: dict[str, list[str]]) -> FakeResponse:
+        # Responses are cached, so the server itself is not the bottleneck
+        key = (int(params.get("count", ["20"])[0]),
+               int(params.get("maxlength", ["0"])[0]),
+               int(params["enddate"][0]) if "enddate" in params else None)
+        with self.__lock:
+            response = self.__responses.get(key)
+        if response is not None:
+            return response
+
+        body = json.dumps(self.query(params)).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+        response = FakeResponse(body, gzip.compress(body, compresslevel=6), etag)
+        with self.__lock:
+            self.__responses[key] = response
+        return response
+
+    def __create_handler(self) -> type[BaseHTTPRequestHandler]:
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately, Nagle would delay
+            # every keep-alive response by the delayed ACK of the client.
+            disable_nagle_algorithm = True
+
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                if url.path != NEWS_PATH:
+                    self.send_error(404)
+                    return
+
+                params = parse_qs(url.query)
+                delay, failed = api._record(params)
+                if delay > 0:
+                    time.sleep(delay)
+                if failed:
+                    self.send_error(api.error_status)
+                    return
+
+                response = api.response(params)
+                if self.headers.get("If-None-Match") == response.etag:
+                    self.send_response(304)
+                    self.send_header("ETag", response.etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                body = response.body
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                self.send_header("ETag", response.etag)
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = response.gzipped
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug(format % args)
+
+        return Handler
+
+    def start(self) -> FakeSteamNewsAPI:
+        self.__thread = threading.Thread(
+            target=self.__server.serve_forever, name="fake-steam", daemon=True)
+        self.__thread.start()
+        return self
+
+    def join(self) -> None:
+        # Wakes up regularly, so KeyboardInterrupt is handled
+        while self.__thread is not None and self.__thread.is_alive():
+            self.__thread.join(0.5)
+
+    def stop(self) -> None:
+        self.__server.shutdown()
+        self.__server.server_close()
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def __enter__(self) -> FakeSteamNewsAPI:
+        return self.start()
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+
+# Usage: python -m cs2posts.fake.steam --port 8080 --latency 0.2 --error-rate 0.05
+# then point CounterStrike2Crawler(api_url=...) at the printed url.
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--recorded", help="GetNewsForApp response to serve")
+    parser.add_argument("--years", type=int, default=4)
+    parser.add_argument("--posts-per-week", type=int, default=3)
+    parser.add_argument("--contents", type=int, default=4096)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+
+    if args.recorded:
+        newsitems = load_recorded(args.recorded)
+    else:
+        end = int(time.time())
+        newsitems = create_history(end - args.years * 365 * 24 * 3600, end,
+                                   args.posts_per_week, args.contents)
+
+    api = FakeSteamNewsAPI(newsitems, args.host, args.port,
+                           latency=args.latency, jitter=args.jitter,
+                           error_rate=args.error_rate,
+                           error_status=args.error_status)
+    print(f"Serving {len(newsitems)} posts at {api.url}")
+    try:
+        api.start()
+        api.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,415 @@
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import logging
+import math
+import queue
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+
+logger = logging.getLogger(__name__)
+
+
+# /bot<token>/<method>, see Application.builder().base_url()
+METHOD_PATH = re.compile(r"^/bot(?P<token>[^/]+)/(?P<method>\w+)$")
+
+FAKE_BOT_USER = {
+    "id": 4242424242,
+    "is_bot": True,
+    "first_name": "CS2 Fake Bot",
+    "username": "cs2_fake_bot",
+}
+
+SEND_METHODS = ("sendMessage", "sendPhoto", "sendVideo")
+
+
+def create_command_update(chat_id: int, text: str) -> dict[str, Any]:
+    # A private chat message starting with a bot command, without update_id
+    command = text.split(maxsplit=1)[0]
+    return {"message": {
+        "message_id": 1,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": "Player"},
+        "text": text,
+        "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+    }}
+
+
+class TokenBucket:
+    # Allows rate requests per second with bursts of up to burst requests
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        # Returns 0 if a token was taken, otherwise the seconds to wait
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class FakeServer(ThreadingHTTPServer):
+    # The default backlog of 5 drops connections of concurrent clients
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class FakeTelegramBotAPI:
+    # Local HTTP server standing in for the Telegram Bot API. Messages are
+    # limited per chat (with bursts of per_chat_burst messages) and globally
+    # (messages per second, 0 disables a limit) with 429 and retry_after
+    # like Telegram does. Sending to a chat
+    # in forbidden_chats fails with 403, to a key of migrated_chats with the
+    # ChatMigrated error pointing to its value.
+    #
+    # Updates given to push_update() are returned by long polling getUpdates
+    # or, once a webhook is set, posted to it in order like Telegram does.
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 per_chat_rate: float = 0.0, per_chat_burst: int = 3,
+                 global_rate: float = 0.0,
+                 forbidden_chats: set[int] | None = None,
+                 migrated_chats: dict[int, int] | None = None) -> None:
+        self.__per_chat_rate = per_chat_rate
+        self.__per_chat_burst = per_chat_burst
+        self.__global_rate = global_rate
+        self.__forbidden_chats = forbidden_chats or set()
+        self.__migrated_chats = migrated_chats or {}
+        self.__chat_buckets: dict[int, TokenBucket] = {}
+        self.__global_bucket: TokenBucket | None = None
+        self.__message_id = 0
+        # (monotonic time, method, chat_id) of every delivered message
+        self.__deliveries: list[tuple[float, str, int]] = []
+        self.__errors: dict[int, int] = {}
+        self.__lock = threading.Lock()
+        # Notified on every delivery and pushed update
+        self.__changed = threading.Condition(self.__lock)
+        self.__update_id = 0
+        self.__updates: list[dict[str, Any]] = []
+        self.__webhook: tuple[str, str] | None = None
+        self.__webhook_updates: queue.Queue[dict[str, Any] | None] = queue.Queue()
+        self.__webhook_thread: threading.Thread | None = None
+        self.__stopped = False
+        self.__server = FakeServer((host, port), self.__create_handler())
+        self.__thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}/bot"
+
+    @property
+    def deliveries(self) -> list[tuple[float, str, int]]:
+        with self.__lock:
+            return list(self.__deliveries)
+
+    @property
+    def errors(self) -> dict[int, int]:
+        # Number of error responses by status code
+        with self.__lock:
+            return dict(self.__errors)
+
+    @property
+    def webhook(self) -> tuple[str, str] | None:
+        # url and secret token of the webhook
+        return self.__webhook
+
+    def push_update(self, update: dict[str, Any]) -> int:
+        # Returns the update_id of the new update
+        with self.__changed:
+            self.__update_id += 1
+            update = {**update, "update_id": self.__update_id}
+            if self.__webhook is not None:
+                self.__webhook_updates.put(update)
+            else:
+                self.__updates.append(update)
+                self.__changed.notify_all()
+            return self.__update_id
+
+    def wait_for_delivery(self, chat_id: int, since: float,
+                          timeout: float = 10.0) -> float | None:
+        # Returns the monotonic time of the first message to chat_id
+        # delivered after since, or None on timeout
+        deadline = time.monotonic() + timeout
+        checked = 0
+        with self.__changed:
+            while True:
+                for at, _, delivered_to in self.__deliveries[checked:]:
+                    if delivered_to == chat_id and at >= since:
+                        return at
+                checked = len(self.__deliveries)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.__changed.wait(remaining)
+
+    def __get_updates(self, params: dict[str, Any]) -> list[dict[str, Any]]:
+        # Long polls for timeout seconds, updates before offset are confirmed
+        offset = int(params.get("offset") or 0)
+        deadline = time.monotonic() + float(params.get("timeout") or 0)
+        with self.__changed:
+            while True:
+                self.__updates = [update for update in self.__updates
+                                  if update["update_id"] >= offset]
+                remaining = deadline - time.monotonic()
+                if self.__updates or remaining <= 0 or self.__stopped or \
+                        self.__webhook is not None:
+                    return list(self.__updates)
+                self.__changed.wait(remaining)
+
+    def __set_webhook(self, url: str, secret_token: str) -> None:
+        with self.__changed:
+            self.__webhook = (url, secret_token)
+            for update in self.__updates:
+                self.__webhook_updates.put(update)
+            self.__updates.clear()
+            self.__changed.notify_all()
+        if self.__webhook_thread is None:
+            self.__webhook_thread = threading.Thread(
+                target=self.__deliver_webhook_updates, name="fake-telegram-webhook",
+                daemon=True)
+            self.__webhook_thread.start()
+
+    def __deliver_webhook_updates(self) -> None:
+        # Posts updates one after another over a kept alive connection
+        connection: http.client.HTTPConnection | None = None
+        while True:
+            update = self.__webhook_updates.get()
+            if update is None:
+                break
+            if self.__webhook is None:
+                continue
+            url, secret_token = self.__webhook
+            parsed = urlparse(url)
+            body = json.dumps(update).encode()
+            for _ in range(2):
+                try:
+                    if connection is None:
+                        connection = http.client.HTTPConnection(
+                            parsed.hostname, parsed.port, timeout=10)
+                    connection.request("POST", parsed.path or "/", body, {
+                        "Content-Type": "application/json",
+                        "X-Telegram-Bot-Api-Secret-Token": secret_token,
+                    })
+                    response = connection.getresponse()
+                    response.read()
+                    break
+                except (OSError, http.client.HTTPException) as e:
+                    # A dropped keep-alive connection is retried once
+                    logger.debug(f'Could not deliver update to webhook: {e}')
+                    if connection is not None:
+                        connection.close()
+                    connection = None
+        if connection is not None:
+            connection.close()
+
+    @staticmethod
+    def error(status: int, description: str,
+              parameters: dict[str, Any] | None = None) -> tuple[int, dict[str, Any]]:
+        response = {"ok": False, "error_code": status, "description": description}
+        if parameters is not None:
+            response["parameters"] = parameters
+        return status, response
+
+    def __check_rate_limits(self, chat_id: int, now: float) -> float:
+        # Must be called with the lock held
+        wait = 0.0
+        if self.__per_chat_rate:
+            bucket = self.__chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = TokenBucket(
+                    self.__per_chat_rate, self.__per_chat_burst, now)
+                self.__chat_buckets[chat_id] = bucket
+            wait = bucket.take(now)
+        if not wait and self.__global_rate:
+            if self.__global_bucket is None:
+                self.__global_bucket = TokenBucket(
+                    self.__global_rate, self.__global_rate, now)
+            wait = self.__global_bucket.take(now)
+        return wait
+
+    def call(self, method: str, params: dict[str, Any]) -> tuple[int, dict[str, Any]]:
+        if method == "getMe":
+            return 200, {"ok": True, "result": FAKE_BOT_USER}
+        if method == "setWebhook":
+            self.__set_webhook(params["url"], params.get("secret_token", ""))
+            return 200, {"ok": True, "result": True}
+        if method == "deleteWebhook":
+            with self.__changed:
+                self.__webhook = None
+            return 200, {"ok": True, "result": True}
+        if method == "setMyCommands":
+            return 200, {"ok": True, "result": True}
+        if method == "getUpdates":
+            return 200, {"ok": True, "result": self.__get_updates(params)}
+        if method not in (*SEND_METHODS, "editMessageText", "deleteMessage"):
+            return self.error(404, "Not Found")
+
+        try:
+            chat_id = int(params["chat_id"])
+        except (KeyError, ValueError):
+            return self.error(400, "Bad Request: chat not found")
+
+        if chat_id in self.__forbidden_chats:
+            return self.error(403, "Forbidden: bot was blocked by the user")
+        if chat_id in self.__migrated_chats:
+            return self.error(
+                400, "Bad Request: group chat was upgraded to a supergroup chat",
+                {"migrate_to_chat_id": self.__migrated_chats[chat_id]})
+
+        now = time.monotonic()
+        with self.__lock:
+            wait = self.__check_rate_limits(chat_id, now)
+            if wait:
+                retry_after = math.ceil(wait)
+                return self.error(
+                    429, f"Too Many Requests: retry after {retry_after}",
+                    {"retry_after": retry_after})
+
+            self.__deliveries.append((now, method, chat_id))
+            self.__message_id += 1
+            message_id = self.__message_id
+            self.__changed.notify_all()
+
+        if method == "deleteMessage":
+            return 200, {"ok": True, "result": True}
+
+        message = {
+            "message_id": int(params.get("message_id", message_id)),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"},
+            "from": FAKE_BOT_USER,
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        if "caption" in params:
+            message["caption"] = params["caption"]
+        return 200, {"ok": True, "result": message}
+
+    def _count_error(self, status: int) -> None:
+        with self.__lock:
+            self.__errors[status] = self.__errors.get(status, 0) + 1
+
+    def __create_handler(self) -> type[BaseHTTPRequestHandler]:
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately, Nagle would delay
+            # every keep-alive response by the delayed ACK of the client.
+            disable_nagle_algorithm = True
+
+            def read_params(self) -> dict[str, Any]:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode() if length else ""
+                query = self.path.split("?", 1)[1] if "?" in self.path else ""
+                params = {key: values[0] for key, values in parse_qs(query).items()}
+                if self.headers.get("Content-Type", "").startswith("application/json"):
+                    params.update(json.loads(body or "{}"))
+                else:
+                    # python-telegram-bot posts form encoded parameters
+                    params.update(
+                        (key, values[0]) for key, values in parse_qs(body).items())
+                return params
+
+            def do_POST(self) -> None:
+                match = METHOD_PATH.match(self.path.split("?", 1)[0])
+                if match is None:
+                    status, response = api.error(404, "Not Found")
+                else:
+                    status, response = api.call(match["method"], self.read_params())
+                if status != 200:
+                    api._count_error(status)
+
+                body = json.dumps(response).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except ConnectionError:
+                    # The client gave up on a long poll, e.g. on shutdown
+                    self.close_connection = True
+
+            do_GET = do_POST
+
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug(format % args)
+
+        return Handler
+
+    def start(self) -> FakeTelegramBotAPI:
+        self.__thread = threading.Thread(
+            target=self.__server.serve_forever, name="fake-telegram", daemon=True)
+        self.__thread.start()
+        return self
+
+    def join(self) -> None:
+        # Wakes up regularly, so KeyboardInterrupt is handled
+        while self.__thread is not None and self.__thread.is_alive():
+            self.__thread.join(0.5)
+
+    def stop(self) -> None:
+        self.__webhook_updates.put(None)
+        with self.__changed:
+            # Ends long polls
+            self.__stopped = True
+            self.__changed.notify_all()
+        self.__server.shutdown()
+        self.__server.server_close()
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def __enter__(self) -> FakeTelegramBotAPI:
+        return self.start()
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+
+# Usage: python -m cs2posts.fake.telegram --port 8081 --per-chat-rate 1 --global-rate 30
+# then start the bot with TELEGRAM_BASE_URL set to the printed url.
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--per-chat-rate", type=float, default=1.0)
+    parser.add_argument("--per-chat-burst", type=int, default=3)
+    parser.add_argument("--global-rate", type=float, default=30.0)
+    args = parser.parse_args()
+
+    api = FakeTelegramBotAPI(args.host, args.port, args.per_chat_rate,
+                             args.per_chat_burst, args.global_rate)
+    print(f"Serving fake Telegram Bot API at {api.base_url}")
+    try:
+        api.start()
+        api.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
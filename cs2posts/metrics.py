@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+import math
+import threading
+from collections.abc import Callable
+from collections.abc import Iterator
+
+
+logger = logging.getLogger(__name__)
+
+
+# Seconds, from a cached answer to a slow Steam request
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# name, label values, value
+Sample = tuple[str, tuple[str, ...], float]
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if value == int(value) and abs(value) < 1 << 53:
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class CounterValue:
+
+    __slots__ = ("value", "lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self.lock:
+            self.value += amount
+
+
+class GaugeValue(CounterValue):
+
+    __slots__ = ()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self.lock:
+            self.value -= amount
+
+
+class HistogramValue:
+    # Counts per bucket are kept apart and summed up when rendered
+
+    __slots__ = ("buckets", "counts", "sum", "lock")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class Metric:
+    # A metric family, the values of a label combination are created on
+    # first use with labels(). Metrics without labels are used directly.
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not labelnames:
+            self._default = self.labels()
+
+    def _create(self):
+        raise NotImplementedError("Method not implemented")
+
+    def labels(self, *labelvalues: str):
+        value = self._values.get(labelvalues)
+        if value is None:
+            if len(labelvalues) != len(self.labelnames):
+                raise ValueError(
+                    f'Expected labels {self.labelnames} for {self.name}, got {labelvalues}')
+            with self._lock:
+                value = self._values.setdefault(labelvalues, self._create())
+        return value
+
+    def samples(self) -> Iterator[Sample]:
+        for labelvalues, value in list(self._values.items()):
+            yield self.name, labelvalues, value.value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        for name, labelvalues, value in self.samples():
+            yield self._line(name, self.labelnames, labelvalues, value)
+
+    @staticmethod
+    def _line(name: str, labelnames: tuple[str, ...], labelvalues: tuple[str, ...],
+              value: float) -> str:
+        if not labelnames:
+            return f"{name} {format_value(value)}"
+        labels = ",".join(f'{labelname}="{escape_label(str(labelvalue))}"'
+                          for labelname, labelvalue in zip(labelnames, labelvalues))
+        return f"{name}{{{labels}}} {format_value(value)}"
+
+
+class Counter(Metric):
+
+    type = "counter"
+
+    def _create(self) -> CounterValue:
+        return CounterValue()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    @property
+    def value(self) -> float:
+        return self._default.value
+
+
+class Gauge(Metric):
+    # A gauge can also be computed on every scrape by a function returning
+    # the value, or the values by label values for labelled gauges.
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.__function: Callable[[], float | dict[tuple[str, ...], float]] | None = None
+
+    def _create(self) -> GaugeValue:
+        return GaugeValue()
+
+    def set_function(self, function: Callable[[], float | dict[tuple[str, ...], float]] | None) -> None:
+        self.__function = function
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    @property
+    def value(self) -> float:
+        return self._default.value
+
+    def samples(self) -> Iterator[Sample]:
+        if self.__function is None:
+            yield from super().samples()
+            return
+        try:
+            values = self.__function()
+        except Exception as e:
+            logger.error(f'Could not collect {self.name}: {e}')
+            return
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labelvalues, value in values.items():
+            yield self.name, labelvalues, value
+
+
+class Histogram(Metric):
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _create(self) -> HistogramValue:
+        return HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    @property
+    def count(self) -> int:
+        return sum(self._default.counts)
+
+    @property
+    def sum(self) -> float:
+        return self._default.sum
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        labelnames = self.labelnames + ("le",)
+        for labelvalues, value in list(self._values.items()):
+            with value.lock:
+                counts = list(value.counts)
+                total = value.sum
+            cumulative = 0
+            for le, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield self._line(f"{self.name}_bucket", labelnames,
+                                 labelvalues + (format_value(le),), cumulative)
+            yield self._line(f"{self.name}_sum", self.labelnames, labelvalues, total)
+            yield self._line(f"{self.name}_count", self.labelnames, labelvalues, cumulative)
+
+
+class Registry:
+
+    def __init__(self) -> None:
+        self.__metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.__metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self.__metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Metric | None:
+        return self.__metrics.get(name)
+
+    def counter(self, name: str, documentation: str,
+                labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str,
+              labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str,
+                  labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        # Prometheus text exposition format
+        lines = []
+        for metric in self.__metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Metrics of the whole bot, rendered by the /metrics endpoint
+REGISTRY = Registry()
+
+
+EVENT_LOOP_LAG = REGISTRY.gauge(
+    "cs2posts_event_loop_lag_seconds",
+    "Delay of the latest event loop lag probe")
+EVENT_LOOP_LAG_SECONDS = REGISTRY.histogram(
+    "cs2posts_event_loop_lag_probe_seconds",
+    "Delay of event loop lag probes, blocking calls show up here")
+
+
+class LoopLagMonitor:
+    # Sleeps interval seconds over and over, anything the loop does not get
+    # back to in time is lag, e.g. a blocking call in a handler.
+
+    def __init__(self, interval: float = 0.5) -> None:
+        self.__interval = interval
+        self.__task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self.__task is None:
+            self.__task = asyncio.create_task(self.__probe())
+
+    async def stop(self) -> None:
+        if self.__task is None:
+            return
+        self.__task.cancel()
+        await asyncio.gather(self.__task, return_exceptions=True)
+        self.__task = None
+
+    async def __probe(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.__interval)
+            lag = max(0.0, loop.time() - start - self.__interval)
+            EVENT_LOOP_LAG.set(lag)
+            EVENT_LOOP_LAG_SECONDS.observe(lag)
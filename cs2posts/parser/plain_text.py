@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import html
+import re
+
+from cs2posts.parser.parser import Parser
+
+
+# BBCode tags e.g. [list], [*], [url=...], [/h3]
+BBCODE_TAG = re.compile(r"\[/?[a-z0-9*]+(?:=[^\]]*)?\]", re.IGNORECASE)
+HTML_TAG = re.compile(r"<[^>]+>")
+WHITESPACE = re.compile(r"\s+")
+
+
+class PlainTextParser(Parser):
+    # Cheap plain text form of a post body for summaries and search, it does
+    # not render anything, markup is simply dropped.
+
+    def __init__(self, text: str):
+        super().__init__(text)
+
+    def parse(self) -> str:
+        text = BBCODE_TAG.sub(" ", self.text)
+        text = HTML_TAG.sub(" ", text)
+        text = html.unescape(text)
+        self.text = WHITESPACE.sub(" ", text).strip()
+        return self.text
+
+    @staticmethod
+    def truncate(text: str, length: int) -> str:
+        if len(text) <= length:
+            return text
+        cut = text.rfind(" ", 0, length)
+        if cut <= 0:
+            cut = length
+        return text[:cut].rstrip(" ,.;:-") + "…"
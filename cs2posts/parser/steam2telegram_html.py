@@ -6,6 +6,7 @@ import sys
 import bbcode
 
 from cs2posts.parser.parser import Parser
+from cs2posts.tracing import span
 
 
 NEWLINE_FORMAT = {
@@ -33,7 +34,8 @@ class Steam2TelegramHTML(Parser):
         self.__parser.append((parser, priority))
 
     def parse(self) -> str:
-        self.text = bbcode.render_html(self.text)
+        with span("parser", parser="bbcode", length=len(self.text)):
+            self.text = bbcode.render_html(self.text)
 
         # TODO: Must be placed here now before parsers due to HeadingParser
         pattern = NEWLINE_FORMAT['br']['pattern']
@@ -42,7 +44,8 @@ class Steam2TelegramHTML(Parser):
 
         parser_by_priority = sorted(self.__parser, key=lambda x: x[1])
         for parser, _ in parser_by_priority:
-            self.text = parser(self.text).parse()
+            with span("parser", parser=parser.__name__, length=len(self.text)):
+                self.text = parser(self.text).parse()
 
         for value in STEAM_FORMAT.values():
             pattern = value['pattern']
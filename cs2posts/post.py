@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-from dataclasses import asdict
 from dataclasses import dataclass
 from dataclasses import field
 from datetime import datetime
@@ -19,7 +18,33 @@ class FeedType(Enum):
         return cls.NOT_DEFINED
 
 
-@dataclass
+# Avoids the comparatively slow Enum lookup per constructed post
+FEED_TYPES = {feed_type.value: feed_type for feed_type in FeedType}
+
+
+class PostKind(Enum):
+    UPDATE = "update"
+    NEWS = "news"
+    EXTERNAL = "external"
+
+
+POST_FIELDS = (
+    "gid",
+    "title",
+    "url",
+    "is_external_url",
+    "author",
+    "contents",
+    "feedlabel",
+    "date",
+    "feedname",
+    "feed_type",
+    "appid",
+    "tags",
+)
+
+
+@dataclass(frozen=True, slots=True, eq=False)
 class Post:
     gid: str
     title: str
@@ -33,24 +58,60 @@ class Post:
     feed_type: int
     appid: int
     # can be empty from crawled data
-    tags: list[str] = field(default_factory=list)
+    tags: tuple[str, ...] = ()
+    # Derived once, posts are immutable
+    feed: FeedType = field(init=False, repr=False)
+    kind: PostKind = field(init=False, repr=False)
+    _content_hash: int | None = field(init=False, repr=False, default=None)
+
+    def __post_init__(self) -> None:
+        # Frozen dataclass, derived fields have to bypass __setattr__
+        tags = tuple(self.tags) if self.tags else ()
+        object.__setattr__(self, "tags", tags)
+
+        feed = FEED_TYPES.get(self.feed_type, FeedType.NOT_DEFINED)
+        object.__setattr__(self, "feed", feed)
+
+        if "patchnotes" in tags or "Release Notes" in self.title:
+            kind = PostKind.UPDATE
+        elif feed is FeedType.EXTERN:
+            kind = PostKind.EXTERNAL
+        else:
+            kind = PostKind.NEWS
+        object.__setattr__(self, "kind", kind)
+
+    @property
+    def content_hash(self) -> int:
+        # Computed on first comparison, hashing the contents is not free
+        if self._content_hash is None:
+            object.__setattr__(self, "_content_hash", hash((
+                self.title, self.url, self.is_external_url, self.author,
+                self.contents, self.feedlabel, self.feedname, self.feed_type,
+                self.appid, self.tags)))
+        return self._content_hash
 
     @property
     def date_as_datetime(self, tz: ZoneInfo = ZoneInfo('UTC')) -> datetime:
         # Do not return a timezone-aware datetime object
         return datetime.fromtimestamp(self.date, tz=tz).replace(tzinfo=None)
 
+    @property
+    def key(self) -> tuple[str, int, int]:
+        return self.gid, self.date, self.content_hash
+
     def to_dict(self) -> dict:
-        return asdict(self)
+        data = {name: getattr(self, name) for name in POST_FIELDS}
+        data["tags"] = list(self.tags)
+        return data
 
     def is_update(self) -> bool:
-        return "patchnotes" in self.tags or "Release Notes" in self.title
+        return self.kind is PostKind.UPDATE
 
     def is_news(self) -> bool:
-        return not self.is_update() and not self.is_external()
+        return self.kind is PostKind.NEWS
 
     def is_external(self) -> bool:
-        return FeedType(self.feed_type) == FeedType.EXTERN
+        return self.feed is FeedType.EXTERN
 
     def is_newer_than(self, other: Post) -> bool:
         if other is None:
@@ -63,15 +124,21 @@ class Post:
         return self.date <= other.date
 
     def get_feed_type(self) -> FeedType:
-        return FeedType(self.feed_type)
+        return self.feed
 
     def __getitem__(self, key: str) -> Any:
-        return self.to_dict()[key]
+        if key not in POST_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
 
     def __eq__(self, other) -> bool:
         if isinstance(other, self.__class__):
-            return self.to_dict() == other.to_dict()
+            # Contents are only compared through their hash
+            return self.key == other.key
         return False
 
     def __ne__(self, other) -> bool:
         return not self.__eq__(other)
+
+    def __hash__(self) -> int:
+        return hash(self.key)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import abc
+import heapq
+import logging
+import math
+import re
+import sqlite3
+from collections import Counter
+from collections.abc import Iterable
+
+
+logger = logging.getLogger(__name__)
+
+
+# (gid, title, plain text body) of an indexed post
+SearchEntry = tuple[str, str, str]
+
+TOKEN = re.compile(r"\w+")
+
+# Title matches rank higher than body matches
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN.findall(text.casefold())
+
+
+class SearchIndex(abc.ABC):
+
+    @abc.abstractmethod
+    def index(self, entries: Iterable[SearchEntry]) -> None:
+        pass
+
+    @abc.abstractmethod
+    def remove(self, gids: Iterable[str]) -> None:
+        pass
+
+    @abc.abstractmethod
+    def rebuild(self, entries: Iterable[SearchEntry]) -> None:
+        pass
+
+    @abc.abstractmethod
+    def search(self, query: str, limit: int) -> list[str]:
+        # Gids of the posts containing all query terms, best match first
+        pass
+
+    @abc.abstractmethod
+    def is_empty(self) -> bool:
+        pass
+
+
+class Fts5SearchIndex(SearchIndex):
+    # SQLite FTS5 table next to the posts table of the archive. Writes take
+    # part in the transaction of the caller.
+
+    SCHEMA = ("CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5("
+              "gid UNINDEXED, title, body, tokenize='unicode61 remove_diacritics 2')")
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.__connection = connection
+        self.__connection.execute(self.SCHEMA)
+
+    @staticmethod
+    def is_supported(connection: sqlite3.Connection) -> bool:
+        try:
+            connection.execute(
+                "CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(text)")
+            connection.execute("DROP TABLE temp.fts5_probe")
+        except sqlite3.OperationalError:
+            return False
+        return True
+
+    @staticmethod
+    def to_match(query: str) -> str:
+        # Every term is quoted, so user input can not use the FTS5 syntax
+        return " ".join(f'"{term}"' for term in tokenize(query))
+
+    def index(self, entries: Iterable[SearchEntry]) -> None:
+        self.__connection.executemany(
+            "INSERT INTO posts_fts (gid, title, body) VALUES (?, ?, ?)", entries)
+
+    def remove(self, gids: Iterable[str]) -> None:
+        # Scans the gid column, only needed for the rare edited posts
+        self.__connection.executemany(
+            "DELETE FROM posts_fts WHERE gid = ?", [(gid,) for gid in gids])
+
+    def rebuild(self, entries: Iterable[SearchEntry]) -> None:
+        self.__connection.execute("DELETE FROM posts_fts")
+        self.__connection.executemany(
+            "INSERT INTO posts_fts (gid, title, body) VALUES (?, ?, ?)", entries)
+        self.__connection.execute(
+            "INSERT INTO posts_fts (posts_fts) VALUES ('optimize')")
+
+    def search(self, query: str, limit: int) -> list[str]:
+        match = self.to_match(query)
+        if not match:
+            return []
+
+        rows = self.__connection.execute(
+            "SELECT gid FROM posts_fts WHERE posts_fts MATCH ?"
+            f" ORDER BY bm25(posts_fts, 0.0, {TITLE_WEIGHT}, {BODY_WEIGHT}) LIMIT ?",
+            (match, limit))
+        return [gid for gid, in rows]
+
+    def is_empty(self) -> bool:
+        return self.__connection.execute(
+            "SELECT 1 FROM posts_fts LIMIT 1").fetchone() is None
+
+
+class InvertedSearchIndex(SearchIndex):
+    # In memory fallback if SQLite is built without FTS5. Ranks with BM25
+    # over the weighted title and body term frequencies like FTS5 does.
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self) -> None:
+        # term -> gid -> weighted term frequency
+        self.__postings: dict[str, dict[str, float]] = {}
+        self.__lengths: dict[str, float] = {}
+        self.__total_length = 0.0
+
+    def __remove(self, gid: str) -> None:
+        if gid not in self.__lengths:
+            return
+        for term in [term for term, postings in self.__postings.items() if gid in postings]:
+            postings = self.__postings[term]
+            del postings[gid]
+            if not postings:
+                del self.__postings[term]
+        self.__total_length -= self.__lengths.pop(gid)
+
+    def __add(self, gid: str, title: str, body: str) -> None:
+        frequencies = Counter()
+        for term in tokenize(title):
+            frequencies[term] += TITLE_WEIGHT
+        for term in tokenize(body):
+            frequencies[term] += BODY_WEIGHT
+
+        for term, frequency in frequencies.items():
+            self.__postings.setdefault(term, {})[gid] = frequency
+
+        length = sum(frequencies.values())
+        self.__lengths[gid] = length
+        self.__total_length += length
+
+    def index(self, entries: Iterable[SearchEntry]) -> None:
+        for gid, title, body in entries:
+            self.__add(gid, title, body)
+
+    def remove(self, gids: Iterable[str]) -> None:
+        # Scans the vocabulary, only needed for the rare edited posts
+        for gid in gids:
+            self.__remove(gid)
+
+    def rebuild(self, entries: Iterable[SearchEntry]) -> None:
+        self.__postings = {}
+        self.__lengths = {}
+        self.__total_length = 0.0
+        for gid, title, body in entries:
+            self.__add(gid, title, body)
+
+    def search(self, query: str, limit: int) -> list[str]:
+        terms = set(tokenize(query))
+        if not terms or not self.__lengths:
+            return []
+
+        postings = [self.__postings.get(term) for term in terms]
+        if not all(postings):
+            return []
+
+        # Intersect starting with the rarest term
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for other in postings[1:]:
+            candidates.intersection_update(other)
+            if not candidates:
+                return []
+
+        count = len(self.__lengths)
+        average_length = self.__total_length / count
+        scores = dict.fromkeys(candidates, 0.0)
+        for term_postings in postings:
+            idf = math.log(1 + (count - len(term_postings) + 0.5) / (len(term_postings) + 0.5))
+            for gid in candidates:
+                frequency = term_postings[gid]
+                norm = 1 - self.B + self.B * self.__lengths[gid] / average_length
+                scores[gid] += idf * frequency * (self.K1 + 1) / (frequency + self.K1 * norm)
+
+        return heapq.nlargest(limit, scores, key=lambda gid: (scores[gid], gid))
+
+    def is_empty(self) -> bool:
+        return not self.__lengths
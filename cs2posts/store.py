@@ -1,19 +1,31 @@
 from __future__ import annotations
 
 import abc
+import asyncio
 import json
 import logging
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
 from cs2posts.bot.chats import Chat
 from cs2posts.bot.chats import Chats
+from cs2posts.bot.columnar import ColumnarChats
+from cs2posts.bot.keywords import KeywordSubscriptions
+from cs2posts.bot.snapshot import ChatSnapshotCodec
+from cs2posts.bot.subscriptions import Subscriptions
+from cs2posts.bot.subscriptions import TopicSubscriptions
 from cs2posts.post import Post
 
 
 logger = logging.getLogger(__name__)
 
 
+STORE_FORMAT_VERSION = 1
+
+
 class Store(abc.ABC):
 
     @abc.abstractmethod
@@ -33,10 +45,109 @@ class Store(abc.ABC):
         pass
 
 
+class AsyncStore(abc.ABC):
+
+    @abc.abstractmethod
+    async def create(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def load(self) -> Any:
+        pass
+
+    @abc.abstractmethod
+    async def save(self, data: Any) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def is_empty(self) -> bool:
+        pass
+
+
+class PendingSave:
+    # A queued save, later saves of the same object wait for it
+
+    __slots__ = ("data", "done", "error", "cancelled")
+
+    def __init__(self, data: Any) -> None:
+        self.data = data
+        self.done = asyncio.Event()
+        self.error: Exception | None = None
+        self.cancelled = False
+
+
+class ThreadedStore(AsyncStore):
+
+    def __init__(self, store: Store) -> None:
+        self.__store = store
+        # A single worker keeps the file operations of a store in order
+        self.__executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="store-io")
+        self.__lock: asyncio.Lock | None = None
+        self.__pending: PendingSave | None = None
+
+    @property
+    def store(self) -> Store:
+        return self.__store
+
+    async def _run(self, func, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, func, *args)
+
+    async def create(self) -> None:
+        await self._run(self.store.create)
+
+    async def load(self) -> Any:
+        return await self._run(self.store.load)
+
+    async def is_empty(self) -> bool:
+        return await self._run(self.store.is_empty)
+
+    async def save(self, data: Any) -> None:
+        if self.__lock is None:
+            self.__lock = asyncio.Lock()
+
+        # Saving the same object again while it is still queued is redundant,
+        # the queued write will pick up its latest state. All coalesced saves
+        # wait for the same event and are woken by a single set().
+        pending = self.__pending
+        while pending is not None and pending.data is data:
+            await pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            if not pending.cancelled:
+                return
+            # The caller of the queued save was cancelled, not the waiters.
+            # The first of them writes instead, the others coalesce into it.
+            pending = self.__pending
+
+        pending = self.__pending = PendingSave(data)
+        try:
+            async with self.__lock:
+                if self.__pending is pending:
+                    self.__pending = None
+                await self._run(self.store.save, data)
+        except asyncio.CancelledError:
+            pending.cancelled = True
+            raise
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            if self.__pending is pending:
+                self.__pending = None
+            pending.done.set()
+
+    def close(self) -> None:
+        self.__executor.shutdown(wait=True)
+
+
 class LocalStore(Store):
 
     def __init__(self, filepath: Path) -> None:
         self.__filepath = filepath
+        self.__manifest_filepath = filepath.with_name(
+            f"{filepath.name}.manifest")
 
         if not self.__filepath.exists():
             self.create()
@@ -45,22 +156,30 @@ class LocalStore(Store):
     def filepath(self) -> Path:
         return self.__filepath
 
+    @property
+    def manifest_filepath(self) -> Path:
+        return self.__manifest_filepath
+
     def create(self) -> None:
-        with open(self.filepath, "w") as fs:
-            json.dump({}, fs)
+        self._write({}, count=0)
 
     def load(self) -> dict[str, Any]:
-        with open(self.filepath) as fs:
-            return json.load(fs)
+        # Raises on unsupported versions before touching the data file
+        self.read_manifest()
+        return self._read()
 
     def save(self, data: Any) -> None:
-        with open(self.filepath, "w") as fs:
-            json.dump(data, fs, indent=4)
+        self._write(data, count=len(data))
 
     def is_empty(self) -> bool:
         if self.filepath.stat().st_size == 0:
             return True
 
+        manifest = self.read_manifest()
+        if manifest is not None:
+            return manifest["count"] == 0
+
+        # Legacy file without (valid) manifest, we have to parse it
         try:
             with open(self.filepath) as fs:
                 data = json.load(fs)
@@ -68,6 +187,48 @@ class LocalStore(Store):
         except json.JSONDecodeError:
             return True
 
+    def read_manifest(self) -> dict[str, int] | None:
+        # The manifest is a small sidecar file holding the format version and
+        # record count. It is only trusted if size and mtime still match the
+        # data file, otherwise callers have to parse the data file.
+        try:
+            with open(self.manifest_filepath) as fs:
+                manifest = json.load(fs)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        version = manifest.get("version", 0)
+        if version > STORE_FORMAT_VERSION:
+            raise ValueError(
+                f'Unsupported store version {version} of {self.filepath}'
+                f' (supported: {STORE_FORMAT_VERSION})')
+
+        stat = self.filepath.stat()
+        if manifest.get("size") != stat.st_size or manifest.get("mtime_ns") != stat.st_mtime_ns:
+            logger.info(f'Manifest of {self.filepath} is outdated. Ignoring it.')
+            return None
+
+        return manifest
+
+    def _read(self) -> Any:
+        with open(self.filepath) as fs:
+            return json.load(fs)
+
+    def _write(self, data: Any, count: int) -> None:
+        with open(self.filepath, "w") as fs:
+            json.dump(data, fs, indent=4)
+
+        stat = self.filepath.stat()
+        manifest = {
+            "version": STORE_FORMAT_VERSION,
+            "count": count,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+        with open(self.manifest_filepath, "w") as fs:
+            json.dump(manifest, fs)
+
 
 class LocalLatestPostStore(LocalStore):
 
@@ -90,51 +251,155 @@ class LocalLatestPostStore(LocalStore):
             return
 
         content[key] = post.to_dict()
+        super().save(content)
 
-        with open(self.filepath, "w") as fs:
-            json.dump(content, fs, indent=4)
+    def get(self, key: str) -> Post | None:
+        # A kind of post that was never seen has no key yet
+        data = self.load().get(key)
+        if data is None:
+            return None
+        return Post(**data)
 
-    def get_latest_news_post(self) -> Post:
-        return Post(**self.load()['news'])
+    def get_latest_news_post(self) -> Post | None:
+        return self.get('news')
 
-    def get_latest_update_post(self) -> Post:
-        return Post(**self.load()['update'])
+    def get_latest_update_post(self) -> Post | None:
+        return self.get('update')
 
-    def get_latest_external_post(self) -> Post:
-        return Post(**self.load()['external'])
+    def get_latest_external_post(self) -> Post | None:
+        return self.get('external')
 
-    def get_latest_post(self) -> Post:
-        news = self.get_latest_news_post()
-        update = self.get_latest_update_post()
-        external = self.get_latest_external_post()
-        return max(news, update, external, key=lambda x: x.date)
+    def get_latest_post(self) -> Post | None:
+        content = self.load()
+        posts = [Post(**content[key]) for key in ('news', 'update', 'external')
+                 if content.get(key) is not None]
+        return max(posts, key=lambda x: x.date, default=None)
 
 
 class LocalChatStore(LocalStore):
 
-    def __init__(self, filepath: Path | None = None) -> None:
+    def __init__(self, filepath: Path | None = None, columnar: bool = False) -> None:
         if filepath is None:
             filepath = Path(__file__).parent / "data" / "chats.json"
 
+        self.columnar = columnar
         super().__init__(filepath)
 
-    def load(self) -> Chats:
-        if self.is_empty():
-            return Chats()
+    def load(self) -> Chats | ColumnarChats:
+        chats = ColumnarChats() if self.columnar else Chats()
 
-        with open(self.filepath) as fs:
-            data = json.load(fs)
+        # Only the manifest is consulted here, so the data file is parsed
+        # at most once per load (legacy files are checked after parsing).
+        if self.filepath.stat().st_size == 0:
+            return chats
+
+        manifest = self.read_manifest()
+        if manifest is not None and manifest["count"] == 0:
+            return chats
 
-        chats = Chats()
-        for chat in data["chats"]:
-            chat = Chat.from_json(chat)
-            if chat.is_removed_while_banned:
+        try:
+            data = self._read()
+        except json.JSONDecodeError:
+            logger.error(f'Could not parse {self.filepath}. Using empty chats.')
+            return chats
+
+        for chat in data.get("chats", []):
+            # Left while banned, written by earlier versions. Their ban is
+            # not migrated, bans are not persisted anymore.
+            if chat.get("is_removed_while_banned"):
                 continue
-            chats.add(chat=chat)
+            chats.add(chat=Chat.from_json(chat))
 
         return chats
 
-    def save(self, chats: Chats) -> None:
-        with open(self.filepath, "w") as fs:
-            chats_json = [chat.to_json() for chat in chats]
-            json.dump({"chats": chats_json}, fs, indent=4)
+    def save(self, chats: Chats | ColumnarChats) -> None:
+        # Iterate over a snapshot, chats may change while saving in a thread
+        if isinstance(chats, ColumnarChats):
+            snapshot = chats.to_chats()
+        else:
+            snapshot = chats.chats
+        chats_json = [chat.to_json() for chat in snapshot]
+        self._write({"chats": chats_json}, count=len(chats_json))
+
+
+class LocalSubscriptionStore(LocalStore):
+
+    subscriptions_class: type[Subscriptions] = Subscriptions
+
+    def load(self) -> Subscriptions:
+        return self.subscriptions_class.from_json(super().load())
+
+    def save(self, subscriptions: Subscriptions) -> None:
+        super().save(subscriptions.to_json())
+
+
+class LocalKeywordStore(LocalSubscriptionStore):
+
+    subscriptions_class = KeywordSubscriptions
+
+    def __init__(self, filepath: Path | None = None) -> None:
+        if filepath is None:
+            filepath = Path(__file__).parent / "data" / "keywords.json"
+
+        super().__init__(filepath)
+
+
+class LocalTopicStore(LocalSubscriptionStore):
+
+    subscriptions_class = TopicSubscriptions
+
+    def __init__(self, filepath: Path | None = None) -> None:
+        if filepath is None:
+            filepath = Path(__file__).parent / "data" / "topics.json"
+
+        super().__init__(filepath)
+
+
+class LocalChatSnapshotStore(Store):
+
+    def __init__(self, filepath: Path | None = None, columnar: bool = False) -> None:
+        if filepath is None:
+            filepath = Path(__file__).parent / "data" / "chats.bin"
+
+        self.__filepath = filepath
+        self.columnar = columnar
+
+        if not self.__filepath.exists():
+            self.create()
+
+    @property
+    def filepath(self) -> Path:
+        return self.__filepath
+
+    def create(self) -> None:
+        self.save(Chats())
+
+    def load(self) -> Chats | ColumnarChats:
+        if self.filepath.stat().st_size == 0:
+            return ColumnarChats() if self.columnar else Chats()
+
+        with open(self.filepath, "rb") as fs:
+            with mmap.mmap(fs.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if self.columnar:
+                    return ColumnarChats.from_snapshot(mm)
+                return ChatSnapshotCodec.decode(mm)
+
+    def save(self, chats: Chats | ColumnarChats) -> None:
+        # Write to a temporary file first so a crash never leaves a torn snapshot
+        tmp_filepath = self.filepath.with_name(f"{self.filepath.name}.tmp")
+        with open(tmp_filepath, "wb") as fs:
+            if isinstance(chats, ColumnarChats):
+                ChatSnapshotCodec.write_records(
+                    fs, list(chats.iter_records()), len(chats))
+            else:
+                ChatSnapshotCodec.write(fs, chats)
+        os.replace(tmp_filepath, self.filepath)
+
+    def is_empty(self) -> bool:
+        with open(self.filepath, "rb") as fs:
+            header = fs.read(ChatSnapshotCodec.HEADER.size)
+
+        try:
+            return ChatSnapshotCodec.read_header(header) == 0
+        except ValueError:
+            return True
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import logging
+import re
+
+from cs2posts.post import Post
+
+logger = logging.getLogger(__name__)
+
+
+# Topics every post is classified into, the same as Post.is_*()
+TOPIC_UPDATE = "update"
+TOPIC_NEWS = "news"
+TOPIC_EXTERNAL = "external"
+
+# Prefixes of topics derived from the crawled post data
+TOPIC_TAG_PREFIX = "tag:"
+TOPIC_FEED_PREFIX = "feed:"
+
+# Topic -> pattern searched in the post title
+DEFAULT_TITLE_PATTERNS = {
+    "release-notes": r"\brelease notes\b",
+    "major": r"\bmajor\b",
+    "premier": r"\bpremier\b",
+    "operation": r"\boperation\b",
+}
+
+
+def normalize_topic(topic: str) -> str:
+    return topic.strip().casefold()
+
+
+class TopicClassifier:
+
+    def __init__(self, title_patterns: dict[str, str] | None = None) -> None:
+        if title_patterns is None:
+            title_patterns = DEFAULT_TITLE_PATTERNS
+
+        self.__title_patterns = [
+            (normalize_topic(topic), re.compile(pattern, re.IGNORECASE))
+            for topic, pattern in title_patterns.items()]
+
+    @property
+    def title_topics(self) -> list[str]:
+        return [topic for topic, _ in self.__title_patterns]
+
+    def classify(self, post: Post) -> frozenset[str]:
+        if post.is_update():
+            topics = {TOPIC_UPDATE}
+        elif post.is_external():
+            topics = {TOPIC_EXTERNAL}
+        else:
+            topics = {TOPIC_NEWS}
+
+        if post.feedname:
+            topics.add(normalize_topic(f"{TOPIC_FEED_PREFIX}{post.feedname}"))
+
+        for tag in post.tags or ():
+            topics.add(normalize_topic(f"{TOPIC_TAG_PREFIX}{tag}"))
+
+        for topic, pattern in self.__title_patterns:
+            if pattern.search(post.title):
+                topics.add(topic)
+
+        return frozenset(topics)
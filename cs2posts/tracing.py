@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MAX_SPANS = 10_000
+
+# Span of the running code, copied into tasks and asyncio.to_thread calls so
+# that spans started there become its children
+CURRENT_SPAN: ContextVar[Span | None] = ContextVar("cs2posts_span", default=None)
+
+
+class NoopSpan:
+    # Handed out while tracing is disabled, a span costs a method call
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> NoopSpan:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class Span:
+    # Field names follow the OpenTelemetry data model, times are unix ns
+
+    __slots__ = ("tracer", "name", "attributes", "trace_id", "span_id",
+                 "parent_span_id", "start", "end", "error", "token")
+
+    def __init__(self, tracer: Tracer, name: str, attributes: dict[str, Any]) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.trace_id = ""
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id: str | None = None
+        self.start = 0
+        self.end = 0
+        self.error: str | None = None
+        self.token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> float:
+        # Seconds
+        return (self.end - self.start) / 1e9
+
+    def __enter__(self) -> Span:
+        parent = CURRENT_SPAN.get()
+        if parent is None:
+            self.trace_id = f"{random.getrandbits(128):032x}"
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_span_id = parent.span_id
+        self.token = CURRENT_SPAN.set(self)
+        self.start = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end = time.time_ns()
+        CURRENT_SPAN.reset(self.token)
+        self.token = None
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.tracer.record(self)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_time_unix_nano": self.start,
+            "end_time_unix_nano": self.end,
+            "status": "ERROR" if self.error else "OK",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class Tracer:
+    # Records finished spans in memory, the latest max_spans are kept until
+    # they are exported. Disabled by default.
+
+    def __init__(self, max_spans: int = DEFAULT_MAX_SPANS) -> None:
+        self.__enabled = False
+        self.__spans: deque[Span] = deque(maxlen=max_spans)
+        self.__lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.__enabled
+
+    @property
+    def spans(self) -> list[Span]:
+        with self.__lock:
+            return list(self.__spans)
+
+    def enable(self, max_spans: int | None = None) -> None:
+        if max_spans is not None and max_spans != self.__spans.maxlen:
+            with self.__lock:
+                self.__spans = deque(self.__spans, maxlen=max_spans)
+        self.__enabled = True
+
+    def disable(self) -> None:
+        self.__enabled = False
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__spans.clear()
+
+    def span(self, name: str, **attributes: Any) -> Span | NoopSpan:
+        if not self.__enabled:
+            return NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def record(self, span: Span) -> None:
+        with self.__lock:
+            self.__spans.append(span)
+
+    def export(self, filepath: Path | str) -> int:
+        # Writes all recorded spans as {"spans": [...]} ordered by their start
+        spans = sorted(self.spans, key=lambda span: span.start)
+        filepath = Path(filepath)
+        tmp_filepath = filepath.with_name(f"{filepath.name}.tmp")
+        with open(tmp_filepath, "w", encoding="utf-8") as fs:
+            json.dump({"spans": [span.to_dict() for span in spans]}, fs, default=str)
+        os.replace(tmp_filepath, filepath)
+        return len(spans)
+
+
+# Tracer of the whole bot, enabled with TRACE_FILEPATH
+TRACER = Tracer()
+
+# Bound once, instrumented code does not pay for another call
+span = TRACER.span
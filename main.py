@@ -2,12 +2,21 @@ from __future__ import annotations
 
 import logging
 
+from cs2posts.archive import PostArchive
+from cs2posts.backfill import HistoryBackfill
+from cs2posts.backfill import LocalBackfillStore
 from cs2posts.bot import settings
 from cs2posts.bot.cs2 import CounterStrike2UpdateBot
+from cs2posts.bot.freshness import LocalFreshnessStore
+from cs2posts.bot.scheduler import LocalSchedulerStore
 from cs2posts.bot.spam import SpamProtector
 from cs2posts.crawler import CounterStrike2Crawler
+from cs2posts.store import LocalChatSnapshotStore
 from cs2posts.store import LocalChatStore
+from cs2posts.store import LocalKeywordStore
 from cs2posts.store import LocalLatestPostStore
+from cs2posts.store import LocalTopicStore
+from cs2posts.store import Store
 
 
 logging.basicConfig(
@@ -18,15 +27,45 @@ logging.basicConfig(
 logging.getLogger('httpx').setLevel(logging.WARNING)
 
 
+def create_chat_store() -> Store:
+    columnar = settings.CHATS_BACKEND == 'columnar'
+    if settings.LOCAL_CHAT_STORE_FORMAT == 'snapshot':
+        return LocalChatSnapshotStore(
+            settings.LOCAL_CHAT_STORE_FILEPATH, columnar=columnar)
+    return LocalChatStore(settings.LOCAL_CHAT_STORE_FILEPATH, columnar=columnar)
+
+
+def create_history_backfill(crawler: CounterStrike2Crawler) -> HistoryBackfill | None:
+    if not settings.POST_ARCHIVE_BACKFILL_SINCE:
+        return None
+    return HistoryBackfill(
+        crawler,
+        LocalBackfillStore(settings.LOCAL_BACKFILL_STORE_FILEPATH),
+        since=settings.POST_ARCHIVE_BACKFILL_SINCE,
+        windows=settings.POST_ARCHIVE_BACKFILL_WINDOWS,
+        rate=settings.POST_ARCHIVE_BACKFILL_RATE)
+
+
 def main() -> int:
+    crawler = CounterStrike2Crawler()
     cs2_update_bot = CounterStrike2UpdateBot(
-        crawler=CounterStrike2Crawler(),
+        crawler=crawler,
         spam_protector=SpamProtector(),
         local_post_store=LocalLatestPostStore(
             settings.LOCAL_LATEST_POST_STORE_FILEPATH),
-        local_chat_store=LocalChatStore(
-            settings.LOCAL_CHAT_STORE_FILEPATH),
-        token=settings.TELEGRAM_TOKEN)
+        local_chat_store=create_chat_store(),
+        local_keyword_store=LocalKeywordStore(
+            settings.LOCAL_KEYWORD_STORE_FILEPATH),
+        local_topic_store=LocalTopicStore(
+            settings.LOCAL_TOPIC_STORE_FILEPATH),
+        post_archive=PostArchive(settings.POST_ARCHIVE_FILEPATH),
+        history_backfill=create_history_backfill(crawler),
+        local_scheduler_store=LocalSchedulerStore(
+            settings.LOCAL_SCHEDULER_STORE_FILEPATH),
+        local_freshness_store=LocalFreshnessStore(
+            settings.LOCAL_FRESHNESS_STORE_FILEPATH),
+        token=settings.TELEGRAM_TOKEN,
+        base_url=settings.TELEGRAM_BASE_URL)
     cs2_update_bot.run()
 
     return 0
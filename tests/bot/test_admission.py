@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from unittest.mock import Mock
+
+import pytest
+from telegram.ext import ApplicationHandlerStop
+
+from cs2posts.bot import settings
+from cs2posts.bot.admission import ADMISSION_COMMANDS
+from cs2posts.bot.admission import ADMISSION_QUEUE_DEPTH
+from cs2posts.bot.admission import AdmissionController
+from cs2posts.bot.admission import get_command
+from cs2posts.bot.admission import Priority
+from cs2posts.bot.admission import SlidingWindow
+
+
+class FakeClock:
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def app():
+    app = Mock()
+    app.update_queue.qsize.return_value = 0
+    return app
+
+
+@pytest.fixture
+def admission(app, clock):
+    return AdmissionController(app, rate=1, window=10, overload_factor=2,
+                               max_queue_depth=100, clock=clock)
+
+
+def create_update(text):
+    update = Mock()
+    update.message.text = text
+    return update
+
+
+@pytest.mark.parametrize("text, command", [
+    ("/latest", "latest"),
+    ("/Search map changes", "search"),
+    ("/news@cs2_bot", "news"),
+    ("hello", None),
+    (None, None),
+    ("/", None),
+    ("/ ", None),
+    ("/@cs2_bot", None),
+])
+def test_admission_get_command(text, command):
+    assert get_command(create_update(text)) == command
+
+
+def test_admission_get_command_other_bot():
+    assert get_command(create_update("/news@CS2_bot"), "cs2_bot") == "news"
+    assert get_command(create_update("/news@other_bot"), "cs2_bot") is None
+    assert get_command(create_update("/news"), "cs2_bot") == "news"
+
+
+def test_admission_sliding_window(clock):
+    window = SlidingWindow(10, clock.now)
+    for _ in range(10):
+        window.add(clock.now)
+    assert window.count(clock.now) == 10
+    assert window.rate(clock.now) == 1
+
+    # Half of the previous window still overlaps
+    clock.now += 15
+    assert window.count(clock.now) == 5
+    window.add(clock.now)
+    assert window.count(clock.now) == 6
+
+    clock.now += 100
+    assert window.count(clock.now) == 0
+
+
+def test_admission_init(app):
+    admission = AdmissionController(app)
+    app.add_handler.assert_called_once()
+    assert app.add_handler.call_args.kwargs == {"group": -1}
+    assert admission.metrics()["accepted"] == 0
+    assert settings.ADMISSION_RATE > 0
+
+
+def test_admission_init_invalid(app):
+    with pytest.raises(ValueError):
+        AdmissionController(app, rate=-1)
+    with pytest.raises(ValueError):
+        AdmissionController(app, overload_factor=0.5)
+
+
+def test_admission_sheds_by_priority(admission, clock):
+    # 10 commands in the window of 10 seconds are the admitted rate
+    assert all(admission.admit(Priority.LOW) for _ in range(10))
+
+    assert admission.admit(Priority.LOW) is False
+    assert admission.admit(Priority.NORMAL)
+    assert admission.admit(Priority.HIGH)
+
+    for _ in range(10):
+        admission.admit(Priority.HIGH)
+    assert admission.load(clock.now) > 2
+    assert admission.admit(Priority.NORMAL) is False
+    assert admission.admit(Priority.HIGH)
+
+    clock.now += 100
+    assert admission.admit(Priority.LOW)
+
+    metrics = admission.metrics()
+    assert metrics["accepted_low"] == 11
+    assert metrics["shed_low"] == 1
+    assert metrics["accepted_normal"] == 1
+    assert metrics["shed_normal"] == 1
+    assert metrics["accepted_high"] == 12
+    assert metrics["shed"] == 2
+    assert metrics["accepted"] == 24
+
+
+def test_admission_sheds_on_queue_depth(admission, app):
+    app.update_queue.qsize.return_value = 101
+    assert admission.admit(Priority.NORMAL) is False
+    assert admission.admit(Priority.HIGH)
+
+    app.update_queue.qsize.return_value = 3
+    assert admission.admit(Priority.NORMAL)
+    assert admission.metrics()["queue_depth"] == 3
+    assert admission.metrics()["max_queue_depth"] == 101
+
+
+def test_admission_registry_metrics(admission, app):
+    accepted = ADMISSION_COMMANDS.labels("accepted", "low").value
+    shed = ADMISSION_COMMANDS.labels("shed", "low").value
+    for _ in range(11):
+        admission.admit(Priority.LOW)
+    assert ADMISSION_COMMANDS.labels("accepted", "low").value == accepted + 10
+    assert ADMISSION_COMMANDS.labels("shed", "low").value == shed + 1
+
+    app.update_queue.qsize.return_value = 7
+    assert ('cs2posts_admission_queue_depth', (), 7) in ADMISSION_QUEUE_DEPTH.samples()
+
+
+def test_admission_disabled(app, clock):
+    admission = AdmissionController(app, rate=0, clock=clock)
+    assert all(admission.admit(Priority.LOW) for _ in range(1000))
+
+
+@pytest.mark.asyncio
+async def test_admission_admit_update(admission):
+    context = Mock()
+    context.bot.username = "cs2_bot"
+    for _ in range(10):
+        await admission.admit_update(create_update("/latest"), context)
+
+    with pytest.raises(ApplicationHandlerStop):
+        await admission.admit_update(create_update("/search map"), context)
+    await admission.admit_update(create_update("/start"), context)
+    # Other messages, unknown commands and commands of other bots are
+    # never counted
+    await admission.admit_update(create_update("hello"), context)
+    await admission.admit_update(create_update("/unknown"), context)
+    await admission.admit_update(create_update("/latest@other_bot"), context)
+    assert admission.metrics()["accepted"] == 11
@@ -47,12 +47,12 @@ def test_chats_create(chats):
 def test_chats_update(chats):
     chat = chats.get(chat_id=2)
     assert chat.is_running is False
-    assert chat.is_banned is False
+    assert chat.is_news_interested is True
 
-    chat = Chat(2, is_running=True, is_banned=True)
+    chat = Chat(2, is_running=True, is_news_interested=False)
     chats.update(chat=chat)
     assert chat.is_running is True
-    assert chat.is_banned is True
+    assert chat.is_news_interested is False
 
 
 def test_chats_create_and_add(chats):
@@ -95,3 +95,71 @@ def test_chats_get_running_and_interested_in_updates(chats):
     chat.is_running = True
     chat.is_update_interested = True
     assert chats.get_running_and_interested_in_updates() == [chat]
+
+
+def test_chats_get_running_and_interested_in_external_news(chats):
+    assert chats.get_running_and_interested_in_external_news() == []
+    chat = chats.get(chat_id=1)
+    chat.is_running = True
+    assert chats.get_running_and_interested_in_external_news() == [chat]
+    chat.is_external_news_interested = False
+    assert chats.get_running_and_interested_in_external_news() == []
+
+
+def test_chats_audience_follows_flag_changes(chats):
+    chat = chats.get(chat_id=2)
+    chat.is_running = True
+    assert chats.get_running_and_interested_in_news() == [chat]
+
+    chat.is_news_interested = False
+    assert chats.get_running_and_interested_in_news() == []
+    assert chats.get_running_and_interested_in_updates() == [chat]
+
+    chat.is_running = False
+    assert chats.get_running_and_interested_in_updates() == []
+
+
+def test_chats_audience_remove(chats):
+    chat = chats.get(chat_id=1)
+    chat.is_running = True
+    chats.remove(chat)
+    assert chats.get_running_chats() == []
+
+    # Removed chats do not affect the audience anymore
+    chat.is_running = False
+    chat.is_running = True
+    assert chats.get_running_chats() == []
+
+
+def test_chats_audience_added_running_chat(chats):
+    chat = Chat(4, is_running=True)
+    chats.add(chat)
+    assert chats.get_running_chats() == [chat]
+
+
+def test_chats_audience_update_replaces_chat(chats):
+    old_chat = chats.get(chat_id=2)
+    new_chat = Chat(2, is_running=True)
+    chats.update(new_chat)
+    assert chats.get_running_chats() == [new_chat]
+
+    old_chat.is_running = True
+    assert chats.get_running_chats() == [new_chat]
+    new_chat.is_running = False
+    assert chats.get_running_chats() == []
+
+
+def test_chats_audience_migrate(chats):
+    chat = chats.get(chat_id=1)
+    chat.is_running = True
+    chats.migrate(chat, new_chat_id=42)
+    assert chats.get_running_chats() == [chat]
+    assert chats.get_running_chats()[0].chat_id == 42
+
+
+def test_chats_list_is_snapshot(chats):
+    snapshot = chats.chats
+    assert chats.chats is snapshot
+    chats.add(Chat(4))
+    assert len(snapshot) == 3
+    assert len(chats.chats) == 4
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import io
+from datetime import datetime
+from unittest.mock import AsyncMock
+
+import pytest
+
+from cs2posts.bot.chats import Chat
+from cs2posts.bot.columnar import ChatView
+from cs2posts.bot.columnar import ColumnarChats
+from cs2posts.bot.snapshot import ChatSnapshotCodec
+from cs2posts.bot.spam import SpamProtector
+
+
+@pytest.fixture
+def chats():
+    return ColumnarChats(chats=[Chat(1), Chat(2), Chat(3)])
+
+
+def test_columnar_chats_contains(chats):
+    assert chats.contains(chat_id=1) is True
+    assert Chat(1) in chats
+    assert Chat(4) not in chats
+
+
+def test_columnar_chats_get(chats):
+    chat = chats.get(chat_id=1)
+    assert isinstance(chat, ChatView)
+    assert chat == Chat(1)
+    assert chats.get(chat_id=4) is None
+
+
+def test_columnar_chats_view_hash(chats):
+    assert hash(chats.get(1)) == hash(chats.get(1))
+    assert {chats.get(1), chats.get(1), chats.get(2)} == {chats.get(1), chats.get(2)}
+
+
+def test_columnar_chats_view_writes_columns(chats):
+    last_activity = datetime(2024, 4, 16, 12, 30, 15, 123000)
+    chat = chats.get(chat_id=2)
+    chat.chat_id_admin = 1337
+    chat.is_running = True
+    chat.is_news_interested = False
+    chat.last_activity = last_activity
+
+    assert chats.get(chat_id=2).to_chat() == Chat(
+        2, chat_id_admin=1337, is_running=True,
+        is_news_interested=False, last_activity=last_activity)
+
+
+def test_columnar_chats_remove_moves_last_row(chats):
+    chats.get(chat_id=3).is_running = True
+    chats.remove(Chat(1))
+
+    assert len(chats) == 2
+    assert Chat(1) not in chats
+    assert chats.get(chat_id=3).is_running
+    assert [chat.chat_id for chat in chats] == [3, 2]
+
+
+def test_columnar_chats_update(chats):
+    chats.update(Chat(2, is_running=True, is_news_interested=False))
+    chat = chats.get(chat_id=2)
+    assert chat.is_running is True
+    assert chat.is_news_interested is False
+
+
+def test_columnar_chats_create_and_add(chats):
+    chat = chats.create_and_add(chat_id=4)
+    chat.chat_id_admin = 42
+    assert chats.get(chat_id=4).chat_id_admin == 42
+
+
+def test_columnar_chats_migrate(chats):
+    chat = chats.get(chat_id=1)
+    chat.is_running = True
+    chat = chats.migrate(chat, new_chat_id=-100)
+
+    assert chat.chat_id == -100
+    assert chats.get(chat_id=1) is None
+    assert chats.get(chat_id=-100).is_running
+
+
+def test_columnar_chats_audiences(chats):
+    assert chats.get_running_and_interested_in_news() == []
+
+    chats.get(chat_id=1).is_running = True
+    chats.get(chat_id=2).is_running = True
+    chats.get(chat_id=2).is_update_interested = False
+
+    assert chats.get_running_chats() == [Chat(1, is_running=True), Chat(
+        2, is_running=True, is_update_interested=False)]
+    assert chats.get_audience_ids("running_news") == [1, 2]
+    assert chats.get_audience_ids("running_updates") == [1]
+    assert chats.get_audience_ids("running_external_news") == [1, 2]
+    assert chats.count_audience("running") == 2
+    assert len(chats.get_interested_in_updates()) == 2
+
+
+@pytest.mark.asyncio
+async def test_columnar_chats_view_with_spam_protector(chats):
+    # Spam checks keep their own state, the stored chats stay untouched
+    spam_protector = SpamProtector(rate=1, burst=1)
+    for _ in range(2):
+        await spam_protector.check(AsyncMock(), 1)
+    assert spam_protector.strikes(1) == 1
+    assert chats.get(chat_id=1) == Chat(1)
+
+
+def test_columnar_chats_from_snapshot(chats):
+    chats.get(chat_id=2).is_running = True
+
+    fs = io.BytesIO()
+    ChatSnapshotCodec.write_records(fs, chats.iter_records(), len(chats))
+    actual = ColumnarChats.from_snapshot(fs.getvalue())
+
+    assert len(actual) == 3
+    assert actual.get_audience_ids("running") == [2]
+
+
+def test_columnar_chats_to_chats(chats):
+    assert chats.to_chats() == [Chat(1), Chat(2), Chat(3)]
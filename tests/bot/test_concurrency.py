@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+from telegram import Update
+
+from cs2posts.bot import settings
+from cs2posts.bot.concurrency import get_chat_id
+from cs2posts.bot.concurrency import PerChatUpdateProcessor
+
+
+def create_update(chat_id):
+    update = Mock(spec=Update)
+    update.effective_chat.id = chat_id
+    return update
+
+
+async def handle(events, name, started=None, release=None):
+    events.append(f"{name} start")
+    if started is not None:
+        started.set()
+    if release is not None:
+        await release.wait()
+    await asyncio.sleep(0)
+    events.append(f"{name} end")
+
+
+def test_get_chat_id():
+    assert get_chat_id(create_update(42)) == 42
+    assert get_chat_id(object()) is None
+
+    update = Mock(spec=Update)
+    update.effective_chat = None
+    assert get_chat_id(update) is None
+
+
+def test_per_chat_update_processor_init():
+    processor = PerChatUpdateProcessor()
+    assert processor.concurrency == settings.UPDATE_CONCURRENCY
+    assert processor.max_concurrent_updates == settings.UPDATE_MAX_PENDING
+    assert processor.pending == 0
+    assert len(processor) == 0
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"concurrency": 0, "max_pending": 1},
+    {"concurrency": 4, "max_pending": 2},
+])
+def test_per_chat_update_processor_init_invalid(kwargs):
+    with pytest.raises(ValueError):
+        PerChatUpdateProcessor(**kwargs)
+
+
+@pytest.mark.asyncio
+async def test_per_chat_update_processor_keeps_chat_order():
+    processor = PerChatUpdateProcessor(concurrency=8, max_pending=16)
+    events = []
+    release = asyncio.Event()
+    started = asyncio.Event()
+
+    first = asyncio.create_task(processor.process_update(
+        create_update(1), handle(events, "a", started, release)))
+    await started.wait()
+    second = asyncio.create_task(processor.process_update(
+        create_update(1), handle(events, "b")))
+    await asyncio.sleep(0.01)
+
+    # The second update of the chat waits for the first one
+    assert events == ["a start"]
+    assert processor.pending == 2
+    assert processor.running == 1
+    assert len(processor) == 1
+
+    release.set()
+    await asyncio.gather(first, second)
+    assert events == ["a start", "a end", "b start", "b end"]
+    assert processor.pending == 0
+    assert len(processor) == 0
+
+
+@pytest.mark.asyncio
+async def test_per_chat_update_processor_runs_chats_concurrently():
+    processor = PerChatUpdateProcessor(concurrency=8, max_pending=16)
+    events = []
+    release = asyncio.Event()
+    started = asyncio.Event()
+
+    slow = asyncio.create_task(processor.process_update(
+        create_update(1), handle(events, "slow", started, release)))
+    await started.wait()
+    # Another chat is not blocked by the slow handler
+    await processor.process_update(create_update(2), handle(events, "fast"))
+    assert events == ["slow start", "fast start", "fast end"]
+
+    release.set()
+    await slow
+    assert events[-1] == "slow end"
+
+
+@pytest.mark.asyncio
+async def test_per_chat_update_processor_limits_concurrency():
+    processor = PerChatUpdateProcessor(concurrency=2, max_pending=16)
+    release = asyncio.Event()
+    running = []
+    max_running = 0
+
+    async def handler():
+        nonlocal max_running
+        running.append(1)
+        max_running = max(max_running, len(running))
+        await release.wait()
+        running.pop()
+
+    tasks = [asyncio.create_task(processor.process_update(create_update(i), handler()))
+             for i in range(5)]
+    await asyncio.sleep(0.01)
+    assert processor.running == 2
+    assert processor.pending == 5
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert max_running == 2
+    assert processor.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_per_chat_update_processor_flooding_chat_keeps_slots_free():
+    processor = PerChatUpdateProcessor(concurrency=2, max_pending=16)
+    events = []
+    release = asyncio.Event()
+    started = asyncio.Event()
+
+    tasks = [asyncio.create_task(processor.process_update(
+        create_update(1), handle(events, "flood 0", started, release)))]
+    await started.wait()
+    tasks += [asyncio.create_task(processor.process_update(
+        create_update(1), handle(events, f"flood {i}"))) for i in range(1, 5)]
+    await asyncio.sleep(0.01)
+
+    # Updates waiting for their chat do not take a handler slot
+    await processor.process_update(create_update(2), handle(events, "other"))
+    assert "other end" in events
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert [event for event in events if event.endswith("start")][1:] == [
+        "other start", "flood 1 start", "flood 2 start", "flood 3 start",
+        "flood 4 start"]
+
+
+@pytest.mark.asyncio
+async def test_per_chat_update_processor_releases_chat_on_error():
+    processor = PerChatUpdateProcessor(concurrency=1, max_pending=1)
+
+    async def fail():
+        raise RuntimeError("handler failed")
+
+    with pytest.raises(RuntimeError):
+        await processor.process_update(create_update(1), fail())
+    assert len(processor) == 0
+    assert processor.pending == 0
+
+    events = []
+    await processor.process_update(create_update(1), handle(events, "next"))
+    assert events == ["next start", "next end"]
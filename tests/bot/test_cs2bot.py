@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import asyncio
+import json
+from dataclasses import replace
 from unittest.mock import AsyncMock
 from unittest.mock import Mock
 from unittest.mock import patch
@@ -8,11 +11,21 @@ import pytest
 from telegram import Update
 from telegram.constants import ChatType
 from telegram.error import BadRequest
+from telegram.error import ChatMigrated
 from telegram.error import Forbidden
+from telegram.error import RetryAfter
 
+import cs2posts.bot.constants as const
+from cs2posts.bot import cs2
+from cs2posts.bot import settings
 from cs2posts.bot.chats import Chat
+from cs2posts.bot.chats import Chats
 from cs2posts.bot.cs2 import CounterStrike2UpdateBot
+from cs2posts.metrics import REGISTRY
 from cs2posts.post import Post
+from cs2posts.post import PostKind
+from cs2posts.store import LocalLatestPostStore
+from cs2posts.tracing import TRACER
 
 
 def create_update_post():
@@ -69,11 +82,13 @@ def test_cs2_bot_init_no_files(bot):
 
     bot.local_post_store.is_empty.return_value = True
     bot.local_post_store.is_empty.assert_called()
-    bot.crawler.crawl.assert_called()
-    bot.local_post_store.save.assert_called()
     bot.local_chat_store.save.assert_called()
 
-    # TODO finish up setup
+    # Posts are crawled in the background after startup
+    bot.crawler.crawl.assert_not_called()
+    bot.local_post_store.save.assert_not_called()
+    assert bot.latest_post is None
+    assert bot.is_warm is False
 
 
 @pytest.mark.asyncio
@@ -194,7 +209,6 @@ async def test_cs2_bot_start_command_new_user(bot):
     mocked_update.message.from_user.id = 42
 
     chat = Chat(42)
-    bot.is_running = False
     bot.chats.get.return_value = None
     bot.chats.create_and_add.return_value = chat
 
@@ -203,14 +217,13 @@ async def test_cs2_bot_start_command_new_user(bot):
 
     bot.chats.create_and_add.assert_called_once_with(chat_id=chat.chat_id)
     bot.local_chat_store.save.call_count == 2
-    bot.spam_protector.update_chat_activity.assert_called_once_with(chat)
     assert chat.chat_id_admin == mocked_update.message.from_user.id
 
     assert chat.is_running
     mocked_update.message.reply_text.assert_called_once()
 
-    mocked_context.job_queue.run_repeating.assert_called_once()
-    assert bot.is_running
+    # Posts are checked from startup on, not from the first /start
+    mocked_context.job_queue.run_repeating.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -224,8 +237,6 @@ async def test_cs2_bot_start_command_existing_user(bot):
 
     chat = Chat(42)
     chat.is_running = True
-    chat.is_removed_while_banned = True
-    bot.is_running = True
     bot.chats.get.return_value = chat
 
     bot.local_chat_store.reset_mock()
@@ -236,7 +247,6 @@ async def test_cs2_bot_start_command_existing_user(bot):
     mocked_update.message.reply_text.assert_called_once()
 
     mocked_context.job_queue.run_repeating.assert_not_called()
-    assert chat.is_removed_while_banned is False
 
 
 @pytest.mark.asyncio
@@ -262,8 +272,8 @@ async def test_cs2_bot_stop_command_chat_is_banned(bot):
     mocked_update = AsyncMock()
 
     chat = Chat(42)
-    chat.is_banned = True
     bot.chats.get.return_value = chat
+    bot.spam_protector.check.return_value = False
 
     bot.local_chat_store.reset_mock()
     await bot.stop(mocked_update, mocked_context)
@@ -335,7 +345,7 @@ async def test_cs2_bot_latest_command(bot):
     bot.chats.get.return_value = chat
     bot.latest_post = Mock()
 
-    with patch('cs2posts.bot.message.TelegramMessageFactory.create') as mocked_factory:
+    with patch('cs2posts.bot.message.TelegramMessageFactory.create_async') as mocked_factory:
         mocked_msg = Mock()
         mocked_factory.return_value = mocked_msg
         bot.send_message = AsyncMock()
@@ -354,7 +364,7 @@ async def test_cs2_bot_news_command(bot):
     bot.chats.get.return_value = chat
     bot.latest_news_post = Mock()
 
-    with patch('cs2posts.bot.message.TelegramMessageFactory.create') as mocked_factory:
+    with patch('cs2posts.bot.message.TelegramMessageFactory.create_async') as mocked_factory:
         mocked_msg = Mock()
         mocked_factory.return_value = mocked_msg
         bot.send_message = AsyncMock()
@@ -373,7 +383,7 @@ async def test_cs2_bot_update_command(bot):
     bot.chats.get.return_value = chat
     bot.latest_update_post = Mock()
 
-    with patch('cs2posts.bot.message.TelegramMessageFactory.create') as mocked_factory:
+    with patch('cs2posts.bot.message.TelegramMessageFactory.create_async') as mocked_factory:
         mocked_msg = Mock()
         mocked_factory.return_value = mocked_msg
         bot.send_message = AsyncMock()
@@ -422,17 +432,16 @@ async def test_cs2_bot_post_checker_new_news_and_update_post(bot):
 @pytest.mark.asyncio
 async def test_cs2_bot_send_news_post_to_chats(bot):
     mocked_context = AsyncMock()
-    mocked_post = Mock()
+    mocked_post = Mock(date=1234567890, kind=PostKind.NEWS)
     mocked_post.is_news.return_value = True
-    bot.chats.get_running_and_interested_in_news.return_value = [Chat(13)]
+    bot.chats.get_audience.return_value = [Chat(13)]
     bot.send_message = AsyncMock()
 
-    with patch('cs2posts.bot.message.TelegramMessageFactory.create') as mocked_factory:
+    with patch('cs2posts.bot.message.TelegramMessageFactory.create_async') as mocked_factory:
         mocked_msg = Mock()
         mocked_factory.return_value = mocked_msg
         await bot.send_post_to_chats(mocked_context, mocked_post)
-        bot.chats.get_running_and_interested_in_news.assert_called_once()
-        bot.chats.get_running_and_interested_in_updates.assert_not_called()
+        bot.chats.get_audience.assert_called_once_with("running_news")
         mocked_factory.assert_called_once_with(post=mocked_post)
         bot.send_message.assert_called_with(
             context=mocked_context, msg=mocked_msg, chat=Chat(13))
@@ -441,18 +450,17 @@ async def test_cs2_bot_send_news_post_to_chats(bot):
 @pytest.mark.asyncio
 async def test_cs2_bot_send_update_post_to_chats(bot):
     mocked_context = AsyncMock()
-    mocked_post = Mock()
+    mocked_post = Mock(date=1234567890, kind=PostKind.UPDATE)
     mocked_post.is_news.return_value = False
     mocked_post.is_update.return_value = True
-    bot.chats.get_running_and_interested_in_updates.return_value = [Chat(13)]
+    bot.chats.get_audience.return_value = [Chat(13)]
     bot.send_message = AsyncMock()
 
-    with patch('cs2posts.bot.message.TelegramMessageFactory.create') as mocked_factory:
+    with patch('cs2posts.bot.message.TelegramMessageFactory.create_async') as mocked_factory:
         mocked_msg = Mock()
         mocked_factory.return_value = mocked_msg
         await bot.send_post_to_chats(mocked_context, mocked_post)
-        bot.chats.get_running_and_interested_in_updates.assert_called_once()
-        bot.chats.get_running_and_interested_in_news.assert_not_called()
+        bot.chats.get_audience.assert_called_once_with("running_updates")
         mocked_factory.assert_called_once_with(post=mocked_post)
         bot.send_message.assert_called_with(
             context=mocked_context, msg=mocked_msg, chat=Chat(13))
@@ -467,10 +475,9 @@ async def test_cs2_bot_send_unknown_post_to_chats(bot):
     mocked_post.is_external.return_value = False
     bot.send_message = AsyncMock()
 
-    with patch('cs2posts.bot.message.TelegramMessageFactory.create') as mocked_factory:
+    with patch('cs2posts.bot.message.TelegramMessageFactory.create_async') as mocked_factory:
         await bot.send_post_to_chats(mocked_context, mocked_post)
-        bot.chats.get_running_and_interested_in_updates.assert_not_called()
-        bot.chats.get_running_and_interested_in_news.assert_not_called()
+        bot.chats.get_audience.assert_not_called()
         mocked_factory.assert_not_called()
         bot.send_message.assert_not_awaited()
 
@@ -511,6 +518,7 @@ async def test_cs2_bot_send_message_raises_bad_request_chat_not_found(bot):
     mocked_msg.send.assert_called_once_with(
         mocked_context.bot, chat_id=chat.chat_id)
     bot.chats.remove.assert_called_once_with(chat)
+    bot.spam_protector.remove.assert_called_once_with(chat.chat_id)
 
 
 @pytest.mark.asyncio
@@ -543,6 +551,33 @@ async def test_cs2_bot_send_message_raises_forbidden(bot):
     bot.chats.remove.assert_called_once_with(chat)
 
 
+@pytest.mark.asyncio
+async def test_cs2_bot_send_message_retries_after_flood_control(bot):
+    mocked_context = AsyncMock()
+    mocked_msg = AsyncMock()
+    mocked_msg.send.side_effect = [RetryAfter(2), None]
+    chat = Chat(42)
+
+    with patch('cs2posts.bot.cs2.asyncio.sleep') as mocked_sleep:
+        await bot.send_message(mocked_context, mocked_msg, chat)
+
+    mocked_sleep.assert_awaited_once_with(2)
+    assert mocked_msg.send.call_count == 2
+    bot.chats.remove.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_send_message_gives_up_after_retries(bot):
+    mocked_context = AsyncMock()
+    mocked_msg = AsyncMock()
+    mocked_msg.send.side_effect = RetryAfter(1)
+
+    with patch('cs2posts.bot.cs2.asyncio.sleep'):
+        await bot.send_message(mocked_context, mocked_msg, Chat(42), retries=2)
+
+    assert mocked_msg.send.call_count == 3
+
+
 @pytest.mark.asyncio
 async def test_cs2_bot_send_message_raises_exception(bot):
     mocked_context = AsyncMock()
@@ -563,3 +598,400 @@ def test_cs2_bot_run(bot):
     bot.run()
     bot.app.run_polling.assert_called_once_with(
         allowed_updates=Update.ALL_TYPES)
+
+
+def test_cs2_bot_run_webhook(bot):
+    bot.app = Mock()
+    bot.run_webhook = Mock()
+    with patch('cs2posts.bot.settings.WEBHOOK_URL', 'https://example.com/hook'):
+        bot.run()
+    bot.run_webhook.assert_called_once_with('https://example.com/hook')
+    bot.app.run_polling.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_post_init_serves_metrics_privately_in_webhook_mode(bot):
+    bot.warm_up = AsyncMock()
+    bot.scheduler = Mock()
+    bot.loop_lag_monitor = Mock()
+    app = Mock()
+    with patch('cs2posts.bot.settings.WEBHOOK_URL', 'https://example.com/hook'), \
+            patch('cs2posts.bot.settings.METRICS_PORT', 9100), \
+            patch('cs2posts.bot.cs2.WebhookServer') as mocked_server:
+        mocked_server.return_value.start = AsyncMock()
+        await bot.post_init(app)
+        await bot.warm_up_task
+
+    mocked_server.assert_called_once_with(
+        app, listen=settings.METRICS_LISTEN, port=9100, url_path=None)
+    mocked_server.return_value.start.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_serve_webhook(bot):
+    bot.app = AsyncMock()
+    bot.post_init = AsyncMock()
+    bot.post_shutdown = AsyncMock()
+    server = AsyncMock()
+    server.secret_token = 'secret'
+    stop = asyncio.Event()
+    stop.set()
+
+    await bot.serve_webhook(server, 'https://example.com/hook', stop=stop)
+
+    server.start.assert_awaited_once()
+    bot.app.bot.set_webhook.assert_awaited_once_with(
+        url='https://example.com/hook', secret_token='secret',
+        allowed_updates=Update.ALL_TYPES)
+    server.stop.assert_awaited_once()
+    bot.app.stop.assert_awaited_once()
+    bot.app.shutdown.assert_awaited_once()
+    bot.post_shutdown.assert_awaited_once_with(bot.app)
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_send_post_to_chats_filters_watched_keywords(bot):
+    mocked_context = AsyncMock()
+    post = create_update_post()
+    bot.chats.get_audience.return_value = [Chat(1), Chat(2), Chat(3)]
+    bot.keywords.subscribe(2, "test body")
+    bot.keywords.subscribe(3, "mirage")
+    bot.send_message = AsyncMock()
+
+    await bot.send_post_to_chats(mocked_context, post)
+
+    chats = [call.kwargs['chat'] for call in bot.send_message.call_args_list]
+    assert chats == [Chat(1), Chat(2)]
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_send_post_to_chats_adds_topic_subscribers(bot):
+    mocked_context = AsyncMock()
+    post = create_update_post()
+    bot.chats.get_audience.return_value = [Chat(1)]
+    bot.chats.get.side_effect = lambda chat_id: Chat(chat_id, is_running=True)
+    bot.topic_subscriptions.subscribe(2, "tag:patchnotes")
+    bot.topic_subscriptions.subscribe(3, "major")
+    bot.topic_subscriptions.subscribe(4, "update+tag:patchnotes")
+    bot.topic_subscriptions.subscribe(5, "news+tag:patchnotes")
+    bot.send_message = AsyncMock()
+
+    await bot.send_post_to_chats(mocked_context, post)
+
+    chats = [call.kwargs['chat'] for call in bot.send_message.call_args_list]
+    assert chats == [Chat(1), Chat(2, is_running=True), Chat(4, is_running=True)]
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_post_checker_archives_posts(bot):
+    bot.post_archive = Mock()
+    bot.crawler.crawl.return_value = {
+        "appnews": {"newsitems": [create_news_post().to_dict()]}}
+    bot.latest_post = create_news_post()
+    bot.latest_news_post = create_news_post()
+    bot.latest_update_post = create_update_post()
+    bot.latest_external_post = create_news_post()
+    bot.send_post_to_chats = AsyncMock()
+
+    await bot.post_checker(AsyncMock())
+
+    bot.post_archive.add.assert_called_once_with([create_news_post()])
+
+
+@patch('cs2posts.bot.spam.SpamProtector')
+@patch('cs2posts.store.LocalChatStore')
+@patch('cs2posts.store.LocalLatestPostStore')
+@patch('cs2posts.crawler.CounterStrike2Crawler')
+@pytest.mark.asyncio
+async def test_cs2_bot_runs_history_backfill(mocked_crawler, mocked_post_store,
+                                             mocked_chat_store, mocked_spam_protector):
+    archive = Mock()
+    backfill = Mock()
+    backfill.run_async = AsyncMock()
+    bot = CounterStrike2UpdateBot(
+        token='test_token',
+        local_chat_store=mocked_chat_store,
+        local_post_store=mocked_post_store,
+        crawler=mocked_crawler,
+        spam_protector=mocked_spam_protector,
+        post_archive=archive,
+        history_backfill=backfill)
+    backfill.run_async.assert_not_called()
+
+    await bot.warm_up()
+    backfill.run_async.assert_awaited_once_with(archive)
+    archive.add.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_warm_up_backfills_empty_archive(bot):
+    bot.post_archive = Mock()
+    bot.post_archive.is_empty.return_value = True
+    bot.history_backfill = None
+
+    await bot.warm_up()
+    bot.post_archive.backfill.assert_called_once_with(
+        bot.crawler, settings.POST_ARCHIVE_BACKFILL_COUNT)
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_warm_up_fetches_latest_posts(bot):
+    bot.latest_post = None
+    bot.post_store = AsyncMock()
+    news_post = replace(create_news_post(), date=1713310428)
+    update_post = replace(create_update_post(), date=1713310429)
+    bot.crawler.crawl.return_value = {"appnews": {"newsitems": [
+        update_post.to_dict(), news_post.to_dict()]}}
+
+    await bot.warm_up()
+
+    assert bot.is_warm
+    assert bot.latest_news_post == news_post
+    assert bot.latest_update_post == update_post
+    assert bot.latest_post == update_post
+    assert bot.post_store.save.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_warm_up_crawl_fails(bot):
+    bot.latest_post = None
+    bot.crawler.crawl.side_effect = TimeoutError
+
+    await bot.warm_up()
+    assert bot.is_warm is False
+
+
+@patch('cs2posts.bot.spam.SpamProtector')
+@patch('cs2posts.store.LocalChatStore')
+@patch('cs2posts.crawler.CounterStrike2Crawler')
+@pytest.mark.asyncio
+async def test_cs2_bot_starts_with_partial_post_store(mocked_crawler, mocked_chat_store,
+                                                      mocked_spam_protector, tmp_path):
+    post_store = LocalLatestPostStore(tmp_path / "latest.json")
+    news_post = replace(create_news_post(), date=1713310428)
+    post_store.save(news_post)
+
+    bot = CounterStrike2UpdateBot(
+        token='test_token',
+        local_chat_store=mocked_chat_store,
+        local_post_store=post_store,
+        crawler=mocked_crawler,
+        spam_protector=mocked_spam_protector)
+
+    # Whatever is persisted is served, the other kinds are crawled
+    assert bot.latest_news_post == news_post
+    assert bot.latest_update_post is None
+    assert bot.latest_external_post is None
+    assert bot.latest_post == news_post
+
+    crawled_news_post = replace(create_news_post(), gid="newer", date=1713310430)
+    update_post = replace(create_update_post(), date=1713310429)
+    mocked_crawler.crawl.return_value = {"appnews": {"newsitems": [
+        crawled_news_post.to_dict(), update_post.to_dict()]}}
+    await bot.warm_up()
+    bot.post_store.close()
+
+    assert bot.latest_news_post == news_post
+    assert bot.latest_update_post == update_post
+    assert bot.latest_post == update_post
+    assert post_store.get_latest_news_post() == news_post
+    assert post_store.get_latest_update_post() == update_post
+    assert post_store.get_latest_external_post() is None
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_post_init_does_not_wait_for_warm_up(bot):
+    release = asyncio.Event()
+
+    async def warm_up():
+        await release.wait()
+
+    bot.warm_up = warm_up
+    bot.scheduler = Mock()
+    bot.loop_lag_monitor = Mock()
+    await bot.post_init(Mock())
+    assert not bot.warm_up_task.done()
+    bot.scheduler.start.assert_called_once()
+
+    release.set()
+    await bot.warm_up_task
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("command", ["latest", "news", "update", "external"])
+async def test_cs2_bot_latest_commands_before_warm_up(bot, command):
+    bot.latest_post = None
+    bot.latest_news_post = None
+    bot.latest_update_post = None
+    bot.latest_external_post = None
+    bot.send_message = AsyncMock()
+    update = AsyncMock()
+
+    await getattr(bot, command)(update, AsyncMock())
+
+    update.message.reply_text.assert_awaited_once_with(
+        const.POSTS_NOT_READY_MESSAGE_ENGLISH)
+    bot.send_message.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_post_checker_sets_missing_baseline(bot):
+    post = replace(create_news_post(), date=1713310428)
+    bot.crawler.crawl.return_value = {"appnews": {"newsitems": [post.to_dict()]}}
+    bot.latest_post = None
+    bot.latest_news_post = None
+    bot.latest_update_post = None
+    bot.latest_external_post = None
+    bot.send_post_to_chats = AsyncMock()
+
+    await bot.post_checker(AsyncMock())
+
+    # Nothing is broadcast, the post was published before the bot started
+    bot.send_post_to_chats.assert_not_called()
+    assert bot.latest_news_post == post
+    assert bot.latest_post == post
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_create_message_is_cached(bot):
+    post = create_news_post()
+    with patch('cs2posts.bot.message.TelegramMessageFactory.create_async') as mocked_factory:
+        assert await bot.create_message(post) is await bot.create_message(post)
+        mocked_factory.assert_awaited_once_with(post)
+
+
+def test_cs2_bot_init_concurrent_updates(bot):
+    assert bot.app.update_processor is bot.update_processor
+    assert bot.update_processor.concurrency == settings.UPDATE_CONCURRENCY
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_send_message_chat_migrated_after_removal(bot):
+    bot.chats = Chats()
+    mocked_context = AsyncMock()
+    mocked_msg = AsyncMock()
+    mocked_msg.send.side_effect = ChatMigrated(43)
+    chat = Chat(42)
+
+    # The chat left while the message was being sent
+    await bot.send_message(mocked_context, mocked_msg, chat)
+    mocked_msg.send.assert_called_once()
+    assert len(bot.chats) == 0
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_send_message_metrics(bot):
+    sent = cs2.MESSAGES_SENT.value
+    forbidden = cs2.SEND_ERRORS.labels("Forbidden").value
+    mocked_msg = AsyncMock()
+
+    await bot.send_message(AsyncMock(), mocked_msg, Chat(42))
+    assert cs2.MESSAGES_SENT.value == sent + 1
+
+    mocked_msg.send.side_effect = Forbidden("blocked")
+    await bot.send_message(AsyncMock(), mocked_msg, Chat(42))
+    assert cs2.MESSAGES_SENT.value == sent + 1
+    assert cs2.SEND_ERRORS.labels("Forbidden").value == forbidden + 1
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_send_post_to_chats_outbox_depth(bot):
+    bot.chats = Chats([Chat(1, is_running=True), Chat(2, is_running=True)])
+    depths = []
+
+    async def send_message(context, msg, chat):
+        depths.append(cs2.OUTBOX_DEPTH.value)
+
+    bot.send_message = send_message
+    with patch('cs2posts.bot.message.TelegramMessageFactory.create_async'):
+        await bot.send_post_to_chats(AsyncMock(), create_news_post())
+
+    assert depths == [2, 1]
+    assert cs2.OUTBOX_DEPTH.value == 0
+
+
+def test_cs2_bot_chat_metrics(bot):
+    bot.chats = Chats([Chat(1, is_running=True), Chat(2, is_news_interested=False)])
+    metrics = bot.chat_metrics()
+    assert metrics[("total",)] == 2
+    assert metrics[("running",)] == 1
+    assert metrics[("news",)] == 1
+    assert "cs2posts_chats{state=\"running_news\"} 1" in REGISTRY.render()
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_send_post_to_chats_records_freshness(bot):
+    bot.chats = Chats([Chat(1, is_running=True), Chat(2, is_running=True),
+                       Chat(3, is_running=True)])
+    post = create_news_post()
+
+    async def send_message(context, msg, chat):
+        return chat.chat_id != 2
+
+    bot.send_message = send_message
+    with patch('cs2posts.bot.message.TelegramMessageFactory.create_async'):
+        await bot.send_post_to_chats(AsyncMock(), post, seen=1713310428.0)
+
+    timeline = bot.freshness.get(post.gid)
+    assert timeline.seen == 1713310428.0
+    assert timeline.rendered is not None
+    # Failed deliveries are not counted
+    assert timeline.deliveries == 2
+    assert timeline.first_delivery <= timeline.last_delivery
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_stats(bot, monkeypatch):
+    monkeypatch.setattr(settings, 'BOT_ADMIN_USER_IDS', frozenset([7]))
+    mocked_update = AsyncMock()
+    mocked_update.effective_user.id = 8
+
+    await bot.stats(mocked_update, AsyncMock())
+    mocked_update.message.reply_text.assert_not_called()
+    # Rejected users spend their tokens like for any other command
+    bot.spam_protector.check.assert_awaited_once()
+
+    mocked_update.effective_user = None
+    await bot.stats(mocked_update, AsyncMock())
+    mocked_update.message.reply_text.assert_not_called()
+
+    mocked_update.effective_user = Mock(id=7)
+    await bot.stats(mocked_update, AsyncMock())
+    mocked_update.message.reply_text.assert_called_once()
+    assert "Post Freshness" in mocked_update.message.reply_text.call_args.kwargs["text"]
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_stats_spam_protected(bot, monkeypatch):
+    monkeypatch.setattr(settings, 'BOT_ADMIN_USER_IDS', frozenset([7]))
+    bot.spam_protector.check.return_value = False
+    mocked_update = AsyncMock()
+    mocked_update.effective_user.id = 7
+
+    await bot.stats(mocked_update, AsyncMock())
+    mocked_update.message.reply_text.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_post_checker_exports_trace(bot, monkeypatch, tmp_path):
+    filepath = tmp_path / "trace.json"
+    monkeypatch.setattr(settings, 'TRACE_FILEPATH', str(filepath))
+    bot.crawler.crawl.side_effect = Exception("Exception")
+
+    TRACER.clear()
+    TRACER.enable()
+    try:
+        await bot.post_checker(context=AsyncMock())
+    finally:
+        TRACER.disable()
+        TRACER.clear()
+
+    spans = json.loads(filepath.read_text())["spans"]
+    assert [span["name"] for span in spans] == ["post_check"]
+
+
+@pytest.mark.asyncio
+async def test_cs2_bot_export_trace_disabled(bot, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, 'TRACE_FILEPATH', str(tmp_path / "trace.json"))
+    await bot.export_trace()
+    assert not (tmp_path / "trace.json").exists()
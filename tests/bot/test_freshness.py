@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import pytest
+
+from cs2posts.bot import freshness
+from cs2posts.bot.freshness import FreshnessCodec
+from cs2posts.bot.freshness import FreshnessMessageFactory
+from cs2posts.bot.freshness import FreshnessTracker
+from cs2posts.bot.freshness import LocalFreshnessStore
+from cs2posts.bot.freshness import PostTimeline
+from cs2posts.post import Post
+from cs2posts.post import PostKind
+
+
+class FakeClock:
+
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def create_post(i: int = 0, title: str = "Release Notes") -> Post:
+    return Post(gid=str(5762994032385146001 + i),
+                title=title,
+                url=f"https://example.com/{i}",
+                is_external_url=False,
+                author="author",
+                contents="contents",
+                feedlabel="Community Announcements",
+                date=1_700_000_000 - 600 + i,
+                feedname="steam_community_announcements",
+                feed_type=1,
+                appid=730,
+                tags=["patchnotes"])
+
+
+def create_timeline(i: int = 0) -> PostTimeline:
+    return PostTimeline(str(5762994032385146001 + i), PostKind.UPDATE,
+                        1_700_000_000, 1_700_000_300.5, 1_700_000_300.75,
+                        1_700_000_301.0, 1_700_000_360.25, 1000)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalFreshnessStore(tmp_path / "freshness.bin")
+
+
+def test_post_timeline_delays():
+    timeline = create_timeline()
+    assert timeline.seen_delay == 300.5
+    assert timeline.render_delay == 0.25
+    assert timeline.first_delivery_delay == 301.0
+    assert timeline.last_delivery_delay == 360.25
+    assert timeline.fan_out == 59.25
+
+    timeline = PostTimeline("1", PostKind.NEWS, 1_700_000_000, 1_700_000_300.0)
+    assert timeline.render_delay is None
+    assert timeline.first_delivery_delay is None
+    assert timeline.fan_out is None
+
+
+def test_freshness_codec_roundtrip():
+    timelines = [create_timeline(0),
+                 PostTimeline("5762994032385146002", PostKind.EXTERNAL,
+                              1_700_000_000, 1_700_000_010.0)]
+    data = FreshnessCodec.encode(timelines)
+    assert len(data) == FreshnessCodec.HEADER.size + 2 * 49
+    assert FreshnessCodec.decode(data) == timelines
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"XXXX" + bytes(10),
+    FreshnessCodec.HEADER.pack(FreshnessCodec.MAGIC, 99, 0),
+    FreshnessCodec.HEADER.pack(FreshnessCodec.MAGIC, FreshnessCodec.VERSION, 1),
+])
+def test_freshness_codec_invalid(data):
+    with pytest.raises(ValueError):
+        FreshnessCodec.decode(data)
+
+
+def test_freshness_store(store):
+    assert store.is_empty()
+    store.save([create_timeline()])
+    assert store.load() == [create_timeline()]
+    assert not store.is_empty()
+
+
+def test_freshness_store_corrupt(store):
+    store.filepath.write_bytes(b"garbage")
+    assert store.load() == []
+
+
+def test_freshness_tracker_timeline(clock):
+    tracker = FreshnessTracker(clock=clock)
+    post = create_post()
+
+    timeline = tracker.seen(post)
+    assert timeline.published == post.date
+    assert timeline.seen == clock.now
+    assert timeline.kind is PostKind.UPDATE
+
+    clock.now += 0.5
+    tracker.rendered(timeline)
+    clock.now += 1
+    tracker.delivered(timeline)
+    clock.now += 10
+    tracker.delivered(timeline)
+
+    assert timeline.render_delay == 0.5
+    assert timeline.first_delivery_delay == 600 + 1.5
+    assert timeline.fan_out == 10
+    assert timeline.deliveries == 2
+
+    # Found again by a later check, e.g. a broadcast of an edited post
+    assert tracker.seen(post, at=clock.now) is timeline
+    assert timeline.seen == 1_700_000_000.0
+
+
+def test_freshness_tracker_keeps_latest_posts(clock):
+    tracker = FreshnessTracker(max_posts=2, clock=clock)
+    for i in range(3):
+        tracker.seen(create_post(i))
+
+    assert len(tracker) == 2
+    assert tracker.get(create_post(0).gid) is None
+    assert [timeline.gid for timeline in tracker.timelines] == [
+        create_post(1).gid, create_post(2).gid]
+
+
+@pytest.mark.asyncio
+async def test_freshness_tracker_finish(store, clock):
+    tracker = FreshnessTracker(store=store, clock=clock)
+    last_delivery = freshness.LAST_DELIVERY_DELAY_SECONDS.labels("update")
+    count = sum(last_delivery.counts)
+    total = last_delivery.sum
+
+    timeline = tracker.seen(create_post())
+    tracker.rendered(timeline)
+    clock.now += 30
+    tracker.delivered(timeline)
+    await tracker.finish(timeline)
+    tracker.close()
+
+    assert sum(last_delivery.counts) == count + 1
+    assert last_delivery.sum == pytest.approx(total + 630)
+    assert FreshnessTracker(store=store).timelines == [timeline]
+
+
+@pytest.mark.asyncio
+async def test_freshness_tracker_finish_without_deliveries(clock):
+    tracker = FreshnessTracker(clock=clock)
+    fan_out = freshness.FAN_OUT_SECONDS.labels("update")
+    count = sum(fan_out.counts)
+
+    await tracker.finish(tracker.seen(create_post()))
+    assert sum(fan_out.counts) == count
+
+
+def test_freshness_message():
+    text = FreshnessMessageFactory.create([create_timeline(0), create_timeline(1)])
+    assert text.startswith("<b>Post Freshness</b>")
+    assert "Posts: 2" in text
+    assert "Publish → last chat: median 6.0m, max 6.0m" in text
+    assert "seen +5.0m, rendered +0.2s, first +5.0m, last +6.0m (1000 chats)" in text
+
+
+def test_freshness_message_lists_latest_posts():
+    timelines = [create_timeline(i) for i in range(3)]
+    for i, timeline in enumerate(timelines):
+        timeline.published += i * 3600
+
+    text = FreshnessMessageFactory.create(timelines, count=2)
+    assert text.count("(1000 chats)") == 2
+    # Newest first
+    assert text.index("00:13") < text.index("23:13")
+
+
+def test_freshness_message_empty():
+    assert "No posts were broadcast yet." in FreshnessMessageFactory.create([])
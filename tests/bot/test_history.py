@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from unittest.mock import AsyncMock
+from unittest.mock import Mock
+
+import pytest
+
+from cs2posts.archive import PostArchive
+from cs2posts.bot.history import CALLBACK_CLOSE
+from cs2posts.bot.history import Direction
+from cs2posts.bot.history import History
+from cs2posts.bot.history import HistoryCallback
+from cs2posts.post import Post
+from cs2posts.post import PostKind
+
+
+def create_post(i: int, title: str = "News") -> Post:
+    return Post(gid=str(5762994032385146001 + i),
+                title=title,
+                url=f"https://example.com/{i}",
+                is_external_url=True,
+                author="author",
+                contents=f"[list][*]Content {i}[/list]",
+                feedlabel="feedlabel",
+                date=1700000000 + i * 60,
+                feedname="feedname",
+                feed_type=1,
+                appid=730)
+
+
+@pytest.fixture
+def history():
+    archive = PostArchive(":memory:")
+    archive.add([create_post(i, "Release Notes" if i % 2 else "News")
+                 for i in range(12)])
+    history = History(Mock())
+    history.set_archive(archive)
+    history.set_spam_protector(Mock(check=AsyncMock(return_value=True)))
+    yield history
+    archive.close()
+
+
+def gids(page) -> list[str]:
+    return [summary.gid[-2:] for summary in page.summaries]
+
+
+def test_history_callback_roundtrip():
+    data = HistoryCallback.encode(
+        PostKind.UPDATE, Direction.OLDER, (1713310428, "5762994032385146001"))
+    assert len(data.encode()) <= 64
+    assert HistoryCallback.decode(data) == (
+        PostKind.UPDATE, Direction.OLDER, (1713310428, "5762994032385146001"))
+
+
+def test_history_load_pages(history, monkeypatch):
+    monkeypatch.setattr('cs2posts.bot.history.settings.HISTORY_PAGE_SIZE', 2)
+
+    first = history.load_page(PostKind.UPDATE)
+    assert gids(first) == ["12", "10"]
+    assert not first.has_newer and first.has_older
+
+    second = history.load_page(PostKind.UPDATE, first.summaries[-1].cursor, Direction.OLDER)
+    assert gids(second) == ["08", "06"]
+    assert second.has_newer and second.has_older
+
+    last = history.load_page(PostKind.UPDATE, (1700000000 + 3 * 60, "5762994032385146004"))
+    assert gids(last) == ["02"]
+    assert last.has_newer and not last.has_older
+
+    back = history.load_page(PostKind.UPDATE, second.summaries[0].cursor, Direction.NEWER)
+    assert gids(back) == gids(first)
+    assert not back.has_newer and back.has_older
+
+
+@pytest.mark.asyncio
+async def test_history_command(history):
+    mocked_update = AsyncMock()
+    mocked_context = AsyncMock()
+    mocked_context.args = ["update"]
+
+    await history.history(mocked_update, mocked_context)
+
+    kwargs = mocked_update.message.reply_text.call_args.kwargs
+    assert "History - Updates" in kwargs['text']
+    assert "Content 11" in kwargs['text']
+    assert "[list]" not in kwargs['text']
+
+
+@pytest.mark.asyncio
+async def test_history_command_spam_protected(history):
+    history.spam_protector.check.return_value = False
+    mocked_update = AsyncMock()
+    mocked_context = AsyncMock()
+    mocked_context.args = []
+
+    await history.history(mocked_update, mocked_context)
+
+    history.spam_protector.check.assert_awaited_once_with(
+        mocked_context.bot, mocked_update.message.chat_id)
+    mocked_update.message.reply_text.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_history_command_invalid_kind(history):
+    mocked_update = AsyncMock()
+    mocked_context = AsyncMock()
+    mocked_context.args = ["unknown"]
+
+    await history.history(mocked_update, mocked_context)
+
+    mocked_update.message.reply_text.assert_awaited_once_with(
+        'Usage: /history [news|update|external]')
+
+
+@pytest.mark.asyncio
+async def test_history_button_edits_message(history):
+    page = history.load_page(None)
+    mocked_update = AsyncMock()
+    mocked_update.callback_query.data = HistoryCallback.encode(
+        None, Direction.OLDER, page.summaries[-1].cursor)
+
+    await history.button(mocked_update, AsyncMock())
+
+    mocked_update.callback_query.edit_message_text.assert_awaited_once()
+    text = mocked_update.callback_query.edit_message_text.call_args.kwargs['text']
+    assert "Content 6" in text
+
+
+@pytest.mark.asyncio
+async def test_history_button_spam_protected(history):
+    history.spam_protector.check.return_value = False
+    page = history.load_page(None)
+    mocked_update = AsyncMock()
+    mocked_update.callback_query.data = HistoryCallback.encode(
+        None, Direction.OLDER, page.summaries[-1].cursor)
+    mocked_context = AsyncMock()
+
+    await history.button(mocked_update, mocked_context)
+
+    history.spam_protector.check.assert_awaited_once_with(
+        mocked_context.bot, mocked_update.effective_chat.id)
+    mocked_update.callback_query.answer.assert_awaited_once()
+    mocked_update.callback_query.edit_message_text.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_history_button_close(history):
+    mocked_update = AsyncMock()
+    mocked_update.callback_query.data = CALLBACK_CLOSE
+
+    await history.button(mocked_update, AsyncMock())
+
+    mocked_update.callback_query.delete_message.assert_awaited_once()
+    mocked_update.callback_query.edit_message_text.assert_not_awaited()
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import pytest
+
+from cs2posts.bot.chats import Chat
+from cs2posts.bot.keywords import KeywordMatcher
+from cs2posts.bot.keywords import KeywordSubscriptions
+from cs2posts.bot.keywords import normalize_keyword
+from cs2posts.post import Post
+
+
+def create_post(title: str, contents: str = "") -> Post:
+    return Post(gid="1",
+                title=title,
+                url="url",
+                is_external_url=False,
+                author="author",
+                contents=contents,
+                feedlabel="feedlabel",
+                feedname="feedname",
+                date=1234567890,
+                feed_type=1,
+                appid=730)
+
+
+def test_keywords_normalize_keyword():
+    assert normalize_keyword("  Anti   Cheat ") == "anti cheat"
+    assert normalize_keyword("   ") == ""
+
+
+def test_keywords_matcher_overlapping_keywords():
+    matcher = KeywordMatcher(["he", "she", "his", "hers"])
+    assert matcher.match("ushers") == set()
+    assert matcher.match("she said hers, not his") == {"she", "hers", "his"}
+
+
+def test_keywords_matcher_whole_words_only():
+    matcher = KeywordMatcher(["premier", "anti-cheat"])
+    assert matcher.match("Premiere") == set()
+    assert matcher.match("Premier season") == {"premier"}
+    assert matcher.match("New anti-cheat.") == {"anti-cheat"}
+
+
+def test_keywords_matcher_add_and_remove():
+    matcher = KeywordMatcher(["mirage"])
+    assert matcher.match("mirage and inferno") == {"mirage"}
+
+    matcher.add("inferno")
+    assert matcher.match("mirage and inferno") == {"mirage", "inferno"}
+
+    matcher.remove("mirage")
+    matcher.remove("unknown")
+    assert matcher.match("mirage and inferno") == {"inferno"}
+
+    matcher.add("mirage")
+    assert matcher.match("mirage and inferno") == {"mirage", "inferno"}
+
+
+def test_keywords_subscriptions_subscribe_and_unsubscribe():
+    subscriptions = KeywordSubscriptions()
+    assert subscriptions.subscribe(1, " Mirage ") == "mirage"
+    subscriptions.subscribe(2, "mirage")
+    subscriptions.subscribe(2, "inferno")
+
+    assert subscriptions.match("Mirage update") == {1, 2}
+    assert subscriptions.match("Inferno update") == {2}
+
+    subscriptions.unsubscribe(2, "MIRAGE")
+    assert subscriptions.get(2) == ["inferno"]
+    assert subscriptions.match("Mirage update") == {1}
+
+    subscriptions.unsubscribe(1, "mirage")
+    assert not subscriptions.is_watching(1)
+    assert subscriptions.match("Mirage update") == set()
+
+
+def test_keywords_subscriptions_subscribe_empty():
+    with pytest.raises(ValueError):
+        KeywordSubscriptions().subscribe(1, "  ")
+
+
+def test_keywords_subscriptions_remove_and_migrate_chat():
+    subscriptions = KeywordSubscriptions()
+    subscriptions.subscribe(1, "mirage")
+    subscriptions.subscribe(1, "inferno")
+
+    subscriptions.migrate(1, 10)
+    assert subscriptions.get(1) == []
+    assert subscriptions.get(10) == ["inferno", "mirage"]
+
+    subscriptions.remove_chat(10)
+    assert len(subscriptions) == 0
+    assert subscriptions.match("mirage inferno") == set()
+
+
+def test_keywords_subscriptions_json_roundtrip():
+    subscriptions = KeywordSubscriptions()
+    subscriptions.subscribe(1, "mirage")
+    subscriptions.subscribe(2, "premier")
+
+    data = subscriptions.to_json()
+    assert data == {"1": ["mirage"], "2": ["premier"]}
+    assert KeywordSubscriptions.from_json(data).to_json() == data
+
+
+def test_keywords_subscriptions_filter():
+    subscriptions = KeywordSubscriptions()
+    chats = [Chat(1), Chat(2), Chat(3)]
+    post = create_post("Release Notes", "[list][*] Mirage: fixed a bug[/list]")
+
+    assert subscriptions.filter(chats, post) is chats
+
+    subscriptions.subscribe(2, "mirage")
+    subscriptions.subscribe(3, "inferno")
+    assert subscriptions.filter(chats, post) == [Chat(1), Chat(2)]
+
+
+def test_keywords_subscriptions_filter_plain_text():
+    subscriptions = KeywordSubscriptions()
+    chats = [Chat(1), Chat(2)]
+    post = create_post("Release Notes", "[b]Anubis[/b] [img]https://cdn.example.com/list.png[/img]")
+
+    subscriptions.subscribe(1, "anubis")
+    subscriptions.subscribe(2, "img")
+    assert subscriptions.filter(chats, post) == [Chat(1)]
@@ -64,7 +64,6 @@ def test_counter_strike_update_message(mocked_cs2_update_post):
     with patch('requests.get') as mocked_get:
         mocked_get.return_value.ok = True
         mocked_get.return_value.url = "https://test.com"
-        mocked_cs2_update_post.body = "[ UI ]\n[list]\n[*]Fixed cases where there was a visible delay loading map images in the Play menu\n[*]Fixed a bug where items that can't be equipped were visible in the Loadout menu\n[*]Fixed a bug where loadout items couldn't be unequipped\n[*]Fixed a bug where loadout changes weren't saved if the game was quit shortly after making changes\n[*]Fixed a bug where loadout changes on the main menu character were delayed\n[/list]\n[ MISC ]\n[list]\n[*]Fixed some visual issues with demo playback\n[*]Fixed an issue where animations would not play back correctly in a CSTV broadcast\n[*]Adjusted wear values of some community stickers to better match CS:GO\n[/list]\n[ MAPS ]\n[i]Ancient:[/i][list]\n[*]Added simplified grenade collisions to corner trims and central pillar on B site\n[/list]\n[i]Anubis:[/i][list]\n[*]Adjusted clipping at A site steps between Walkway and Heaven\n[/list]"
         msg = CounterStrikeUpdateMessage(post=mocked_cs2_update_post)
         expected = "<b>Release Notes for 2/13/2009</b>\n(2009-02-13 23:31:30)\n\nmy content(Author: Valve)\n\nSource: <a href='https://test.com'>Link</a>"
         assert len(msg.messages) == 1
@@ -101,6 +100,22 @@ async def test_telegram_message_send_news(mocked_cs2_news_post):
         assert mocked_bot.send_message.called
 
 
+@pytest.mark.asyncio
+async def test_telegram_message_send_news_to_many_chats(mocked_cs2_news_post):
+    mocked_cs2_news_post = Post(**{**mocked_cs2_news_post.to_dict(), "contents": "This is a test message."})
+    with patch('requests.get') as mocked_get:
+        mocked_get.return_value.url = "https://test.com"
+        msg = TelegramMessageFactory.create(mocked_cs2_news_post)
+
+    mocked_bot = AsyncMock()
+    await msg.send(bot=mocked_bot, chat_id=1)
+    await msg.send(bot=mocked_bot, chat_id=2)
+
+    first, second = mocked_bot.send_message.call_args_list
+    assert first.kwargs["text"] == second.kwargs["text"]
+    assert first.kwargs["text"].count("<b>Some News</b>") == 1
+
+
 @pytest.mark.asyncio
 async def test_telegram_message_send_update(mocked_cs2_update_post):
     with patch('requests.get') as mocked_get:
@@ -113,3 +128,24 @@ async def test_telegram_message_send_update(mocked_cs2_update_post):
 
     mocked_bot.send_photo.assert_not_called()
     mocked_bot.send_message.assert_called()
+
+
+@pytest.mark.asyncio
+async def test_telegram_message_factory_create_async(mocked_cs2_update_post):
+    with patch('cs2posts.bot.message.Utils.get_redirected_url',
+               return_value="https://resolved.com") as mocked_redirect:
+        msg = await TelegramMessageFactory.create_async(mocked_cs2_update_post)
+    mocked_redirect.assert_called_once_with("https://test.com")
+    assert msg.message.endswith("Source: <a href='https://resolved.com'>Link</a>")
+
+
+@pytest.mark.asyncio
+async def test_telegram_message_is_valid_url_caches_valid_urls(mocked_cs2_news_post):
+    msg = CounterStrikeNewsMessage(mocked_cs2_news_post, url="https://test.com")
+    with patch('cs2posts.bot.message.Utils.is_valid_url',
+               side_effect=[False, True]) as mocked_is_valid_url:
+        # A failed check is repeated, a successful one is remembered
+        assert await msg.is_valid_url("https://example.com/image.jpg") is False
+        assert await msg.is_valid_url("https://example.com/image.jpg") is True
+        assert await msg.is_valid_url("https://example.com/image.jpg") is True
+    assert mocked_is_valid_url.call_count == 2
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import asyncio
+import time
+from types import SimpleNamespace
 from unittest.mock import AsyncMock
 from unittest.mock import Mock
 from unittest.mock import patch
@@ -7,15 +10,18 @@ from unittest.mock import patch
 import pytest
 
 from cs2posts.bot.chats import Chat
+from cs2posts.bot.chats import Chats
 from cs2posts.bot.options import ButtonData
 from cs2posts.bot.options import Options
+from cs2posts.store import LocalChatStore
+from cs2posts.store import ThreadedStore
 
 
 @pytest.fixture
 def options():
     options = Options(Mock())
     options.set_chats(Mock())
-    options.set_chats_store(Mock())
+    options.set_chats_store(AsyncMock())
     return options
 
 
@@ -211,3 +217,61 @@ async def test_options_close(options):
     mocked_context.bot.delete_message.assert_awaited_once()
     mocked_context.bot.delete_message.assert_called_once_with(
         chat_id=42, message_id=1337)
+
+
+@pytest.mark.asyncio
+async def test_options_buttons_do_not_block_event_loop(tmp_path):
+    save_duration = 0.05
+    store = LocalChatStore(tmp_path / "chats.json")
+    chats = Chats(chats=[Chat(i, chat_id_admin=i) for i in range(100)])
+    store.save(chats)
+
+    blocking_save = store.save
+
+    def slow_save(data):
+        time.sleep(save_duration)
+        blocking_save(data)
+
+    store.save = slow_save
+    threaded_store = ThreadedStore(store)
+
+    async def noop(*args):
+        pass
+
+    options = Options(Mock())
+    options.set_chats(chats)
+    options.set_chats_store(threaded_store)
+    options.update = noop
+
+    # Plain objects instead of mocks, call recording would dominate the lag
+    updates = []
+    for chat_id in range(len(chats)):
+        query = SimpleNamespace(
+            answer=noop,
+            data=ButtonData.NEWS.value,
+            from_user=SimpleNamespace(id=chat_id),
+            message=SimpleNamespace(chat_id=chat_id))
+        updates.append(SimpleNamespace(callback_query=query))
+
+    max_lag = 0.0
+    done = asyncio.Event()
+
+    async def measure_lag():
+        nonlocal max_lag
+        loop = asyncio.get_running_loop()
+        while not done.is_set():
+            start = loop.time()
+            await asyncio.sleep(0.001)
+            max_lag = max(max_lag, loop.time() - start - 0.001)
+
+    lag_task = asyncio.create_task(measure_lag())
+    await asyncio.gather(*[options.button(updates[i % len(updates)], None)
+                           for i in range(1_000)])
+    done.set()
+    await lag_task
+    threaded_store.close()
+
+    # Every chat has been toggled an even number of times
+    assert all(chat.is_news_interested for chat in store.load())
+    # A blocking save would stall the loop for at least save_duration
+    assert max_lag < save_duration / 2
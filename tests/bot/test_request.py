@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import pytest
+from telegram import Bot
+
+from cs2posts.bot.message import TelegramMessageFactory
+from cs2posts.bot.request import TracedRequest
+from cs2posts.fake.telegram import FakeTelegramBotAPI
+from cs2posts.post import Post
+from cs2posts.tracing import span
+from cs2posts.tracing import TRACER
+
+
+@pytest.fixture
+def api():
+    with FakeTelegramBotAPI() as api:
+        yield api
+
+
+@pytest.fixture
+def tracer():
+    TRACER.clear()
+    TRACER.enable()
+    yield TRACER
+    TRACER.disable()
+    TRACER.clear()
+
+
+def create_bot(api: FakeTelegramBotAPI) -> Bot:
+    return Bot("123:fake", base_url=api.base_url, request=TracedRequest())
+
+
+def create_update_post() -> Post:
+    return Post(gid="5762994032385146001",
+                title="Release Notes for 4/17/2024",
+                url="https://example.com/1",
+                is_external_url=False,
+                author="author",
+                contents="[ MAPS ][list][*]Fixed a bug.[/list]",
+                feedlabel="Community Announcements",
+                date=1713310428,
+                feedname="steam_community_announcements",
+                feed_type=1,
+                appid=730,
+                tags=["patchnotes"])
+
+
+@pytest.mark.asyncio
+async def test_traced_request_disabled(api):
+    async with create_bot(api) as bot:
+        await bot.send_message(chat_id=1, text="Hello")
+    assert TRACER.spans == []
+
+
+@pytest.mark.asyncio
+async def test_traced_request_spans(api, tracer):
+    async with create_bot(api) as bot:
+        with span("send", chat_id=1) as send:
+            await bot.send_message(chat_id=1, text="Hello")
+
+    bot_api = [span for span in tracer.spans if span.parent_span_id == send.span_id]
+    assert len(bot_api) == 1
+    assert bot_api[0].name == "bot_api"
+    assert bot_api[0].attributes == {
+        "method": "sendMessage", "chat_id": 1, "status_code": 200}
+
+
+@pytest.mark.asyncio
+async def test_traced_render_and_send(api, tracer, tmp_path):
+    with patch('cs2posts.bot.utils.Utils.get_redirected_url', side_effect=lambda url: url):
+        async with create_bot(api) as bot:
+            with span("broadcast"):
+                msg = TelegramMessageFactory.create(create_update_post())
+                await msg.send(bot, chat_id=1)
+
+    # getMe of the bot initialization is a trace of its own
+    broadcast = tracer.spans[-1]
+    spans = [span for span in tracer.spans if span.trace_id == broadcast.trace_id]
+    names = [span.name for span in spans]
+    assert [span.attributes["parser"] for span in spans if span.name == "parser"] == [
+        "bbcode", "SteamListParser", "SteamUpdateHeadingParser"]
+    assert names.count("split") == 1
+    assert names.count("bot_api") == 1
+    assert names[-1] == "broadcast"
+
+    # Rendering is one span within the broadcast, the parsers within it
+    render = spans[names.index("render")]
+    assert render.parent_span_id == broadcast.span_id
+    assert spans[0].parent_span_id == render.span_id
+    assert tracer.export(tmp_path / "trace.json") == len(tracer.spans)
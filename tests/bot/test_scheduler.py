@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock
+from unittest.mock import Mock
+
+import pytest
+
+from cs2posts.bot import settings
+from cs2posts.bot.scheduler import LocalSchedulerStore
+from cs2posts.bot.scheduler import PostCheckScheduler
+
+
+class FakeClock:
+
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalSchedulerStore(tmp_path / "scheduler.json")
+
+
+def test_scheduler_store(store):
+    assert store.load() is None
+    store.save(1234.5)
+    assert store.load() == 1234.5
+    assert not store.is_empty()
+
+
+def test_scheduler_init():
+    scheduler = PostCheckScheduler(AsyncMock())
+    assert scheduler.interval == settings.CS2_UPDATE_CHECK_INTERVAL
+    assert scheduler.last_run is None
+    assert scheduler.is_running is False
+
+
+@pytest.mark.parametrize("kwargs", [{"interval": 0}, {"jitter": -1}])
+def test_scheduler_init_invalid(kwargs):
+    with pytest.raises(ValueError):
+        PostCheckScheduler(AsyncMock(), **kwargs)
+
+
+def test_scheduler_next_delay(store, clock):
+    # Never checked before
+    scheduler = PostCheckScheduler(AsyncMock(), interval=900, store=store, clock=clock)
+    assert scheduler.next_delay() == 0
+
+    store.save(clock.now - 300)
+    scheduler = PostCheckScheduler(AsyncMock(), interval=900, store=store, clock=clock)
+    assert scheduler.next_delay() == 600
+
+    # The bot was down for longer than the interval
+    clock.now += 3600
+    assert scheduler.next_delay() == 0
+
+    # The clock went back
+    clock.now -= 7200
+    assert scheduler.next_delay() == 900
+
+
+@pytest.mark.asyncio
+async def test_scheduler_run_persists_last_run(store, clock):
+    callback = AsyncMock()
+    scheduler = PostCheckScheduler(callback, interval=900, store=store, clock=clock)
+    context = Mock()
+
+    await scheduler.run(context)
+    callback.assert_awaited_once_with(context)
+    assert scheduler.last_run == clock.now
+    assert scheduler.runs == 1
+    await scheduler.stop()
+
+    assert PostCheckScheduler(AsyncMock(), store=store, clock=clock).last_run == clock.now
+
+
+@pytest.mark.asyncio
+async def test_scheduler_run_survives_failing_check(clock):
+    scheduler = PostCheckScheduler(AsyncMock(side_effect=RuntimeError), clock=clock)
+    await scheduler.run(Mock())
+    assert scheduler.last_run == clock.now
+
+
+@pytest.mark.asyncio
+async def test_scheduler_catches_up_on_start(store, clock):
+    store.save(clock.now - 3600)
+    checked = asyncio.Event()
+    scheduler = PostCheckScheduler(AsyncMock(side_effect=lambda _: checked.set()),
+                                   interval=900, jitter=0, store=store, clock=clock)
+
+    scheduler.start(Mock())
+    assert scheduler.is_running
+    await asyncio.wait_for(checked.wait(), timeout=1)
+    assert scheduler.runs == 1
+
+    await scheduler.stop()
+    assert scheduler.is_running is False
+
+
+@pytest.mark.asyncio
+async def test_scheduler_runs_repeatedly():
+    loop = asyncio.get_running_loop()
+    runs = []
+    checked = asyncio.Event()
+
+    async def callback(context):
+        runs.append(loop.time())
+        if len(runs) == 3:
+            checked.set()
+
+    scheduler = PostCheckScheduler(callback, interval=0.01, jitter=0)
+    scheduler.start(Mock())
+    # Starting twice does not run the check twice as often
+    scheduler.start(Mock())
+    await asyncio.wait_for(checked.wait(), timeout=1)
+    await scheduler.stop()
+
+    assert all(later - earlier >= 0.009 for earlier, later in zip(runs, runs[1:]))
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from unittest.mock import AsyncMock
+from unittest.mock import Mock
+
+import pytest
+
+from cs2posts.archive import PostArchive
+from cs2posts.bot.search import Search
+from cs2posts.bot.search import SearchMessageFactory
+from cs2posts.post import Post
+
+
+def create_post(i: int, title: str) -> Post:
+    return Post(gid=str(5762994032385146001 + i),
+                title=title,
+                url=f"https://example.com/{i}",
+                is_external_url=True,
+                author="author",
+                contents=f"[list][*]Content {i}[/list]",
+                feedlabel="feedlabel",
+                date=1700000000 + i * 60,
+                feedname="feedname",
+                feed_type=1,
+                appid=730)
+
+
+@pytest.fixture
+def search():
+    archive = PostArchive(":memory:")
+    archive.add([create_post(0, "Anubis <Update>"), create_post(1, "Premier")])
+    search = Search(Mock())
+    search.set_archive(archive)
+    search.set_spam_protector(Mock(check=AsyncMock(return_value=True)))
+    yield search
+    archive.close()
+
+
+def test_search_message_factory_create_text(search):
+    text = SearchMessageFactory.create_text("anubis", search.archive.search("anubis"))
+    assert "1. <a href='https://example.com/0'>Anubis &lt;Update&gt;</a> (2023-11-14)" in text
+
+    text = SearchMessageFactory.create_text("<nuke>", [])
+    assert "&lt;nuke&gt;" in text
+    assert "No matching posts found." in text
+
+
+@pytest.mark.asyncio
+async def test_search_command(search):
+    update = AsyncMock()
+    context = Mock()
+    context.args = ["Anubis"]
+    await search.search(update, context)
+
+    kwargs = update.message.reply_text.call_args.kwargs
+    assert "Anubis &lt;Update&gt;" in kwargs["text"]
+    assert "Premier" not in kwargs["text"]
+    assert kwargs["disable_web_page_preview"]
+
+
+@pytest.mark.asyncio
+async def test_search_command_usage(search):
+    update = AsyncMock()
+    context = Mock()
+    context.args = []
+    await search.search(update, context)
+    update.message.reply_text.assert_called_once_with('Usage: /search <terms>')
+
+
+@pytest.mark.asyncio
+async def test_search_command_spam_protected(search):
+    search.spam_protector.check.return_value = False
+    update = AsyncMock()
+    context = Mock()
+    context.args = ["Anubis"]
+    await search.search(update, context)
+
+    search.spam_protector.check.assert_awaited_once_with(
+        context.bot, update.message.chat_id)
+    update.message.reply_text.assert_not_called()
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import io
+from datetime import datetime
+
+import pytest
+
+from cs2posts.bot.chats import Chat
+from cs2posts.bot.chats import Chats
+from cs2posts.bot.snapshot import ChatFlags
+from cs2posts.bot.snapshot import ChatSnapshotCodec
+
+
+@pytest.fixture
+def chats():
+    return Chats(chats=[
+        Chat(1),
+        Chat(-1001234567890, chat_id_admin=42, is_running=True,
+             is_news_interested=False,
+             last_activity=datetime(2024, 4, 16, 12, 30, 15, 123000)),
+        Chat(3, is_external_news_interested=False),
+    ])
+
+
+def encode(chats) -> bytes:
+    fs = io.BytesIO()
+    ChatSnapshotCodec.write(fs, chats)
+    return fs.getvalue()
+
+
+def test_snapshot_record_size():
+    assert ChatSnapshotCodec.RECORD.size == 25
+
+
+def test_snapshot_roundtrip(chats):
+    buffer = encode(chats)
+    assert len(buffer) == ChatSnapshotCodec.HEADER.size + \
+        len(chats) * ChatSnapshotCodec.RECORD.size
+
+    actual = ChatSnapshotCodec.decode(buffer)
+    assert len(actual) == len(chats)
+    for chat in chats:
+        assert actual.get(chat.chat_id) == chat
+
+
+def test_snapshot_encode_flags():
+    chat = Chat(1, is_running=True, is_news_interested=False,
+                is_update_interested=False, is_external_news_interested=False)
+    assert ChatSnapshotCodec.encode_flags(chat) == ChatFlags.IS_RUNNING
+
+
+def test_snapshot_iter_records_streams_chunks(chats, monkeypatch):
+    monkeypatch.setattr(ChatSnapshotCodec, "CHUNK_RECORDS", 1)
+    records = list(ChatSnapshotCodec.iter_records(encode(chats)))
+    assert [record[0] for record in records] == [
+        chat.chat_id for chat in chats]
+
+
+def test_snapshot_read_header_empty():
+    assert ChatSnapshotCodec.read_header(encode(Chats())) == 0
+
+
+def test_snapshot_invalid_magic(chats):
+    buffer = b"XXXX" + encode(chats)[4:]
+    with pytest.raises(ValueError):
+        ChatSnapshotCodec.read_header(buffer)
+
+
+def test_snapshot_truncated(chats):
+    buffer = encode(chats)[:-1]
+    with pytest.raises(ValueError):
+        list(ChatSnapshotCodec.iter_records(buffer))
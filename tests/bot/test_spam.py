@@ -1,9 +1,6 @@
 from __future__ import annotations
 
-from datetime import datetime
-from datetime import timedelta
 from unittest.mock import AsyncMock
-from zoneinfo import ZoneInfo
 
 import pytest
 from telegram.constants import ParseMode
@@ -14,151 +11,249 @@ from cs2posts.bot.spam import SpamProtector
 from cs2posts.bot.spam import SpamProtectorMessages
 
 
-@pytest.fixture
-def chat():
-    return Chat(chat_id=1337)
+class FakeClock:
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
 
 
 @pytest.fixture
-def spam_protector():
-    return SpamProtector()
+def clock():
+    return FakeClock()
 
 
-def get_utc_now():
-    return datetime.now(tz=ZoneInfo('UTC')).replace(tzinfo=None)
+@pytest.fixture
+def spam_protector(clock):
+    return SpamProtector(rate=1, burst=1, max_strikes=3, ban_timeout=180,
+                         clock=clock)
 
 
-def test_spam_protector_messages_warning(chat: Chat):
-    chat.strikes = 1
-    max_strikes = 3
+def test_spam_protector_messages_warning():
     expected = "<b>Spamming</b> bot results in Timeout <b>(1/3)</b>."
-    assert SpamProtectorMessages.warning(chat, max_strikes) == expected
+    assert SpamProtectorMessages.warning(1, 3) == expected
 
 
-def test_spam_protector_messages_banned(chat: Chat):
-    chat.strikes = 3
-    timout = 180
-    max_strikes = 3
+def test_spam_protector_messages_banned():
     expected = "<b>Strike (3/3)</b> Chat is now <b>banned</b> for spamming (Timeout: 3 mins)."
-    assert SpamProtectorMessages.banned(chat, timout, max_strikes) == expected
+    assert SpamProtectorMessages.banned(3, 180, 3) == expected
+
 
+def test_spam_protector_init():
+    spam_protector = SpamProtector()
+    assert spam_protector.max_strikes == settings.CHAT_MAX_STRIKES
+    assert spam_protector.ban_timeout == settings.CHAT_BAN_TIMEOUT_SECONDS
+    assert len(spam_protector) == 0
 
-def test_spam_protector_init(spam_protector):
-    assert spam_protector.MAX_STRIKES == settings.CHAT_MAX_STRIKES
-    assert spam_protector.BAN_TIMEOUT == settings.CHAT_BAN_TIMEOUT_SECONDS
 
+@pytest.mark.parametrize("kwargs", [
+    {"rate": 0}, {"burst": 0}, {"max_strikes": 0}])
+def test_spam_protector_init_invalid(kwargs):
+    with pytest.raises(ValueError):
+        SpamProtector(**kwargs)
 
-def test_spam_protector_update_chat_activity(spam_protector, chat):
-    spam_protector.update_chat_activity(chat)
-    assert chat.last_activity is not None
 
+def test_spam_protector_consume(spam_protector, clock):
+    assert spam_protector.consume(1, clock.now) is None
+    assert spam_protector.consume(1, clock.now + 0.5) is not None
+    assert spam_protector.consume(1, clock.now + 1.5) is None
+    # Other chats have their own bucket
+    assert spam_protector.consume(2, clock.now + 1.5) is None
+    assert len(spam_protector) == 2
 
-def test_spam_protector_increase_strike_level(spam_protector, chat):
-    spam_protector.increase_strike_level(chat)
-    assert chat.strikes == 1
-    spam_protector.increase_strike_level(chat)
-    assert chat.strikes == 2
-    spam_protector.increase_strike_level(chat)
-    assert chat.strikes == 3
-    spam_protector.increase_strike_level(chat)
-    assert chat.strikes == 3
 
+def test_spam_protector_consume_burst(clock):
+    spam_protector = SpamProtector(rate=1, burst=3, clock=clock)
+    assert [spam_protector.consume(1, clock.now) is None
+            for _ in range(4)] == [True, True, True, False]
+    # Idle chats do not save up more than the burst
+    clock.now += 3600
+    assert [spam_protector.consume(1, clock.now) is None
+            for _ in range(4)] == [True, True, True, False]
 
-def test_spam_protector_reduce_strike_level(spam_protector, chat):
-    chat.strikes = 3
-    spam_protector.reduce_strike_level(chat)
-    assert chat.strikes == 2
-    spam_protector.reduce_strike_level(chat)
-    assert chat.strikes == 1
-    spam_protector.reduce_strike_level(chat)
-    assert chat.strikes == 0
-    spam_protector.reduce_strike_level(chat)
-    assert chat.strikes == 0
 
+def test_spam_protector_ban_unban(spam_protector, clock):
+    spam_protector.ban(1)
+    assert spam_protector.is_banned(1)
+    clock.now += 180
+    assert spam_protector.is_banned(1) is False
 
-def test_spam_protector_is_spamming(spam_protector, chat):
-    chat.last_activity = get_utc_now()
-    assert spam_protector.is_spamming(chat)
-    chat.last_activity = get_utc_now(
-    ) - timedelta(milliseconds=settings.CHAT_SPAM_INTERVAL_MS + 1)
-    assert spam_protector.is_spamming(chat) is False
+    spam_protector.ban(1)
+    spam_protector.unban(1)
+    assert spam_protector.is_banned(1) is False
+    spam_protector.unban(2)
+    assert spam_protector.is_banned(2) is False
 
 
-def test_spam_protector_ban(spam_protector, chat):
-    spam_protector.ban(chat)
-    assert chat.is_banned
+def test_spam_protector_remove(spam_protector, clock):
+    spam_protector.consume(1, clock.now)
+    spam_protector.remove(1)
+    spam_protector.remove(2)
+    assert spam_protector.get(1) is None
+    assert len(spam_protector) == 0
+
+
+@pytest.mark.asyncio
+async def test_spam_protector_check(spam_protector, clock):
+    mock_bot = AsyncMock()
+    assert await spam_protector.check(mock_bot, 1)
+    clock.now += 1
+    assert await spam_protector.check(mock_bot, 1)
+    mock_bot.send_message.assert_not_called()
+
 
+@pytest.mark.asyncio
+async def test_spam_protector_check_strikes_and_bans(spam_protector, clock):
+    mock_bot = AsyncMock()
+    assert await spam_protector.check(mock_bot, 1)
 
-def test_spam_protector_unban(spam_protector, chat):
-    chat.is_banned = True
-    spam_protector.unban(chat)
-    assert chat.is_banned is False
+    assert await spam_protector.check(mock_bot, 1)
+    assert spam_protector.strikes(1) == 1
+    mock_bot.send_message.assert_called_once_with(
+        chat_id=1,
+        text=SpamProtectorMessages.warning(1, 3),
+        parse_mode=ParseMode.HTML)
+    mock_bot.reset_mock()
 
+    assert await spam_protector.check(mock_bot, 1)
+    assert spam_protector.strikes(1) == 2
 
-def test_spam_protector_is_banned(spam_protector, chat):
-    chat.is_banned = True
-    assert spam_protector.is_banned(chat)
-    chat.is_banned = False
-    assert spam_protector.is_banned(chat) is False
+    mock_bot.reset_mock()
+    assert await spam_protector.check(mock_bot, 1) is False
+    assert spam_protector.strikes(1) == 3
+    assert spam_protector.is_banned(1)
+    mock_bot.send_message.assert_called_once_with(
+        chat_id=1,
+        text=SpamProtectorMessages.banned(3, 180, 3),
+        parse_mode=ParseMode.HTML)
 
+    # Banned chats are ignored silently
+    mock_bot.reset_mock()
+    clock.now += 179
+    assert await spam_protector.check(mock_bot, 1) is False
+    mock_bot.send_message.assert_not_called()
 
-def test_spam_protector_is_timeouted(spam_protector, chat):
-    chat.last_activity = get_utc_now()
-    assert spam_protector.is_timeouted(chat)
-    chat.last_activity = get_utc_now(
-    ) - timedelta(seconds=settings.CHAT_BAN_TIMEOUT_SECONDS + 1)
-    assert spam_protector.is_timeouted(chat) is False
+    clock.now += 1
+    assert await spam_protector.check(mock_bot, 1)
+    assert spam_protector.is_banned(1) is False
 
 
 @pytest.mark.asyncio
-async def test_spam_protector_check(spam_protector, chat):
+async def test_spam_protector_check_ban_longer_than_a_day(clock):
+    # timedelta.seconds wraps after a day, the monotonic clock does not
+    spam_protector = SpamProtector(rate=1, burst=1, max_strikes=1,
+                                   ban_timeout=2 * 24 * 3600, clock=clock)
     mock_bot = AsyncMock()
-    await spam_protector.check(mock_bot, None)
+    await spam_protector.check(mock_bot, 1)
+    assert await spam_protector.check(mock_bot, 1) is False
 
-    chat.is_banned = True
-    chat.last_activity = get_utc_now()
-    await spam_protector.check(mock_bot, chat)
+    clock.now += 24 * 3600 + 10
+    assert await spam_protector.check(mock_bot, 1) is False
+    clock.now += 24 * 3600
+    assert await spam_protector.check(mock_bot, 1)
 
-    chat.last_activity = get_utc_now(
-    ) - timedelta(seconds=settings.CHAT_BAN_TIMEOUT_SECONDS + 1)
-    await spam_protector.check(mock_bot, chat)
-    chat.is_banned = False
 
-    chat.last_activity = get_utc_now()
-    chat.strikes = 3
-    await spam_protector.check(mock_bot, chat)
-    assert chat.is_banned
+@pytest.mark.asyncio
+async def test_spam_protector_check_strike_timeout(clock):
+    spam_protector = SpamProtector(rate=1, burst=1, max_strikes=2,
+                                   strike_timeout=60, clock=clock)
+    mock_bot = AsyncMock()
+    await spam_protector.check(mock_bot, 1)
+    await spam_protector.check(mock_bot, 1)
+    assert spam_protector.strikes(1) == 1
+
+    clock.now += 61
+    await spam_protector.check(mock_bot, 1)
+    await spam_protector.check(mock_bot, 1)
+    assert spam_protector.strikes(1) == 1
+    assert spam_protector.is_banned(1) is False
 
 
 @pytest.mark.asyncio
-async def test_spam_protector_strike(spam_protector, chat):
-    chat.is_banned = True
-    await spam_protector.strike(None, chat)
-    assert chat.strikes == 0
+async def test_spam_protector_check_does_not_touch_chat(spam_protector):
+    chat = Chat(chat_id=1)
+    for _ in range(5):
+        await spam_protector.check(AsyncMock(), chat.chat_id)
+    assert chat == Chat(chat_id=1)
+
+
+def test_spam_protector_expire_lifts_bans(spam_protector, clock):
+    spam_protector.ban(1)
+    spam_protector.ban(2, clock.now + 60)
+    clock.now += 180
+    spam_protector.expire()
+    assert spam_protector.is_banned(1) is False
+    assert spam_protector.is_banned(2)
+
+    # A renewed ban is not lifted by the deadline of the old one
+    spam_protector.ban(2)
+    clock.now += 60
+    spam_protector.expire()
+    assert spam_protector.is_banned(2)
+
+
+def test_spam_protector_expire_evicts_idle_chats(clock):
+    spam_protector = SpamProtector(rate=1, burst=1, idle_timeout=60, clock=clock)
+    spam_protector.consume(1, clock.now)
+    spam_protector.consume(2, clock.now + 30)
+    assert spam_protector.expire(clock.now + 60) == 1
+    assert spam_protector.get(1) is None
+    assert spam_protector.get(2) is not None
+
+
+def test_spam_protector_max_chats(clock):
+    spam_protector = SpamProtector(rate=1, burst=1, max_chats=1000, clock=clock)
+    spam_protector.ban(0)
+    for chat_id in range(100_000):
+        spam_protector.consume(chat_id, clock.now)
+        # The chat used last is evicted last
+        spam_protector.consume(7, clock.now)
+    assert len(spam_protector) == 1000
+    assert spam_protector.get(7) is not None
+    assert spam_protector.get(0) is None
+    # Bans are not evicted
+    assert spam_protector.is_banned(0)
+
 
+@pytest.mark.asyncio
+async def test_spam_protector_check_forgives_strikes_on_deadline(clock):
+    spam_protector = SpamProtector(rate=1, burst=1, max_strikes=3,
+                                   strike_timeout=60, clock=clock)
     mock_bot = AsyncMock()
-    chat.is_banned = False
-    await spam_protector.strike(mock_bot, chat)
-    assert chat.strikes == 1
-    mock_bot.send_message.assert_called_once_with(
-        chat_id=chat.chat_id,
-        text=SpamProtectorMessages.warning(chat, settings.CHAT_MAX_STRIKES),
-        parse_mode=ParseMode.HTML)
-    mock_bot.reset_mock()
+    for _ in range(3):
+        await spam_protector.check(mock_bot, 1)
+    assert spam_protector.strikes(1) == 2
 
-    await spam_protector.strike(mock_bot, chat)
-    assert chat.strikes == 2
-    mock_bot.send_message.assert_called_once_with(
-        chat_id=chat.chat_id,
-        text=SpamProtectorMessages.warning(chat, settings.CHAT_MAX_STRIKES),
-        parse_mode=ParseMode.HTML)
-    mock_bot.reset_mock()
+    spam_protector.expire(clock.now + 59)
+    assert spam_protector.strikes(1) == 2
+    spam_protector.expire(clock.now + 60)
+    assert spam_protector.strikes(1) == 0
 
-    await spam_protector.strike(mock_bot, chat)
-    assert chat.strikes == 3
-    mock_bot.send_message.assert_called_once_with(
-        chat_id=chat.chat_id,
-        text=SpamProtectorMessages.banned(
-            chat, settings.CHAT_BAN_TIMEOUT_SECONDS, settings.CHAT_MAX_STRIKES),
-        parse_mode=ParseMode.HTML)
-    assert chat.is_banned
+
+@pytest.mark.asyncio
+async def test_spam_protector_check_decides_before_sending(clock):
+    spam_protector = SpamProtector(rate=1, burst=1, max_strikes=1,
+                                   ban_timeout=180, clock=clock)
+    mock_bot = AsyncMock()
+
+    async def send_message(**kwargs):
+        # Another update handled while the ban is announced
+        clock.now += 180
+        spam_protector.expire()
+
+    mock_bot.send_message.side_effect = send_message
+    await spam_protector.check(mock_bot, 1)
+    assert await spam_protector.check(mock_bot, 1) is False
+
+
+def test_spam_protector_record_strike(spam_protector, clock):
+    spam_protector.consume(1, clock.now)
+    state = spam_protector.consume(1, clock.now)
+    assert spam_protector.record_strike(1, state, clock.now) == \
+        SpamProtectorMessages.warning(1, 3)
+    spam_protector.record_strike(1, state, clock.now)
+    assert spam_protector.record_strike(1, state, clock.now) == \
+        SpamProtectorMessages.banned(3, 180, 3)
+    assert spam_protector.is_banned(1)
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from cs2posts.bot.chats import Chat
+from cs2posts.bot.chats import Chats
+from cs2posts.bot.subscriptions import Subscriptions
+from cs2posts.bot.subscriptions import TopicSubscriptions
+
+
+def test_subscriptions_resolve_union():
+    subscriptions = Subscriptions()
+    subscriptions.subscribe(1, "a")
+    subscriptions.subscribe(2, "a")
+    subscriptions.subscribe(2, "b")
+    subscriptions.subscribe(3, "c")
+
+    assert subscriptions.keys == ["a", "b", "c"]
+    assert subscriptions.subscribers("a") == {1, 2}
+    assert subscriptions.resolve(["a", "c"]) == {1, 2, 3}
+    assert subscriptions.resolve(["b", "unknown"]) == {2}
+    assert subscriptions.resolve([]) == set()
+
+
+def test_subscriptions_unsubscribe_removes_empty_keys():
+    subscriptions = Subscriptions()
+    subscriptions.subscribe(1, "a")
+    subscriptions.unsubscribe(1, "a")
+    subscriptions.unsubscribe(1, "unknown")
+
+    assert subscriptions.keys == []
+    assert not subscriptions.is_subscribed(1)
+    assert len(subscriptions) == 0
+
+
+def test_subscriptions_json_roundtrip():
+    subscriptions = Subscriptions()
+    subscriptions.subscribe(1, "b")
+    subscriptions.subscribe(1, "a")
+
+    assert subscriptions.to_json() == {"1": ["a", "b"]}
+    assert Subscriptions.from_json({"1": ["a", "b"]}).get(1) == ["a", "b"]
+
+
+def test_topic_subscriptions_normalize():
+    subscriptions = TopicSubscriptions()
+    assert subscriptions.subscribe(1, " Tag:PatchNotes ") == "tag:patchnotes"
+    assert subscriptions.subscribers("TAG:patchnotes") == {1}
+
+
+def test_topic_subscriptions_audience():
+    chats = Chats([Chat(1, is_running=True),
+                   Chat(2, is_running=True),
+                   Chat(3, is_running=True),
+                   Chat(4, is_running=False),
+                   Chat(6, is_running=True, is_news_interested=False)])
+
+    subscriptions = TopicSubscriptions()
+    assert [chat.chat_id for chat in subscriptions.audience(chats, {"news", "major"})] == [1, 2, 3]
+    assert subscriptions.audience(chats, {"major"}) == []
+
+    subscriptions.subscribe(1, "major")
+    subscriptions.subscribe(3, "major")
+    subscriptions.subscribe(4, "major")
+    subscriptions.subscribe(2, "premier")
+    subscriptions.subscribe(5, "major")
+    subscriptions.subscribe(6, "major")
+
+    audience = subscriptions.audience(chats, {"news", "major"})
+    assert [chat.chat_id for chat in audience] == [1, 2, 3, 6]
+    audience = subscriptions.audience(chats, {"update", "major"})
+    assert [chat.chat_id for chat in audience] == [1, 2, 3, 6]
+    audience = subscriptions.audience(chats, {"premier"})
+    assert [chat.chat_id for chat in audience] == [2]
+
+
+def test_topic_subscriptions_intersection():
+    subscriptions = TopicSubscriptions()
+    assert subscriptions.subscribe(1, " Update + Major ") == "major+update"
+    subscriptions.subscribe(2, "major")
+
+    assert subscriptions.resolve({"update"}) == set()
+    assert subscriptions.resolve({"major"}) == {2}
+    assert subscriptions.resolve({"update", "major", "tag:patchnotes"}) == {1, 2}
+
+    subscriptions.unsubscribe(1, "major+update")
+    assert subscriptions.resolve({"update", "major"}) == {2}
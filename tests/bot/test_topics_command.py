@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from unittest.mock import AsyncMock
+from unittest.mock import Mock
+
+import pytest
+
+from cs2posts.bot.chats import Chat
+from cs2posts.bot.chats import Chats
+from cs2posts.bot.subscriptions import TopicSubscriptions
+from cs2posts.bot.topics import Topics
+from cs2posts.topics import TopicClassifier
+
+
+@pytest.fixture
+def topics():
+    topics = Topics(Mock(), TopicClassifier())
+    topics.set_chats(Chats([Chat(42, chat_id_admin=42)]))
+    topics.set_subscriptions(TopicSubscriptions())
+    topics.set_store(AsyncMock())
+    topics.set_spam_protector(Mock(check=AsyncMock(return_value=True)))
+    return topics
+
+
+def create_update(user_id: int = 42) -> AsyncMock:
+    mocked_update = AsyncMock()
+    mocked_update.message.chat_id = 42
+    mocked_update.message.from_user.id = user_id
+    return mocked_update
+
+
+def create_context(*args: str) -> AsyncMock:
+    mocked_context = AsyncMock()
+    mocked_context.args = list(args)
+    return mocked_context
+
+
+@pytest.mark.asyncio
+async def test_topics_add_and_remove(topics):
+    await topics.topics(create_update(), create_context("add", "Major,", "tag:patchnotes"))
+    assert topics.subscriptions.get(42) == ["major", "tag:patchnotes"]
+
+    await topics.topics(create_update(), create_context("remove", "major"))
+    assert topics.subscriptions.get(42) == ["tag:patchnotes"]
+    assert topics.store.save.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_topics_list(topics):
+    mocked_update = create_update()
+    await topics.topics(mocked_update, create_context())
+
+    topics.store.save.assert_not_awaited()
+    text = mocked_update.message.reply_text.call_args.kwargs['text']
+    assert "No topics subscribed." in text
+
+
+@pytest.mark.asyncio
+async def test_topics_no_admin(topics):
+    mocked_update = create_update(user_id=1337)
+    await topics.topics(mocked_update, create_context("add", "major"))
+
+    assert topics.subscriptions.get(42) == []
+    mocked_update.message.reply_text.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_topics_add_intersection(topics):
+    await topics.topics(create_update(), create_context("add", "Major + Update"))
+    assert topics.subscriptions.get(42) == ["major+update"]
+
+
+@pytest.mark.asyncio
+async def test_topics_spam_protected(topics):
+    topics.spam_protector.check.return_value = False
+    mocked_update = create_update()
+    mocked_context = create_context("add", "major")
+    await topics.topics(mocked_update, mocked_context)
+
+    topics.spam_protector.check.assert_awaited_once_with(mocked_context.bot, 42)
+    assert topics.subscriptions.get(42) == []
+    mocked_update.message.reply_text.assert_not_awaited()
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from unittest.mock import AsyncMock
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import pytest
+
+from cs2posts.bot.chats import Chat
+from cs2posts.bot.chats import Chats
+from cs2posts.bot.keywords import KeywordSubscriptions
+from cs2posts.bot.watch import Watch
+
+
+@pytest.fixture
+def watch():
+    watch = Watch(Mock())
+    watch.set_chats(Chats([Chat(42, chat_id_admin=42)]))
+    watch.set_subscriptions(KeywordSubscriptions())
+    watch.set_store(AsyncMock())
+    watch.set_spam_protector(Mock(check=AsyncMock(return_value=True)))
+    return watch
+
+
+def create_update(chat_id: int = 42, user_id: int = 42) -> AsyncMock:
+    mocked_update = AsyncMock()
+    mocked_update.message.chat_id = chat_id
+    mocked_update.message.from_user.id = user_id
+    return mocked_update
+
+
+def create_context(*args: str) -> AsyncMock:
+    mocked_context = AsyncMock()
+    mocked_context.args = list(args)
+    return mocked_context
+
+
+def test_watch_parse_keywords():
+    assert Watch.parse_keywords(["Mirage,", "anti", "cheat", ",", ""]) == [
+        "mirage", "anti cheat"]
+    assert Watch.parse_keywords([]) == []
+
+
+@pytest.mark.asyncio
+async def test_watch_adds_keywords(watch):
+    mocked_update = create_update()
+    await watch.watch(mocked_update, create_context("Mirage,", "premier"))
+
+    assert watch.subscriptions.get(42) == ["mirage", "premier"]
+    watch.store.save.assert_awaited_once_with(watch.subscriptions)
+    mocked_update.message.reply_text.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_watch_lists_keywords(watch):
+    watch.subscriptions.subscribe(42, "mirage")
+    mocked_update = create_update()
+    await watch.watch(mocked_update, create_context())
+
+    watch.store.save.assert_not_awaited()
+    text = mocked_update.message.reply_text.call_args.kwargs['text']
+    assert "- mirage" in text
+
+
+@pytest.mark.asyncio
+async def test_watch_no_admin(watch):
+    mocked_update = create_update(user_id=1337)
+    await watch.watch(mocked_update, create_context("mirage"))
+
+    assert watch.subscriptions.get(42) == []
+    mocked_update.message.reply_text.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+@patch('cs2posts.bot.watch.settings')
+async def test_watch_too_many_keywords(mocked_settings, watch):
+    mocked_settings.WATCH_MAX_KEYWORDS = 2
+    mocked_settings.WATCH_MAX_KEYWORD_LENGTH = 32
+    mocked_update = create_update()
+    await watch.watch(mocked_update, create_context("a, b, c"))
+
+    assert watch.subscriptions.get(42) == []
+    watch.store.save.assert_not_awaited()
+    mocked_update.message.reply_text.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_unwatch_keyword(watch):
+    watch.subscriptions.subscribe(42, "mirage")
+    watch.subscriptions.subscribe(42, "premier")
+    await watch.unwatch(create_update(), create_context("mirage"))
+
+    assert watch.subscriptions.get(42) == ["premier"]
+    watch.store.save.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_unwatch_all(watch):
+    watch.subscriptions.subscribe(42, "mirage")
+    watch.subscriptions.subscribe(42, "premier")
+    await watch.unwatch(create_update(), create_context())
+
+    assert not watch.subscriptions.is_watching(42)
+
+
+@pytest.mark.asyncio
+async def test_watch_spam_protected(watch):
+    watch.spam_protector.check.return_value = False
+    mocked_update = create_update()
+    mocked_context = create_context("mirage")
+    await watch.watch(mocked_update, mocked_context)
+    await watch.unwatch(mocked_update, mocked_context)
+
+    assert watch.spam_protector.check.await_count == 2
+    assert watch.subscriptions.get(42) == []
+    watch.store.save.assert_not_awaited()
+    mocked_update.message.reply_text.assert_not_awaited()
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+import http.client
+import json
+from unittest.mock import Mock
+
+import pytest
+from telegram import Update
+from telegram.ext import Application
+from telegram.ext import CommandHandler
+
+from cs2posts.bot.webhook import WEBHOOK_UPDATES
+from cs2posts.bot.webhook import WebhookServer
+from cs2posts.fake.telegram import create_command_update
+from cs2posts.fake.telegram import FakeTelegramBotAPI
+from cs2posts.metrics import Registry
+
+
+def create_app():
+    app = Mock()
+    app.bot = None
+    app.update_queue = asyncio.Queue()
+    return app
+
+
+def request(port, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        connection.request(method, path, body, headers or {})
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+async def post_update(server, update, secret_token=None):
+    return await asyncio.to_thread(
+        request, server.port, "POST", "/telegram", json.dumps(update),
+        {"Content-Type": "application/json",
+         "X-Telegram-Bot-Api-Secret-Token": secret_token or server.secret_token})
+
+
+@pytest.mark.asyncio
+async def test_webhook_server_puts_updates_on_queue():
+    app = create_app()
+    server = WebhookServer(app, secret_token="secret")
+    count = WEBHOOK_UPDATES.labels("received").value
+    await server.start()
+    try:
+        update = {"update_id": 7, **create_command_update(42, "/latest")}
+        assert await post_update(server, update) == (200, b"")
+
+        received = app.update_queue.get_nowait()
+        assert isinstance(received, Update)
+        assert received.update_id == 7
+        assert received.message.text == "/latest"
+        assert server.received == 1
+        assert WEBHOOK_UPDATES.labels("received").value == count + 1
+    finally:
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_webhook_server_rejects_invalid_updates():
+    app = create_app()
+    server = WebhookServer(app)
+    await server.start()
+    try:
+        update = {"update_id": 7, **create_command_update(42, "/latest")}
+        status, _ = await post_update(server, update, secret_token="wrong")
+        assert status == 403
+
+        for body in (b"{", b"null", b"{}", b"[1]", b'{"message": {}}'):
+            status, _ = await asyncio.to_thread(
+                request, server.port, "POST", "/telegram", body,
+                {"X-Telegram-Bot-Api-Secret-Token": server.secret_token})
+            assert status == 400
+
+        status, _ = await asyncio.to_thread(request, server.port, "GET", "/telegram")
+        assert status == 405
+        status, _ = await asyncio.to_thread(request, server.port, "POST", "/other")
+        assert status == 404
+
+        assert app.update_queue.empty()
+        assert server.rejected == 6
+        assert len(server.secret_token) >= 32
+    finally:
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_webhook_server_rejects_large_updates():
+    server = WebhookServer(create_app(), max_body_size=10)
+    await server.start()
+    try:
+        status, _ = await post_update(server, create_command_update(42, "/latest"))
+        assert status == 413
+    finally:
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_webhook_server_health():
+    app = create_app()
+    server = WebhookServer(app, url_path=None)
+    await server.start()
+    try:
+        await app.update_queue.put(None)
+        status, body = await asyncio.to_thread(request, server.port, "GET", "/health")
+        assert status == 200
+        health = json.loads(body)
+        assert health["status"] == "ok"
+        assert health["pending"] == 1
+    finally:
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_webhook_server_does_not_serve_metrics():
+    # /metrics is only served by the private status server
+    server = WebhookServer(create_app(), url_path="/hook/")
+    await server.start()
+    try:
+        status, _ = await asyncio.to_thread(request, server.port, "GET", "/metrics")
+        assert status == 404
+        status, body = await asyncio.to_thread(request, server.port, "GET", "/health")
+        assert status == 200
+        assert json.loads(body)["status"] == "ok"
+        assert server.url == f"http://127.0.0.1:{server.port}/hook"
+    finally:
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_webhook_server_closes_slow_connections():
+    server = WebhookServer(create_app(), timeout=0.05, idle_timeout=0.1)
+    await server.start()
+    try:
+        # Headers are never completed
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(b"POST /telegram HTTP/1.1\r\n")
+        await writer.drain()
+        assert await asyncio.wait_for(reader.read(), 1) == b""
+        writer.close()
+
+        # Body is shorter than announced
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(b"POST /telegram HTTP/1.1\r\nContent-Length: 10\r\n\r\n{")
+        await writer.drain()
+        assert await asyncio.wait_for(reader.read(), 1) == b""
+        writer.close()
+
+        # Idle kept alive connection
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(b"GET /health HTTP/1.1\r\n\r\n")
+        await writer.drain()
+        assert (await reader.readline()).startswith(b"HTTP/1.1 200")
+        await asyncio.wait_for(reader.read(), 1)
+        assert reader.at_eof()
+        writer.close()
+    finally:
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_webhook_server_metrics():
+    registry = Registry()
+    registry.counter("test_requests_total", "Requests").inc(3)
+    server = WebhookServer(create_app(), url_path=None, registry=registry)
+    await server.start()
+    try:
+        status, body = await asyncio.to_thread(request, server.port, "GET", "/metrics")
+        assert status == 200
+        assert b"test_requests_total 3\n" in body
+
+        # Without a url_path no updates are accepted
+        status, _ = await post_update(server, create_command_update(1, "/latest"))
+        assert status == 404
+        assert server.url == f"http://127.0.0.1:{server.port}"
+    finally:
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_webhook_server_receives_updates_from_telegram():
+    with FakeTelegramBotAPI() as api:
+        app = Application.builder().token("123:fake").base_url(api.base_url).build()
+
+        async def latest(update, context):
+            await update.message.reply_text("latest")
+
+        app.add_handler(CommandHandler("latest", latest))
+        server = WebhookServer(app)
+        async with app:
+            await app.start()
+            await server.start()
+            await app.bot.set_webhook(url=server.url, secret_token=server.secret_token)
+            try:
+                for chat_id in (1, 2, 3):
+                    api.push_update(create_command_update(chat_id, "/latest"))
+                    assert await asyncio.to_thread(api.wait_for_delivery, chat_id, 0.0, 5)
+            finally:
+                await server.stop()
+                await app.stop()
+
+        assert server.received == 3
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from cs2posts.parser.plain_text import PlainTextParser
+
+
+def test_plain_text_parser_strips_markup():
+    text = ("[h3]Maps[/h3][list][*]Fixed <b>Mirage</b> &amp; Inferno"
+            "[*][url=https://example.com]Link[/url][/list]")
+    assert PlainTextParser(text).parse() == "Maps Fixed Mirage & Inferno Link"
+
+
+def test_plain_text_parser_keeps_brackets_without_tags():
+    assert PlainTextParser("[ MISC ] Fixed a bug").parse() == "[ MISC ] Fixed a bug"
+
+
+def test_plain_text_parser_truncate():
+    assert PlainTextParser.truncate("short", 10) == "short"
+    assert PlainTextParser.truncate("Fixed a bug, where", 14) == "Fixed a bug…"
+    assert PlainTextParser.truncate("abcdefghij", 4) == "abcd…"
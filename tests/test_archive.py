@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import pytest
+
+from cs2posts.archive import PostArchive
+from cs2posts.archive import PostSummary
+from cs2posts.post import Post
+from cs2posts.post import PostKind
+
+
+def create_post(i: int, title: str = "News", feed_type: int = 1) -> Post:
+    return Post(gid=str(1000 + i),
+                title=title,
+                url="url",
+                is_external_url=True,
+                author="author",
+                contents=f"Content {i}",
+                feedlabel="feedlabel",
+                date=1700000000 + i * 60,
+                feedname="feedname",
+                feed_type=feed_type,
+                appid=730)
+
+
+@pytest.fixture
+def posts():
+    posts = []
+    for i in range(30):
+        if i % 3 == 0:
+            posts.append(create_post(i, title="Release Notes"))
+        elif i % 5 == 0:
+            posts.append(create_post(i, feed_type=0))
+        else:
+            posts.append(create_post(i))
+    return posts
+
+
+@pytest.fixture
+def archive(posts):
+    archive = PostArchive(":memory:")
+    archive.add(posts)
+    yield archive
+    archive.close()
+
+
+def gids(posts: list[Post]) -> list[str]:
+    return [post.gid for post in posts]
+
+
+def test_archive_add_and_get(archive, posts):
+    assert len(archive) == 30
+    assert archive.add(posts) == 0
+    assert archive.get(posts[3].gid) == posts[3]
+    assert archive.get("unknown") is None
+    assert archive.contains(posts[3].gid)
+
+
+def test_archive_add_updates_edited_posts(archive, posts):
+    edited = replace(posts[3], contents="Edited")
+    assert archive.add([edited]) == 0
+    assert archive.get(edited.gid).contents == "Edited"
+
+
+def test_archive_add_does_not_parse_known_posts(archive, posts):
+    with patch('cs2posts.archive.ArchivedPost.create') as mocked_create:
+        assert archive.add(posts) == 0
+        mocked_create.assert_not_called()
+
+
+def test_archive_latest(archive):
+    assert gids(archive.latest(3)) == ["1029", "1028", "1027"]
+    assert gids(archive.latest(3, PostKind.UPDATE)) == ["1027", "1024", "1021"]
+    assert gids(archive.latest(2, PostKind.EXTERNAL)) == ["1025", "1020"]
+    assert gids(archive.latest(2, PostKind.NEWS)) == ["1029", "1028"]
+
+
+def test_archive_newer_than(archive, posts):
+    assert gids(archive.newer_than(posts[26].date)) == ["1027", "1028", "1029"]
+    assert gids(archive.newer_than(posts[20].date, kind=PostKind.UPDATE)) == [
+        "1021", "1024", "1027"]
+    assert archive.newer_than(posts[29].date) == []
+
+
+def test_archive_pages(archive):
+    pages = []
+    cursor = None
+    while True:
+        page = archive.before(cursor, 4, PostKind.UPDATE)
+        if not page:
+            break
+        pages.append(gids(page))
+        cursor = (page[-1].date, page[-1].gid)
+
+    assert pages == [
+        ["1027", "1024", "1021", "1018"],
+        ["1015", "1012", "1009", "1006"],
+        ["1003", "1000"],
+    ]
+
+    # Back from the second page to the first one
+    first = archive.latest(5, PostKind.UPDATE)[-1]
+    assert gids(archive.after((first.date, first.gid), 4, PostKind.UPDATE)) == [
+        "1027", "1024", "1021", "1018"]
+
+
+def test_archive_pages_same_date(archive, posts):
+    twin = replace(posts[29], gid="9999")
+    archive.add([twin])
+
+    assert gids(archive.latest(2)) == ["9999", "1029"]
+    assert gids(archive.before((twin.date, twin.gid), 2)) == ["1029", "1028"]
+
+
+def test_archive_persistent(tmp_path, posts):
+    filepath = tmp_path / "posts.db"
+    archive = PostArchive(filepath)
+    assert archive.is_empty()
+    archive.add(posts)
+    archive.close()
+
+    archive = PostArchive(filepath)
+    assert not archive.is_empty()
+    assert gids(archive.latest(1)) == ["1029"]
+    archive.close()
+
+
+def test_archive_backfill(posts):
+    crawler = Mock()
+    crawler.crawl.return_value = {
+        "appnews": {"newsitems": [post.to_dict() for post in posts]}}
+
+    archive = PostArchive(":memory:")
+    assert archive.backfill(crawler, count=100) == 30
+    crawler.crawl.assert_called_once_with(count=100)
+    assert len(archive) == 30
+
+
+def test_archive_summaries(archive, posts):
+    page = archive.before(None, 2, PostKind.UPDATE, summaries=True)
+    assert page == [
+        PostSummary("1027", posts[27].date, PostKind.UPDATE, "Release Notes", "url", "Content 27"),
+        PostSummary("1024", posts[24].date, PostKind.UPDATE, "Release Notes", "url", "Content 24"),
+    ]
+    assert page[-1].cursor == (posts[24].date, "1024")
+    assert archive.after(page[-1].cursor, 1, PostKind.UPDATE, summaries=True)[0].gid == "1027"
+
+
+@pytest.mark.parametrize("backend", ["fts5", "inverted"])
+def test_archive_search(backend):
+    archive = PostArchive(":memory:", search_backend=backend)
+    archive.add([create_post(0, title="Vertigo Update"),
+                 create_post(1, title="News"),
+                 replace(create_post(2), contents="[b]Vertigo[/b] is back")])
+
+    assert [summary.gid for summary in archive.search("vertigo")] == ["1000", "1002"]
+    assert archive.search("vertigo", limit=1)[0].title == "Vertigo Update"
+    assert archive.search("nothing") == []
+
+    # Edited posts are re-indexed
+    archive.add([replace(create_post(2), contents="Gone")])
+    assert [summary.gid for summary in archive.search("vertigo")] == ["1000"]
+    archive.close()
+
+
+def test_archive_search_index_is_rebuilt(tmp_path):
+    archive = PostArchive(tmp_path / "posts.db", search_backend="inverted")
+    archive.add([create_post(0, title="Vertigo Update")])
+    archive.close()
+
+    archive = PostArchive(tmp_path / "posts.db", search_backend="inverted")
+    assert [summary.gid for summary in archive.search("vertigo")] == ["1000"]
+    archive.close()
+
+
+def test_archive_is_used_by_threads(archive, posts):
+    # Queries run on the threads of asyncio.to_thread while the event loop
+    # thread writes
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        pages = list(executor.map(lambda _: archive.latest(5), range(20)))
+        results = list(executor.map(lambda _: archive.search("release"), range(20)))
+        archive.add([create_post(30)])
+
+    assert all(gids(page) == gids(pages[0]) for page in pages)
+    assert all(len(result) == 10 for result in results)
+    assert archive.contains(create_post(30).gid)
+
+
+def test_archive_unknown_search_backend():
+    with pytest.raises(ValueError):
+        PostArchive(":memory:", search_backend="unknown")
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import pytest
+
+from cs2posts.archive import PostArchive
+from cs2posts.backfill import BackfillState
+from cs2posts.backfill import BackfillWindow
+from cs2posts.backfill import HistoryBackfill
+from cs2posts.backfill import LocalBackfillStore
+from cs2posts.backfill import RateBudget
+from cs2posts.crawler import CounterStrike2Crawler
+from cs2posts.fake.steam import create_history
+from cs2posts.fake.steam import FakeSteamNewsAPI
+
+
+START = 1577836800  # 2020-01-01
+END = 1704067200  # 2024-01-01
+
+
+@pytest.fixture(scope="module")
+def api():
+    with FakeSteamNewsAPI(create_history(START, END, posts_per_week=3)) as api:
+        yield api
+
+
+@pytest.fixture
+def archive():
+    archive = PostArchive(":memory:", search_backend="inverted")
+    yield archive
+    archive.close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalBackfillStore(tmp_path / "backfill.json")
+
+
+class FailingCrawler(CounterStrike2Crawler):
+
+    def __init__(self, api_url: str, fail_after: int, fail_calls: int | None = None) -> None:
+        super().__init__(api_url)
+        self.calls = 0
+        self.fail_after = fail_after
+        # Only fails this many calls after fail_after, all by default
+        self.fail_calls = fail_calls
+
+    def crawl(self, *, count=None, enddate=None):
+        self.calls += 1
+        if self.calls > self.fail_after and (
+                self.fail_calls is None or self.calls <= self.fail_after + self.fail_calls):
+            raise TimeoutError
+        return super().crawl(count=count, enddate=enddate)
+
+
+def test_backfill_plan_windows():
+    state = BackfillState.plan(0, 99, 3)
+    assert [(window.start, window.cursor) for window in state.windows] == [
+        (66, 99), (32, 65), (0, 31)]
+    assert not state.is_done()
+
+    with pytest.raises(ValueError):
+        BackfillState.plan(10, 0, 3)
+
+
+def test_backfill_state_json_roundtrip():
+    state = BackfillState([BackfillWindow(0, 10, done=True), BackfillWindow(11, 20)])
+    assert BackfillState.from_json(state.to_json()).to_json() == state.to_json()
+
+
+def test_backfill_store(store):
+    assert len(store.load()) == 0
+    store.save(BackfillState.plan(0, 99, 3))
+    assert len(store.load()) == 3
+
+
+def test_backfill_rate_budget():
+    with pytest.raises(ValueError):
+        RateBudget(0)
+
+
+def test_backfill_crawler_enddate(api):
+    crawler = CounterStrike2Crawler(api.url)
+    enddate = api.newsitems[10]["date"]
+    items = crawler.crawl(count=5, enddate=enddate)["appnews"]["newsitems"]
+    assert [item["gid"] for item in items] == [
+        item["gid"] for item in api.newsitems[10:15]]
+
+
+def test_backfill_whole_history(api, archive, store):
+    backfill = HistoryBackfill(CounterStrike2Crawler(api.url), store,
+                               since=START, windows=4, page_size=50, rate=1000)
+    assert backfill.run(archive) == len(api.newsitems)
+    assert len(archive) == len(api.newsitems)
+    assert store.load().is_done()
+
+    # A finished backfill does not crawl again
+    requests = len(api.requests)
+    assert backfill.run(archive) == 0
+    assert len(api.requests) == requests
+
+
+def test_backfill_windows_do_not_overlap(api, archive, store):
+    backfill = HistoryBackfill(CounterStrike2Crawler(api.url), store,
+                               since=START, windows=4, page_size=50, rate=1000)
+    before = len(api.requests)
+    backfill.run(archive)
+
+    # Every window needs one request more than its pages at most
+    pages = -(-len(api.newsitems) // 50)
+    assert len(api.requests) - before <= pages + 2 * 4
+
+
+def test_backfill_resumes_from_cursor(api, archive, store):
+    crawler = FailingCrawler(api.url, fail_after=5)
+    backfill = HistoryBackfill(crawler, store, since=START, windows=2,
+                               page_size=20, rate=1000, retries=1, backoff=0.01)
+    with pytest.raises(TimeoutError):
+        backfill.run(archive)
+
+    state = store.load()
+    assert not state.is_done()
+    partial = len(archive)
+    assert 0 < partial < len(api.newsitems)
+
+    crawler.fail_after = 1000
+    assert backfill.run(archive) == len(api.newsitems) - partial
+    assert len(archive) == len(api.newsitems)
+    assert store.load().is_done()
+
+
+def test_backfill_retries_failed_pages(api, archive, store):
+    crawler = FailingCrawler(api.url, fail_after=3, fail_calls=2)
+    backfill = HistoryBackfill(crawler, store, since=START, windows=2,
+                               page_size=50, rate=1000, retries=2, backoff=0.01)
+    assert backfill.run(archive) == len(api.newsitems)
+    assert store.load().is_done()
+
+
+@pytest.mark.asyncio
+async def test_backfill_run_async(api, archive, store):
+    crawler = FailingCrawler(api.url, fail_after=2, fail_calls=1)
+    backfill = HistoryBackfill(crawler, store, since=START, windows=4,
+                               page_size=50, rate=1000, backoff=0.01)
+    assert await backfill.run_async(archive) == len(api.newsitems)
+    assert len(archive) == len(api.newsitems)
+    assert store.load().is_done()
@@ -3,6 +3,8 @@ from __future__ import annotations
 import pytest
 
 from cs2posts.cs2 import CounterStrike2Posts
+from cs2posts.cs2 import PARSE_SECONDS
+from cs2posts.post import Post
 
 
 @pytest.fixture
@@ -84,6 +86,14 @@ def test_cs2_net_posts(cs2_posts):
     assert len(cs2_posts) == 2
 
 
+def test_cs2_net_posts_parse_seconds_by_kind(crawler_data):
+    news = sum(PARSE_SECONDS.labels("news").counts)
+    update = sum(PARSE_SECONDS.labels("update").counts)
+    CounterStrike2Posts(crawler_data)
+    assert sum(PARSE_SECONDS.labels("news").counts) == news + 1
+    assert sum(PARSE_SECONDS.labels("update").counts) == update + 1
+
+
 def test_cs2_net_news_posts(cs2_posts):
     assert len(cs2_posts.news_posts) == 1
 
@@ -164,3 +174,71 @@ def test_cs2_net_posts_json(cs2_posts):
             'tags': ['patchnotes']
         }
     ]
+
+
+def create_post(gid: str, date: int, title: str = "News", contents: str = "Content",
+                feed_type: int = 1) -> Post:
+    return Post(gid=gid,
+                title=title,
+                url="url",
+                is_external_url=True,
+                author="author",
+                contents=contents,
+                feedlabel="feedlabel",
+                date=date,
+                feedname="feedname",
+                feed_type=feed_type,
+                appid=730)
+
+
+def test_cs2_net_posts_partitioned_and_sorted():
+    cutoff = CounterStrike2Posts.INITIAL_EPOCH_TIME_CS2
+    posts = CounterStrike2Posts.from_posts([
+        create_post("1", cutoff + 10),
+        create_post("2", cutoff + 30, title="Release Notes for today"),
+        create_post("3", cutoff + 20, feed_type=0),
+        create_post("4", cutoff - 1),
+        create_post("5", cutoff + 40, title="Release Notes external", feed_type=0),
+    ])
+
+    assert [post.gid for post in posts.posts] == ["5", "2", "3", "1", "4"]
+    assert [post.gid for post in posts.news_posts] == ["1"]
+    assert [post.gid for post in posts.update_posts] == ["5", "2"]
+    assert [post.gid for post in posts.external_posts] == ["5", "3"]
+    assert posts.latest.gid == "5"
+    assert posts.oldest.gid == "4"
+    assert posts.oldest_news_post.gid == "1"
+    assert posts.oldest_external_post.gid == "3"
+
+
+def test_cs2_net_posts_views_are_copies(cs2_posts):
+    cs2_posts.news_posts.clear()
+    assert len(cs2_posts.news_posts) == 1
+
+
+def test_cs2_net_posts_merge(cs2_posts):
+    latest = cs2_posts.latest
+    new_post = create_post("new", latest.date + 100)
+    edited = create_post(latest.gid, latest.date, contents="Edited")
+
+    cs2_posts.merge(CounterStrike2Posts.from_posts([edited, new_post]))
+
+    assert [post.gid for post in cs2_posts.posts] == [
+        "new", latest.gid, "5124585319846885283"]
+    assert cs2_posts.posts[1].contents == "Edited"
+    assert cs2_posts.latest_news_post.gid == "new"
+    assert cs2_posts.latest_update_post.gid == "5124585319846885283"
+
+
+def test_cs2_net_posts_merge_window(cs2_posts):
+    latest = cs2_posts.latest
+    cs2_posts.merge([create_post("new", latest.date + 100)], window=2)
+
+    assert [post.gid for post in cs2_posts.posts] == ["new", latest.gid]
+    assert cs2_posts.latest_update_post is None
+
+
+def test_cs2_net_posts_merge_into_empty():
+    posts = CounterStrike2Posts(None)
+    posts.merge([create_post("1", 1700000000), create_post("2", 1700000100)])
+    assert [post.gid for post in posts.posts] == ["2", "1"]
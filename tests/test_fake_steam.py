@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import gzip
+import json
+
+import pytest
+import requests
+
+from cs2posts.crawler import CounterStrike2Crawler
+from cs2posts.cs2 import CounterStrike2Posts
+from cs2posts.fake.steam import create_history
+from cs2posts.fake.steam import FakeSteamNewsAPI
+from cs2posts.fake.steam import load_recorded
+
+
+START = 1672531200  # 2023-01-01
+END = 1704067200  # 2024-01-01
+
+
+@pytest.fixture(scope="module")
+def api():
+    with FakeSteamNewsAPI(create_history(START, END, contents_size=2048)) as api:
+        yield api
+
+
+def test_fake_steam_count_and_enddate(api):
+    crawler = CounterStrike2Crawler(api.url)
+    data = crawler.crawl(count=10)
+    assert data["appnews"]["count"] == len(api.newsitems)
+    assert data["appnews"]["newsitems"] == api.newsitems[:10]
+
+    enddate = api.newsitems[20]["date"]
+    items = crawler.crawl(count=3, enddate=enddate)["appnews"]["newsitems"]
+    assert items == api.newsitems[20:23]
+    assert crawler.crawl(count=3, enddate=START - 1)["appnews"]["newsitems"] == []
+
+
+def test_fake_steam_maxlength(api):
+    response = requests.get(f"{api.url}?appid=730&count=2&maxlength=100")
+    for item in response.json()["appnews"]["newsitems"]:
+        assert item["contents"].endswith("...")
+        assert len(item["contents"]) == 103
+
+
+def test_fake_steam_etag(api):
+    url = f"{api.url}?appid=730&count=5&maxlength=0"
+    response = requests.get(url)
+    etag = response.headers["ETag"]
+
+    cached = requests.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    other = requests.get(url.replace("count=5", "count=6"), headers={"If-None-Match": etag})
+    assert other.status_code == 200
+    assert other.headers["ETag"] != etag
+
+
+def test_fake_steam_gzip(api):
+    url = f"{api.url}?appid=730&count=50&maxlength=0"
+    compressed = requests.get(url, headers={"Accept-Encoding": "gzip"}, stream=True)
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    raw = compressed.raw.read()
+    assert json.loads(gzip.decompress(raw)) == requests.get(
+        url, headers={"Accept-Encoding": "identity"}).json()
+    assert len(raw) < int(requests.get(
+        url, headers={"Accept-Encoding": "identity"}).headers["Content-Length"])
+
+
+def test_fake_steam_error_rate():
+    with FakeSteamNewsAPI(create_history(START, END), error_rate=1.0) as api:
+        with pytest.raises(Exception, match="503"):
+            CounterStrike2Crawler(api.url).crawl(count=10)
+
+
+def test_fake_steam_latency(monkeypatch):
+    monkeypatch.setattr("cs2posts.crawler.CRAWLER_REQUEST_TIMEOUT", 0.05)
+    with FakeSteamNewsAPI(create_history(START, END), latency=0.3) as api:
+        with pytest.raises(requests.exceptions.Timeout):
+            CounterStrike2Crawler(api.url).crawl(count=10)
+
+
+def test_fake_steam_recorded(api, tmp_path):
+    filepath = tmp_path / "news.json"
+    recorded = requests.get(f"{api.url}?appid=730&count=25&maxlength=0").json()
+    recorded["appnews"]["newsitems"].reverse()
+    filepath.write_text(json.dumps(recorded))
+
+    with FakeSteamNewsAPI(load_recorded(filepath)) as recorded_api:
+        posts = CounterStrike2Posts(CounterStrike2Crawler(recorded_api.url).crawl(count=100))
+        assert [post.gid for post in posts.posts] == [
+            item["gid"] for item in api.newsitems[:25]]
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import pytest
+from telegram import Bot
+from telegram.error import ChatMigrated
+from telegram.error import Forbidden
+from telegram.error import RetryAfter
+
+from cs2posts.fake.telegram import create_command_update
+from cs2posts.fake.telegram import FakeTelegramBotAPI
+from cs2posts.fake.telegram import TokenBucket
+
+
+@pytest.fixture
+def api():
+    with FakeTelegramBotAPI(per_chat_rate=1.0, per_chat_burst=1, forbidden_chats={13},
+                            migrated_chats={-100: -1000100}) as api:
+        yield api
+
+
+def create_bot(api: FakeTelegramBotAPI) -> Bot:
+    return Bot("123:fake", base_url=api.base_url)
+
+
+def test_fake_telegram_token_bucket():
+    bucket = TokenBucket(rate=2.0, burst=2, now=0.0)
+    assert bucket.take(0.0) == 0
+    assert bucket.take(0.0) == 0
+    assert bucket.take(0.0) == pytest.approx(0.5)
+    assert bucket.take(0.5) == 0
+
+
+@pytest.mark.asyncio
+async def test_fake_telegram_send_edit_delete(api):
+    async with create_bot(api) as bot:
+        await send_edit_delete(api, bot)
+
+
+async def send_edit_delete(api: FakeTelegramBotAPI, bot: Bot) -> None:
+    assert bot.username == "cs2_fake_bot"
+
+    message = await bot.send_message(chat_id=1, text="<b>Hello</b>", parse_mode="HTML")
+    assert message.chat_id == 1
+    assert message.text == "<b>Hello</b>"
+
+    await bot.send_photo(chat_id=2, photo="https://example.com/a.png", caption="A")
+    await bot.send_video(chat_id=3, video="https://example.com/a.mp4")
+    assert [method for _, method, _ in api.deliveries] == [
+        "sendMessage", "sendPhoto", "sendVideo"]
+
+    # The per chat limit only allows one message per second
+    with pytest.raises(RetryAfter) as e:
+        await bot.edit_message_text(chat_id=1, message_id=message.message_id, text="Bye")
+    assert e.value.retry_after == 1
+    assert api.errors == {429: 1}
+
+
+@pytest.mark.asyncio
+async def test_fake_telegram_delete_message(api):
+    async with create_bot(api) as bot:
+        assert await bot.delete_message(chat_id=1, message_id=1)
+
+
+@pytest.mark.asyncio
+async def test_fake_telegram_global_rate_limit():
+    with FakeTelegramBotAPI(global_rate=2.0) as api:
+        async with create_bot(api) as bot:
+            await bot.send_message(chat_id=1, text="a")
+            await bot.send_message(chat_id=2, text="b")
+            with pytest.raises(RetryAfter):
+                await bot.send_message(chat_id=3, text="c")
+
+
+@pytest.mark.asyncio
+async def test_fake_telegram_injected_errors(api):
+    async with create_bot(api) as bot:
+        with pytest.raises(Forbidden):
+            await bot.send_message(chat_id=13, text="blocked")
+
+        with pytest.raises(ChatMigrated) as e:
+            await bot.send_message(chat_id=-100, text="migrated")
+        assert e.value.new_chat_id == -1000100
+        await bot.send_message(chat_id=-1000100, text="migrated")
+
+
+@pytest.mark.asyncio
+async def test_fake_telegram_get_updates():
+    with FakeTelegramBotAPI() as api:
+        async with create_bot(api) as bot:
+            assert await bot.get_updates(timeout=0) == ()
+
+            update_id = api.push_update(create_command_update(42, "/latest"))
+            updates = await bot.get_updates(timeout=5)
+            assert [update.update_id for update in updates] == [update_id]
+            assert updates[0].message.chat_id == 42
+            assert updates[0].message.text == "/latest"
+
+            # Confirmed updates are not returned again
+            assert await bot.get_updates(offset=update_id + 1, timeout=0) == ()
+
+
+def test_fake_telegram_wait_for_delivery():
+    with FakeTelegramBotAPI() as api:
+        assert api.wait_for_delivery(1, since=0.0, timeout=0.05) is None
+        api.call("sendMessage", {"chat_id": "1", "text": "Hello"})
+        assert api.wait_for_delivery(1, since=0.0, timeout=0.05) is not None
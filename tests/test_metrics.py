@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+
+import pytest
+
+from cs2posts import metrics
+from cs2posts.metrics import format_value
+from cs2posts.metrics import LoopLagMonitor
+from cs2posts.metrics import Registry
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+@pytest.mark.parametrize("value, expected", [
+    (3, "3"),
+    (2.0, "2"),
+    (0.25, "0.25"),
+    (math.inf, "+Inf"),
+    (math.nan, "NaN"),
+])
+def test_format_value(value, expected):
+    assert format_value(value) == expected
+
+
+def test_registry_counter(registry):
+    counter = registry.counter("test_total", "Test counter")
+    counter.inc()
+    counter.inc(2)
+    assert counter.value == 3
+    assert registry.render() == (
+        "# HELP test_total Test counter\n"
+        "# TYPE test_total counter\n"
+        "test_total 3\n")
+
+
+def test_registry_counter_labels(registry):
+    counter = registry.counter("errors_total", "Errors", ("error",))
+    counter.labels("Forbidden").inc()
+    counter.labels("Forbidden").inc()
+    counter.labels('Bad "quote"').inc()
+    assert counter.labels("Forbidden").value == 2
+    rendered = registry.render()
+    assert 'errors_total{error="Forbidden"} 2\n' in rendered
+    assert 'errors_total{error="Bad \\"quote\\""} 1\n' in rendered
+
+    with pytest.raises(ValueError):
+        counter.labels("a", "b")
+
+
+def test_registry_duplicate_metric(registry):
+    registry.counter("test_total", "Test counter")
+    with pytest.raises(ValueError):
+        registry.gauge("test_total", "Test gauge")
+
+
+def test_registry_gauge(registry):
+    gauge = registry.gauge("depth", "Depth")
+    gauge.inc(5)
+    gauge.dec(2)
+    assert gauge.value == 3
+    gauge.set(7)
+    assert "depth 7\n" in registry.render()
+
+
+def test_registry_gauge_function(registry):
+    gauge = registry.gauge("chats", "Chats", ("state",))
+    gauge.set_function(lambda: {("running",): 2, ("total",): 3})
+    rendered = registry.render()
+    assert 'chats{state="running"} 2\n' in rendered
+    assert 'chats{state="total"} 3\n' in rendered
+
+    # A failing function does not break the other metrics
+    gauge.set_function(lambda: 1 / 0)
+    registry.counter("other_total", "Other").inc()
+    assert "other_total 1\n" in registry.render()
+
+
+def test_registry_histogram(registry):
+    histogram = registry.histogram("latency_seconds", "Latency", ("kind",),
+                                   buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.labels("news").observe(value)
+    rendered = registry.render()
+    assert 'latency_seconds_bucket{kind="news",le="0.1"} 2\n' in rendered
+    assert 'latency_seconds_bucket{kind="news",le="1"} 3\n' in rendered
+    assert 'latency_seconds_bucket{kind="news",le="+Inf"} 4\n' in rendered
+    assert 'latency_seconds_sum{kind="news"} 5.65\n' in rendered
+    assert 'latency_seconds_count{kind="news"} 4\n' in rendered
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_monitor():
+    probes = metrics.EVENT_LOOP_LAG_SECONDS.count
+    lag = metrics.EVENT_LOOP_LAG_SECONDS.sum
+    monitor = LoopLagMonitor(interval=0.01)
+    monitor.start()
+    await asyncio.sleep(0.02)
+    # Blocks the loop, the next probe is late
+    time.sleep(0.05)
+    await asyncio.sleep(0.03)
+    await monitor.stop()
+
+    assert metrics.EVENT_LOOP_LAG_SECONDS.count > probes
+    assert metrics.EVENT_LOOP_LAG_SECONDS.sum - lag >= 0.03
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+from dataclasses import replace
+
 import pytest
 
 from cs2posts.post import FeedType
 from cs2posts.post import Post
+from cs2posts.post import PostKind
 
 
 @pytest.fixture
@@ -65,7 +68,7 @@ def test_post_to_dict(post_fixture):
         "feedname": post_fixture.feedname,
         "feed_type": post_fixture.feed_type,
         "appid": post_fixture.appid,
-        "tags": post_fixture.tags
+        "tags": ["patchnotes"]
     }
     assert post_fixture.to_dict() == expected
 
@@ -97,5 +100,43 @@ def test_post_not_equals(post_fixture, post_fixture2):
 def test_post_is_newer_than(post_fixture, post_fixture2):
     assert not post_fixture.is_newer_than(None)
     assert not post_fixture.is_newer_than(post_fixture2)
-    post_fixture2.date = 123456789
+    post_fixture2 = replace(post_fixture2, date=123456789)
     assert post_fixture.is_newer_than(post_fixture2)
+
+
+def test_post_is_immutable(post_fixture):
+    with pytest.raises(AttributeError):
+        post_fixture.title = "Changed"
+    assert post_fixture.tags == ("patchnotes",)
+
+
+def test_post_classification_is_cached(post_fixture, post_fixture2):
+    assert post_fixture.kind is PostKind.UPDATE
+    assert post_fixture2.kind is PostKind.NEWS
+    assert post_fixture.get_feed_type() is FeedType.INTERN
+
+    external = replace(post_fixture2, feed_type=0)
+    assert external.kind is PostKind.EXTERNAL
+    assert external.is_external()
+    assert not external.is_news()
+
+    # External posts with release notes stay updates as well
+    external_update = replace(post_fixture, feed_type=0)
+    assert external_update.is_update()
+    assert external_update.is_external()
+
+
+def test_post_equals_gid_date_and_content(post_fixture):
+    same = replace(post_fixture, tags=["patchnotes"])
+    assert same == post_fixture
+    assert hash(same) == hash(post_fixture)
+    assert len({post_fixture, same}) == 1
+
+    assert replace(post_fixture, contents="Edited body") != post_fixture
+    assert replace(post_fixture, date=1) != post_fixture
+    assert replace(post_fixture, gid="3") != post_fixture
+
+
+def test_post_get_item_unknown_key(post_fixture):
+    with pytest.raises(KeyError):
+        post_fixture["kind"]
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from cs2posts.search import Fts5SearchIndex
+from cs2posts.search import InvertedSearchIndex
+from cs2posts.search import tokenize
+
+
+ENTRIES = [
+    ("1", "Release Notes for 4/17/2024", "Fixed a bug with the Ancient map"),
+    ("2", "Premier Season One", "Ancient returns to the active duty pool"),
+    ("3", "Ancient", "New map update"),
+    ("4", "Counter-Strike 2 Update", "Fixed smoke grenades on Mirage"),
+]
+
+
+@pytest.fixture(params=["fts5", "inverted"])
+def index(request):
+    if request.param == "inverted":
+        yield InvertedSearchIndex()
+        return
+
+    connection = sqlite3.connect(":memory:")
+    if not Fts5SearchIndex.is_supported(connection):
+        pytest.skip("SQLite without FTS5")
+    yield Fts5SearchIndex(connection)
+    connection.close()
+
+
+def test_search_tokenize():
+    assert tokenize("Counter-Strike 2: ÜBER Patch!") == ["counter", "strike", "2", "über", "patch"]
+
+
+def test_search_index_ranks_title_matches_first(index):
+    assert index.is_empty()
+    index.index(ENTRIES)
+    assert not index.is_empty()
+
+    assert index.search("ancient", 10)[0] == "3"
+    assert sorted(index.search("ancient", 10)) == ["1", "2", "3"]
+    assert index.search("ANCIENT", 1) == ["3"]
+
+
+def test_search_index_all_terms_must_match(index):
+    index.index(ENTRIES)
+    assert sorted(index.search("fixed", 10)) == ["1", "4"]
+    assert index.search("fixed mirage", 10) == ["4"]
+    assert index.search("fixed nuke", 10) == []
+    assert index.search("unknown", 10) == []
+    assert index.search("", 10) == []
+
+
+def test_search_index_ignores_query_syntax(index):
+    index.index(ENTRIES)
+    assert index.search('"map" (update* -', 10) == ["3"]
+
+
+def test_search_index_remove_and_rebuild(index):
+    index.index(ENTRIES)
+    index.remove(["3"])
+    index.index([("3", "Nuke", "New map")])
+    assert sorted(index.search("ancient", 10)) == ["1", "2"]
+    assert index.search("nuke", 10) == ["3"]
+
+    index.rebuild(ENTRIES[:2])
+    assert index.search("nuke", 10) == []
+    assert sorted(index.search("ancient", 10)) == ["1", "2"]
@@ -1,14 +1,25 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import time
+from unittest.mock import Mock
+from unittest.mock import patch
 
 import pytest
 
 from cs2posts.bot.chats import Chat
 from cs2posts.bot.chats import Chats
+from cs2posts.bot.columnar import ColumnarChats
+from cs2posts.bot.keywords import KeywordSubscriptions
+from cs2posts.store import LocalChatSnapshotStore
 from cs2posts.store import LocalChatStore
+from cs2posts.store import LocalKeywordStore
 from cs2posts.store import LocalLatestPostStore
+from cs2posts.store import LocalTopicStore
 from cs2posts.store import Post
+from cs2posts.store import STORE_FORMAT_VERSION
+from cs2posts.store import ThreadedStore
 
 
 @pytest.fixture
@@ -114,6 +125,11 @@ def test_local_latest_post_store_get_latest_update_post(local_latest_post_store,
     assert actual_post == expected_post
 
 
+def test_local_latest_post_store_missing_key(local_latest_post_store, data_latest):
+    assert local_latest_post_store.get_latest_external_post() is None
+    assert local_latest_post_store.get_latest_post() == Post(**data_latest["update"])
+
+
 def test_local_chat_store_load(local_chat_store, data_chats):
     chats = local_chat_store.load()
     assert isinstance(chats, Chats)
@@ -130,3 +146,242 @@ def test_local_chat_store_save(local_chat_store):
 
     for chat in chats:
         assert chat in actual_chats
+
+
+def test_local_chat_store_load_legacy_spam_state(local_chat_store):
+    # Spam state written by earlier versions is dropped on load
+    legacy = {**Chat(1, is_running=True).to_json(),
+              "strikes": 2, "is_banned": True, "is_removed_while_banned": False}
+    removed = {**Chat(2).to_json(),
+               "strikes": 3, "is_banned": True, "is_removed_while_banned": True}
+    with open(local_chat_store.filepath, "w") as fs:
+        json.dump({"chats": [legacy, removed]}, fs)
+    local_chat_store.manifest_filepath.unlink(missing_ok=True)
+
+    chats = local_chat_store.load()
+    assert len(chats) == 1
+    assert chats.get(1) == Chat(1, is_running=True)
+    assert "strikes" not in chats.get(1).to_json()
+
+
+def test_local_store_create_writes_manifest(tmp_path):
+    store = LocalChatStore(tmp_path / "chats.json")
+    assert store.manifest_filepath.exists()
+    assert store.read_manifest()["count"] == 0
+    assert store.is_empty()
+
+
+def test_local_chat_store_save_updates_manifest(local_chat_store):
+    local_chat_store.save(Chats(chats=[Chat(1), Chat(2), Chat(3)]))
+    manifest = local_chat_store.read_manifest()
+    assert manifest["count"] == 3
+    assert local_chat_store.is_empty() is False
+
+
+def test_local_store_is_empty_does_not_parse_with_manifest(local_chat_store):
+    local_chat_store.save(Chats(chats=[Chat(1)]))
+    with patch('cs2posts.store.json.load', wraps=json.load) as mocked_load:
+        assert local_chat_store.is_empty() is False
+        # Only the manifest is read
+        assert mocked_load.call_count == 1
+
+
+def test_local_store_outdated_manifest_is_ignored(local_chat_store):
+    local_chat_store.save(Chats())
+    assert local_chat_store.is_empty()
+
+    with open(local_chat_store.filepath, "w") as fs:
+        json.dump({"chats": [Chat(1).to_json()]}, fs)
+
+    assert local_chat_store.read_manifest() is None
+    assert local_chat_store.is_empty() is False
+    assert len(local_chat_store.load()) == 1
+
+
+def test_local_store_unsupported_version(local_chat_store):
+    local_chat_store.save(Chats())
+    with open(local_chat_store.manifest_filepath) as fs:
+        manifest = json.load(fs)
+    manifest["version"] = STORE_FORMAT_VERSION + 1
+    with open(local_chat_store.manifest_filepath, "w") as fs:
+        json.dump(manifest, fs)
+
+    with pytest.raises(ValueError):
+        local_chat_store.load()
+
+
+def test_local_chat_store_load_parses_once(local_chat_store):
+    local_chat_store.save(Chats(chats=[Chat(1), Chat(2)]))
+    with patch('cs2posts.store.json.load', wraps=json.load) as mocked_load:
+        chats = local_chat_store.load()
+        # manifest + data file
+        assert mocked_load.call_count == 2
+    assert len(chats) == 2
+
+
+def test_local_chat_store_load_legacy_parses_once(local_chat_store):
+    local_chat_store.manifest_filepath.unlink(missing_ok=True)
+    with patch('cs2posts.store.json.load', wraps=json.load) as mocked_load:
+        chats = local_chat_store.load()
+        assert mocked_load.call_count == 1
+    assert len(chats) == 2
+
+
+@pytest.mark.asyncio
+async def test_threaded_store_roundtrip(local_chat_store):
+    store = ThreadedStore(local_chat_store)
+    await store.save(Chats(chats=[Chat(7)]))
+    assert await store.is_empty() is False
+    chats = await store.load()
+    assert Chat(7) in chats
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_threaded_store_coalesces_saves_of_same_object():
+    mocked_store = Mock()
+    mocked_store.save.side_effect = lambda data: time.sleep(0.05)
+    store = ThreadedStore(mocked_store)
+    chats = Chats()
+
+    await asyncio.gather(*[store.save(chats) for _ in range(10)])
+
+    # First save is running while the others queue up behind one write
+    assert mocked_store.save.call_count == 2
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_threaded_store_does_not_coalesce_different_objects():
+    mocked_store = Mock()
+    store = ThreadedStore(mocked_store)
+
+    await asyncio.gather(store.save("a"), store.save("b"), store.save("c"))
+
+    assert [c.args[0] for c in mocked_store.save.call_args_list] == [
+        "a", "b", "c"]
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_threaded_store_save_raises():
+    mocked_store = Mock()
+    mocked_store.save.side_effect = OSError("disk full")
+    store = ThreadedStore(mocked_store)
+
+    with pytest.raises(OSError):
+        await store.save(Chats())
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_threaded_store_coalesced_saves_share_error():
+    def save(data):
+        if mocked_store.save.call_count > 1:
+            raise OSError("disk full")
+        time.sleep(0.05)
+
+    mocked_store = Mock()
+    mocked_store.save.side_effect = save
+    store = ThreadedStore(mocked_store)
+    chats = Chats()
+
+    results = await asyncio.gather(*[store.save(chats) for _ in range(5)],
+                                   return_exceptions=True)
+
+    # The queued write failed, every save coalesced into it sees its error
+    assert results[0] is None
+    assert all(isinstance(result, OSError) for result in results[1:])
+    assert mocked_store.save.call_count == 2
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_threaded_store_coalesced_saves_retry_cancelled_save():
+    mocked_store = Mock()
+    mocked_store.save.side_effect = lambda data: time.sleep(0.05)
+    store = ThreadedStore(mocked_store)
+    chats = Chats()
+
+    # Keeps the lock, the next save of chats is queued behind it
+    blocking = asyncio.create_task(store.save("other"))
+    await asyncio.sleep(0)
+    leading = asyncio.create_task(store.save(chats))
+    await asyncio.sleep(0)
+    coalesced = [asyncio.create_task(store.save(chats)) for _ in range(3)]
+    await asyncio.sleep(0)
+
+    leading.cancel()
+    await asyncio.gather(blocking, *coalesced)
+
+    # One retried write for all coalesced saves
+    assert leading.cancelled()
+    assert [c.args[0] for c in mocked_store.save.call_args_list] == ["other", chats]
+    store.close()
+
+
+def test_local_chat_snapshot_store_create(tmp_path):
+    store = LocalChatSnapshotStore(tmp_path / "chats.bin")
+    assert store.filepath.exists()
+    assert store.is_empty()
+    assert len(store.load()) == 0
+
+
+def test_local_chat_snapshot_store_save_and_load(tmp_path):
+    store = LocalChatSnapshotStore(tmp_path / "chats.bin")
+    chats = [Chat(41, is_running=True), Chat(1338, chat_id_admin=1)]
+    store.save(Chats(chats=chats))
+
+    assert store.is_empty() is False
+    actual_chats = store.load()
+    for chat in chats:
+        assert actual_chats.get(chat.chat_id) == chat
+
+
+def test_local_chat_store_columnar(tmp_path):
+    store = LocalChatStore(tmp_path / "chats.json", columnar=True)
+    store.save(ColumnarChats(chats=[Chat(1, is_running=True), Chat(2)]))
+
+    chats = store.load()
+    assert isinstance(chats, ColumnarChats)
+    assert chats.get_audience_ids("running") == [1]
+
+
+def test_local_chat_snapshot_store_columnar(tmp_path):
+    store = LocalChatSnapshotStore(tmp_path / "chats.bin", columnar=True)
+    assert isinstance(store.load(), ColumnarChats)
+
+    store.save(ColumnarChats(chats=[Chat(1, is_running=True), Chat(2)]))
+    chats = store.load()
+    assert isinstance(chats, ColumnarChats)
+    assert len(chats) == 2
+    assert chats.get_audience_ids("running") == [1]
+
+
+def test_local_keyword_store_save_and_load(tmp_path):
+    store = LocalKeywordStore(tmp_path / "keywords.json")
+    assert store.is_empty()
+    assert len(store.load()) == 0
+
+    subscriptions = KeywordSubscriptions()
+    subscriptions.subscribe(1, "Mirage")
+    subscriptions.subscribe(1, "premier")
+    subscriptions.subscribe(2, "mirage")
+    store.save(subscriptions)
+
+    assert not store.is_empty()
+    loaded = store.load()
+    assert loaded.get(1) == ["mirage", "premier"]
+    assert loaded.get(2) == ["mirage"]
+    assert loaded.match("New Mirage update") == {1, 2}
+
+
+def test_local_topic_store_save_and_load(tmp_path):
+    store = LocalTopicStore(tmp_path / "topics.json")
+    subscriptions = store.load()
+    subscriptions.subscribe(1, "Major")
+    store.save(subscriptions)
+
+    loaded = store.load()
+    assert type(loaded) is type(subscriptions)
+    assert loaded.get(1) == ["major"]
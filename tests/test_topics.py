@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from cs2posts.post import Post
+from cs2posts.topics import TopicClassifier
+
+
+def create_post(title: str, feed_type: int = 1, tags: list[str] | None = None,
+                feedname: str = "steam_community_announcements") -> Post:
+    return Post(gid="1",
+                title=title,
+                url="url",
+                is_external_url=False,
+                author="author",
+                contents="contents",
+                feedlabel="feedlabel",
+                date=1234567890,
+                feedname=feedname,
+                feed_type=feed_type,
+                appid=730,
+                tags=tags or [])
+
+
+def test_topics_classify_update():
+    post = create_post("Release Notes for 4/16/2024", tags=["patchnotes"])
+    assert TopicClassifier().classify(post) == {
+        "update",
+        "release-notes",
+        "tag:patchnotes",
+        "feed:steam_community_announcements",
+    }
+
+
+def test_topics_classify_news_title_patterns():
+    post = create_post("PGL Major Copenhagen 2024 and Premier Season")
+    assert TopicClassifier().classify(post) == {
+        "news",
+        "major",
+        "premier",
+        "feed:steam_community_announcements",
+    }
+
+
+def test_topics_classify_external():
+    post = create_post("Majority report", feed_type=0, feedname="PC Gamer")
+    assert TopicClassifier().classify(post) == {"external", "feed:pc gamer"}
+
+
+def test_topics_custom_title_patterns():
+    classifier = TopicClassifier({"Maps": r"\b(mirage|inferno)\b"})
+    assert classifier.title_topics == ["maps"]
+    assert "maps" in classifier.classify(create_post("Inferno changes"))
+    assert "maps" not in classifier.classify(create_post("Nuke changes"))
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from cs2posts.cs2 import CounterStrike2Posts
+from cs2posts.tracing import NOOP_SPAN
+from cs2posts.tracing import span
+from cs2posts.tracing import TRACER
+from cs2posts.tracing import Tracer
+
+
+@pytest.fixture
+def tracer():
+    tracer = Tracer(max_spans=100)
+    tracer.enable()
+    return tracer
+
+
+@pytest.fixture
+def global_tracer():
+    TRACER.clear()
+    TRACER.enable()
+    yield TRACER
+    TRACER.disable()
+    TRACER.clear()
+
+
+def test_tracer_disabled():
+    tracer = Tracer()
+    assert tracer.enabled is False
+    with tracer.span("crawl", count=10) as current:
+        current.set_attribute("bytes", 42)
+    assert current is NOOP_SPAN
+    assert tracer.spans == []
+
+
+def test_tracer_nested_spans(tracer):
+    with tracer.span("post_check") as root:
+        with tracer.span("crawl", count=10) as child:
+            child.set_attribute("bytes", 42)
+    with tracer.span("post_check") as other:
+        pass
+
+    assert tracer.spans == [child, root, other]
+    assert root.parent_span_id is None
+    assert child.parent_span_id == root.span_id
+    assert child.trace_id == root.trace_id
+    assert other.trace_id != root.trace_id
+    assert child.attributes == {"count": 10, "bytes": 42}
+    assert root.start <= child.start <= child.end <= root.end
+    assert child.duration >= 0
+
+
+def test_tracer_records_errors(tracer):
+    with pytest.raises(ValueError):
+        with tracer.span("parse"):
+            raise ValueError("invalid json")
+
+    assert tracer.spans[0].to_dict()["status"] == "ERROR"
+    assert tracer.spans[0].error == "ValueError: invalid json"
+
+
+def test_tracer_keeps_latest_spans(tracer):
+    tracer.enable(max_spans=2)
+    for i in range(3):
+        with tracer.span("send", chat_id=i):
+            pass
+    assert [span.attributes["chat_id"] for span in tracer.spans] == [1, 2]
+
+    tracer.clear()
+    assert tracer.spans == []
+
+
+@pytest.mark.asyncio
+async def test_tracer_spans_follow_threads_and_tasks(tracer):
+    def crawl():
+        with tracer.span("crawl"):
+            pass
+
+    async def send():
+        with tracer.span("send"):
+            await asyncio.sleep(0)
+
+    with tracer.span("post_check") as root:
+        await asyncio.to_thread(crawl)
+        await asyncio.gather(send(), send())
+
+    children = [span for span in tracer.spans if span is not root]
+    assert sorted(span.name for span in children) == ["crawl", "send", "send"]
+    assert all(span.parent_span_id == root.span_id for span in children)
+
+
+def test_tracer_export(tracer, tmp_path):
+    with tracer.span("broadcast", gid="1337", chats=2):
+        with tracer.span("send", chat_id=1):
+            pass
+
+    filepath = tmp_path / "trace.json"
+    assert tracer.export(filepath) == 2
+
+    spans = json.loads(filepath.read_text())["spans"]
+    assert [span["name"] for span in spans] == ["broadcast", "send"]
+    assert spans[0]["attributes"] == {"gid": "1337", "chats": 2}
+    assert spans[1]["parent_span_id"] == spans[0]["span_id"]
+    assert spans[0]["status"] == "OK"
+    assert spans[0]["end_time_unix_nano"] >= spans[1]["end_time_unix_nano"]
+
+
+def test_parse_span(global_tracer):
+    data = {"appnews": {"newsitems": []}}
+    with span("post_check"):
+        CounterStrike2Posts(data)
+
+    parse = global_tracer.spans[0]
+    assert parse.name == "parse"
+    assert parse.attributes == {"newsitems": 0, "posts": 0}